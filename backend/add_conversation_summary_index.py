@@ -0,0 +1,38 @@
+"""
+conversation_summaries 테이블에 (conversation_id, created_at) 커버링 인덱스 추가
+
+다른 대화 요약 조회(대화별 ROW_NUMBER() OVER (... ORDER BY created_at DESC))가
+정렬 없이 인덱스만 읽도록 하고, summary를 함께 저장해 테이블 조회를 생략합니다.
+"""
+import sys
+from pathlib import Path
+
+backend_dir = Path(__file__).parent
+sys.path.insert(0, str(backend_dir))
+
+from sqlalchemy import text
+from app.db.database import engine
+
+
+def add_conversation_summary_index():
+    """conversation_summaries (conversation_id, created_at) INCLUDE (summary) 인덱스 추가"""
+
+    with engine.connect() as conn:
+        try:
+            print("Creating ix_conversation_summaries_conversation_created_at index...")
+            conn.execute(text("""
+                CREATE INDEX IF NOT EXISTS ix_conversation_summaries_conversation_created_at
+                ON conversation_summaries (conversation_id, created_at)
+                INCLUDE (summary)
+            """))
+            conn.commit()
+            print("✅ ix_conversation_summaries_conversation_created_at index created successfully!")
+
+        except Exception as e:
+            print(f"❌ Error: {e}")
+            conn.rollback()
+            raise
+
+
+if __name__ == "__main__":
+    add_conversation_summary_index()
@@ -0,0 +1,36 @@
+"""
+messages 테이블에 (conversation_id, created_at) 복합 인덱스 추가
+
+대화별 최근 메시지 조회(ORDER BY created_at DESC LIMIT N)가 정렬 없이 인덱스만 읽도록 합니다.
+"""
+import sys
+from pathlib import Path
+
+backend_dir = Path(__file__).parent
+sys.path.insert(0, str(backend_dir))
+
+from sqlalchemy import text
+from app.db.database import engine
+
+
+def add_message_history_index():
+    """messages (conversation_id, created_at) 인덱스 추가"""
+
+    with engine.connect() as conn:
+        try:
+            print("Creating ix_messages_conversation_created_at index...")
+            conn.execute(text("""
+                CREATE INDEX IF NOT EXISTS ix_messages_conversation_created_at
+                ON messages (conversation_id, created_at)
+            """))
+            conn.commit()
+            print("✅ ix_messages_conversation_created_at index created successfully!")
+
+        except Exception as e:
+            print(f"❌ Error: {e}")
+            conn.rollback()
+            raise
+
+
+if __name__ == "__main__":
+    add_message_history_index()
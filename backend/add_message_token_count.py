@@ -0,0 +1,62 @@
+"""
+messages 테이블에 token_count 컬럼 추가 및 기존 메시지 토큰 수 채우기
+
+토큰 수는 app.services.token_counter의 Gemini 토크나이저 근사로 계산합니다.
+"""
+import sys
+from pathlib import Path
+
+backend_dir = Path(__file__).parent
+sys.path.insert(0, str(backend_dir))
+
+from sqlalchemy import text
+from app.db.database import engine
+from app.services.token_counter import count_tokens
+
+BATCH_SIZE = 1000
+
+
+def add_message_token_count_column():
+    """Messages 테이블에 token_count 컬럼 추가 후 배치로 채우기"""
+
+    with engine.connect() as conn:
+        try:
+            # 1. token_count 컬럼 추가
+            print("Adding token_count column to messages table...")
+            conn.execute(text("""
+                ALTER TABLE messages
+                ADD COLUMN IF NOT EXISTS token_count INTEGER
+            """))
+            conn.commit()
+            print("✅ token_count column added successfully!")
+
+            # 2. 기존 메시지 토큰 수 채우기 (배치)
+            print("Backfilling token_count...")
+            total = 0
+            while True:
+                rows = conn.execute(text("""
+                    SELECT id, content FROM messages
+                    WHERE token_count IS NULL
+                    LIMIT :limit
+                """), {"limit": BATCH_SIZE}).fetchall()
+                if not rows:
+                    break
+
+                conn.execute(
+                    text("UPDATE messages SET token_count = :token_count WHERE id = :id"),
+                    [{"id": row.id, "token_count": count_tokens(row.content)} for row in rows]
+                )
+                conn.commit()
+                total += len(rows)
+                print(f"  - {total} messages updated")
+
+            print(f"✅ token_count backfilled for {total} messages!")
+
+        except Exception as e:
+            print(f"❌ Error: {e}")
+            conn.rollback()
+            raise
+
+
+if __name__ == "__main__":
+    add_message_token_count_column()
@@ -0,0 +1,73 @@
+"""
+user_prompt_preferences 테이블에 선호도 누적 학습 카운터 컬럼 추가
+
+- positive_feedbacks: 긍정 피드백 수
+- length_{short,medium,long}_score / _count: 응답 길이 구간별 피드백 점수 합 / 개수
+- emoji_score / emoji_count, plain_score / plain_count: 이모지 유무별 피드백 점수 합 / 개수
+
+컬럼 추가 후 기존 선호도 행마다 피드백 기록에서 카운터를 다시 만듭니다.
+"""
+import sys
+from pathlib import Path
+
+backend_dir = Path(__file__).parent
+sys.path.insert(0, str(backend_dir))
+
+from sqlalchemy import text
+from app.db.database import engine, SessionLocal
+from app.models.user_prompt_preference import UserPromptPreference
+from app.services.preference_learning_service import update_user_preferences
+
+
+COUNTER_COLUMNS = [
+    "positive_feedbacks",
+    "length_short_score",
+    "length_short_count",
+    "length_medium_score",
+    "length_medium_count",
+    "length_long_score",
+    "length_long_count",
+    "emoji_score",
+    "emoji_count",
+    "plain_score",
+    "plain_count",
+]
+
+
+def add_preference_counter_columns():
+    """선호도 카운터 컬럼 추가 및 기존 선호도 재계산"""
+
+    with engine.connect() as conn:
+        try:
+            print("Adding preference counter columns to user_prompt_preferences table...")
+            for column in COUNTER_COLUMNS:
+                conn.execute(text(f"""
+                    ALTER TABLE user_prompt_preferences
+                    ADD COLUMN IF NOT EXISTS {column} INTEGER NOT NULL DEFAULT 0
+                """))
+            conn.commit()
+            print(f"✅ {len(COUNTER_COLUMNS)} counter columns added successfully!")
+
+        except Exception as e:
+            print(f"❌ Error: {e}")
+            conn.rollback()
+            raise
+
+    db = SessionLocal()
+    try:
+        keys = db.query(UserPromptPreference.user_id, UserPromptPreference.character_id).all()
+        print(f"Rebuilding counters for {len(keys)} preferences...")
+        for user_id, character_id in keys:
+            update_user_preferences(db, user_id, character_id)
+        print("✅ Preference counters rebuilt successfully!")
+
+    except Exception as e:
+        print(f"❌ Error: {e}")
+        db.rollback()
+        raise
+    finally:
+        db.close()
+
+
+if __name__ == "__main__":
+    add_preference_counter_columns()
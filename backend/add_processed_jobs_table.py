@@ -0,0 +1,29 @@
+"""
+processed_jobs 테이블 생성 (백그라운드 작업 멱등 키)
+
+작업 큐가 임대 만료 작업을 다른 프로세스에서 다시 실행해도 메트릭/토큰 사용량/메모리가
+중복 반영되지 않도록, 처리한 job_id를 효과와 같은 트랜잭션으로 기록합니다.
+"""
+import sys
+from pathlib import Path
+
+backend_dir = Path(__file__).parent
+sys.path.insert(0, str(backend_dir))
+
+from app.db.database import engine
+from app.models.processed_job import ProcessedJob
+
+
+def add_processed_jobs_table():
+    """processed_jobs 테이블 생성"""
+    try:
+        print("Creating processed_jobs table...")
+        ProcessedJob.__table__.create(bind=engine, checkfirst=True)
+        print("✅ processed_jobs table created successfully!")
+    except Exception as e:
+        print(f"❌ Error: {e}")
+        raise
+
+
+if __name__ == "__main__":
+    add_processed_jobs_table()
@@ -0,0 +1,65 @@
+"""
+계층적 대화 요약을 위한 컬럼 추가
+
+- conversations.summarized_until: 요약된 마지막 메시지 시각 (요약 워터마크)
+- conversation_summaries.level: 요약 단계 (0: 구간 요약, 1: 누적 요약)
+
+기존 대화는 마지막 요약의 끝 메시지 시각으로 워터마크를 채웁니다.
+"""
+import sys
+from pathlib import Path
+
+backend_dir = Path(__file__).parent
+sys.path.insert(0, str(backend_dir))
+
+from sqlalchemy import text
+from app.db.database import engine
+
+
+def add_rolling_summary_columns():
+    """summarized_until, level 컬럼 추가 및 기존 대화 워터마크 채우기"""
+
+    with engine.connect() as conn:
+        try:
+            print("Adding summarized_until column to conversations table...")
+            conn.execute(text("""
+                ALTER TABLE conversations
+                ADD COLUMN IF NOT EXISTS summarized_until TIMESTAMPTZ
+            """))
+            print("Adding level column to conversation_summaries table...")
+            conn.execute(text("""
+                ALTER TABLE conversation_summaries
+                ADD COLUMN IF NOT EXISTS level INTEGER NOT NULL DEFAULT 0
+            """))
+            conn.commit()
+            print("✅ summarized_until, level columns added successfully!")
+
+            # 스키마 변경 커밋 후 별도 트랜잭션으로 워터마크 채우기
+            print("Backfilling summarized_until from existing summaries...")
+            result = conn.execute(text("""
+                UPDATE conversations c
+                SET summarized_until = (
+                    SELECT m.created_at
+                    FROM conversation_summaries cs
+                    JOIN messages m ON m.id = cs.end_message_id
+                    WHERE cs.conversation_id = c.id
+                    ORDER BY m.created_at DESC
+                    LIMIT 1
+                )
+                WHERE c.summarized_until IS NULL
+                  AND EXISTS (
+                      SELECT 1 FROM conversation_summaries cs
+                      WHERE cs.conversation_id = c.id
+                  )
+            """))
+            conn.commit()
+            print(f"✅ summarized_until backfilled for {result.rowcount} conversations!")
+
+        except Exception as e:
+            print(f"❌ Error: {e}")
+            conn.rollback()
+            raise
+
+
+if __name__ == "__main__":
+    add_rolling_summary_columns()
@@ -0,0 +1,41 @@
+"""
+token_usage 테이블에 컨텍스트 캐시 컬럼 추가
+
+- prompt_cache_hit: Gemini 컨텍스트 캐시 적중 여부 (NULL: 캐시 미사용)
+- cached_input_tokens: 캐시로 절약한 입력 토큰 수
+"""
+import sys
+from pathlib import Path
+
+backend_dir = Path(__file__).parent
+sys.path.insert(0, str(backend_dir))
+
+from sqlalchemy import text
+from app.db.database import engine
+
+
+def add_token_usage_cache_columns():
+    """token_usage 테이블에 prompt_cache_hit, cached_input_tokens 컬럼 추가"""
+
+    with engine.connect() as conn:
+        try:
+            print("Adding prompt cache columns to token_usage table...")
+            conn.execute(text("""
+                ALTER TABLE token_usage
+                ADD COLUMN IF NOT EXISTS prompt_cache_hit BOOLEAN
+            """))
+            conn.execute(text("""
+                ALTER TABLE token_usage
+                ADD COLUMN IF NOT EXISTS cached_input_tokens INTEGER NOT NULL DEFAULT 0
+            """))
+            conn.commit()
+            print("✅ prompt_cache_hit, cached_input_tokens columns added successfully!")
+
+        except Exception as e:
+            print(f"❌ Error: {e}")
+            conn.rollback()
+            raise
+
+
+if __name__ == "__main__":
+    add_token_usage_cache_columns()
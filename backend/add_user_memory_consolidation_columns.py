@@ -0,0 +1,94 @@
+"""
+user_memory 테이블에 메모리 통합 컬럼 및 상위 K 투영 인덱스 추가
+
+- content_hash: 정규화된 내용 해시 (다음 통합 때 채워짐)
+- mention_count: 추출된 횟수
+- confidence_updated_at: 신뢰도 감쇠 기준 시각 (기존 행은 updated_at)
+- projection_rank: 타입별 신뢰도 상위 K 순위 (컨텍스트 조회 대상)
+
+기존 데이터는 타입별 신뢰도 순으로 projection_rank를 채웁니다.
+"""
+import sys
+from pathlib import Path
+
+backend_dir = Path(__file__).parent
+sys.path.insert(0, str(backend_dir))
+
+from sqlalchemy import text
+from app.db.database import engine
+from app.services.memory_consolidation_service import MEMORY_PROJECTION_TOP_K
+
+
+def add_user_memory_consolidation_columns():
+    """user_memory 통합 컬럼/인덱스 추가 및 기존 데이터 채우기"""
+
+    with engine.connect() as conn:
+        try:
+            print("Adding consolidation columns to user_memory table...")
+            conn.execute(text("""
+                ALTER TABLE user_memory
+                ADD COLUMN IF NOT EXISTS content_hash VARCHAR(64)
+            """))
+            conn.execute(text("""
+                ALTER TABLE user_memory
+                ADD COLUMN IF NOT EXISTS mention_count INTEGER NOT NULL DEFAULT 1
+            """))
+            conn.execute(text("""
+                ALTER TABLE user_memory
+                ADD COLUMN IF NOT EXISTS confidence_updated_at TIMESTAMPTZ DEFAULT now()
+            """))
+            conn.execute(text("""
+                ALTER TABLE user_memory
+                ADD COLUMN IF NOT EXISTS projection_rank INTEGER
+            """))
+            conn.commit()
+            print("✅ content_hash, mention_count, confidence_updated_at, projection_rank columns added!")
+
+            print("Creating ix_user_memory_projection index...")
+            conn.execute(text("""
+                CREATE INDEX IF NOT EXISTS ix_user_memory_projection
+                ON user_memory (user_id, character_id)
+                WHERE projection_rank IS NOT NULL
+            """))
+            conn.commit()
+            print("✅ ix_user_memory_projection index created successfully!")
+
+            # 스키마 변경 커밋 후 별도 트랜잭션으로 기존 데이터 채우기
+            print("Backfilling confidence_updated_at and projection_rank...")
+            conn.execute(text("""
+                UPDATE user_memory
+                SET confidence_updated_at = updated_at
+            """))
+
+            top_k_cases = " ".join(
+                f"WHEN '{memory_type}' THEN {top_k}"
+                for memory_type, top_k in MEMORY_PROJECTION_TOP_K.items()
+            )
+            result = conn.execute(text(f"""
+                UPDATE user_memory um
+                SET projection_rank = CASE
+                    WHEN ranked.rn <= (CASE ranked.memory_type {top_k_cases} ELSE 0 END)
+                    THEN ranked.rn
+                END
+                FROM (
+                    SELECT
+                        id, memory_type,
+                        ROW_NUMBER() OVER (
+                            PARTITION BY user_id, character_id, memory_type
+                            ORDER BY confidence_score DESC, updated_at DESC
+                        ) AS rn
+                    FROM user_memory
+                ) ranked
+                WHERE ranked.id = um.id
+            """))
+            conn.commit()
+            print(f"✅ projection_rank backfilled for {result.rowcount} memories!")
+
+        except Exception as e:
+            print(f"❌ Error: {e}")
+            conn.rollback()
+            raise
+
+
+if __name__ == "__main__":
+    add_user_memory_consolidation_columns()
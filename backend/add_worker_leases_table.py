@@ -0,0 +1,29 @@
+"""
+worker_leases 테이블 생성 (백그라운드 워커 임대)
+
+선호도 갱신 워커처럼 프로세스마다 시작되는 주기 작업이 한 프로세스에서만 실행되도록
+워커 이름별 임대(owner, expires_at)를 기록합니다.
+"""
+import sys
+from pathlib import Path
+
+backend_dir = Path(__file__).parent
+sys.path.insert(0, str(backend_dir))
+
+from app.db.database import engine
+from app.models.worker_lease import WorkerLease
+
+
+def add_worker_leases_table():
+    """worker_leases 테이블 생성"""
+    try:
+        print("Creating worker_leases table...")
+        WorkerLease.__table__.create(bind=engine, checkfirst=True)
+        print("✅ worker_leases table created successfully!")
+    except Exception as e:
+        print(f"❌ Error: {e}")
+        raise
+
+
+if __name__ == "__main__":
+    add_worker_leases_table()
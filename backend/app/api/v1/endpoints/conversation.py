@@ -1,15 +1,18 @@
 from fastapi import APIRouter, Depends, HTTPException, status, Query
 from fastapi.responses import StreamingResponse
 from sqlalchemy.orm import Session
-from sqlalchemy import desc
-from typing import List
+from sqlalchemy.ext.asyncio import AsyncSession
+from sqlalchemy import desc, select
+from typing import Any, Dict, List, Optional
 from uuid import UUID
 from datetime import datetime
+import asyncio
 import json
 import re
 
+from app.core.config import settings
 from app.core.security import get_current_user
-from app.db.database import get_db
+from app.db.database import get_db, get_async_db, SessionLocal, AsyncSessionLocal
 from app.models.user import User
 from app.api.dependencies import check_guest_limits
 from app.models.conversation import Conversation
@@ -24,12 +27,21 @@ from app.schemas.conversation import (
 )
 from app.schemas.message import MessageCreate, MessageResponse
 from app.services.llm_service import stream_gemini_response
-from app.services.context_service import build_conversation_context, optimize_context_for_token_limit
+from app.services.context_service import (
+    load_conversation_context,
+    compose_conversation_context,
+    optimize_context_for_token_limit,
+)
 from app.services.summary_service import check_summary_trigger, create_conversation_summary
 from app.services.memory_service import should_update_memory, update_user_memory
 from app.services.emotion_service import detect_emotion, format_emotion_summary
 from app.services.crisis_detection_service import detect_crisis_level
 from app.services.token_tracker import TokenTracker
+from app.services.job_queue import job_queue
+from app.services.job_idempotency import run_job_once, run_job_once_async
+from app.services.context_cache import invalidate_context, invalidate_context_for_conversation
+from app.services.message_window import record_message, discard_conversation
+from app.services.token_counter import count_tokens
 
 router = APIRouter()
 
@@ -106,6 +118,192 @@ def filter_internal_process(text: str) -> str:
     return text.strip()
 
 
+# 스트리밍 필터용 패턴 (filter_internal_process와 동일한 규칙)
+_SECTION_LINE_PATTERN = re.compile(r'^(##|[0-9]+\.)\s')
+_LABEL_LINE_PATTERN = re.compile(r'^\*\*[^*]+\*\*:\s')
+_COUNSELOR_LABEL_PATTERN = re.compile(r'\*\*상담사\*\*:\s*')
+_PREAMBLE_LINE_PATTERN = re.compile(
+    r'^(#{1,6}\s|[0-9]+\s*단계|[0-9]+\.\s|\*\*[^*]+\*\*:|응답 전|내부 분석)'
+)
+# 아직 위 패턴 중 하나로 완성될 수 있는 줄 앞부분 (판단 보류)
+_PENDING_PREFIX_PATTERN = re.compile(
+    r'^(#{1,6}|-{1,2}|[0-9]+\s*\.?|[0-9]+\s*단|\*|\*\*[^*]*|\*\*[^*]+\*|\*\*[^*]+\*\*:?'
+    r'|응|응답|응답 |내|내부|내부 |내부 분)$'
+)
+# 판단 보류를 허용하는 줄 앞부분 최대 길이 (굵은 글씨 한 줄 등)
+_MAX_PENDING_PREFIX = 40
+
+
+class InternalProcessStreamFilter:
+    """
+    filter_internal_process의 스트리밍(상태 기계) 버전
+
+    청크가 들어오는 즉시 사용자에게 보여도 되는 부분만 내보냅니다.
+    줄 단위로 판단하되, 줄 앞부분만으로 판단이 끝나면 줄이 끝나기 전에도 바로 전송합니다.
+
+    상태:
+        detect: 첫 줄을 보고 CoT 서두로 시작하는지 판단
+        preamble: CoT 서두 억제 중 (**상담사**: 또는 --- 를 기다림)
+        lines: 일반 응답 - filter_internal_process의 줄 단위 규칙 적용
+        passthrough: 구분자 이후 실제 응답 - 그대로 전달
+
+    구분자 없이 응답이 끝나면 버퍼링한 원문에 filter_internal_process를 적용해
+    기존 일괄 필터와 같은 결과를 돌려줍니다.
+    """
+
+    def __init__(self):
+        self._state = "detect"
+        self._line = ""  # 현재 줄 (개행 전)
+        self._line_decision: Optional[str] = None  # None(보류) | "keep" | "drop"
+        self._line_sent = 0  # 현재 줄에서 이미 내보낸 문자 수
+        self._in_process_section = False
+        self._pending_newlines = 0
+        self._raw_preamble = ""  # preamble 상태에서의 원문 (폴백용)
+        self._output: List[str] = []
+
+    @property
+    def text(self) -> str:
+        """지금까지 사용자에게 전달된 전체 텍스트 (저장용)"""
+        return "".join(self._output)
+
+    def feed(self, chunk: str) -> str:
+        """
+        청크를 받아 지금 바로 보낼 수 있는 텍스트 반환
+
+        Args:
+            chunk: LLM 스트리밍 청크
+
+        Returns:
+            사용자에게 전송할 텍스트 (없으면 빈 문자열)
+        """
+        emitted = []
+        for part in re.split(r'(\n)', chunk):
+            if not part:
+                continue
+            if part == "\n":
+                emitted.append(self._end_line())
+            else:
+                self._line += part
+                if self._state == "preamble":
+                    self._raw_preamble += part
+                emitted.append(self._advance_line())
+        return "".join(emitted)
+
+    def flush(self) -> str:
+        """
+        스트림 종료 시 남은 텍스트 반환
+
+        Returns:
+            사용자에게 전송할 나머지 텍스트
+        """
+        emitted = self._end_line(final=True)
+        if self._state == "preamble":
+            # 구분자가 끝내 나오지 않음 → 기존 일괄 필터로 폴백
+            emitted += self._emit(filter_internal_process(self._raw_preamble), new_line=True)
+        return emitted
+
+    # ----- 내부 구현 -----
+
+    def _emit(self, text: str, new_line: bool = False) -> str:
+        """줄바꿈 정리(연속 개행 최대 2개, 앞 공백 제거)를 적용하여 출력"""
+        if not self._output:
+            text = text.lstrip()
+        if not text:
+            return ""
+        prefix = "\n" * min(self._pending_newlines, 2) if self._output and new_line else ""
+        self._pending_newlines = 0
+        self._output.append(prefix + text)
+        return prefix + text
+
+    def _advance_line(self, final: bool = False) -> str:
+        """현재 줄의 운명을 판단하고, 유지할 줄이면 확정된 부분을 전송"""
+        if self._state == "preamble":
+            # 상담사 라벨은 줄 중간에 나올 수도 있으므로 매번 확인
+            counselor = _COUNSELOR_LABEL_PATTERN.search(self._line)
+            if counselor:
+                self._line_decision = self._start_passthrough(self._line[counselor.end():])
+
+        if self._line_decision is None:
+            self._line_decision = self._decide(self._line, final)
+        if self._line_decision != "keep" or self._line.strip() == "":
+            return ""
+
+        pending = self._line[self._line_sent:]
+        is_line_start = self._line_sent == 0
+        self._line_sent = len(self._line)
+        return self._emit(pending, new_line=is_line_start)
+
+    def _end_line(self, final: bool = False) -> str:
+        """개행(또는 스트림 종료)으로 줄이 끝났을 때 처리"""
+        emitted = self._advance_line(final=True)
+
+        if self._state == "preamble" and not final:
+            self._raw_preamble += "\n"
+        if self._line_decision == "keep" and self._output:
+            self._pending_newlines += 1
+
+        self._line = ""
+        self._line_decision = None
+        self._line_sent = 0
+        return emitted
+
+    def _start_passthrough(self, rest: str) -> str:
+        """구분자 이후 실제 응답 구간으로 전환"""
+        self._state = "passthrough"
+        self._in_process_section = False
+        self._line = rest
+        self._line_sent = 0
+        return "keep"
+
+    def _decide(self, line: str, final: bool) -> Optional[str]:
+        """
+        줄 앞부분으로 유지/제거 결정
+
+        Returns:
+            "keep" | "drop" | None (더 읽어봐야 함)
+        """
+        if not final and len(line) <= _MAX_PENDING_PREFIX and _PENDING_PREFIX_PATTERN.match(line):
+            return None
+
+        counselor = _COUNSELOR_LABEL_PATTERN.match(line)
+        if counselor:
+            # 라벨 이후만 실제 응답
+            return self._start_passthrough(line[counselor.end():])
+
+        if line.startswith("---"):
+            if self._state in ("detect", "preamble"):
+                return self._start_passthrough(line.lstrip("-").lstrip())
+            return "drop"
+
+        if self._state == "detect":
+            if line.strip() == "":
+                return "drop" if final else None
+            if _PREAMBLE_LINE_PATTERN.match(line):
+                self._state = "preamble"
+                self._raw_preamble = line
+                return "drop"
+            self._state = "lines"
+
+        if self._state == "preamble":
+            return "drop"
+
+        if self._state == "passthrough":
+            return "keep"
+
+        # lines 상태: filter_internal_process 전략 4와 동일한 규칙
+        if line.strip() == "":
+            if not final:
+                return None
+            self._in_process_section = False
+            return "keep"
+        if _SECTION_LINE_PATTERN.match(line):
+            self._in_process_section = True
+            return "drop"
+        if _LABEL_LINE_PATTERN.match(line) or self._in_process_section:
+            return "drop"
+        return "keep"
+
+
 # ============================================
 # 메트릭 자동 수집
 # ============================================
@@ -137,9 +335,9 @@ def update_conversation_metrics(
         db.add(metrics)
         db.flush()  # default 값 적용을 위해 flush
 
-    # 토큰 수 추정 (대략 4자 = 1토큰)
-    input_tokens = len(user_content) // 4
-    output_tokens = len(ai_content) // 4
+    # 토큰 수 계산 (Gemini 토크나이저 근사)
+    input_tokens = count_tokens(user_content)
+    output_tokens = count_tokens(ai_content)
 
     # None 값 방어 코드 추가
     if metrics.total_messages is None:
@@ -181,25 +379,220 @@ def update_conversation_metrics(
         metrics.max_response_time_ms = max(metrics.max_response_time_ms, response_time_ms)
 
     db.commit()
-    
-    # Phase 1: 토큰 사용량 추적 시스템에 기록
-    # user_id는 conversation에서 가져와야 함
-    conversation = db.query(Conversation).filter(
-        Conversation.id == conversation_id
-    ).first()
-    
-    if conversation:
-        TokenTracker.record_usage(
+
+
+def record_chat_token_usage(
+    db: Session,
+    conversation_id: UUID,
+    user_id: UUID,
+    user_content: str,
+    ai_content: str,
+    prompt_cache_hit: Optional[bool] = None,
+    cached_input_tokens: int = 0,
+    input_tokens: Optional[int] = None
+):
+    """
+    Phase 1: 토큰 사용량 추적 시스템에 기록
+
+    Args:
+        db: 데이터베이스 세션
+        conversation_id: 대화 ID
+        user_id: 사용자 ID
+        user_content: 사용자 메시지 내용
+        ai_content: AI 응답 내용
+        prompt_cache_hit: 컨텍스트 캐시 적중 여부 (None: 캐시 미사용)
+        cached_input_tokens: 컨텍스트 캐시로 절약한 입력 토큰
+        input_tokens: 실제 전체 입력 토큰 (컨텍스트 캐시를 쓴 경우, 절약 토큰과 같은 기준)
+    """
+    # 토큰 수 계산 (Gemini 토크나이저 근사)
+    # 캐시를 쓴 요청은 절약 토큰이 입력 토큰을 넘지 않도록 전체 프롬프트 입력으로 기록
+    if input_tokens is None:
+        input_tokens = count_tokens(user_content)
+    TokenTracker.record_usage(
+        db=db,
+        user_id=user_id,
+        input_tokens=input_tokens,
+        output_tokens=count_tokens(ai_content),
+        conversation_id=conversation_id,
+        model_name="gemini-2.5-flash-lite",
+        purpose="chat",
+        prompt_cache_hit=prompt_cache_hit,
+        cached_input_tokens=cached_input_tokens
+    )
+
+
+# ============================================
+# 응답 후 백그라운드 작업
+# ============================================
+# 응답(done) 전송을 늦추지 않도록 메트릭/토큰 기록/요약/메모리 추출은
+# 작업 큐에서 별도 세션으로 실행 (실패 시 재시도, 재시작 시 복구)
+# 작업은 다시 실행될 수 있으므로 누적 작업은 job_id 처리 기록으로 한 번만 반영하고,
+# 요약은 summarized_until 비교 갱신으로, Few-shot 감정은 덮어쓰기로 멱등성을 보장
+
+def _run_once_with_session(job_id: Optional[str], name: str, func, **kwargs):
+    """새 DB 세션으로 동기 함수를 한 번만 반영 (워커 스레드용)"""
+    db = SessionLocal()
+    try:
+        run_job_once(db, job_id, name, func, **kwargs)
+    finally:
+        db.close()
+
+
+@job_queue.register("conversation_metrics")
+async def conversation_metrics_job(payload: dict):
+    """대화 메트릭 업데이트 작업"""
+    await asyncio.to_thread(
+        _run_once_with_session,
+        payload.get("job_id"),
+        "conversation_metrics",
+        update_conversation_metrics,
+        conversation_id=UUID(payload["conversation_id"]),
+        user_content=payload["user_content"],
+        ai_content=payload["ai_content"],
+        response_time_ms=payload["response_time_ms"]
+    )
+
+
+@job_queue.register("chat_token_usage")
+async def chat_token_usage_job(payload: dict):
+    """토큰 사용량 기록 작업"""
+    await asyncio.to_thread(
+        _run_once_with_session,
+        payload.get("job_id"),
+        "chat_token_usage",
+        record_chat_token_usage,
+        conversation_id=UUID(payload["conversation_id"]),
+        user_id=UUID(payload["user_id"]),
+        user_content=payload["user_content"],
+        ai_content=payload["ai_content"],
+        prompt_cache_hit=payload.get("prompt_cache_hit"),
+        cached_input_tokens=payload.get("cached_input_tokens", 0),
+        input_tokens=payload.get("input_tokens")
+    )
+
+
+@job_queue.register("conversation_summary")
+async def conversation_summary_job(payload: dict):
+    """대화 요약 필요 여부 확인 및 자동 생성 작업"""
+    conversation_id = UUID(payload["conversation_id"])
+    db = SessionLocal()
+    try:
+        if await asyncio.to_thread(check_summary_trigger, db, conversation_id):
+            await create_conversation_summary(db, conversation_id)
+    finally:
+        db.close()
+
+
+async def _update_user_memory_if_due(db: Session, conversation_id: UUID, user_id: UUID, character_id: UUID):
+    if await asyncio.to_thread(should_update_memory, db, conversation_id):
+        await update_user_memory(
             db=db,
-            user_id=conversation.user_id,
-            input_tokens=input_tokens,
-            output_tokens=output_tokens,
             conversation_id=conversation_id,
-            model_name="gemini-2.5-flash-lite",
-            purpose="chat"
+            user_id=user_id,
+            character_id=character_id
         )
 
 
+@job_queue.register("user_memory")
+async def user_memory_job(payload: dict):
+    """사용자 메모리 업데이트 작업 (10개 메시지마다)"""
+    db = SessionLocal()
+    try:
+        await run_job_once_async(
+            db,
+            payload.get("job_id"),
+            "user_memory",
+            _update_user_memory_if_due,
+            conversation_id=UUID(payload["conversation_id"]),
+            user_id=UUID(payload["user_id"]),
+            character_id=UUID(payload["character_id"])
+        )
+    finally:
+        db.close()
+
+
+async def enqueue_post_response_jobs(
+    conversation_id: UUID,
+    user_id: UUID,
+    character_id: UUID,
+    user_content: str,
+    ai_content: str,
+    response_time_ms: float,
+    cache_info: Optional[Dict[str, Any]] = None
+):
+    """
+    AI 응답 완료 후 처리할 작업들을 작업 큐에 등록
+
+    Args:
+        conversation_id: 대화 ID
+        user_id: 사용자 ID
+        character_id: AI 캐릭터 ID
+        user_content: 사용자 메시지 내용
+        ai_content: AI 응답 내용
+        response_time_ms: 응답 시간 (밀리초)
+        cache_info: stream_gemini_response가 채운 컨텍스트 캐시 정보
+    """
+    base_payload = {
+        "conversation_id": str(conversation_id),
+        "user_id": str(user_id),
+        "character_id": str(character_id)
+    }
+    content_payload = {
+        **base_payload,
+        "user_content": user_content,
+        "ai_content": ai_content
+    }
+
+    # 메트릭 자동 수집 (응답 시간, 토큰 수 등)
+    await job_queue.enqueue("conversation_metrics", {
+        **content_payload,
+        "response_time_ms": response_time_ms
+    })
+    cache_info = cache_info or {}
+    prompt_cache = cache_info.get("prompt_cache")
+    await job_queue.enqueue("chat_token_usage", {
+        **content_payload,
+        "prompt_cache_hit": None if prompt_cache is None else prompt_cache == "hit",
+        "cached_input_tokens": cache_info.get("cached_tokens", 0) if prompt_cache else 0,
+        "input_tokens": cache_info.get("input_tokens") if prompt_cache else None
+    })
+    # 대화 요약 필요 여부 확인 및 자동 생성
+    await job_queue.enqueue("conversation_summary", base_payload)
+    # 사용자 메모리 업데이트 (10개 메시지마다)
+    await job_queue.enqueue("user_memory", base_payload)
+
+
+# ============================================
+# 감정 감지 (타임아웃 적용)
+# ============================================
+
+DEFAULT_EMOTION_DATA = {
+    "primary_emotion": "neutral",
+    "emotion_category": "neutral",
+    "intensity": 0.0,
+    "secondary_emotions": [],
+    "response_style": "balanced"
+}
+
+
+async def detect_emotion_with_timeout(content: str, timeout: float = 3.0) -> dict:
+    """
+    감정 감지 (시간 초과 시 기본값 반환)
+
+    Args:
+        content: 사용자 메시지 내용
+        timeout: 최대 대기 시간 (초)
+
+    Returns:
+        감정 분석 결과
+    """
+    try:
+        return await asyncio.wait_for(detect_emotion(content), timeout=timeout)
+    except asyncio.TimeoutError:
+        print("⚠️ 감정 감지 시간 초과 (기본값 사용)")
+        return dict(DEFAULT_EMOTION_DATA)
+
+
 @router.post("", response_model=ConversationResponse, status_code=status.HTTP_201_CREATED)
 async def create_conversation(
     conversation_data: ConversationCreate,
@@ -238,6 +631,9 @@ async def create_conversation(
     db.commit()
     db.refresh(new_conversation)
 
+    # 캐시된 대화 수 갱신
+    invalidate_context(current_user.id, new_conversation.character_id)
+
     return new_conversation
 
 
@@ -246,7 +642,7 @@ async def list_conversations(
     skip: int = Query(0, ge=0, description="건너뛸 항목 수"),
     limit: int = Query(20, ge=1, le=100, description="가져올 최대 항목 수"),
     character_id: UUID = Query(None, description="필터링할 AI 캐릭터 ID"),
-    db: Session = Depends(get_db),
+    db: AsyncSession = Depends(get_async_db),
     current_user: User = Depends(get_current_user)
 ):
     """
@@ -256,16 +652,19 @@ async def list_conversations(
     - **limit**: 한 번에 가져올 대화 수 (최대 100)
     - **character_id**: 특정 AI 캐릭터와의 대화만 필터링 (선택)
     """
-    query = db.query(Conversation).filter(
+    query = select(Conversation).where(
         Conversation.user_id == current_user.id
     )
 
     if character_id:
-        query = query.filter(Conversation.character_id == character_id)
+        query = query.where(Conversation.character_id == character_id)
 
-    conversations = query.order_by(
-        desc(Conversation.updated_at)
-    ).offset(skip).limit(limit).all()
+    result = await db.execute(
+        query.order_by(
+            desc(Conversation.updated_at)
+        ).offset(skip).limit(limit)
+    )
+    conversations = result.scalars().all()
 
     # character는 relationship의 lazy="joined"로 자동 로드됨
     return conversations
@@ -274,7 +673,7 @@ async def list_conversations(
 @router.get("/{conversation_id}", response_model=ConversationResponse)
 async def get_conversation(
     conversation_id: UUID,
-    db: Session = Depends(get_db),
+    db: AsyncSession = Depends(get_async_db),
     current_user: User = Depends(get_current_user)
 ):
     """
@@ -282,10 +681,13 @@ async def get_conversation(
 
     - **conversation_id**: 조회할 대화 ID
     """
-    conversation = db.query(Conversation).filter(
-        Conversation.id == conversation_id,
-        Conversation.user_id == current_user.id
-    ).first()
+    result = await db.execute(
+        select(Conversation).where(
+            Conversation.id == conversation_id,
+            Conversation.user_id == current_user.id
+        )
+    )
+    conversation = result.scalar_one_or_none()
 
     if not conversation:
         raise HTTPException(
@@ -300,7 +702,7 @@ async def get_conversation(
 async def update_conversation(
     conversation_id: UUID,
     conversation_data: ConversationUpdate,
-    db: Session = Depends(get_db),
+    db: AsyncSession = Depends(get_async_db),
     current_user: User = Depends(get_current_user)
 ):
     """
@@ -311,10 +713,13 @@ async def update_conversation(
     """
     print(f"📝 제목 수정 요청: conversation_id={conversation_id}, new_title={conversation_data.title}, user_id={current_user.id}")
 
-    conversation = db.query(Conversation).filter(
-        Conversation.id == conversation_id,
-        Conversation.user_id == current_user.id
-    ).first()
+    result = await db.execute(
+        select(Conversation).where(
+            Conversation.id == conversation_id,
+            Conversation.user_id == current_user.id
+        )
+    )
+    conversation = result.scalar_one_or_none()
 
     if not conversation:
         print(f"❌ 대화를 찾을 수 없음: conversation_id={conversation_id}")
@@ -329,8 +734,11 @@ async def update_conversation(
         conversation.title = conversation_data.title
         print(f"✅ 제목 수정 완료: {old_title} → {conversation_data.title}")
 
-    db.commit()
-    db.refresh(conversation)
+    await db.commit()
+    await db.refresh(conversation)
+
+    # 다른 대화 목록에 캐시된 제목 갱신
+    invalidate_context_for_conversation(current_user.id, conversation.character_id, conversation_id)
 
     return conversation
 
@@ -338,7 +746,7 @@ async def update_conversation(
 @router.delete("/{conversation_id}", status_code=status.HTTP_204_NO_CONTENT)
 async def delete_conversation(
     conversation_id: UUID,
-    db: Session = Depends(get_db),
+    db: AsyncSession = Depends(get_async_db),
     current_user: User = Depends(get_current_user)
 ):
     """
@@ -347,10 +755,13 @@ async def delete_conversation(
     - **conversation_id**: 삭제할 대화 ID
     - 대화와 관련된 모든 메시지도 함께 삭제됩니다 (CASCADE)
     """
-    conversation = db.query(Conversation).filter(
-        Conversation.id == conversation_id,
-        Conversation.user_id == current_user.id
-    ).first()
+    result = await db.execute(
+        select(Conversation).where(
+            Conversation.id == conversation_id,
+            Conversation.user_id == current_user.id
+        )
+    )
+    conversation = result.scalar_one_or_none()
 
     if not conversation:
         raise HTTPException(
@@ -358,8 +769,13 @@ async def delete_conversation(
             detail="대화를 찾을 수 없습니다"
         )
 
-    db.delete(conversation)
-    db.commit()
+    character_id = conversation.character_id
+    await db.delete(conversation)
+    await db.commit()
+
+    # 삭제된 대화의 요약/메시지가 캐시에 남지 않도록 무효화
+    invalidate_context(current_user.id, character_id)
+    discard_conversation(conversation_id)
 
     return None
 
@@ -369,7 +785,7 @@ async def get_conversation_messages(
     conversation_id: UUID,
     skip: int = Query(0, ge=0, description="건너뛸 메시지 수"),
     limit: int = Query(50, ge=1, le=100, description="가져올 최대 메시지 수"),
-    db: Session = Depends(get_db),
+    db: AsyncSession = Depends(get_async_db),
     current_user: User = Depends(get_current_user)
 ):
     """
@@ -380,10 +796,13 @@ async def get_conversation_messages(
     - **limit**: 한 번에 가져올 메시지 수 (최대 100)
     """
     # 대화 소유권 확인
-    conversation = db.query(Conversation).filter(
-        Conversation.id == conversation_id,
-        Conversation.user_id == current_user.id
-    ).first()
+    result = await db.execute(
+        select(Conversation).where(
+            Conversation.id == conversation_id,
+            Conversation.user_id == current_user.id
+        )
+    )
+    conversation = result.scalar_one_or_none()
 
     if not conversation:
         raise HTTPException(
@@ -392,11 +811,14 @@ async def get_conversation_messages(
         )
 
     # 메시지 조회 (시간순)
-    messages = db.query(Message).filter(
-        Message.conversation_id == conversation_id
-    ).order_by(
-        Message.created_at
-    ).offset(skip).limit(limit).all()
+    result = await db.execute(
+        select(Message).where(
+            Message.conversation_id == conversation_id
+        ).order_by(
+            Message.created_at
+        ).offset(skip).limit(limit)
+    )
+    messages = result.scalars().all()
 
     return messages
 
@@ -405,7 +827,7 @@ async def get_conversation_messages(
 async def stream_chat_message(
     conversation_id: UUID,
     message_data: MessageCreate,
-    db: Session = Depends(get_db),
+    db: AsyncSession = Depends(get_async_db),
     current_user: User = Depends(get_current_user)
 ):
     """
@@ -416,10 +838,13 @@ async def stream_chat_message(
     - 실시간으로 AI 응답을 스트리밍으로 반환합니다
     """
     # 대화 소유권 확인
-    conversation = db.query(Conversation).filter(
-        Conversation.id == conversation_id,
-        Conversation.user_id == current_user.id
-    ).first()
+    result = await db.execute(
+        select(Conversation).where(
+            Conversation.id == conversation_id,
+            Conversation.user_id == current_user.id
+        )
+    )
+    conversation = result.scalar_one_or_none()
 
     if not conversation:
         raise HTTPException(
@@ -428,9 +853,7 @@ async def stream_chat_message(
         )
 
     # AI 캐릭터 정보 가져오기
-    character = db.query(AICharacter).filter(
-        AICharacter.id == conversation.character_id
-    ).first()
+    character = await db.get(AICharacter, conversation.character_id)
 
     if not character:
         raise HTTPException(
@@ -442,32 +865,29 @@ async def stream_chat_message(
     user_message = Message(
         conversation_id=conversation_id,
         role="user",
-        content=message_data.content
+        content=message_data.content,
+        token_count=count_tokens(message_data.content)
     )
     db.add(user_message)
-    db.commit()
-    db.refresh(user_message)
-
-    # 감정 감지 (비동기, 타임아웃 적용)
-    import asyncio
-    try:
-        emotion_data = await asyncio.wait_for(detect_emotion(message_data.content), timeout=3.0)
-    except asyncio.TimeoutError:
-        print("⚠️ 감정 감지 시간 초과 (기본값 사용)")
-        emotion_data = {
-            "primary_emotion": "neutral",
-            "emotion_category": "neutral",
-            "intensity": 0.0,
-            "secondary_emotions": [],
-            "response_style": "balanced"
-        }
-
-    # 감정 정보 로깅 (디버깅용)
-    if emotion_data.get("intensity", 0) > 0.3:
-        emotion_summary = format_emotion_summary(emotion_data)
-        print(f"🎭 감정 감지: {emotion_summary}")
+    await db.commit()
+    record_message(conversation_id, "user", message_data.content, user_message.token_count)
+    invalidate_context_for_conversation(current_user.id, conversation.character_id, conversation_id)
+
+    # 감정 감지(LLM)와 컨텍스트 조회(DB)를 동시에 실행
+    # 감정 결과는 마지막 프롬프트 구성 단계에서만 필요하므로 임계 경로에서 제외
+    emotion_task = asyncio.create_task(detect_emotion_with_timeout(message_data.content))
+    load_task = asyncio.create_task(
+        load_conversation_context(
+            db=db,
+            conversation_id=conversation_id,
+            user_id=current_user.id,
+            character=character,
+            use_advanced_prompting=True,  # Advanced Prompt Engineering 활성화
+            current_message=message_data.content  # 관련 메모리 검색용
+        )
+    )
 
-    # Phase 3.1: 위기 감지 (전문 상담사만 활성화)
+    # Phase 3.1: 위기 감지 (전문 상담사만 활성화) - 키워드 기반이라 즉시 완료
     crisis_level = "none"
 
     if character.personality == "전문적인 심리 상담사":
@@ -482,104 +902,104 @@ async def stream_chat_message(
     else:
         print(f"ℹ️  위기 감지 비활성화: {character.name} ({character.personality})")
 
-    # 컨텍스트 구축 (Phase 2.2: 개인화 + 동적 Few-shot + Phase 3.1: 위기 대응)
-    # 동기 DB 작업을 별도 스레드에서 실행하여 이벤트 루프 차단 방지
-    import asyncio
-    loop = asyncio.get_running_loop()
-    
-    context = await loop.run_in_executor(
-        None,
-        lambda: build_conversation_context(
-            db=db,
-            conversation_id=conversation_id,
-            user_id=current_user.id,
-            character=character,
-            current_message=message_data.content,  # Phase 2.2: 동적 Few-shot용
-            emotion_data=emotion_data,
-            crisis_level=crisis_level,  # Phase 3.1: 위기 대응
-            use_advanced_prompting=True  # Advanced Prompt Engineering 활성화
-        )
+    emotion_data, loaded_context = await asyncio.gather(emotion_task, load_task)
+
+    # 감정 정보 로깅 (디버깅용)
+    if emotion_data.get("intensity", 0) > 0.3:
+        emotion_summary = format_emotion_summary(emotion_data)
+        print(f"🎭 감정 감지: {emotion_summary}")
+
+    # 컨텍스트 구성 (Phase 2.2: 개인화 + 동적 Few-shot + Phase 3.1: 위기 대응)
+    # 감정/위기 정보는 이 단계에서만 주입됨
+    # (DB 조회는 load 단계에서 끝났으므로 CPU 작업만 워커 스레드에서 실행 - 다른 스트림을 막지 않음)
+    context = await asyncio.to_thread(
+        compose_conversation_context,
+        loaded_context=loaded_context,
+        user_id=current_user.id,
+        character=character,
+        current_message=message_data.content,  # Phase 2.2: 동적 Few-shot용
+        emotion_data=emotion_data,
+        crisis_level=crisis_level,  # Phase 3.1: 위기 대응
+        use_advanced_prompting=True
     )
 
-    # 토큰 제한에 맞춰 최적화
-    context = optimize_context_for_token_limit(context, max_tokens=4000)
+    # 토큰 제한에 맞춰 최적화 (고급 프롬프팅은 구성 단계에서 이미 예산 안으로 패킹됨)
+    context = optimize_context_for_token_limit(context, max_tokens=settings.CONTEXT_MAX_TOKENS)
 
     # 메시지 추출
     messages = context["messages"]
 
     # 스트리밍 응답 생성
     async def generate():
-        raw_response = ""  # 필터링 전 원본
         start_time = datetime.utcnow()  # 응답 시작 시간
 
         try:
-            # 1단계: 전체 AI 응답 수집
-            async for chunk in stream_gemini_response(messages):
-                raw_response += chunk
+            # AI 응답을 받는 즉시 내부 프로세스를 걸러내며 스트리밍
+            # (사용자에게 보여도 되는 것으로 확정된 토큰만 바로 전송)
+            stream_filter = InternalProcessStreamFilter()
+            cache_info: Dict[str, Any] = {}
+            async for chunk in stream_gemini_response(
+                messages,
+                prompt_prefix=context.get("prompt_prefix"),
+                cache_info=cache_info
+            ):
+                visible = stream_filter.feed(chunk)
+                if visible:
+                    yield f"data: {json.dumps({'type': 'chunk', 'content': visible})}\n\n"
+
+            # 스트림 종료 후 남은 텍스트 전송 (구분자 없는 CoT 서두는 여기서 일괄 필터링)
+            visible = stream_filter.flush()
+            if visible:
+                yield f"data: {json.dumps({'type': 'chunk', 'content': visible})}\n\n"
 
             # 응답 완료 시간
             end_time = datetime.utcnow()
             response_time_ms = (end_time - start_time).total_seconds() * 1000
 
-            # 2단계: 내부 프로세스 필터링
-            full_response = filter_internal_process(raw_response)
-
-            # 3단계: 필터링된 응답을 빠르게 chunk로 나눠서 스트리밍
-            # (사용자 경험을 위해 즉각적인 표시처럼 보이게)
-            chunk_size = 20  # 20자씩 전송
-            for i in range(0, len(full_response), chunk_size):
-                chunk = full_response[i:i + chunk_size]
-                yield f"data: {json.dumps({'type': 'chunk', 'content': chunk})}\n\n"
+            # 사용자에게 전송된 그대로 저장
+            full_response = stream_filter.text
 
             # AI 응답 저장 (필터링된 버전)
-            ai_message = Message(
-                conversation_id=conversation_id,
-                role="assistant",
-                content=full_response
-            )
-            db.add(ai_message)
-
-            # 대화 객체 다시 가져오기 (세션 분리 문제 해결)
-            conv = db.query(Conversation).filter(
-                Conversation.id == conversation_id
-            ).first()
-
-            if conv:
-                # 대화 타임스탬프 업데이트
-                conv.updated_at = datetime.utcnow()
-
-                # 첫 메시지인 경우 제목 자동 생성
-                if not conv.title:
-                    # 첫 사용자 메시지를 제목으로 사용 (최대 50자)
-                    conv.title = message_data.content[:50]
-                    if len(message_data.content) > 50:
-                        conv.title += "..."
-
-            db.commit()
-            db.refresh(ai_message)
-
-            # 메트릭 자동 수집 (응답 시간, 토큰 수 등)
-            update_conversation_metrics(
-                db=db,
+            # 요청 의존성 세션은 응답 스트리밍 전에 닫히므로 별도 세션 사용
+            async with AsyncSessionLocal() as stream_db:
+                ai_message = Message(
+                    conversation_id=conversation_id,
+                    role="assistant",
+                    content=full_response,
+                    token_count=count_tokens(full_response)
+                )
+                stream_db.add(ai_message)
+
+                # 대화 객체 다시 가져오기 (세션 분리 문제 해결)
+                conv = await stream_db.get(Conversation, conversation_id)
+
+                if conv:
+                    # 대화 타임스탬프 업데이트
+                    conv.updated_at = datetime.utcnow()
+
+                    # 첫 메시지인 경우 제목 자동 생성
+                    if not conv.title:
+                        # 첫 사용자 메시지를 제목으로 사용 (최대 50자)
+                        conv.title = message_data.content[:50]
+                        if len(message_data.content) > 50:
+                            conv.title += "..."
+
+                await stream_db.commit()
+
+            record_message(conversation_id, "assistant", full_response, ai_message.token_count)
+            invalidate_context_for_conversation(current_user.id, character.id, conversation_id)
+
+            # 메트릭/요약/메모리는 백그라운드 작업으로 처리 (done 즉시 전송)
+            await enqueue_post_response_jobs(
                 conversation_id=conversation_id,
+                user_id=current_user.id,
+                character_id=character.id,
                 user_content=message_data.content,
                 ai_content=full_response,
-                response_time_ms=response_time_ms
+                response_time_ms=response_time_ms,
+                cache_info=cache_info
             )
 
-            # 대화 요약 필요 여부 확인 및 자동 생성
-            if check_summary_trigger(db, conversation_id):
-                await create_conversation_summary(db, conversation_id)
-
-            # 사용자 메모리 업데이트 (10개 메시지마다)
-            if should_update_memory(db, conversation_id):
-                await update_user_memory(
-                    db=db,
-                    conversation_id=conversation_id,
-                    user_id=current_user.id,
-                    character_id=character.id
-                )
-
             # 완료 신호 전송
             yield f"data: {json.dumps({'type': 'done', 'message_id': str(ai_message.id)})}\n\n"
 
@@ -602,20 +1022,23 @@ async def stream_chat_message(
 @router.get("/{conversation_id}/summaries")
 async def get_conversation_summaries(
     conversation_id: UUID,
-    db: Session = Depends(get_db),
+    db: AsyncSession = Depends(get_async_db),
     current_user: User = Depends(get_current_user)
 ):
     """
     대화 요약 목록 조회
 
     - **conversation_id**: 대화 ID
-    - 해당 대화의 모든 요약을 시간순으로 반환합니다
+    - 누적 요약(level=1)을 먼저, 이후 구간 요약(level=0)을 시간순으로 반환합니다
     """
     # 대화 소유권 확인
-    conversation = db.query(Conversation).filter(
-        Conversation.id == conversation_id,
-        Conversation.user_id == current_user.id
-    ).first()
+    result = await db.execute(
+        select(Conversation).where(
+            Conversation.id == conversation_id,
+            Conversation.user_id == current_user.id
+        )
+    )
+    conversation = result.scalar_one_or_none()
 
     if not conversation:
         raise HTTPException(
@@ -624,11 +1047,15 @@ async def get_conversation_summaries(
         )
 
     # 요약 조회
-    summaries = db.query(ConversationSummary).filter(
-        ConversationSummary.conversation_id == conversation_id
-    ).order_by(
-        ConversationSummary.created_at
-    ).all()
+    result = await db.execute(
+        select(ConversationSummary).where(
+            ConversationSummary.conversation_id == conversation_id
+        ).order_by(
+            desc(ConversationSummary.level),
+            ConversationSummary.created_at
+        )
+    )
+    summaries = result.scalars().all()
 
     return {
         "summaries": [
@@ -636,6 +1063,7 @@ async def get_conversation_summaries(
                 "id": str(summary.id),
                 "summary": summary.summary,
                 "message_count": summary.message_count,
+                "level": summary.level,
                 "created_at": summary.created_at.isoformat()
             }
             for summary in summaries
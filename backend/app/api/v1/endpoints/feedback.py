@@ -13,6 +13,12 @@ from app.db.database import get_db
 from app.models import MessageFeedback, ConversationRating, Message, Conversation, ConversationMetrics, AICharacter
 from app.core.security import get_current_user
 from app.models.user import User
+from app.services.few_shot_index_service import (
+    sync_exemplar_for_feedback,
+    enqueue_exemplar_emotion_detection,
+)
+from app.services.preference_learning_service import record_feedback_signal
+from app.services.context_cache import invalidate_context
 
 
 router = APIRouter()
@@ -86,6 +92,8 @@ async def create_or_update_message_feedback(
 
     - 같은 메시지에 이미 피드백이 있으면 업데이트
     - 없으면 새로 생성
+    - 긍정 피드백이면 Few-shot 예제 인덱스에 추가, 부정으로 바뀌면 삭제
+    - 선호도 학습 카운터를 함께 갱신 (전체 재계산 없음)
     """
     # 메시지 존재 여부 및 권한 확인
     message = db.query(Message).filter(Message.id == feedback_data.message_id).first()
@@ -141,11 +149,29 @@ async def create_or_update_message_feedback(
                 metrics.negative_feedbacks -= 1
                 metrics.positive_feedbacks += 1
 
+        # 선호도 학습 카운터 갱신 (값이 바뀐 경우만)
+        preference = record_feedback_signal(
+            db,
+            current_user.id,
+            conversation.character_id,
+            message,
+            feedback_data.is_helpful,
+            previous_is_helpful=existing_feedback.is_helpful
+        )
+
         # 업데이트
         existing_feedback.is_helpful = feedback_data.is_helpful
         existing_feedback.feedback_text = feedback_data.feedback_text
+
+        # Few-shot 예제 인덱스 갱신
+        exemplar = sync_exemplar_for_feedback(db, message, conversation, feedback_data.is_helpful)
+
         db.commit()
         db.refresh(existing_feedback)
+        if preference:
+            invalidate_context(current_user.id, conversation.character_id)
+        if exemplar:
+            await enqueue_exemplar_emotion_detection(exemplar)
         return existing_feedback
     else:
         # 새로운 피드백 메트릭 업데이트
@@ -162,8 +188,25 @@ async def create_or_update_message_feedback(
             feedback_text=feedback_data.feedback_text
         )
         db.add(new_feedback)
+
+        # 선호도 학습 카운터 갱신
+        preference = record_feedback_signal(
+            db,
+            current_user.id,
+            conversation.character_id,
+            message,
+            feedback_data.is_helpful
+        )
+
+        # Few-shot 예제 인덱스 갱신
+        exemplar = sync_exemplar_for_feedback(db, message, conversation, feedback_data.is_helpful)
+
         db.commit()
         db.refresh(new_feedback)
+        if preference:
+            invalidate_context(current_user.id, conversation.character_id)
+        if exemplar:
+            await enqueue_exemplar_emotion_detection(exemplar)
         return new_feedback
 
 
@@ -24,6 +24,59 @@ class Settings(BaseSettings):
     LLM_MODEL: str = "gemini-2.5-flash-lite"  # 기본 모델
     LLM_TEMPERATURE: float = 0.7  # 응답의 창의성 (0.0 ~ 1.0)
     LLM_MAX_OUTPUT_TOKENS: int = 2048  # 최대 출력 토큰 수
+    LLM_REQUEST_TIMEOUT: float = 30.0  # 단발성 LLM 호출 기본 타임아웃 (초)
+    LLM_MAX_CONCURRENCY: int = 16  # 전체 동시 LLM 호출 수 (REST 전송 스레드 풀 크기)
+    LLM_BACKGROUND_CONCURRENCY: int = 4  # 요약/메모리 추출 동시 호출 수 (채팅 용량 보호)
+    LLM_QUEUE_TIMEOUT: float = 10.0  # 호출 슬롯 대기 최대 시간 (초)
+    GEMINI_API_ENDPOINT: Optional[str] = None  # 예: http://localhost:8765 (로컬 가짜 서버)
+    GEMINI_TRANSPORT: Optional[str] = None  # grpc | grpc_asyncio | rest
+
+    # Gemini 컨텍스트 캐시 (시스템 프롬프트 고정 앞부분을 cachedContents로 재사용)
+    GEMINI_CONTEXT_CACHE_ENABLED: bool = False
+    GEMINI_CONTEXT_CACHE_TTL: int = 600  # 캐시 유지 시간 (초, 저장 시간만큼 과금)
+    GEMINI_CONTEXT_CACHE_MIN_TOKENS: int = 1024  # 이보다 짧은 앞부분은 캐시하지 않음 (모델별 최소 크기)
+    GEMINI_CONTEXT_CACHE_MAX_ENTRIES: int = 256  # 프로세스에서 추적할 최대 캐시 수 (LRU)
+
+    # 임베딩/검색 설정 (Few-shot 예제 및 사용자 메모리 검색)
+    EMBEDDING_BACKEND: str = "hashing"  # hashing | sentence_transformers
+    EMBEDDING_MODEL: str = "snunlp/KR-SBERT-V40K-klueNLI-augSTS"  # sentence_transformers 사용 시
+    EMBEDDING_DIM: int = 512  # hashing 백엔드 차원
+    FEW_SHOT_RETRIEVAL: str = "ngram"  # ngram | embedding
+    FEW_SHOT_EMBEDDING_THRESHOLD: Optional[float] = None  # 보정값이 없는 임베딩 모델용 임계값 (benchmarks/few_shot_threshold_calibration.py)
+
+    # 로컬 감정 분류기 (확신도가 낮은 메시지만 LLM으로 감정 분석)
+    EMOTION_CLASSIFIER_ENABLED: bool = True
+    EMOTION_CLASSIFIER_MIN_CONFIDENCE: float = 0.5  # 이 미만이면 LLM 사용
+
+    # 컨텍스트 토큰 예산 (시스템 프롬프트 섹션 + 대화 메시지를 우선순위로 패킹)
+    CONTEXT_MAX_TOKENS: int = 4000
+    HISTORY_MODE: str = "auto"  # auto | chat_turns | inline (히스토리를 한 번만 전달하는 방식)
+
+    # 컨텍스트 캐시 설정 ((사용자, 캐릭터) 단위 메모리/다른 대화/선호도)
+    CONTEXT_CACHE_BACKEND: str = "memory"  # memory | redis | none
+    CONTEXT_CACHE_TTL: float = 300.0  # 캐시 유지 시간 (초)
+    CONTEXT_CACHE_MAX_ENTRIES: int = 1024  # memory 백엔드 최대 항목 수 (LRU)
+    CONTEXT_CACHE_REDIS_URL: Optional[str] = None  # 예: redis://localhost:6379/0
+
+    # 메시지 윈도우 설정 (대화별 최근 메시지 링 버퍼, 프로세스 내)
+    MESSAGE_WINDOW_ENABLED: bool = True
+    MESSAGE_WINDOW_SIZE: int = 20  # 대화 히스토리로 사용할 최근 메시지 수
+    MESSAGE_WINDOW_MAX_CONVERSATIONS: int = 4096  # 유지할 최대 대화 수 (LRU)
+
+    # 백그라운드 작업 큐 설정 (응답 완료 후 메트릭/요약/메모리 처리)
+    JOB_QUEUE_BACKEND: str = "sqlite"  # sqlite | memory
+    JOB_QUEUE_SQLITE_PATH: str = "background_jobs.sqlite3"
+    JOB_QUEUE_WORKERS: int = 2  # 동시 실행 워커 수
+    JOB_QUEUE_MAX_RETRIES: int = 3  # 최대 재시도 횟수
+    JOB_QUEUE_RETRY_BACKOFF: float = 2.0  # 재시도 대기 시간 기준 (초, 지수 증가)
+    JOB_QUEUE_MAX_SIZE: int = 1000  # 프로세스 메모리 큐 크기 (초과분은 저장소에 남았다가 폴링으로 실행)
+    JOB_QUEUE_POLL_INTERVAL: float = 5.0  # 임대 갱신 및 저장소 폴링 주기 (초)
+    JOB_QUEUE_LEASE_TIMEOUT: float = 60.0  # 이 시간 동안 갱신되지 않은 작업은 다른 프로세스가 복구 (초)
+
+    # 선호도 갱신 워커 설정 (오래된 사용자 선호도를 주기적으로 배치 재계산)
+    PREFERENCE_REFRESH_ENABLED: bool = True
+    PREFERENCE_REFRESH_INTERVAL: float = 600.0  # 배치 사이 대기 시간 (초)
+    PREFERENCE_REFRESH_BATCH_SIZE: int = 100  # 한 배치에서 갱신할 최대 선호도 수
 
     # Cloudinary 설정
     CLOUDINARY_CLOUD_NAME: str
@@ -1,4 +1,8 @@
+import ssl
+from urllib.parse import parse_qsl, urlencode, urlsplit, urlunsplit
+
 from sqlalchemy import create_engine
+from sqlalchemy.ext.asyncio import AsyncSession, async_sessionmaker, create_async_engine
 from sqlalchemy.ext.declarative import declarative_base
 from sqlalchemy.orm import sessionmaker
 from app.core.config import settings
@@ -14,6 +18,74 @@ engine = create_engine(
 # Create session factory
 SessionLocal = sessionmaker(autocommit=False, autoflush=False, bind=engine)
 
+
+
+# libpq 전용 SSL 파라미터 (asyncpg는 URL 쿼리 대신 connect_args의 ssl로 받음)
+_LIBPQ_SSL_PARAMS = ("sslmode", "sslrootcert", "sslcert", "sslkey")
+
+
+def build_async_database_url(url: str):
+    """
+    동기 DATABASE_URL을 asyncpg용 URL과 connect_args로 변환
+
+    - postgresql:// → postgresql+asyncpg://, cockroachdb:// → cockroachdb+asyncpg://
+    - sslmode/sslrootcert 등은 URL에서 제거하고 ssl 설정으로 변환
+
+    Args:
+        url: 동기 엔진용 데이터베이스 URL
+
+    Returns:
+        (비동기 URL, connect_args) 튜플
+    """
+    parts = urlsplit(url)
+    scheme = parts.scheme.split("+")[0]
+    if scheme in ("postgres", "postgresql"):
+        scheme = "postgresql+asyncpg"
+    elif scheme == "cockroachdb":
+        scheme = "cockroachdb+asyncpg"
+
+    query = dict(parse_qsl(parts.query))
+    ssl_params = {key: query.pop(key) for key in _LIBPQ_SSL_PARAMS if key in query}
+
+    connect_args = {}
+    sslmode = ssl_params.get("sslmode")
+    if sslmode in ("verify-full", "verify-ca"):
+        context = ssl.create_default_context(cafile=ssl_params.get("sslrootcert"))
+        context.check_hostname = sslmode == "verify-full"
+        if ssl_params.get("sslcert"):
+            context.load_cert_chain(ssl_params["sslcert"], ssl_params.get("sslkey"))
+        connect_args["ssl"] = context
+    elif sslmode in ("require", "prefer", "allow"):
+        context = ssl.create_default_context()
+        context.check_hostname = False
+        context.verify_mode = ssl.CERT_NONE
+        connect_args["ssl"] = context
+    elif sslmode == "disable":
+        connect_args["ssl"] = False
+
+    async_url = urlunsplit((scheme, parts.netloc, parts.path, urlencode(query), parts.fragment))
+    return async_url, connect_args
+
+
+# Create async database engine (대화 등 요청량이 많은 경로용)
+_async_url, _async_connect_args = build_async_database_url(settings.DATABASE_URL)
+async_engine = create_async_engine(
+    _async_url,
+    connect_args=_async_connect_args,
+    pool_pre_ping=True,
+    pool_size=10,
+    max_overflow=20
+)
+
+# Create async session factory
+# expire_on_commit=False: 커밋 후 속성 접근 시 암묵적 IO(지연 로딩)가 발생하지 않도록 함
+AsyncSessionLocal = async_sessionmaker(
+    bind=async_engine,
+    class_=AsyncSession,
+    autoflush=False,
+    expire_on_commit=False
+)
+
 # Create base class for models
 Base = declarative_base()
 
@@ -25,3 +97,9 @@ def get_db():
         yield db
     finally:
         db.close()
+
+
+async def get_async_db():
+    """Dependency for getting async database session."""
+    async with AsyncSessionLocal() as db:
+        yield db
@@ -2,6 +2,8 @@ from fastapi import FastAPI
 from fastapi.middleware.cors import CORSMiddleware
 from app.core.config import settings
 from app.api.v1.api import api_router
+from app.services.job_queue import job_queue
+from app.services.preference_refresh_worker import preference_refresh_worker
 
 # Create FastAPI app
 app = FastAPI(
@@ -90,6 +92,21 @@ app.add_middleware(
 app.include_router(api_router, prefix=settings.API_V1_PREFIX)
 
 
+@app.on_event("startup")
+async def start_background_workers():
+    """백그라운드 작업 큐 워커 시작 (미완료 작업 복구 포함)"""
+    await job_queue.start()
+    if settings.PREFERENCE_REFRESH_ENABLED:
+        await preference_refresh_worker.start()
+
+
+@app.on_event("shutdown")
+async def stop_background_workers():
+    """백그라운드 작업 큐 워커 종료"""
+    await preference_refresh_worker.stop()
+    await job_queue.stop()
+
+
 @app.get("/")
 async def root():
     """Root endpoint"""
@@ -14,10 +14,13 @@ from app.models.message_feedback import MessageFeedback
 from app.models.conversation_rating import ConversationRating
 from app.models.conversation_metrics import ConversationMetrics
 from app.models.user_prompt_preference import UserPromptPreference
+from app.models.few_shot_exemplar import FewShotExemplar
 from app.models.subscription_plan import SubscriptionPlan, SubscriptionTier
 from app.models.subscription import Subscription, SubscriptionStatus
 from app.models.token_usage import TokenUsage
 from app.models.token_quota import TokenQuota
+from app.models.processed_job import ProcessedJob
+from app.models.worker_lease import WorkerLease
 
 __all__ = [
     "User",
@@ -38,10 +41,13 @@ __all__ = [
     "ConversationRating",
     "ConversationMetrics",
     "UserPromptPreference",
+    "FewShotExemplar",
     "SubscriptionPlan",
     "SubscriptionTier",
     "Subscription",
     "SubscriptionStatus",
     "TokenUsage",
     "TokenQuota",
+    "ProcessedJob",
+    "WorkerLease",
 ]
@@ -24,6 +24,7 @@ class Conversation(Base):
         index=True
     )
     title = Column(String(200), nullable=True)  # 첫 메시지에서 자동 생성
+    summarized_until = Column(DateTime(timezone=True), nullable=True)  # 요약된 마지막 메시지 시각 (요약 워터마크)
     created_at = Column(DateTime(timezone=True), server_default=func.now(), nullable=False)
     updated_at = Column(
         DateTime(timezone=True),
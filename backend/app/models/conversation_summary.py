@@ -1,12 +1,17 @@
-from sqlalchemy import Column, Text, Integer, DateTime, ForeignKey
+from sqlalchemy import Column, Text, Integer, DateTime, ForeignKey, Index
 from sqlalchemy.dialects.postgresql import UUID
 from sqlalchemy.sql import func
 import uuid
 from app.db.database import Base
 
 
+# 요약 단계
+SUMMARY_LEVEL_CHUNK = 0  # 메시지 구간(20개) 요약
+SUMMARY_LEVEL_ROLLING = 1  # 오래된 구간 요약을 합친 누적 요약 (대화당 1개)
+
+
 class ConversationSummary(Base):
-    """대화 요약 모델 - 토큰 최적화를 위한 점진적 요약"""
+    """대화 요약 모델 - 토큰 최적화를 위한 점진적 요약 (구간 요약 + 누적 요약)"""
     __tablename__ = "conversation_summaries"
 
     id = Column(UUID(as_uuid=True), primary_key=True, default=uuid.uuid4)
@@ -18,6 +23,7 @@ class ConversationSummary(Base):
     )
     summary = Column(Text, nullable=False)  # 요약 내용
     message_count = Column(Integer, nullable=False)  # 요약된 메시지 수
+    level = Column(Integer, nullable=False, default=SUMMARY_LEVEL_CHUNK, server_default="0")  # 요약 단계
     start_message_id = Column(
         UUID(as_uuid=True),
         ForeignKey("messages.id", ondelete="SET NULL"),
@@ -30,5 +36,16 @@ class ConversationSummary(Base):
     )  # 요약 끝 메시지
     created_at = Column(DateTime(timezone=True), server_default=func.now(), nullable=False, index=True)
 
+    __table_args__ = (
+        # 대화별 최근 요약 조회 (ROW_NUMBER() OVER (PARTITION BY conversation_id ORDER BY created_at DESC))
+        # summary를 함께 저장해 테이블 조회 없이 인덱스만으로 처리
+        Index(
+            "ix_conversation_summaries_conversation_created_at",
+            "conversation_id",
+            "created_at",
+            postgresql_include=["summary"]
+        ),
+    )
+
     def __repr__(self):
         return f"<ConversationSummary {self.id}: {self.message_count} messages>"
@@ -0,0 +1,50 @@
+from sqlalchemy import Column, String, Text, DateTime, ForeignKey, Index
+from sqlalchemy.dialects.postgresql import UUID
+from sqlalchemy.sql import func
+import uuid
+from app.db.database import Base
+
+
+class FewShotExemplar(Base):
+    """
+    동적 Few-shot 예제 인덱스 모델
+
+    긍정 피드백(is_helpful)을 받은 AI 응답과 직전 사용자 메시지 쌍.
+    피드백이 기록될 때 추가되고, 피드백이 부정으로 바뀌면 삭제됩니다.
+    """
+    __tablename__ = "few_shot_exemplars"
+
+    id = Column(UUID(as_uuid=True), primary_key=True, default=uuid.uuid4)
+    user_id = Column(
+        UUID(as_uuid=True),
+        ForeignKey("users.id", ondelete="CASCADE"),
+        nullable=False
+    )
+    character_id = Column(
+        UUID(as_uuid=True),
+        ForeignKey("ai_characters.id", ondelete="CASCADE"),
+        nullable=False
+    )
+    message_id = Column(
+        UUID(as_uuid=True),
+        ForeignKey("messages.id", ondelete="CASCADE"),
+        nullable=False,
+        unique=True  # AI 응답 메시지당 하나의 예제
+    )
+    user_message = Column(Text, nullable=False)  # 직전 사용자 메시지
+    assistant_response = Column(Text, nullable=False)  # 긍정 피드백 받은 AI 응답
+    emotion = Column(String(50), nullable=True)  # 사용자 메시지의 주요 감정 (백그라운드로 채움)
+    created_at = Column(DateTime(timezone=True), server_default=func.now(), nullable=False)
+    updated_at = Column(
+        DateTime(timezone=True),
+        server_default=func.now(),
+        onupdate=func.now(),
+        nullable=False
+    )
+
+    __table_args__ = (
+        Index("ix_few_shot_exemplars_user_character", "user_id", "character_id"),
+    )
+
+    def __repr__(self):
+        return f"<FewShotExemplar {self.id}: message={self.message_id}>"
@@ -1,4 +1,4 @@
-from sqlalchemy import Column, String, Text, DateTime, ForeignKey
+from sqlalchemy import Column, String, Text, Integer, DateTime, ForeignKey, Index
 from sqlalchemy.dialects.postgresql import UUID
 from sqlalchemy.sql import func
 import uuid
@@ -18,7 +18,13 @@ class Message(Base):
     )
     role = Column(String(20), nullable=False)  # 'user' 또는 'assistant'
     content = Column(Text, nullable=False)
+    token_count = Column(Integer, nullable=True)  # 내용 토큰 수 (token_counter 근사, 저장 시 계산)
     created_at = Column(DateTime(timezone=True), server_default=func.now(), nullable=False, index=True)
 
+    __table_args__ = (
+        # 대화별 최근 메시지 조회 (conversation_id = ? ORDER BY created_at DESC LIMIT N)
+        Index("ix_messages_conversation_created_at", "conversation_id", "created_at"),
+    )
+
     def __repr__(self):
         return f"<Message {self.id}: {self.role}>"
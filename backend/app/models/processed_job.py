@@ -0,0 +1,20 @@
+from sqlalchemy import Column, String, DateTime
+from sqlalchemy.sql import func
+from app.db.database import Base
+
+
+class ProcessedJob(Base):
+    """
+    처리 완료된 백그라운드 작업 기록 (멱등 키)
+
+    부작용이 있는 작업은 효과와 같은 트랜잭션으로 이 기록을 커밋하므로,
+    임대 만료로 다른 프로세스에서 다시 실행돼도 효과가 중복 반영되지 않습니다.
+    """
+    __tablename__ = "processed_jobs"
+
+    job_id = Column(String(36), primary_key=True)  # job_queue Job.id
+    name = Column(String(100), nullable=False)
+    processed_at = Column(DateTime(timezone=True), server_default=func.now(), nullable=False, index=True)
+
+    def __repr__(self):
+        return f"<ProcessedJob {self.name} {self.job_id}>"
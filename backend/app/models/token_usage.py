@@ -1,4 +1,4 @@
-from sqlalchemy import Column, String, Integer, DateTime, ForeignKey
+from sqlalchemy import Column, String, Integer, Boolean, DateTime, ForeignKey
 from sqlalchemy.dialects.postgresql import UUID
 from sqlalchemy.sql import func
 import uuid
@@ -20,6 +20,10 @@ class TokenUsage(Base):
     input_tokens = Column(Integer, nullable=False)
     output_tokens = Column(Integer, nullable=False)
     total_tokens = Column(Integer, nullable=False)
+
+    # Gemini 컨텍스트 캐시 (시스템 프롬프트 고정 앞부분)
+    prompt_cache_hit = Column(Boolean, nullable=True)  # True: 적중, False: 새로 생성, None: 캐시 미사용
+    cached_input_tokens = Column(Integer, default=0, nullable=False)  # 캐시로 절약한 입력 토큰
     
     # 메타데이터
     model_name = Column(String(100), nullable=True)  # 예: "gemini-1.5-pro"
@@ -1,4 +1,4 @@
-from sqlalchemy import Column, String, Float, DateTime, ForeignKey
+from sqlalchemy import Column, String, Integer, Float, DateTime, ForeignKey, Index, text
 from sqlalchemy.dialects.postgresql import UUID, JSONB
 from sqlalchemy.sql import func
 import uuid
@@ -25,7 +25,11 @@ class UserMemory(Base):
     memory_type = Column(String(50), nullable=False, index=True)
     # 'fact', 'preference', 'emotion_pattern', 'tone_preference'
     content = Column(JSONB, nullable=False)  # 메모리 내용 (JSON)
-    confidence_score = Column(Float, default=1.0, nullable=False, index=True)  # 0.0 ~ 1.0
+    confidence_score = Column(Float, default=1.0, nullable=False, index=True)  # 0.0 ~ 1.0 (감쇠 반영)
+    content_hash = Column(String(64), nullable=True)  # 정규화된 내용 해시 (중복 병합용)
+    mention_count = Column(Integer, default=1, server_default="1", nullable=False)  # 추출된 횟수
+    confidence_updated_at = Column(DateTime(timezone=True), server_default=func.now(), nullable=True)  # 감쇠 기준 시각
+    projection_rank = Column(Integer, nullable=True)  # 타입별 상위 K 순위 (컨텍스트 조회 대상, 범위 밖이면 NULL)
     source_conversation_id = Column(
         UUID(as_uuid=True),
         ForeignKey("conversations.id", ondelete="SET NULL"),
@@ -39,5 +43,15 @@ class UserMemory(Base):
         nullable=False
     )
 
+    __table_args__ = (
+        # 컨텍스트 조회: 타입별 상위 K 메모리만 (사용자당 크기 일정)
+        Index(
+            "ix_user_memory_projection",
+            "user_id",
+            "character_id",
+            postgresql_where=text("projection_rank IS NOT NULL")
+        ),
+    )
+
     def __repr__(self):
         return f"<UserMemory {self.id}: {self.memory_type}>"
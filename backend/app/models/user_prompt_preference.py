@@ -57,6 +57,19 @@ class UserPromptPreference(Base):
     total_feedbacks = Column(Integer, default=0, nullable=False)
     positive_feedback_ratio = Column(Float, default=0.0, nullable=False, comment="0.0-1.0")
 
+    # 누적 학습 카운터 (피드백 기록 시 O(1) 갱신, 선호도는 이 값으로 바로 계산)
+    positive_feedbacks = Column(Integer, default=0, server_default="0", nullable=False)
+    length_short_score = Column(Integer, default=0, server_default="0", nullable=False, comment="짧은 응답 피드백 점수 합 (+1/-1)")
+    length_short_count = Column(Integer, default=0, server_default="0", nullable=False)
+    length_medium_score = Column(Integer, default=0, server_default="0", nullable=False, comment="중간 응답 피드백 점수 합")
+    length_medium_count = Column(Integer, default=0, server_default="0", nullable=False)
+    length_long_score = Column(Integer, default=0, server_default="0", nullable=False, comment="긴 응답 피드백 점수 합")
+    length_long_count = Column(Integer, default=0, server_default="0", nullable=False)
+    emoji_score = Column(Integer, default=0, server_default="0", nullable=False, comment="이모지 포함 응답 피드백 점수 합")
+    emoji_count = Column(Integer, default=0, server_default="0", nullable=False)
+    plain_score = Column(Integer, default=0, server_default="0", nullable=False, comment="이모지 없는 응답 피드백 점수 합")
+    plain_count = Column(Integer, default=0, server_default="0", nullable=False)
+
     # 메타 정보
     confidence_score = Column(
         Float,
@@ -0,0 +1,18 @@
+from sqlalchemy import Column, String, DateTime
+from app.db.database import Base
+
+
+class WorkerLease(Base):
+    """
+    백그라운드 워커 임대 (여러 프로세스 중 하나만 주기 작업 실행)
+
+    임대를 가진 프로세스가 expires_at 전에 갱신하고, 프로세스가 죽으면 만료 후 다른 프로세스가 가져갑니다.
+    """
+    __tablename__ = "worker_leases"
+
+    name = Column(String(100), primary_key=True)  # 워커 이름
+    owner = Column(String(36), nullable=False)  # 임대를 가진 프로세스 ID
+    expires_at = Column(DateTime(timezone=True), nullable=False)
+
+    def __repr__(self):
+        return f"<WorkerLease {self.name} owner={self.owner}>"
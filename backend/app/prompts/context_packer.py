@@ -0,0 +1,206 @@
+"""
+프롬프트 섹션 패킹
+
+시스템 프롬프트를 섹션 단위(기본 지침, 위기 대응, 선호도, 감정 가이드, Few-shot, CoT,
+대화 히스토리, 사용자 컨텍스트)로 나누고, 각 섹션의 우선순위와 토큰 비용으로
+토큰 예산 안에서 우선순위 합이 가장 큰 조합을 고릅니다 (다중 선택 배낭 문제).
+
+- required 섹션은 항상 포함
+- 섹션마다 축소본(fallbacks, 예: Few-shot 예시 수 줄이기)을 둘 수 있으며 최대 하나만 선택
+- 선택 결과는 원래 섹션 순서대로 이어붙임
+- pack_prompt_with_history: 대화 메시지(최근 k개)도 같은 예산 안에서 함께 선택
+  (인라인 대화록처럼 메시지를 다른 형태로 넣을 때는 그 형태의 토큰 비용으로 계산)
+- split_stable_prefix: 턴 간에 바뀌지 않는 앞쪽 섹션(stable)과 나머지를 분리 (제공자 캐시용)
+"""
+from dataclasses import dataclass, field
+from typing import Any, Callable, Dict, List, Optional, Tuple
+
+from app.services.token_counter import count_tokens, count_message_tokens
+
+
+# 대화 메시지 우선순위: 직전 메시지가 가장 높고, 오래될수록 감소
+HISTORY_MESSAGE_PRIORITY = 45.0
+HISTORY_PRIORITY_DECAY = 0.85
+
+
+@dataclass
+class PromptSection:
+    """
+    시스템 프롬프트 섹션
+
+    Attributes:
+        name: 섹션 이름 (로그/측정용)
+        parts: 포함 시 이어붙일 프롬프트 조각
+        priority: 우선순위 (클수록 먼저 유지)
+        required: 예산과 무관하게 항상 포함
+        fallbacks: 전체가 들어가지 않을 때 대신 쓸 축소본 (같은 자리에 최대 하나만 포함)
+        stable: 대화 턴 간에 바뀌지 않는 고정 섹션 (프롬프트 앞부분, 컨텍스트 캐시 대상)
+    """
+    name: str
+    parts: List[str]
+    priority: float = 0.0
+    required: bool = False
+    fallbacks: List["PromptSection"] = field(default_factory=list)
+    stable: bool = False
+    _tokens: Optional[int] = field(default=None, repr=False)
+
+    @property
+    def text(self) -> str:
+        return "\n".join(self.parts)
+
+    @property
+    def tokens(self) -> int:
+        """섹션 토큰 비용 (구분 줄바꿈 포함, 한 번만 계산)"""
+        if self._tokens is None:
+            self._tokens = count_tokens(self.text)
+        return self._tokens
+
+    def prepend(self, part: str) -> None:
+        """맨 앞에 조각 추가 (이미 계산된 토큰 수도 함께 갱신)"""
+        self.parts.insert(0, part)
+        if self._tokens is not None:
+            self._tokens += count_tokens(part)
+
+
+def pack_sections(
+    sections: List[PromptSection],
+    token_budget: Optional[int] = None
+) -> List[PromptSection]:
+    """
+    토큰 예산 안에서 포함할 섹션 선택
+
+    Args:
+        sections: 프롬프트 순서대로 나열된 섹션
+        token_budget: 토큰 예산 (None이면 전체 포함)
+
+    Returns:
+        포함할 섹션 목록 (원래 순서, 축소본이 선택되면 축소본)
+    """
+    if token_budget is None or sum(section.tokens for section in sections) <= token_budget:
+        return list(sections)
+
+    required_tokens = sum(section.tokens for section in sections if section.required)
+    remaining = token_budget - required_tokens
+
+    # 파레토 프론티어 DP: (비용, 우선순위 합, 섹션별 선택) - 비용이 늘면 우선순위 합도 늘어나는 상태만 유지
+    # 선택값: -1 = 제외, 0 = 전체, i = fallbacks[i - 1]
+    optional = [index for index, section in enumerate(sections) if not section.required]
+    states: List[Tuple[int, float, Tuple[int, ...]]] = [(0, 0.0, ())]
+
+    for index in optional:
+        options = [sections[index]] + sections[index].fallbacks
+        candidates = []
+        for cost, value, choices in states:
+            candidates.append((cost, value, choices + (-1,)))
+            for option_index, option in enumerate(options):
+                new_cost = cost + option.tokens
+                if new_cost <= remaining:
+                    candidates.append((new_cost, value + option.priority, choices + (option_index,)))
+
+        candidates.sort(key=lambda state: (state[0], -state[1]))
+        states = []
+        for state in candidates:
+            if not states or state[1] > states[-1][1]:
+                states.append(state)
+
+    best_choices = max(states, key=lambda state: state[1])[2] if states else ()
+    chosen = dict(zip(optional, best_choices))
+
+    packed = []
+    for index, section in enumerate(sections):
+        if section.required:
+            packed.append(section)
+            continue
+        choice = chosen.get(index, -1)
+        if choice == 0:
+            packed.append(section)
+        elif choice > 0:
+            packed.append(section.fallbacks[choice - 1])
+    return packed
+
+
+def render_sections(sections: List[PromptSection]) -> str:
+    """섹션 조각을 순서대로 이어붙여 프롬프트 생성"""
+    return "\n".join(part for section in sections for part in section.parts)
+
+
+def split_stable_prefix(
+    sections: List[PromptSection]
+) -> Tuple[List[PromptSection], List[PromptSection]]:
+    """
+    앞쪽에 연속된 stable 섹션(고정 앞부분)과 나머지(변동 뒷부분)로 분리
+
+    render_sections(prefix) + "\n" + render_sections(suffix)는 render_sections(sections)와 같습니다.
+
+    Returns:
+        (고정 앞부분 섹션, 변동 뒷부분 섹션)
+    """
+    split_at = 0
+    while split_at < len(sections) and sections[split_at].stable:
+        split_at += 1
+    return sections[:split_at], sections[split_at:]
+
+
+def pack_prompt_with_history(
+    sections: List[PromptSection],
+    history: List[Dict[str, Any]],
+    token_budget: Optional[int] = None,
+    message_tokens: Optional[Callable[[Dict[str, Any]], int]] = None,
+    history_overhead: int = 0
+) -> Tuple[List[PromptSection], List[Dict[str, Any]]]:
+    """
+    시스템 프롬프트 섹션과 대화 메시지를 하나의 토큰 예산으로 함께 패킹
+
+    마지막 메시지(현재 사용자 메시지)는 항상 포함하고, 이전 메시지는
+    "최근 k개" 단위의 축소본으로 다른 섹션과 경쟁합니다.
+
+    Args:
+        sections: 시스템 프롬프트 섹션
+        history: 시간순 대화 메시지 (마지막이 현재 메시지)
+        token_budget: 전체 토큰 예산 (None이면 전체 포함)
+        message_tokens: 이전 메시지 하나의 토큰 비용 (기본값: 채팅 메시지 비용)
+        history_overhead: 이전 메시지를 하나라도 포함할 때 드는 고정 비용 (예: 대화록 머리말)
+
+    Returns:
+        (포함할 프롬프트 섹션, 포함할 대화 메시지)
+    """
+    if not history:
+        return pack_sections(sections, token_budget), []
+
+    previous = history[:-1]
+    message_tokens = message_tokens or count_message_tokens
+
+    current = PromptSection("current_message", [], required=True)
+    current._tokens = count_message_tokens(history[-1])
+
+    # 최근 k개 메시지를 유지하는 축소본 (최신 메시지부터 비용/우선순위 누적)
+    keep_counts: Dict[int, int] = {}
+    variants = []
+    tokens = history_overhead
+    priority = 0.0
+    for age, message in enumerate(reversed(previous)):
+        tokens += message_tokens(message)
+        priority += HISTORY_MESSAGE_PRIORITY * HISTORY_PRIORITY_DECAY ** age
+        variant = PromptSection("history_messages", [], priority=priority)
+        variant._tokens = tokens
+        keep_counts[id(variant)] = age + 1
+        variants.insert(0, variant)
+
+    extra = [current]
+    if variants:
+        variants[0].fallbacks = variants[1:]
+        extra.insert(0, variants[0])
+
+    packed = pack_sections(sections + extra, token_budget)
+
+    kept = 0
+    prompt_sections = []
+    for section in packed:
+        if section is current:
+            continue
+        if id(section) in keep_counts:
+            kept = keep_counts[id(section)]
+            continue
+        prompt_sections.append(section)
+
+    return prompt_sections, previous[len(previous) - kept:] + history[-1:]
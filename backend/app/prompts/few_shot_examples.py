@@ -339,19 +339,31 @@ def format_examples_for_prompt(examples: List[FewShotExample]) -> str:
     Returns:
         포맷된 프롬프트 문자열
     """
-    formatted = []
+    return "\n".join(
+        format_example_for_prompt(example, i)
+        for i, example in enumerate(examples, 1)
+    )
+
+
+def format_example_for_prompt(example: FewShotExample, index: int) -> str:
+    """
+    Few-shot 예시 하나를 프롬프트 형식으로 포맷팅
+
+    Args:
+        example: FewShotExample
+        index: 예시 번호 (1부터)
 
-    for i, example in enumerate(examples, 1):
-        # 응답에서 개행을 공백으로 변경 (자연스러운 대화체)
-        response = example.assistant_response.replace("\n\n", " ").replace("\n", " ")
+    Returns:
+        포맷된 예시 문자열
+    """
+    # 응답에서 개행을 공백으로 변경 (자연스러운 대화체)
+    response = example.assistant_response.replace("\n\n", " ").replace("\n", " ")
 
-        formatted.append(f"""
-예시 {i} ({example.emotion}):
+    return f"""
+예시 {index} ({example.emotion}):
 사용자: "{example.user_message}"
 상담사: "{response}"
-""")
-
-    return "\n".join(formatted)
+"""
 
 
 # ============================================
@@ -3,19 +3,63 @@
 
 Few-shot Learning, Chain-of-Thought, 감정별 특화 프롬프트를 통합하여
 최적화된 시스템 프롬프트를 생성하는 핵심 모듈
+
+기본 지침, 위기 대응, 선호도, 감정 가이드, CoT, 고정 Few-shot 예시 같은 정적 조각은
+(감정, 위기 수준, 선호도, 예시 수, CoT) 조합별로 한 번만 렌더링하고 토큰 수까지 계산해
+캐시합니다 (compile_static_prompt). 캐시는 인스턴스가 아니라 조각 문자열을 키로 하는
+모듈 수준 함수에 있습니다. 요청마다 새로 만드는 것은 대화 히스토리와
+사용자 컨텍스트 같은 동적 부분뿐입니다.
+
+섹션 순서는 대화 턴 간에 바뀌지 않는 고정 앞부분(기본 지침, CoT, 캐릭터 역할)을 먼저 두고,
+턴마다 달라지는 부분(위기 대응, 선호도, 감정 가이드, Few-shot, 히스토리, 사용자 정보)을
+뒤에 둡니다. 고정 앞부분은 Gemini 컨텍스트 캐시(prompt_cache)로 재사용할 수 있습니다.
 """
 
-from typing import List, Dict, Optional, TYPE_CHECKING
+from dataclasses import dataclass
+from functools import lru_cache
+from typing import List, Dict, Optional, Tuple, TYPE_CHECKING
 from .few_shot_examples import (
     get_examples_by_emotion,
     get_random_examples,
-    format_examples_for_prompt,
+    format_example_for_prompt,
     FewShotExample
 )
+from .context_packer import PromptSection, pack_sections, render_sections
+from app.services.token_counter import count_tokens
 
 if TYPE_CHECKING:
     from sqlalchemy.orm import Session
     from uuid import UUID
+    from app.services.dynamic_few_shot_service import CandidateIndex
+
+
+# 컴파일된 정적 조각 캐시 크기
+COMPILED_PROMPT_CACHE_SIZE = 512
+FRAGMENT_CACHE_SIZE = 1024
+
+
+@dataclass(frozen=True)
+class CompiledPrompt:
+    """
+    (감정, 위기 수준, 선호도, 예시 수, CoT) 조합별로 미리 렌더링한 정적 섹션
+
+    섹션 객체는 요청 간에 공유되므로 수정하지 않습니다.
+
+    Attributes:
+        stable: 고정 앞부분 섹션 (기본 지침, CoT)
+        volatile: 턴마다 달라지는 정적 섹션 (위기 대응, 선호도, 감정 가이드)
+        few_shot: 고정 Few-shot 예시 섹션 (감정별 예시로 채워지는 경우만, 아니면 None)
+    """
+    stable: Tuple[PromptSection, ...]
+    volatile: Tuple[PromptSection, ...]
+    few_shot: Optional[PromptSection]
+
+
+def _compiled_section(name: str, parts: List[str], **kwargs) -> PromptSection:
+    """토큰 수까지 미리 계산한 정적 섹션 생성"""
+    section = PromptSection(name, parts, **kwargs)
+    section.tokens
+    return section
 
 
 class PromptBuilder:
@@ -29,6 +73,12 @@ class PromptBuilder:
     - Context integration: 대화 히스토리 및 사용자 프로필 활용
     """
 
+    # Few-shot 섹션의 머리말/맺음말
+    FEW_SHOT_HEADER = ["\n---\n", "**참고할 상담 예시**:", "\n"]
+    FEW_SHOT_FOOTER = "\n위 예시의 패턴과 톤을 참고하여 응답하세요."
+    # 인라인 대화록(inline 히스토리 모드)의 머리말
+    TRANSCRIPT_HEADER = "**지금까지의 대화** (이 흐름을 이어서 응답하세요):"
+
     def __init__(self):
         self.base_system_prompt = self._load_base_prompt()
         self.emotion_guidelines = self._load_emotion_guidelines()
@@ -222,6 +272,18 @@ class PromptBuilder:
 
         return ""
 
+    # 섹션별 우선순위 (클수록 토큰 예산이 부족할 때 먼저 유지)
+    SECTION_PRIORITIES = {
+        "emotion_guideline": 80,
+        "preference": 70,
+        "user_profile": 65,
+        "few_shot": 60,
+        "current_summary": 55,
+        "cot": 50,
+        "cross_conversation": 35,
+        "history": 30,
+    }
+
     def build_system_prompt(
         self,
         emotion: Optional[str] = None,
@@ -232,7 +294,8 @@ class PromptBuilder:
         user_context: Optional[Dict] = None,
         user_preference: Optional[Dict] = None,
         custom_examples: Optional[List[FewShotExample]] = None,
-        crisis_level: str = "none"
+        crisis_level: str = "none",
+        token_budget: Optional[int] = None
     ) -> str:
         """
         통합 시스템 프롬프트 생성 (개인화 + 위기 대응)
@@ -246,63 +309,145 @@ class PromptBuilder:
             user_context: 사용자 프로필 정보
             user_preference: 사용자 선호도 설정
             crisis_level: 위기 수준 ("none", "medium", "high", "critical")
+            token_budget: 시스템 프롬프트 토큰 예산 (None이면 모든 섹션 포함)
 
         Returns:
             최적화된 시스템 프롬프트
         """
-        prompt_parts = [self.base_system_prompt]
-
-        # 0. 위기 대응 프롬프트 추가 (최우선)
-        if crisis_level != "none":
-            crisis_prompt = self._get_crisis_response_prompt(crisis_level)
-            if crisis_prompt:
-                prompt_parts.append("\n" + "="*50 + "\n")
-                prompt_parts.append(crisis_prompt)
-                prompt_parts.append("\n" + "="*50 + "\n")
-
-        # 1. 사용자 선호도 기반 조정 (Phase 2.2)
-        if user_preference:
-            preference_adjustment = self._build_preference_adjustment(user_preference)
-            if preference_adjustment:
-                prompt_parts.append("\n---\n")
-                prompt_parts.append(preference_adjustment)
-
-        # 2. 감정별 특화 가이드라인 추가
-        if emotion and emotion in self.emotion_guidelines:
-            prompt_parts.append("\n---\n")
-            prompt_parts.append(self.emotion_guidelines[emotion])
+        sections = self.build_sections(
+            emotion=emotion,
+            use_few_shot=use_few_shot,
+            few_shot_count=few_shot_count,
+            use_cot=use_cot,
+            conversation_history=conversation_history,
+            user_context=user_context,
+            user_preference=user_preference,
+            custom_examples=custom_examples,
+            crisis_level=crisis_level
+        )
+        return render_sections(pack_sections(sections, token_budget))
+
+    def build_sections(
+        self,
+        emotion: Optional[str] = None,
+        use_few_shot: bool = True,
+        few_shot_count: int = 3,
+        use_cot: bool = False,
+        conversation_history: Optional[List[Dict]] = None,
+        user_context: Optional[Dict] = None,
+        user_preference: Optional[Dict] = None,
+        custom_examples: Optional[List[FewShotExample]] = None,
+        crisis_level: str = "none"
+    ) -> List[PromptSection]:
+        """
+        시스템 프롬프트를 우선순위가 있는 섹션 목록으로 생성 (인자는 build_system_prompt와 동일)
+
+        Returns:
+            프롬프트 순서대로 나열된 PromptSection 목록
+        """
+        priorities = self.SECTION_PRIORITIES
+
+        # 기본 지침, CoT, 위기 대응(최우선), 선호도(Phase 2.2), 감정별 가이드라인은 컴파일된 조각 재사용
+        compiled = self.compile_static_prompt(
+            emotion=emotion,
+            crisis_level=crisis_level,
+            preference_key=self._preference_key(user_preference),
+            few_shot_count=few_shot_count if use_few_shot else 0,
+            use_cot=use_cot
+        )
+        user_sections = self._format_user_context_sections(user_context) if user_context else []
+
+        # 고정 앞부분: 기본 지침 + CoT + 캐릭터 역할
+        sections = list(compiled.stable)
+        for section in user_sections:
+            if section.stable:
+                section.prepend("\n---\n")
+                sections.append(section)
+        user_sections = [section for section in user_sections if not section.stable]
+
+        # 1. 턴마다 달라지는 부분: 위기 대응, 선호도, 감정별 가이드라인
+        sections.extend(compiled.volatile)
 
         # 2. Few-shot 예시 추가 (Phase 2.2: 동적 예제 우선)
         if use_few_shot:
             # 동적 예제가 제공되면 사용, 아니면 정적 예제
             if custom_examples:
-                examples = custom_examples[:few_shot_count]
+                few_shot = self._build_few_shot_section(custom_examples[:few_shot_count])
+            elif compiled.few_shot is not None:
+                few_shot = compiled.few_shot
             else:
-                examples = self._get_relevant_examples(emotion, few_shot_count)
-
-            if examples:
-                prompt_parts.append("\n---\n")
-                prompt_parts.append("**참고할 상담 예시**:")
-                prompt_parts.append("\n")
-                prompt_parts.append(format_examples_for_prompt(examples))
-                prompt_parts.append("\n위 예시의 패턴과 톤을 참고하여 응답하세요.")
+                few_shot = self._build_few_shot_section(self._get_relevant_examples(emotion, few_shot_count))
 
-        # 3. Chain-of-Thought 추론 프롬프트 추가
-        if use_cot:
-            prompt_parts.append("\n---\n")
-            prompt_parts.append(self._get_cot_prompt())
+            if few_shot is not None:
+                sections.append(few_shot)
 
-        # 4. 대화 컨텍스트 추가
+        # 3. 대화 컨텍스트 추가
         if conversation_history:
-            prompt_parts.append("\n---\n")
-            prompt_parts.append(self._format_conversation_history(conversation_history))
+            sections.append(PromptSection(
+                "history",
+                ["\n---\n", self.format_conversation_history(conversation_history)],
+                priority=priorities["history"]
+            ))
 
-        # 5. 사용자 컨텍스트 추가
-        if user_context:
-            prompt_parts.append("\n---\n")
-            prompt_parts.append(self._format_user_context(user_context))
+        # 4. 사용자 컨텍스트 추가
+        if user_sections:
+            user_sections[0].prepend("\n---\n")
+            sections.extend(user_sections)
+
+        return sections
+
+    def compile_static_prompt(
+        self,
+        emotion: Optional[str],
+        crisis_level: str,
+        preference_key: Optional[Tuple[str, str, str]],
+        few_shot_count: int,
+        use_cot: bool
+    ) -> CompiledPrompt:
+        """
+        정적 프롬프트 조각 (조각 문자열 조합별로 한 번만 렌더링되고 이후 캐시 재사용)
+
+        Args:
+            emotion: 감지된 감정
+            crisis_level: 위기 수준 ("none", "medium", "high", "critical")
+            preference_key: _preference_key()로 만든 선호도 키 (개인화 안 하면 None)
+            few_shot_count: Few-shot 예시 개수 (0이면 예시 없음)
+            use_cot: Chain-of-Thought 포함 여부
+
+        Returns:
+            CompiledPrompt
+        """
+        # 감정별 예시만으로 채워지는 경우에만 고정 (부족분을 랜덤 예시로 채우면 요청마다 다름)
+        few_shot_examples = ()
+        if few_shot_count > 0 and emotion:
+            emotion_examples = get_examples_by_emotion(emotion)
+            if len(emotion_examples) >= few_shot_count:
+                few_shot_examples = _example_keys(emotion_examples[:few_shot_count])
+
+        return _compile_static_prompt(
+            self.base_system_prompt,
+            self._get_cot_prompt() if use_cot else "",
+            self._get_crisis_response_prompt(crisis_level) if crisis_level != "none" else "",
+            self._render_preference_adjustment(*preference_key) if preference_key else "",
+            self.emotion_guidelines.get(emotion, "") if emotion else "",
+            few_shot_examples
+        )
+
+    @staticmethod
+    def clear_compiled_cache() -> None:
+        """컴파일된 정적 조각 캐시 비우기 (프롬프트 문구 변경 시, 벤치마크용)"""
+        _compile_static_prompt.cache_clear()
+        _example_fragment.cache_clear()
+        _fragment_tokens.cache_clear()
+
+    def _build_few_shot_section(self, examples: List[FewShotExample]) -> Optional[PromptSection]:
+        """
+        Few-shot 예시 섹션 생성
 
-        return "\n".join(prompt_parts)
+        예산이 부족하면 앞쪽(관련도 높은) 예시만 남긴 축소본을 사용합니다.
+        예시별 조각과 토큰 수는 캐시된 값을 이어붙입니다.
+        """
+        return _few_shot_section(_example_keys(examples))
 
     def _get_relevant_examples(self, emotion: Optional[str], count: int) -> List[FewShotExample]:
         """감정에 맞는 관련 예시 가져오기"""
@@ -358,17 +503,31 @@ class PromptBuilder:
         Returns:
             선호도 조정 프롬프트
         """
-        adjustments = []
-
-        # 신뢰도가 너무 낮으면 개인화 안 함
-        confidence = preference.get("confidence_score", 0.0)
-        if confidence < 0.3:
+        preference_key = self._preference_key(preference)
+        if not preference_key:
             return ""
+        return self._render_preference_adjustment(*preference_key)
 
-        adjustments.append("**개인 맞춤 설정** (이 사용자의 선호도):")
+    def _preference_key(self, preference: Optional[Dict]) -> Optional[Tuple[str, str, str]]:
+        """
+        선호도에서 프롬프트에 영향을 주는 값만 추린 캐시 키
+
+        Returns:
+            (응답 길이, 톤, 이모지) 또는 None (선호도가 없거나 신뢰도가 너무 낮으면 개인화 안 함)
+        """
+        if not preference or preference.get("confidence_score", 0.0) < 0.3:
+            return None
+        return (
+            preference.get("preferred_response_length", "medium"),
+            preference.get("preferred_tone", "mixed"),
+            preference.get("emoji_preference", "moderate")
+        )
+
+    def _render_preference_adjustment(self, length_pref: str, tone_pref: str, emoji_pref: str) -> str:
+        """선호도 조정 프롬프트 렌더링"""
+        adjustments = ["**개인 맞춤 설정** (이 사용자의 선호도):"]
 
         # 1. 응답 길이 조정
-        length_pref = preference.get("preferred_response_length", "medium")
         if length_pref == "short":
             adjustments.append("""
 - **응답 길이**: 짧고 간결하게 (1-2문단, 각 문단 2-3문장)
@@ -379,7 +538,6 @@ class PromptBuilder:
   충분한 설명과 예시를 포함하세요. 근거를 함께 제시하세요.""")
 
         # 2. 톤 조정
-        tone_pref = preference.get("preferred_tone", "mixed")
         if tone_pref == "formal":
             adjustments.append("""
 - **대화 톤**: 격식 있게
@@ -390,7 +548,6 @@ class PromptBuilder:
   편안하고 친근한 말투를 사용하세요.""")
 
         # 3. 이모지 조정
-        emoji_pref = preference.get("emoji_preference", "moderate")
         if emoji_pref == "none":
             adjustments.append("""
 - **이모지**: 사용하지 마세요
@@ -406,8 +563,8 @@ class PromptBuilder:
 
         return "\n".join(adjustments)
 
-    def _format_conversation_history(self, history: List[Dict]) -> str:
-        """대화 히스토리 포맷팅"""
+    def format_conversation_history(self, history: List[Dict]) -> str:
+        """대화 히스토리 요약 포맷팅 (최근 5개, 메시지당 200자)"""
         if not history:
             return ""
 
@@ -424,25 +581,58 @@ class PromptBuilder:
         formatted.append("\n위 대화 맥락을 고려하여 일관성 있게 응답하세요.")
         return "\n".join(formatted)
 
+    def format_transcript(self, history: List[Dict]) -> str:
+        """
+        대화 히스토리 전체를 인라인 대화록으로 포맷팅 (inline 히스토리 모드)
+
+        채팅 메시지로 따로 보내지 않으므로 잘라내지 않습니다.
+        """
+        formatted = [self.TRANSCRIPT_HEADER]
+        formatted.extend(self.format_transcript_line(msg) for msg in history)
+        return "\n".join(formatted)
+
+    def format_transcript_line(self, msg: Dict) -> str:
+        """인라인 대화록의 메시지 한 줄"""
+        role = "사용자" if msg.get("role") == "user" else "AI"
+        return f"**{role}**: {msg.get('content', '')}"
+
     def _format_user_context(self, context: Dict) -> str:
         """사용자 프로필 컨텍스트 포맷팅"""
         if not context:
             return ""
 
-        formatted = []
+        return render_sections(self._format_user_context_sections(context))
+
+    def _format_user_context_sections(self, context: Dict) -> List[PromptSection]:
+        """
+        사용자 프로필 컨텍스트를 섹션별로 포맷팅
+
+        캐릭터 역할과 마무리 안내는 항상 포함하고, 사용자 정보/다른 대화/현재 대화 요약은
+        토큰 예산에 따라 선택됩니다. 캐릭터 역할은 턴 간에 바뀌지 않는 고정 앞부분입니다.
+        """
+        if not context:
+            return []
+
+        priorities = self.SECTION_PRIORITIES
+        sections = []
 
         # 🆕 캐릭터 역할 정의 (최우선)
         if context.get("character_name") and context.get("character_personality"):
-            formatted.append("**당신의 역할**:")
-            formatted.append(f"당신은 '{context['character_name']}'이며, {context['character_personality']}입니다.")
+            role = ["**당신의 역할**:"]
+            role.append(f"당신은 '{context['character_name']}'이며, {context['character_personality']}입니다.")
+            role_tokens = count_tokens("\n".join(role))
 
-            # 성격별 특화 가이드라인
+            # 성격별 특화 가이드라인 (토큰 수는 캐시)
             personality_guide = self._get_personality_guideline(context['character_personality'])
             if personality_guide:
-                formatted.append(personality_guide)
-            formatted.append("")  # 빈 줄 추가
+                role.append(personality_guide)
+            role.append("")  # 빈 줄 추가
+
+            role_section = PromptSection("user_role", role, required=True, stable=True)
+            role_section._tokens = role_tokens + _fragment_tokens(personality_guide)
+            sections.append(role_section)
 
-        formatted.append("**사용자에 대해 알고 있는 정보** (자연스럽게 활용하세요):")
+        formatted = ["**사용자에 대해 알고 있는 정보** (자연스럽게 활용하세요):"]
 
         # 대화 횟수
         if context.get("conversation_count"):
@@ -475,29 +665,48 @@ class PromptBuilder:
                 else:
                     formatted.append(f"  • {pattern}")
 
+        sections.append(PromptSection("user_profile", formatted, priority=priorities["user_profile"]))
+
+        cross_conversation = []
+
         # 다른 대화 요약
         if context.get("recent_conversations"):
-            formatted.append("\n**최근 다른 대화에서 나눴던 주요 내용**:")
+            cross_conversation.append("\n**최근 다른 대화에서 나눴던 주요 내용**:")
             for summary in context["recent_conversations"][:3]:
-                formatted.append(f"  • {summary}")
+                cross_conversation.append(f"  • {summary}")
 
         # 다른 대화의 구체적 메시지
         if context.get("other_conversation_messages"):
-            formatted.append("\n**이전 대화에서 나눴던 구체적인 내용** (자연스럽게 언급 가능):")
+            cross_conversation.append("\n**이전 대화에서 나눴던 구체적인 내용** (자연스럽게 언급 가능):")
             for conv in context["other_conversation_messages"][:2]:
                 title = conv.get("title", "이전 대화")
-                formatted.append(f"\n  [{title}]")
+                cross_conversation.append(f"\n  [{title}]")
                 for msg in conv.get("messages", [])[:3]:
                     role = "사용자" if msg.get("role") == "user" else "AI"
                     content = msg.get("content", "")[:80]
-                    formatted.append(f"    - {role}: {content}")
+                    cross_conversation.append(f"    - {role}: {content}")
+
+        if cross_conversation:
+            sections.append(PromptSection(
+                "cross_conversation",
+                cross_conversation,
+                priority=priorities["cross_conversation"]
+            ))
 
         # 현재 대화 요약
         if context.get("current_conversation_summary"):
-            formatted.append(f"\n**지금 나누는 대화 요약**:\n{context['current_conversation_summary']}")
-
-        formatted.append("\n**중요**: 위 정보를 자연스럽게 활용하세요. \"지난번에...\" \"이전에 말씀하신...\" 같은 표현으로 연결성을 보여주세요.")
-        return "\n".join(formatted)
+            sections.append(PromptSection(
+                "current_summary",
+                [f"\n**지금 나누는 대화 요약**:\n{context['current_conversation_summary']}"],
+                priority=priorities["current_summary"]
+            ))
+
+        sections.append(PromptSection(
+            "user_context_note",
+            ["\n**중요**: 위 정보를 자연스럽게 활용하세요. \"지난번에...\" \"이전에 말씀하신...\" 같은 표현으로 연결성을 보여주세요."],
+            required=True
+        ))
+        return sections
 
     def _get_personality_guideline(self, personality: str) -> str:
         """성격별 맞춤 가이드라인 - 각 캐릭터의 유니크한 특성 강화"""
@@ -638,6 +847,115 @@ class PromptBuilder:
         return guidelines.get(personality, "")
 
 
+# 정적 조각 캐시 (인스턴스를 붙잡지 않도록 문자열/튜플 값을 키로 하는 모듈 수준 함수)
+@lru_cache(maxsize=COMPILED_PROMPT_CACHE_SIZE)
+def _compile_static_prompt(
+    base_prompt: str,
+    cot_prompt: str,
+    crisis_prompt: str,
+    preference_prompt: str,
+    emotion_guideline: str,
+    few_shot_examples: Tuple[Tuple[str, str, str], ...]
+) -> CompiledPrompt:
+    """
+    정적 프롬프트 조각 렌더링 (조합별로 한 번만 실행)
+
+    Args:
+        base_prompt: 기본 지침
+        cot_prompt: CoT 프롬프트 (없으면 "")
+        crisis_prompt: 위기 대응 프롬프트 (없으면 "")
+        preference_prompt: 선호도 조정 프롬프트 (없으면 "")
+        emotion_guideline: 감정별 가이드라인 (없으면 "")
+        few_shot_examples: 고정 Few-shot 예시의 (감정, 사용자 메시지, 응답) 목록
+
+    Returns:
+        CompiledPrompt
+    """
+    priorities = PromptBuilder.SECTION_PRIORITIES
+    stable = [_compiled_section("base", [base_prompt], required=True, stable=True)]
+    if cot_prompt:
+        stable.append(_compiled_section(
+            "cot",
+            ["\n---\n", cot_prompt],
+            priority=priorities["cot"],
+            stable=True
+        ))
+
+    sections = []
+    if crisis_prompt:
+        sections.append(_compiled_section(
+            "crisis",
+            ["\n" + "="*50 + "\n", crisis_prompt, "\n" + "="*50 + "\n"],
+            required=True
+        ))
+
+    if preference_prompt:
+        sections.append(_compiled_section(
+            "preference",
+            ["\n---\n", preference_prompt],
+            priority=priorities["preference"]
+        ))
+
+    if emotion_guideline:
+        sections.append(_compiled_section(
+            "emotion_guideline",
+            ["\n---\n", emotion_guideline],
+            priority=priorities["emotion_guideline"]
+        ))
+
+    few_shot = _few_shot_section(few_shot_examples) if few_shot_examples else None
+    return CompiledPrompt(stable=tuple(stable), volatile=tuple(sections), few_shot=few_shot)
+
+
+def _few_shot_section(examples: Tuple[Tuple[str, str, str], ...]) -> Optional[PromptSection]:
+    """(감정, 사용자 메시지, 응답) 목록으로 Few-shot 섹션과 축소본 생성"""
+    if not examples:
+        return None
+
+    fragments = [_example_fragment(i, *example) for i, example in enumerate(examples, 1)]
+    header, footer = PromptBuilder.FEW_SHOT_HEADER, PromptBuilder.FEW_SHOT_FOOTER
+    frame_tokens = _fragment_tokens("\n".join(header + [footer]))
+
+    variants = []
+    for count in range(len(fragments), 0, -1):
+        variant = PromptSection(
+            "few_shot",
+            header + [
+                "\n".join(text for text, _ in fragments[:count]),
+                footer
+            ],
+            priority=PromptBuilder.SECTION_PRIORITIES["few_shot"] * count / len(fragments)
+        )
+        variant._tokens = frame_tokens + sum(tokens for _, tokens in fragments[:count])
+        variants.append(variant)
+
+    variants[0].fallbacks = variants[1:]
+    return variants[0]
+
+
+def _example_keys(examples: List[FewShotExample]) -> Tuple[Tuple[str, str, str], ...]:
+    """Few-shot 예시를 캐시 키로 쓸 수 있는 (감정, 사용자 메시지, 응답) 튜플로 변환"""
+    return tuple((example.emotion, example.user_message, example.assistant_response) for example in examples)
+
+
+@lru_cache(maxsize=FRAGMENT_CACHE_SIZE)
+def _example_fragment(
+    index: int,
+    emotion: str,
+    user_message: str,
+    assistant_response: str
+) -> Tuple[str, int]:
+    """예시 하나의 프롬프트 조각과 토큰 수 (캐시)"""
+    text = format_example_for_prompt(FewShotExample(emotion, user_message, assistant_response), index)
+    return text, count_tokens(text)
+
+
+@lru_cache(maxsize=FRAGMENT_CACHE_SIZE)
+def _fragment_tokens(text: str) -> int:
+    """고정 조각(성격별 가이드라인, Few-shot 머리말 등)의 토큰 수 (캐시)"""
+    return count_tokens(text)
+
+
 # 전역 인스턴스
 _prompt_builder = None
 
@@ -667,7 +985,8 @@ def build_counseling_prompt(
     current_message: Optional[str] = None,
     use_dynamic_few_shot: bool = True,
     # Phase 3.1: 위기 대응
-    crisis_level: str = "none"
+    crisis_level: str = "none",
+    token_budget: Optional[int] = None
 ) -> str:
     """
     상담용 프롬프트 빌드 (Phase 2.2: 개인화 + 동적 Few-shot + Phase 3.1: 위기 대응)
@@ -687,16 +1006,62 @@ def build_counseling_prompt(
         current_message: 현재 사용자 메시지 (동적 Few-shot용)
         use_dynamic_few_shot: 동적 Few-shot 사용 여부
         crisis_level: 위기 수준 ("none", "medium", "high", "critical")
+        token_budget: 시스템 프롬프트 토큰 예산 (None이면 모든 섹션 포함)
 
     Returns:
         완성된 시스템 프롬프트
     """
+    sections = build_counseling_sections(
+        emotion=emotion,
+        use_few_shot=use_few_shot,
+        few_shot_count=few_shot_count,
+        use_cot=use_cot,
+        conversation_history=conversation_history,
+        user_context=user_context,
+        user_preference=user_preference,
+        custom_examples=custom_examples,
+        db=db,
+        user_id=user_id,
+        character_id=character_id,
+        current_message=current_message,
+        use_dynamic_few_shot=use_dynamic_few_shot,
+        crisis_level=crisis_level
+    )
+    return render_sections(pack_sections(sections, token_budget))
+
+
+def build_counseling_sections(
+    emotion: Optional[str] = None,
+    use_few_shot: bool = True,
+    few_shot_count: int = 3,
+    use_cot: bool = False,
+    conversation_history: Optional[List[Dict]] = None,
+    user_context: Optional[Dict] = None,
+    user_preference: Optional[Dict] = None,
+    custom_examples: Optional[List[FewShotExample]] = None,
+    db: Optional['Session'] = None,
+    user_id: Optional['UUID'] = None,
+    character_id: Optional['UUID'] = None,
+    current_message: Optional[str] = None,
+    use_dynamic_few_shot: bool = True,
+    crisis_level: str = "none",
+    few_shot_index: Optional['CandidateIndex'] = None
+) -> List[PromptSection]:
+    """
+    상담용 프롬프트 섹션 생성 (인자는 build_counseling_prompt와 동일)
+
+    대화 메시지와 함께 토큰 예산을 나눠 쓸 때(pack_prompt_with_history) 사용합니다.
+    few_shot_index(load_candidate_index 결과)를 주면 DB 세션 없이 동적 Few-shot을 선택합니다.
+
+    Returns:
+        프롬프트 순서대로 나열된 PromptSection 목록
+    """
     # Phase 2.2: 동적 Few-shot 예제 생성
     final_examples = custom_examples
 
     if final_examples is None and use_dynamic_few_shot and use_few_shot:
         # 동적 Few-shot을 사용하려면 필요한 매개변수 확인
-        if db and user_id and character_id and current_message:
+        if (db or few_shot_index is not None) and user_id and character_id and current_message:
             from app.services.dynamic_few_shot_service import get_hybrid_few_shot_examples
 
             # 하이브리드 Few-shot 생성 (동적 50% + 정적 50%)
@@ -707,11 +1072,12 @@ def build_counseling_prompt(
                 current_emotion=emotion,
                 current_message=current_message,
                 total_count=few_shot_count,
-                dynamic_ratio=0.5  # 동적 예제 50%
+                dynamic_ratio=0.5,  # 동적 예제 50%
+                index=few_shot_index
             )
 
     builder = get_prompt_builder()
-    return builder.build_system_prompt(
+    return builder.build_sections(
         emotion=emotion,
         use_few_shot=use_few_shot,
         few_shot_count=few_shot_count,
@@ -8,6 +8,7 @@ class ConversationSummaryBase(BaseModel):
     """대화 요약 기본 스키마"""
     summary: str = Field(..., min_length=10, description="요약 내용")
     message_count: int = Field(..., gt=0, description="요약된 메시지 수")
+    level: int = Field(0, ge=0, description="요약 단계 (0: 구간 요약, 1: 누적 요약)")
 
 
 class ConversationSummaryCreate(ConversationSummaryBase):
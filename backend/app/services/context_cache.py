@@ -0,0 +1,200 @@
+"""
+컨텍스트 캐시 서비스 - (사용자, 캐릭터) 단위 채팅 컨텍스트 캐시
+
+메모리, 다른 대화 요약/메시지, 선호도는 요약/메모리/선호도가 새로 저장될 때만 바뀌므로
+연속된 턴에서는 캐시된 값을 재사용하고, 해당 쓰기 지점에서 명시적으로 무효화합니다.
+
+- memory (기본값): 프로세스 내 TTL + 크기 제한 LRU
+- redis: Redis 호환 서버 (pip install redis 필요, 여러 프로세스가 캐시 공유)
+- none: 캐시 사용 안 함
+
+캐시 값은 JSON으로 직렬화할 수 있는 딕셔너리입니다 (context_loader.UserContextSection.to_dict).
+RedisContextCache는 redis-py와 같은 get/set(ex=)/delete 인터페이스의 클라이언트를 받으므로
+로컬에서는 fakeredis.FakeRedis() 등을 주입해 확인할 수 있습니다.
+"""
+import json
+import threading
+import time
+from abc import ABC, abstractmethod
+from collections import OrderedDict
+from typing import Any, Optional, Tuple
+from uuid import UUID
+
+
+class ContextCache(ABC):
+    """컨텍스트 캐시 백엔드 인터페이스"""
+
+    name = "base"
+
+    @abstractmethod
+    def get(self, user_id: UUID, character_id: UUID) -> Optional[Any]:
+        """캐시된 값 (없거나 만료되면 None)"""
+
+    @abstractmethod
+    def set(self, user_id: UUID, character_id: UUID, value: Any) -> None:
+        """값 저장 (JSON 직렬화 가능한 값)"""
+
+    @abstractmethod
+    def invalidate(self, user_id: UUID, character_id: UUID) -> None:
+        """캐시 항목 삭제"""
+
+
+class InMemoryContextCache(ContextCache):
+    """
+    프로세스 내 TTL + LRU 캐시
+
+    무효화는 백그라운드 작업 스레드에서도 호출되므로 잠금으로 보호합니다.
+    """
+
+    name = "memory"
+
+    def __init__(self, ttl: float = 300.0, max_entries: int = 1024):
+        self.ttl = ttl
+        self.max_entries = max_entries
+        self._entries: "OrderedDict[Tuple[str, str], Tuple[float, Any]]" = OrderedDict()
+        self._lock = threading.Lock()
+
+    def __len__(self) -> int:
+        return len(self._entries)
+
+    def get(self, user_id: UUID, character_id: UUID) -> Optional[Any]:
+        key = (str(user_id), str(character_id))
+        with self._lock:
+            entry = self._entries.get(key)
+            if entry is None:
+                return None
+
+            expires_at, value = entry
+            if expires_at <= time.monotonic():
+                del self._entries[key]
+                return None
+
+            self._entries.move_to_end(key)
+            return value
+
+    def set(self, user_id: UUID, character_id: UUID, value: Any) -> None:
+        key = (str(user_id), str(character_id))
+        with self._lock:
+            self._entries[key] = (time.monotonic() + self.ttl, value)
+            self._entries.move_to_end(key)
+            while len(self._entries) > self.max_entries:
+                self._entries.popitem(last=False)
+
+    def invalidate(self, user_id: UUID, character_id: UUID) -> None:
+        with self._lock:
+            self._entries.pop((str(user_id), str(character_id)), None)
+
+
+class RedisContextCache(ContextCache):
+    """
+    Redis 호환 서버 캐시 (TTL은 서버 만료, 크기 제한은 서버 maxmemory 정책에 위임)
+
+    Redis 오류는 캐시 미스로 처리하여 채팅 경로를 막지 않습니다.
+    """
+
+    name = "redis"
+
+    def __init__(self, client: Any, ttl: float = 300.0, prefix: str = "mindpause:context:"):
+        self.client = client
+        self.ttl = ttl
+        self.prefix = prefix
+
+    @classmethod
+    def from_url(cls, url: str, ttl: float = 300.0) -> "RedisContextCache":
+        import redis
+
+        return cls(redis.Redis.from_url(url), ttl=ttl)
+
+    def _key(self, user_id: UUID, character_id: UUID) -> str:
+        return f"{self.prefix}{user_id}:{character_id}"
+
+    def get(self, user_id: UUID, character_id: UUID) -> Optional[Any]:
+        try:
+            data = self.client.get(self._key(user_id, character_id))
+            return json.loads(data) if data is not None else None
+        except Exception as e:
+            print(f"⚠️ 컨텍스트 캐시 조회 실패: {str(e)}")
+            return None
+
+    def set(self, user_id: UUID, character_id: UUID, value: Any) -> None:
+        try:
+            self.client.set(
+                self._key(user_id, character_id),
+                json.dumps(value, ensure_ascii=False),
+                ex=max(int(self.ttl), 1)
+            )
+        except Exception as e:
+            print(f"⚠️ 컨텍스트 캐시 저장 실패: {str(e)}")
+
+    def invalidate(self, user_id: UUID, character_id: UUID) -> None:
+        try:
+            self.client.delete(self._key(user_id, character_id))
+        except Exception as e:
+            print(f"⚠️ 컨텍스트 캐시 무효화 실패: {str(e)}")
+
+
+_cache: Optional[ContextCache] = None
+_cache_initialized = False
+
+
+def get_context_cache() -> Optional[ContextCache]:
+    """
+    설정에 따른 컨텍스트 캐시 (싱글톤)
+
+    Returns:
+        ContextCache 또는 None (CONTEXT_CACHE_BACKEND=none)
+    """
+    global _cache, _cache_initialized
+    if not _cache_initialized:
+        from app.core.config import settings
+
+        backend = settings.CONTEXT_CACHE_BACKEND
+        if backend == "redis":
+            try:
+                _cache = RedisContextCache.from_url(
+                    settings.CONTEXT_CACHE_REDIS_URL,
+                    ttl=settings.CONTEXT_CACHE_TTL
+                )
+            except Exception as e:
+                print(f"⚠️ Redis 컨텍스트 캐시 초기화 실패, 메모리 캐시 사용: {str(e)}")
+        if _cache is None and backend != "none":
+            _cache = InMemoryContextCache(
+                ttl=settings.CONTEXT_CACHE_TTL,
+                max_entries=settings.CONTEXT_CACHE_MAX_ENTRIES
+            )
+        _cache_initialized = True
+    return _cache
+
+
+def set_context_cache(cache: Optional[ContextCache]) -> None:
+    """컨텍스트 캐시 교체 (예: RedisContextCache(fakeredis.FakeRedis()))"""
+    global _cache, _cache_initialized
+    _cache = cache
+    _cache_initialized = True
+
+
+def invalidate_context(user_id: UUID, character_id: UUID) -> None:
+    """
+    (사용자, 캐릭터) 컨텍스트 캐시 무효화
+
+    요약/메모리/선호도 저장, 대화 생성/삭제 후 호출합니다.
+    """
+    cache = get_context_cache()
+    if cache is not None:
+        cache.invalidate(user_id, character_id)
+
+
+def invalidate_context_for_conversation(user_id: UUID, character_id: UUID, conversation_id: UUID) -> None:
+    """
+    대화 하나에 메시지/제목이 저장된 뒤 컨텍스트 캐시 무효화
+
+    캐시된 사용자 섹션은 만든 대화(conversation_id)에서만 사용되고, 그 대화의 메시지는
+    섹션에서 제외되므로 같은 대화의 쓰기는 캐시를 유지합니다 (연속된 턴은 캐시 적중).
+    다른 대화의 쓰기는 캐시된 다른 대화 메시지/제목을 바꾸므로 무효화합니다.
+    """
+    cache = get_context_cache()
+    if cache is None:
+        return
+    cached = cache.get(user_id, character_id)
+    if cached is not None and cached.get("conversation_id") != str(conversation_id):
+        cache.invalidate(user_id, character_id)
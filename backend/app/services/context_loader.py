@@ -0,0 +1,502 @@
+"""
+컨텍스트 로더 - 채팅 턴에 필요한 컨텍스트 데이터를 한 번의 쿼리로 조회
+
+기존에는 선호도, 메모리, 요약, 다른 대화(대화 수만큼 반복), 최근 메시지, 대화 수를
+각각 조회해 턴마다 약 10번(+ 이전 대화 수에 비례)의 왕복이 발생했습니다.
+
+여기서는 CTE와 섹션별 jsonb_agg 서브쿼리로 모든 섹션을 한 행에 담아 한 번에 가져오고,
+타입이 있는 ContextBundle로 변환합니다.
+
+- 사용자 섹션 (메모리, 다른 대화 요약/메시지, 대화 수, 선호도): (사용자, 캐릭터) 단위로 캐시
+  (섹션을 만든 대화에서만 재사용하므로, 그 대화에 메시지가 쌓여도 캐시가 유지됨)
+  (메모리는 통합 시 기록한 타입별 상위 K개(projection_rank)만 읽으므로 크기가 일정)
+- 대화 섹션 (현재 대화 요약): 턴마다 조회
+- 최근 메시지: 대화별 메시지 윈도우(링 버퍼)가 없을 때만 조회
+
+사용자 섹션은 현재 대화와 무관하게 캐시할 수 있도록 현재 대화를 제외하지 않고
+한 개씩 더 조회한 뒤, for_conversation에서 현재 대화를 걸러냅니다.
+"""
+from dataclasses import asdict, dataclass, field
+from datetime import datetime, timedelta
+from typing import Any, Dict, List, Optional
+from uuid import UUID
+
+from sqlalchemy import text
+from sqlalchemy.dialects.postgresql import JSONB
+from sqlalchemy.ext.asyncio import AsyncSession
+
+from app.services.context_cache import get_context_cache
+from app.services.message_window import get_message_windows
+from app.services.preference_learning_service import DEFAULT_PREFERENCE
+
+
+@dataclass
+class MemoryRecord:
+    """조회된 사용자 메모리 (UserMemory와 같은 속성 이름)"""
+    id: str
+    memory_type: str
+    content: Dict[str, Any]
+    confidence_score: float
+    updated_at: Optional[datetime] = None
+
+
+@dataclass
+class SummaryRecord:
+    """조회된 대화 요약"""
+    summary: str
+    created_at: Optional[datetime] = None
+    conversation_id: Optional[str] = None
+
+
+@dataclass
+class OtherConversation:
+    """다른 대화와 그 대화의 최근 메시지 (시간순)"""
+    title: str
+    updated_at: Optional[datetime]
+    messages: List[Dict[str, str]] = field(default_factory=list)
+    id: Optional[str] = None
+
+
+@dataclass
+class UserContextSection:
+    """(사용자, 캐릭터) 단위 컨텍스트 - 요약/메모리/선호도가 바뀔 때까지 재사용 가능"""
+    memories: List[MemoryRecord]
+    recent_summaries: List[SummaryRecord]
+    recent_conversations: List[OtherConversation]
+    conversation_count: int
+    preference: Optional[Dict[str, Any]] = None
+
+    # 현재 대화를 제외한 뒤 사용할 개수
+    other_conversation_limit: int = 5
+    message_conversation_limit: int = 3
+    recent_summary_limit: int = 3
+
+    def for_conversation(self, conversation_id: UUID) -> Dict[str, Any]:
+        """
+        현재 대화를 제외한 다른 대화 섹션 계산
+
+        Args:
+            conversation_id: 현재 대화 ID
+
+        Returns:
+            recent_summaries(최신순 요약 텍스트), other_conversations 딕셔너리
+        """
+        current = str(conversation_id)
+        others = [conv for conv in self.recent_conversations if conv.id != current]
+
+        summary_conversations = {conv.id for conv in others[:self.other_conversation_limit]}
+        recent_summaries = [
+            s.summary for s in self.recent_summaries
+            if s.conversation_id in summary_conversations
+        ][:self.recent_summary_limit]
+
+        # 메시지가 없는 대화는 제외 (기존 동작과 동일)
+        other_conversations = [
+            conv for conv in others[:self.message_conversation_limit]
+            if conv.messages
+        ]
+
+        return {
+            "recent_summaries": recent_summaries,
+            "other_conversations": other_conversations
+        }
+
+    def to_dict(self) -> Dict[str, Any]:
+        """캐시 저장용 JSON 직렬화 가능한 딕셔너리 (시각은 ISO 문자열)"""
+        data = asdict(self)
+        for section in ("memories", "recent_summaries", "recent_conversations"):
+            for item in data[section]:
+                for key in ("created_at", "updated_at"):
+                    if isinstance(item.get(key), datetime):
+                        item[key] = item[key].isoformat()
+        return data
+
+    @classmethod
+    def from_dict(cls, data: Dict[str, Any]) -> "UserContextSection":
+        """to_dict 결과에서 복원"""
+        return cls(
+            memories=[
+                MemoryRecord(**{**item, "updated_at": _parse_timestamp(item.get("updated_at"))})
+                for item in data["memories"]
+            ],
+            recent_summaries=[
+                SummaryRecord(**{**item, "created_at": _parse_timestamp(item.get("created_at"))})
+                for item in data["recent_summaries"]
+            ],
+            recent_conversations=[
+                OtherConversation(**{**item, "updated_at": _parse_timestamp(item.get("updated_at"))})
+                for item in data["recent_conversations"]
+            ],
+            conversation_count=data["conversation_count"],
+            preference=data.get("preference"),
+            other_conversation_limit=data["other_conversation_limit"],
+            message_conversation_limit=data["message_conversation_limit"],
+            recent_summary_limit=data["recent_summary_limit"]
+        )
+
+
+@dataclass
+class ContextBundle:
+    """채팅 턴 하나에 필요한 컨텍스트 데이터"""
+    memories: List[MemoryRecord]
+    summaries: List[SummaryRecord]
+    recent_summaries: List[str]
+    other_conversations: List[OtherConversation]
+    recent_messages: List[Dict[str, str]]
+    conversation_count: int
+    preference: Optional[Dict[str, Any]] = None
+
+
+# 사용자 섹션: 최근 대화(현재 대화 포함, 1개 더), 대화별 최근 메시지/요약
+_USER_SECTION_CTES = """
+    recent_conversations AS (
+        SELECT id, title, updated_at
+        FROM conversations
+        WHERE user_id = :user_id
+          AND character_id = :character_id
+          AND updated_at >= :cutoff
+        ORDER BY updated_at DESC
+        LIMIT :conversation_fetch_limit
+    ),
+    recent_conversation_messages AS (
+        SELECT conversation_id, role, content, created_at
+        FROM (
+            SELECT
+                m.conversation_id, m.role, m.content, m.created_at,
+                ROW_NUMBER() OVER (
+                    PARTITION BY m.conversation_id ORDER BY m.created_at DESC
+                ) AS rn
+            FROM messages m
+            JOIN (
+                SELECT id FROM recent_conversations
+                ORDER BY updated_at DESC
+                LIMIT :message_conversation_fetch_limit
+            ) rc ON rc.id = m.conversation_id
+        ) ranked
+        WHERE rn <= :messages_per_conversation
+    ),
+    recent_conversation_summaries AS (
+        SELECT conversation_id, summary, created_at
+        FROM (
+            SELECT
+                cs.conversation_id, cs.summary, cs.created_at,
+                ROW_NUMBER() OVER (
+                    PARTITION BY cs.conversation_id ORDER BY cs.created_at DESC
+                ) AS rn
+            FROM conversation_summaries cs
+            JOIN recent_conversations rc ON rc.id = cs.conversation_id
+        ) ranked
+        WHERE rn <= :recent_summary_limit
+        ORDER BY created_at DESC
+        LIMIT :summary_fetch_limit
+    )
+"""
+
+# 사용자 메모리: 통합 시 기록한 타입별 상위 K개만 (ix_user_memory_projection 부분 인덱스)
+_MEMORIES_SUBQUERY = """
+            SELECT jsonb_agg(jsonb_build_object(
+                'id', um.id,
+                'memory_type', um.memory_type,
+                'content', um.content,
+                'confidence_score', um.confidence_score,
+                'updated_at', um.updated_at
+            ) ORDER BY um.confidence_score DESC)
+            FROM user_memory um
+            WHERE um.user_id = :user_id
+              AND um.character_id = :character_id
+              AND um.projection_rank IS NOT NULL
+              AND um.confidence_score >= :confidence_threshold
+"""
+
+_USER_SECTION_COLUMNS = f"""
+        ({_MEMORIES_SUBQUERY}) AS memories,
+        (
+            SELECT jsonb_agg(jsonb_build_object(
+                'conversation_id', rs.conversation_id,
+                'summary', rs.summary,
+                'created_at', rs.created_at
+            ) ORDER BY rs.created_at DESC)
+            FROM recent_conversation_summaries rs
+        ) AS recent_summaries,
+        (
+            SELECT jsonb_agg(jsonb_build_object(
+                'id', rc.id,
+                'title', rc.title,
+                'updated_at', rc.updated_at,
+                'messages', (
+                    SELECT jsonb_agg(jsonb_build_object(
+                        'role', rm.role,
+                        'content', rm.content
+                    ) ORDER BY rm.created_at)
+                    FROM recent_conversation_messages rm
+                    WHERE rm.conversation_id = rc.id
+                )
+            ) ORDER BY rc.updated_at DESC)
+            FROM recent_conversations rc
+        ) AS recent_conversations,
+        (
+            SELECT count(*)
+            FROM conversations
+            WHERE user_id = :user_id AND character_id = :character_id
+        ) AS conversation_count,
+        p.id AS preference_id,
+        p.preferred_response_length,
+        p.preferred_tone,
+        p.emoji_preference,
+        p.preferred_few_shot_count,
+        p.confidence_score AS preference_confidence_score
+"""
+
+_USER_SECTION_FROM = """
+    FROM (SELECT 1) AS anchor
+    LEFT JOIN user_prompt_preferences p
+        ON p.user_id = :user_id AND p.character_id = :character_id
+"""
+
+# 대화 섹션: 현재 대화 요약 (누적 요약 먼저, 이후 최근 구간 요약 :summary_limit개 시간순)
+# 누적 요약 도입 전에 쌓인 구간 요약이 많은 대화도 컨텍스트 크기가 일정하도록 수준별 최신 N개만 사용
+_SUMMARY_COLUMNS = """
+        (
+            SELECT jsonb_agg(jsonb_build_object(
+                'summary', cs.summary,
+                'created_at', cs.created_at
+            ) ORDER BY cs.level DESC, cs.created_at)
+            FROM (
+                SELECT
+                    summary, created_at, level,
+                    ROW_NUMBER() OVER (PARTITION BY level ORDER BY created_at DESC) AS rn
+                FROM conversation_summaries
+                WHERE conversation_id = :conversation_id
+            ) cs
+            WHERE cs.rn <= :summary_limit
+        ) AS summaries
+"""
+
+# 대화 섹션: 최근 메시지 (메시지 윈도우가 없을 때만, 최신 N개를 시간순으로)
+_RECENT_MESSAGE_COLUMNS = """
+        (
+            SELECT jsonb_agg(jsonb_build_object(
+                'role', m.role,
+                'content', m.content,
+                'token_count', m.token_count
+            ) ORDER BY m.created_at)
+            FROM (
+                SELECT role, content, token_count, created_at
+                FROM messages
+                WHERE conversation_id = :conversation_id
+                ORDER BY created_at DESC
+                LIMIT :message_limit
+            ) m
+        ) AS recent_messages
+"""
+
+
+def _build_query(include_user_section: bool, include_messages: bool):
+    """필요한 섹션만 담은 컨텍스트 쿼리 구성"""
+    columns = [_SUMMARY_COLUMNS]
+    jsonb_columns = {"summaries": JSONB}
+    if include_messages:
+        columns.append(_RECENT_MESSAGE_COLUMNS)
+        jsonb_columns["recent_messages"] = JSONB
+
+    if include_user_section:
+        columns.insert(0, _USER_SECTION_COLUMNS)
+        jsonb_columns.update({
+            "memories": JSONB,
+            "recent_summaries": JSONB,
+            "recent_conversations": JSONB,
+        })
+        sql = f"WITH {_USER_SECTION_CTES} SELECT {', '.join(columns)} {_USER_SECTION_FROM}"
+    else:
+        sql = f"SELECT {', '.join(columns)}"
+
+    return text(sql).columns(**jsonb_columns)
+
+
+# (사용자 섹션 포함 여부, 최근 메시지 포함 여부) → 쿼리
+CONTEXT_QUERIES = {
+    (include_user_section, include_messages): _build_query(include_user_section, include_messages)
+    for include_user_section in (True, False)
+    for include_messages in (True, False)
+}
+
+
+def _parse_timestamp(value: Any) -> Optional[datetime]:
+    """jsonb로 직렬화된 시각 문자열을 datetime으로 변환"""
+    if value is None or isinstance(value, datetime):
+        return value
+    try:
+        return datetime.fromisoformat(str(value))
+    except ValueError:
+        return None
+
+
+def _parse_user_section(
+    row: Dict[str, Any],
+    other_conversation_limit: int,
+    message_conversation_limit: int,
+    recent_summary_limit: int
+) -> UserContextSection:
+    """쿼리 결과 행에서 사용자 섹션 구성"""
+    memories = [
+        MemoryRecord(
+            id=item["id"],
+            memory_type=item["memory_type"],
+            content=item["content"],
+            confidence_score=item["confidence_score"],
+            updated_at=_parse_timestamp(item.get("updated_at"))
+        )
+        for item in row["memories"] or []
+    ]
+
+    recent_summaries = [
+        SummaryRecord(
+            summary=item["summary"],
+            created_at=_parse_timestamp(item.get("created_at")),
+            conversation_id=item.get("conversation_id")
+        )
+        for item in row["recent_summaries"] or []
+    ]
+
+    recent_conversations = [
+        OtherConversation(
+            id=item.get("id"),
+            title=item.get("title") or "이전 대화",
+            updated_at=_parse_timestamp(item.get("updated_at")),
+            messages=item.get("messages") or []
+        )
+        for item in row["recent_conversations"] or []
+    ]
+
+    # 선호도는 읽기만 함 (갱신은 피드백 기록과 선호도 갱신 워커가 담당), 없으면 기본값
+    preference = dict(DEFAULT_PREFERENCE)
+    if row["preference_id"] is not None:
+        preference = {
+            "preferred_response_length": row["preferred_response_length"],
+            "preferred_tone": row["preferred_tone"],
+            "emoji_preference": row["emoji_preference"],
+            "preferred_few_shot_count": row["preferred_few_shot_count"],
+            "confidence_score": row["preference_confidence_score"]
+        }
+
+    return UserContextSection(
+        memories=memories,
+        recent_summaries=recent_summaries,
+        recent_conversations=recent_conversations,
+        conversation_count=row["conversation_count"] or 0,
+        preference=preference,
+        other_conversation_limit=other_conversation_limit,
+        message_conversation_limit=message_conversation_limit,
+        recent_summary_limit=recent_summary_limit
+    )
+
+
+async def load_context_bundle(
+    db: AsyncSession,
+    conversation_id: UUID,
+    user_id: UUID,
+    character_id: UUID,
+    confidence_threshold: float = 0.7,
+    days: int = 30,
+    other_conversation_limit: int = 5,
+    message_conversation_limit: int = 3,
+    messages_per_conversation: int = 5,
+    recent_summary_limit: int = 3,
+    summary_limit: int = 3,
+    message_limit: int = 20,
+    use_cache: bool = True
+) -> ContextBundle:
+    """
+    채팅 컨텍스트 데이터 일괄 조회 (DB 왕복 1회)
+
+    사용자 섹션이 캐시에 있으면 대화 섹션만, 메시지 윈도우가 있으면 최근 메시지 없이 조회합니다.
+    캐시된 사용자 섹션은 그 섹션을 만든 대화에서만 사용합니다
+    (다른 대화로 바꾸면 그동안 쌓인 이전 대화 메시지를 반영하도록 다시 조회).
+
+    Args:
+        db: 데이터베이스 세션
+        conversation_id: 현재 대화 ID
+        user_id: 사용자 ID
+        character_id: AI 캐릭터 ID
+        confidence_threshold: 메모리 최소 신뢰도 점수
+        days: 다른 대화 조회 기간 (최근 N일)
+        other_conversation_limit: 요약을 가져올 다른 대화 수
+        message_conversation_limit: 메시지를 가져올 다른 대화 수
+        messages_per_conversation: 다른 대화당 메시지 수
+        recent_summary_limit: 다른 대화 요약 수 (최신순)
+        summary_limit: 현재 대화의 수준별 최대 요약 수 (누적 요약 + 최근 구간 요약)
+        message_limit: 현재 대화 메시지 수 (메시지 윈도우가 없을 때)
+        use_cache: 사용자 섹션 캐시/메시지 윈도우 사용 여부
+
+    Returns:
+        ContextBundle
+    """
+    cache = get_context_cache() if use_cache else None
+    cached = cache.get(user_id, character_id) if cache else None
+    user_section = None
+    if cached is not None and cached.get("conversation_id") == str(conversation_id):
+        user_section = UserContextSection.from_dict(cached["section"])
+
+    message_windows = get_message_windows() if use_cache else None
+    recent_messages = message_windows.get(conversation_id) if message_windows else None
+
+    include_user_section = user_section is None
+    include_messages = recent_messages is None
+
+    params = {"conversation_id": conversation_id, "summary_limit": summary_limit}
+    if include_messages:
+        params["message_limit"] = message_limit
+    if include_user_section:
+        params.update({
+            "user_id": user_id,
+            "character_id": character_id,
+            "cutoff": datetime.utcnow() - timedelta(days=days),
+            "confidence_threshold": confidence_threshold,
+            # 현재 대화가 포함될 수 있으므로 1개씩 더 조회
+            "conversation_fetch_limit": other_conversation_limit + 1,
+            "message_conversation_fetch_limit": message_conversation_limit + 1,
+            "messages_per_conversation": messages_per_conversation,
+            "recent_summary_limit": recent_summary_limit,
+            # 현재 대화 요약(최대 recent_summary_limit개)을 제외해도 충분하도록 2배 조회
+            "summary_fetch_limit": recent_summary_limit * 2,
+        })
+
+    result = await db.execute(CONTEXT_QUERIES[(include_user_section, include_messages)], params)
+    row = result.mappings().one()
+
+    if include_user_section:
+        user_section = _parse_user_section(
+            row,
+            other_conversation_limit,
+            message_conversation_limit,
+            recent_summary_limit
+        )
+        if cache:
+            cache.set(user_id, character_id, {
+                "conversation_id": str(conversation_id),
+                "section": user_section.to_dict()
+            })
+
+    if include_messages:
+        recent_messages = list(row["recent_messages"] or [])
+        if message_windows:
+            message_windows.hydrate(conversation_id, recent_messages)
+
+    summaries = [
+        SummaryRecord(
+            summary=item["summary"],
+            created_at=_parse_timestamp(item.get("created_at"))
+        )
+        for item in row["summaries"] or []
+    ]
+    others = user_section.for_conversation(conversation_id)
+
+    return ContextBundle(
+        memories=user_section.memories,
+        summaries=summaries,
+        recent_summaries=others["recent_summaries"],
+        other_conversations=others["other_conversations"],
+        recent_messages=recent_messages,
+        conversation_count=user_section.conversation_count,
+        preference=user_section.preference
+    )
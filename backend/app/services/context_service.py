@@ -1,50 +1,91 @@
 """
 컨텍스트 관리 서비스 - 대화 컨텍스트 구축 및 메모리 관리 (Advanced Prompt Engineering 통합)
 """
-from sqlalchemy.orm import Session
-from sqlalchemy import desc
-from typing import List, Dict, Any, Optional
+import asyncio
+
+from sqlalchemy.ext.asyncio import AsyncSession
+from typing import Callable, List, Dict, Any, Optional
 from uuid import UUID
 
-from app.models.conversation import Conversation
-from app.models.message import Message
-from app.models.conversation_summary import ConversationSummary
-from app.models.user_memory import UserMemory
 from app.models.ai_character import AICharacter
-from app.prompts.prompt_builder import build_counseling_prompt
-from app.services.preference_learning_service import (
-    should_update_preferences,
-    update_user_preferences,
-    get_or_create_preference
+from app.core.config import settings
+from app.prompts.prompt_builder import build_counseling_sections, get_prompt_builder
+from app.prompts.context_packer import (
+    PromptSection,
+    pack_prompt_with_history,
+    render_sections,
+    split_stable_prefix
 )
+from app.services.memory_retrieval_service import rank_memories_by_relevance
+from app.services.context_loader import load_context_bundle
+from app.services.dynamic_few_shot_service import load_candidate_index
+from app.services.token_counter import count_tokens, count_messages_tokens, trim_messages_to_budget
 
 
-def get_user_memories(
-    db: Session,
-    user_id: UUID,
-    character_id: UUID,
-    confidence_threshold: float = 0.7
-) -> Dict[str, List[Dict[str, Any]]]:
+# 시스템 프롬프트를 첫 사용자 메시지 앞에 붙일 때 사용하는 구분 문구
+SYSTEM_PROMPT_SEPARATOR = "\n\n---\n\n사용자 메시지:\n"
+
+# 인라인 대화록 섹션 앞 구분선
+TRANSCRIPT_SEPARATOR = "\n---\n"
+
+# 히스토리 중복 제거로 절약한 토큰 수를 받는 측정 훅
+TokensSavedHook = Callable[[Dict[str, Any]], None]
+_tokens_saved_hooks: List[TokensSavedHook] = []
+
+
+def register_tokens_saved_hook(hook: TokensSavedHook) -> None:
+    """
+    히스토리 중복 제거 측정 훅 등록
+
+    훅은 요청마다 {"mode", "tokens_saved", "history_messages"} 딕셔너리를 받습니다.
+    """
+    _tokens_saved_hooks.append(hook)
+
+
+def _request_message(msg: Dict[str, Any]) -> Dict[str, str]:
+    """LLM 요청용 메시지 (role/content만, 예산 계산용 token_count 제외)"""
+    return {"role": msg["role"], "content": msg["content"]}
+
+
+def _report_tokens_saved(report: Dict[str, Any]) -> None:
+    """등록된 측정 훅 호출 (훅 오류는 응답에 영향 없음)"""
+    for hook in _tokens_saved_hooks:
+        try:
+            hook(report)
+        except Exception as e:
+            print(f"⚠️ 토큰 절약 측정 훅 오류: {str(e)}")
+
+
+def resolve_history_mode(model_name: Optional[str] = None) -> str:
     """
-    사용자 메모리 가져오기
+    대화 히스토리 전달 방식 결정
+
+    - chat_turns: 이전 메시지를 채팅 턴으로 전달 (멀티턴을 지원하는 Gemini 모델)
+    - inline: 이전 메시지를 시스템 프롬프트에 대화록으로 넣고 현재 메시지만 전달
 
     Args:
-        db: 데이터베이스 세션
-        user_id: 사용자 ID
-        character_id: AI 캐릭터 ID
-        confidence_threshold: 최소 신뢰도 점수
+        model_name: 모델 이름 (기본값: LLM_MODEL)
 
     Returns:
-        메모리 타입별로 분류된 메모리 딕셔너리
+        "chat_turns" 또는 "inline"
+    """
+    if settings.HISTORY_MODE in ("chat_turns", "inline"):
+        return settings.HISTORY_MODE
+
+    model_name = model_name or settings.LLM_MODEL
+    return "chat_turns" if model_name.startswith("gemini") else "inline"
+
+
+def categorize_memories(memories: List[Any]) -> Dict[str, List[Dict[str, Any]]]:
     """
-    memories = db.query(UserMemory).filter(
-        UserMemory.user_id == user_id,
-        UserMemory.character_id == character_id,
-        UserMemory.confidence_score >= confidence_threshold
-    ).order_by(
-        desc(UserMemory.confidence_score)
-    ).all()
+    메모리를 타입별로 분류
+
+    Args:
+        memories: UserMemory 또는 MemoryRecord 목록 (정렬된 순서 유지)
 
+    Returns:
+        메모리 타입별로 분류된 메모리 딕셔너리
+    """
     # 타입별로 분류
     categorized_memories = {
         "facts": [],
@@ -112,240 +153,63 @@ def format_user_context(memories: Dict[str, List[Dict[str, Any]]]) -> str:
     return "\n\n".join(context_parts) if context_parts else ""
 
 
-def get_conversation_summaries(
-    db: Session,
-    conversation_id: UUID
-) -> List[ConversationSummary]:
-    """
-    대화 요약 가져오기
-
-    Args:
-        db: 데이터베이스 세션
-        conversation_id: 대화 ID
-
-    Returns:
-        대화 요약 리스트 (시간순)
-    """
-    summaries = db.query(ConversationSummary).filter(
-        ConversationSummary.conversation_id == conversation_id
-    ).order_by(
-        ConversationSummary.created_at
-    ).all()
-
-    return summaries
-
-
-def get_recent_conversation_summaries(
-    db: Session,
-    user_id: UUID,
-    character_id: UUID,
-    current_conversation_id: UUID,
-    days: int = 7
-) -> List[ConversationSummary]:
-    """
-    최근 N일간의 다른 대화 요약 가져오기 (크로스-대화 컨텍스트)
-
-    Args:
-        db: 데이터베이스 세션
-        user_id: 사용자 ID
-        character_id: AI 캐릭터 ID
-        current_conversation_id: 현재 대화 ID (제외)
-        days: 최근 N일
-
-    Returns:
-        다른 대화의 요약 리스트
-    """
-    from datetime import datetime, timedelta
-
-    cutoff_date = datetime.utcnow() - timedelta(days=days)
-
-    # 같은 캐릭터와의 다른 대화들
-    other_conversations = db.query(Conversation).filter(
-        Conversation.user_id == user_id,
-        Conversation.character_id == character_id,
-        Conversation.id != current_conversation_id,
-        Conversation.updated_at >= cutoff_date
-    ).order_by(
-        desc(Conversation.updated_at)
-    ).limit(5).all()  # 최근 5개 대화
-
-    # 해당 대화들의 요약 수집
-    summaries = []
-    for conv in other_conversations:
-        conv_summaries = db.query(ConversationSummary).filter(
-            ConversationSummary.conversation_id == conv.id
-        ).order_by(
-            ConversationSummary.created_at
-        ).all()
-
-        summaries.extend(conv_summaries)
-
-    return summaries
-
-
-def get_recent_messages(
-    db: Session,
-    conversation_id: UUID,
-    limit: int = 20
-) -> List[Message]:
-    """
-    최근 메시지 가져오기
-
-    Args:
-        db: 데이터베이스 세션
-        conversation_id: 대화 ID
-        limit: 가져올 메시지 수
-
-    Returns:
-        최근 메시지 리스트 (시간순)
-    """
-    messages = db.query(Message).filter(
-        Message.conversation_id == conversation_id
-    ).order_by(
-        Message.created_at
-    ).limit(limit).all()
-
-    return messages
-
-
-def get_recent_messages_from_other_conversations(
-    db: Session,
-    user_id: UUID,
-    character_id: UUID,
-    current_conversation_id: UUID,
-    days: int = 7,
-    messages_per_conversation: int = 10
-) -> List[Dict[str, Any]]:
-    """
-    최근 N일간의 다른 대화에서 최근 메시지 가져오기
-
-    Args:
-        db: 데이터베이스 세션
-        user_id: 사용자 ID
-        character_id: AI 캐릭터 ID
-        current_conversation_id: 현재 대화 ID (제외)
-        days: 최근 N일
-        messages_per_conversation: 각 대화당 가져올 메시지 수
-
-    Returns:
-        다른 대화의 최근 메시지 리스트 (대화별로 그룹화)
-    """
-    from datetime import datetime, timedelta
-
-    cutoff_date = datetime.utcnow() - timedelta(days=days)
-
-    # 같은 캐릭터와의 다른 대화들 (최근 3개만)
-    other_conversations = db.query(Conversation).filter(
-        Conversation.user_id == user_id,
-        Conversation.character_id == character_id,
-        Conversation.id != current_conversation_id,
-        Conversation.updated_at >= cutoff_date
-    ).order_by(
-        desc(Conversation.updated_at)
-    ).limit(3).all()
-
-    # 각 대화의 최근 메시지 수집
-    conversations_with_messages = []
-    for conv in other_conversations:
-        messages = db.query(Message).filter(
-            Message.conversation_id == conv.id
-        ).order_by(
-            desc(Message.created_at)
-        ).limit(messages_per_conversation).all()
-
-        # 시간순으로 재정렬 (오래된 것부터)
-        messages.reverse()
-
-        if messages:
-            conversations_with_messages.append({
-                "conversation_title": conv.title or "이전 대화",
-                "conversation_date": conv.updated_at,
-                "messages": messages
-            })
-
-    return conversations_with_messages
-
-
-def build_conversation_context(
-    db: Session,
+async def load_conversation_context(
+    db: AsyncSession,
     conversation_id: UUID,
     user_id: UUID,
     character: AICharacter,
-    current_message: str = "",
-    emotion_data: Dict[str, Any] = None,
-    crisis_level: str = "none",
-    use_advanced_prompting: bool = True
+    use_advanced_prompting: bool = True,
+    current_message: str = ""
 ) -> Dict[str, Any]:
     """
-    완전한 대화 컨텍스트 구축 (Phase 2.2: 개인화 + 동적 Few-shot + Phase 3.1: 위기 대응)
+    감정 분석 결과와 무관한 컨텍스트 데이터 조회 (DB 작업)
+
+    감정 감지(LLM 호출)와 동시에 실행할 수 있도록 분리된 단계이며,
+    결과는 compose_conversation_context에 전달합니다.
 
     Args:
         db: 데이터베이스 세션
         conversation_id: 대화 ID
         user_id: 사용자 ID
         character: AI 캐릭터
-        current_message: 현재 사용자 메시지 (동적 Few-shot용)
-        emotion_data: 감정 분석 데이터 (선택적)
-        crisis_level: 위기 수준 ("none", "medium", "high", "critical")
         use_advanced_prompting: Few-shot, CoT 등 고급 프롬프팅 사용 여부
+        current_message: 현재 사용자 메시지 (관련 메모리 검색용)
 
     Returns:
-        LLM에 전달할 컨텍스트 딕셔너리
+        조회된 컨텍스트 데이터 딕셔너리
     """
-    # 0. 사용자 선호도 가져오기 및 업데이트 (Phase 2.2)
-    user_preference_data = None
-    if use_advanced_prompting:
-        # 선호도 업데이트가 필요한지 체크
-        if should_update_preferences(db, user_id, character.id):
-            # 선호도 학습 업데이트 실행
-            update_user_preferences(db, user_id, character.id)
-
-        # 현재 선호도 가져오기
-        preference = get_or_create_preference(db, user_id, character.id)
-        user_preference_data = {
-            "preferred_response_length": preference.preferred_response_length,
-            "preferred_tone": preference.preferred_tone,
-            "emoji_preference": preference.emoji_preference,
-            "preferred_few_shot_count": preference.preferred_few_shot_count,
-            "confidence_score": preference.confidence_score
-        }
-
-    # 1. 사용자 메모리 가져오기
-    memories = get_user_memories(db, user_id, character.id)
-
-    # 2. 현재 대화 요약 가져오기
-    summaries = get_conversation_summaries(db, conversation_id)
-
-    # 3. 최근 다른 대화 요약 가져오기 (크로스-대화 컨텍스트)
-    # 심리 상담에서는 장기 메모리가 중요하므로 30일로 확장
-    recent_summaries = get_recent_conversation_summaries(
-        db=db,
-        user_id=user_id,
-        character_id=character.id,
-        current_conversation_id=conversation_id,
-        days=30  # 7일 → 30일로 확장
+    # 선호도/메모리/요약/다른 대화/최근 메시지/대화 수를 한 번의 쿼리로 조회
+    bundle = await load_context_bundle(db, conversation_id, user_id, character.id)
+
+    # 동적 Few-shot 후보 인덱스 (구성 단계가 DB 없이 워커 스레드에서 실행되도록 미리 조회)
+    few_shot_index = (
+        await load_candidate_index(db, user_id, character.id)
+        if use_advanced_prompting and current_message
+        else None
     )
 
-    # 4. 최근 다른 대화의 메시지 가져오기 (구체적 내용 포함)
-    other_conversations_messages = get_recent_messages_from_other_conversations(
-        db=db,
-        user_id=user_id,
-        character_id=character.id,
-        current_conversation_id=conversation_id,
-        days=30,  # 7일 → 30일로 확장
-        messages_per_conversation=10
+    # 0. 사용자 선호도 가져오기 (Phase 2.2)
+    # 읽기 전용 (캐시된 사용자 섹션), 학습/갱신은 피드백 기록과 선호도 갱신 워커에서 수행
+    user_preference_data = bundle.preference if use_advanced_prompting else None
+
+    # 1. 사용자 메모리 (현재 메시지와 관련된 메모리 우선)
+    memories = categorize_memories(
+        rank_memories_by_relevance(user_id, character.id, bundle.memories, current_message)
     )
 
-    # 5. 현재 대화의 최근 메시지 가져오기
-    recent_messages = get_recent_messages(db, conversation_id, limit=20)
+    # 2. 현재 대화 요약
+    summaries = bundle.summaries
+
+    # 3~5. 다른 대화 요약/메시지(최근 30일), 현재 대화 메시지는 bundle에 포함
 
     # 6. 대화 히스토리 구성
-    conversation_history = []
-    for msg in recent_messages:
-        conversation_history.append({
-            "role": msg.role,
-            "content": msg.content
-        })
+    # token_count는 토큰 예산 계산 시 재사용 (LLM 요청에는 role/content만 사용)
+    conversation_history = [
+        {"role": msg["role"], "content": msg["content"], "token_count": msg.get("token_count")}
+        for msg in bundle.recent_messages
+    ]
+
+    conversation_count = bundle.conversation_count
 
     # 7. 고급 사용자 컨텍스트 구성 (기존 메모리 + 다른 채팅방 내용 + 캐릭터 정보)
     enhanced_user_context = {
@@ -354,10 +218,7 @@ def build_conversation_context(
         "character_personality": character.personality,
         "character_description": character.description,
         # 기존 정보
-        "conversation_count": db.query(Conversation).filter(
-            Conversation.user_id == user_id,
-            Conversation.character_id == character.id
-        ).count()
+        "conversation_count": conversation_count
     }
 
     # 메모리 데이터 추가
@@ -376,35 +237,77 @@ def build_conversation_context(
             pattern for pattern in memories["emotion_patterns"][:3]
         ]
 
-    # 다른 대화 요약 추가
-    if recent_summaries:
-        recent_summaries_sorted = sorted(
-            recent_summaries,
-            key=lambda x: x.created_at,
-            reverse=True
-        )[:3]
-        enhanced_user_context["recent_conversations"] = [
-            s.summary for s in recent_summaries_sorted
-        ]
+    # 다른 대화 요약 추가 (최신순 3개)
+    if bundle.recent_summaries:
+        enhanced_user_context["recent_conversations"] = bundle.recent_summaries
 
     # 다른 대화의 구체적 메시지 추가
-    if other_conversations_messages:
+    if bundle.other_conversations:
         enhanced_user_context["other_conversation_messages"] = []
-        for conv_data in other_conversations_messages:
+        for other in bundle.other_conversations:
             conv_summary = {
-                "title": conv_data["conversation_title"],
+                "title": other.title,
                 "messages": [
-                    {"role": msg.role, "content": msg.content[:100]}  # 100자로 제한
-                    for msg in conv_data["messages"][:5]  # 최근 5개만
+                    {"role": msg["role"], "content": msg["content"][:100]}  # 100자로 제한
+                    for msg in other.messages  # 대화별 최근 5개 (SQL에서 제한)
                 ]
             }
             enhanced_user_context["other_conversation_messages"].append(conv_summary)
 
-    # 현재 대화 요약 추가
+    # 현재 대화 요약 추가 (누적 요약 1개 + 최근 구간 요약 3개, 대화 길이와 무관하게 제한됨)
     if summaries:
-        summary_texts = [s.summary for s in summaries[-3:]]
+        summary_texts = [s.summary for s in summaries]
         enhanced_user_context["current_conversation_summary"] = "\n\n".join(summary_texts)
 
+    return {
+        "user_preference": user_preference_data,
+        "memories": memories,
+        "summaries": summaries,
+        "conversation_history": conversation_history,
+        "user_context": enhanced_user_context,
+        "few_shot_index": few_shot_index
+    }
+
+
+def compose_conversation_context(
+    loaded_context: Dict[str, Any],
+    user_id: UUID,
+    character: AICharacter,
+    current_message: str = "",
+    emotion_data: Dict[str, Any] = None,
+    crisis_level: str = "none",
+    use_advanced_prompting: bool = True,
+    max_tokens: Optional[int] = None
+) -> Dict[str, Any]:
+    """
+    조회된 컨텍스트에 감정/위기 정보를 반영하여 최종 프롬프트 구성
+
+    Note: DB를 사용하지 않는 CPU 작업(Few-shot 점수 계산, 토큰 예산 패킹, 프롬프트 구성)이므로
+          이벤트 루프를 막지 않도록 asyncio.to_thread로 호출합니다.
+
+    Args:
+        loaded_context: load_conversation_context 결과 (동적 Few-shot 후보 인덱스 포함)
+        user_id: 사용자 ID
+        character: AI 캐릭터
+        current_message: 현재 사용자 메시지 (동적 Few-shot용)
+        emotion_data: 감정 분석 데이터 (선택적)
+        crisis_level: 위기 수준 ("none", "medium", "high", "critical")
+        use_advanced_prompting: Few-shot, CoT 등 고급 프롬프팅 사용 여부
+        max_tokens: 시스템 프롬프트 + 대화 메시지 토큰 예산 (None이면 CONTEXT_MAX_TOKENS)
+
+    Returns:
+        LLM에 전달할 컨텍스트 딕셔너리
+        (prompt_prefix: 첫 메시지 맨 앞의 고정 앞부분, 컨텍스트 캐시용 - 없으면 None)
+    """
+    if max_tokens is None:
+        max_tokens = settings.CONTEXT_MAX_TOKENS
+
+    user_preference_data = loaded_context["user_preference"]
+    memories = loaded_context["memories"]
+    summaries = loaded_context["summaries"]
+    conversation_history = loaded_context["conversation_history"]
+    enhanced_user_context = loaded_context["user_context"]
+
     # 8. Advanced Prompt Engineering 적용 (Phase 2.2: 개인화 통합)
     if use_advanced_prompting:
         # 감정 카테고리 추출
@@ -417,17 +320,21 @@ def build_conversation_context(
             else 3
         )
 
-        # 고급 프롬프트 생성 (Phase 2.2: 선호도 + 동적 Few-shot + Phase 3.1: 위기 대응)
-        system_prompt = build_counseling_prompt(
+        # 히스토리는 한 번만 전달 (채팅 턴 또는 인라인 대화록 중 하나)
+        history_mode = resolve_history_mode()
+        previous_history = conversation_history[:-1]
+
+        # 고급 프롬프트 섹션 생성 (Phase 2.2: 선호도 + 동적 Few-shot + Phase 3.1: 위기 대응)
+        prompt_sections = build_counseling_sections(
             emotion=detected_emotion,
             use_few_shot=True,
             few_shot_count=few_shot_count,
             use_cot=True,  # CoT 활성화: 메타-인지 형태 + Post-processing 필터로 안전하게 사용
-            conversation_history=conversation_history[:-1] if len(conversation_history) > 1 else None,
+            conversation_history=None,  # 히스토리는 아래에서 모드에 따라 한 번만 포함
             user_context=enhanced_user_context,
             user_preference=user_preference_data,  # Phase 2.2: 개인화
-            # Phase 2.2: 동적 Few-shot
-            db=db,
+            # Phase 2.2: 동적 Few-shot (미리 조회한 후보 인덱스 사용)
+            few_shot_index=loaded_context.get("few_shot_index"),
             user_id=user_id,
             character_id=character.id,
             current_message=current_message,
@@ -436,21 +343,74 @@ def build_conversation_context(
             crisis_level=crisis_level
         )
 
-        # 시스템 프롬프트를 첫 메시지에 포함
+        # 시스템 프롬프트 섹션과 대화 메시지를 하나의 토큰 예산으로 함께 선택
+        # (첫 메시지에 붙는 구분 문구만큼 예산에서 제외)
+        # inline 모드는 이전 메시지가 대화록 줄로 들어가므로 그 비용으로 함께 선택
+        builder = get_prompt_builder()
+        history_cost = {}
+        if history_mode == "inline":
+            history_cost = {
+                "message_tokens": lambda msg: count_tokens(builder.format_transcript_line(msg)) + 1,
+                "history_overhead": count_tokens(f"{TRANSCRIPT_SEPARATOR}\n{builder.TRANSCRIPT_HEADER}") + 1
+            }
+        prompt_sections, conversation_history = pack_prompt_with_history(
+            prompt_sections,
+            conversation_history,
+            max_tokens - count_tokens(SYSTEM_PROMPT_SEPARATOR),
+            **history_cost
+        )
+
+        if history_mode == "inline":
+            # 이전 메시지를 대화록으로 시스템 프롬프트에 넣고 현재 메시지만 전달
+            kept_history = conversation_history[:-1]
+            if kept_history:
+                transcript = PromptSection(
+                    "history",
+                    [TRANSCRIPT_SEPARATOR, builder.format_transcript(kept_history)]
+                )
+                # 사용자 정보 섹션 앞 (캐릭터 역할 등 고정 앞부분은 그대로 유지)
+                insert_at = next(
+                    (
+                        i for i, section in enumerate(prompt_sections)
+                        if section.name.startswith("user_") and not section.stable
+                    ),
+                    len(prompt_sections)
+                )
+                prompt_sections.insert(insert_at, transcript)
+            conversation_history = conversation_history[-1:]
+            tokens_saved = count_messages_tokens(kept_history)
+        else:
+            # 이전 방식에서 시스템 프롬프트에 중복으로 들어가던 히스토리 요약
+            tokens_saved = (
+                count_tokens("\n---\n\n" + builder.format_conversation_history(previous_history))
+                if previous_history else 0
+            )
+
+        _report_tokens_saved({
+            "mode": history_mode,
+            "tokens_saved": tokens_saved,
+            "history_messages": len(previous_history)
+        })
+
+        system_prompt = render_sections(prompt_sections)
+
+        # 턴 간에 바뀌지 않는 고정 앞부분 (Gemini 컨텍스트 캐시 대상)
+        stable_sections, _ = split_stable_prefix(prompt_sections)
+        prompt_prefix = render_sections(stable_sections) if stable_sections else None
+
+        # 시스템 프롬프트를 첫 사용자 메시지에 포함 (앞쪽 AI 메시지는 제외)
+        while conversation_history and conversation_history[0]["role"] != "user":
+            conversation_history = conversation_history[1:]
+
         messages = []
         if conversation_history:
             first_msg = conversation_history[0]
-            if first_msg["role"] == "user":
-                messages.append({
-                    "role": "user",
-                    "content": f"{system_prompt}\n\n---\n\n사용자 메시지:\n{first_msg['content']}"
-                })
-                # 나머지 메시지 추가
-                messages.extend(conversation_history[1:])
-            else:
-                messages = conversation_history
-        else:
-            messages = conversation_history
+            messages.append({
+                "role": "user",
+                "content": f"{system_prompt}{SYSTEM_PROMPT_SEPARATOR}{first_msg['content']}"
+            })
+            # 나머지 메시지 추가 (token_count는 예산 계산용이므로 제외)
+            messages.extend(_request_message(msg) for msg in conversation_history[1:])
 
     else:
         # 기존 방식 (하위 호환성)
@@ -480,10 +440,12 @@ def build_conversation_context(
                 base_prompt += f"\n{emotion_instructions}"
 
         messages = [{"role": "system", "content": base_prompt}]
-        messages.extend(conversation_history)
+        messages.extend(_request_message(msg) for msg in conversation_history)
+        prompt_prefix = None
 
     return {
         "messages": messages,
+        "prompt_prefix": prompt_prefix,
         "character": character,
         "user_memories": memories,
         "has_summaries": len(summaries) > 0,
@@ -491,10 +453,58 @@ def build_conversation_context(
     }
 
 
+async def build_conversation_context(
+    db: AsyncSession,
+    conversation_id: UUID,
+    user_id: UUID,
+    character: AICharacter,
+    current_message: str = "",
+    emotion_data: Dict[str, Any] = None,
+    crisis_level: str = "none",
+    use_advanced_prompting: bool = True
+) -> Dict[str, Any]:
+    """
+    완전한 대화 컨텍스트 구축 (Phase 2.2: 개인화 + 동적 Few-shot + Phase 3.1: 위기 대응)
+
+    조회(load_conversation_context)와 구성(compose_conversation_context)을 순서대로 실행합니다.
+
+    Args:
+        db: 데이터베이스 세션
+        conversation_id: 대화 ID
+        user_id: 사용자 ID
+        character: AI 캐릭터
+        current_message: 현재 사용자 메시지 (동적 Few-shot용)
+        emotion_data: 감정 분석 데이터 (선택적)
+        crisis_level: 위기 수준 ("none", "medium", "high", "critical")
+        use_advanced_prompting: Few-shot, CoT 등 고급 프롬프팅 사용 여부
+
+    Returns:
+        LLM에 전달할 컨텍스트 딕셔너리
+    """
+    loaded_context = await load_conversation_context(
+        db=db,
+        conversation_id=conversation_id,
+        user_id=user_id,
+        character=character,
+        use_advanced_prompting=use_advanced_prompting,
+        current_message=current_message
+    )
+
+    return await asyncio.to_thread(
+        compose_conversation_context,
+        loaded_context=loaded_context,
+        user_id=user_id,
+        character=character,
+        current_message=current_message,
+        emotion_data=emotion_data,
+        crisis_level=crisis_level,
+        use_advanced_prompting=use_advanced_prompting
+    )
+
+
 def estimate_token_count(text: str) -> int:
     """
-    텍스트의 대략적인 토큰 수 추정
-    (1 토큰 ≈ 4 글자, 한국어는 좀 더 효율적)
+    텍스트의 토큰 수 추정 (Gemini 토크나이저 근사, 한국어 보정)
 
     Args:
         text: 추정할 텍스트
@@ -502,10 +512,7 @@ def estimate_token_count(text: str) -> int:
     Returns:
         대략적인 토큰 수
     """
-    # 간단한 추정: 공백 기준으로 단어 수 + 문자 수 / 4
-    words = len(text.split())
-    chars = len(text)
-    return int(words + chars / 4)
+    return count_tokens(text)
 
 
 def optimize_context_for_token_limit(
@@ -515,6 +522,9 @@ def optimize_context_for_token_limit(
     """
     토큰 제한에 맞춰 컨텍스트 최적화
 
+    메시지별 토큰 수(저장된 token_count 재사용)를 한 번만 계산하고,
+    최근 메시지부터의 누적합으로 남길 메시지를 한 번에 결정합니다.
+
     Args:
         context: 원본 컨텍스트
         max_tokens: 최대 토큰 수
@@ -524,30 +534,17 @@ def optimize_context_for_token_limit(
     """
     messages = context["messages"]
 
-    # 현재 토큰 수 추정
-    total_text = "\n".join([msg["content"] for msg in messages])
-    current_tokens = estimate_token_count(total_text)
-
     # 토큰 제한을 초과하면 메시지 줄이기
-    if current_tokens > max_tokens:
+    if count_messages_tokens(messages) > max_tokens:
         # 시스템 프롬프트는 유지
         system_messages = [msg for msg in messages if msg["role"] == "system"]
         conversation_messages = [msg for msg in messages if msg["role"] != "system"]
 
-        # 최근 메시지부터 역순으로 추가
-        optimized_messages = system_messages.copy()
-        remaining_tokens = max_tokens - estimate_token_count(
-            "\n".join([msg["content"] for msg in system_messages])
-        )
-
-        for msg in reversed(conversation_messages):
-            msg_tokens = estimate_token_count(msg["content"])
-            if remaining_tokens - msg_tokens > 0:
-                optimized_messages.insert(len(system_messages), msg)
-                remaining_tokens -= msg_tokens
-            else:
-                break
-
-        context["messages"] = optimized_messages
+        # 최근 메시지부터 남은 예산 안에서 유지 (현재 메시지는 예산을 넘어도 유지)
+        remaining_tokens = max_tokens - count_messages_tokens(system_messages)
+        kept_messages = trim_messages_to_budget(conversation_messages, remaining_tokens)
+        if not kept_messages and conversation_messages:
+            kept_messages = conversation_messages[-1:]
+        context["messages"] = system_messages + kept_messages
 
     return context
@@ -2,21 +2,40 @@
 동적 Few-shot 예제 선택 서비스
 
 사용자의 과거 대화에서 긍정 피드백 받은 응답을 Few-shot 예제로 활용
+(후보는 few_shot_index_service의 예제 인덱스에서 조회)
+
+채팅 경로에서는 load_candidate_index로 후보 인덱스를 비동기 조회한 뒤,
+점수 계산/선택은 DB 없이 (워커 스레드에서) 수행합니다.
 """
+import asyncio
+from collections import OrderedDict
+from sqlalchemy.ext.asyncio import AsyncSession
 from sqlalchemy.orm import Session
-from sqlalchemy import desc
-from typing import List, Dict, Optional
+from typing import Any, List, Dict, Optional, Set, Tuple
 from uuid import UUID
 
-from app.models.conversation import Conversation
-from app.models.message import Message
-from app.models.message_feedback import MessageFeedback
+import numpy as np
+
+from app.core.config import settings
 from app.prompts.few_shot_examples import FewShotExample
+from app.services.embedding_service import get_embedding_backend
+from app.services.few_shot_index_service import (
+    exemplar_to_candidate,
+    get_exemplar_index_version,
+    get_exemplar_index_version_async,
+    get_exemplars,
+    get_exemplars_async,
+    tokenize_text,
+)
+from app.services.similarity_engine import SimilarityMatrix
+from app.services.vector_index import VectorIndex
 
 
 def calculate_text_similarity(text1: str, text2: str) -> float:
     """
-    간단한 텍스트 유사도 계산 (키워드 기반)
+    간단한 텍스트 유사도 계산 (문자 n-gram Jaccard, 단일 쌍)
+
+    여러 후보를 한 번에 비교할 때는 SimilarityMatrix를 사용합니다.
 
     Args:
         text1: 첫 번째 텍스트
@@ -26,15 +45,26 @@ def calculate_text_similarity(text1: str, text2: str) -> float:
         0.0-1.0 사이의 유사도 점수
     """
     # 간단한 키워드 매칭 방식
-    # 나중에 임베딩 기반으로 업그레이드 가능
+    # (예제 검색은 CandidateIndex의 임베딩/n-gram 인덱스를 사용)
 
     if not text1 or not text2:
         return 0.0
 
-    # 공백으로 토큰화
-    tokens1 = set(text1.lower().split())
-    tokens2 = set(text2.lower().split())
+    # 어절 단위 문자 n-gram으로 토큰화
+    return calculate_token_similarity(tokenize_text(text1), tokenize_text(text2))
+
+
+def calculate_token_similarity(tokens1: Set[str], tokens2: Set[str]) -> float:
+    """
+    토큰 집합 간 Jaccard 유사도 (미리 토큰화된 인덱스 예제용)
+
+    Args:
+        tokens1: 첫 번째 토큰 집합
+        tokens2: 두 번째 토큰 집합
 
+    Returns:
+        0.0-1.0 사이의 유사도 점수
+    """
     if not tokens1 or not tokens2:
         return 0.0
 
@@ -82,13 +112,188 @@ def calculate_emotion_similarity(emotion1: Optional[str], emotion2: Optional[str
     return 0.3
 
 
-def select_dynamic_few_shot_examples(
+# ============================================
+# 사용자별 후보 점수 행렬 캐시
+# ============================================
+
+# 종합 유사도(텍스트 70% + 감정 30%) 임계값
+# - ngram: 문자 n-gram Jaccard 기준으로 정한 값
+# - 임베딩 백엔드: ngram과 같은 통과 비율이 되도록 benchmarks/few_shot_threshold_calibration.py로 보정
+#   (hashing, dim=512: 라벨 데이터 234개 메시지에서 통과 비율 0.34%, 선택 예제 겹침 67%)
+FEW_SHOT_SIMILARITY_THRESHOLDS = {
+    "ngram": 0.4,
+    "hashing": 0.485,
+}
+_warned_uncalibrated: Set[str] = set()
+
+
+def get_similarity_threshold(retrieval: str) -> float:
+    """
+    검색 방식별 종합 유사도 임계값
+
+    보정값이 없는 임베딩 모델은 settings.FEW_SHOT_EMBEDDING_THRESHOLD를 사용하고,
+    이것도 없으면 ngram 임계값을 쓰면서 한 번 경고합니다.
+    """
+    if retrieval != "embedding":
+        return FEW_SHOT_SIMILARITY_THRESHOLDS["ngram"]
+    if settings.FEW_SHOT_EMBEDDING_THRESHOLD is not None:
+        return settings.FEW_SHOT_EMBEDDING_THRESHOLD
+    backend_name = get_embedding_backend().name
+    threshold = FEW_SHOT_SIMILARITY_THRESHOLDS.get(backend_name)
+    if threshold is None:
+        if backend_name not in _warned_uncalibrated:
+            _warned_uncalibrated.add(backend_name)
+            print(f"⚠️ Few-shot 임계값 보정값 없음 ({backend_name}), ngram 임계값 사용")
+        threshold = FEW_SHOT_SIMILARITY_THRESHOLDS["ngram"]
+    return threshold
+
+
+class CandidateIndex:
+    """
+    사용자/캐릭터별 후보 예제와 텍스트 검색 인덱스
+
+    settings.FEW_SHOT_RETRIEVAL에 따라
+    - ngram (기본값): 전체 후보에 대한 문자 n-gram Jaccard
+    - embedding: 임베딩 + 근사 최근접 이웃 인덱스 (후보 수가 늘어도 질의 시간이 거의 일정)
+    """
+
+    def __init__(self, version: Tuple[Any, ...], candidates: List[Dict[str, Any]]):
+        self.version = version
+        self.candidates = candidates
+        self.retrieval = settings.FEW_SHOT_RETRIEVAL
+        self.threshold = get_similarity_threshold(self.retrieval)
+        texts = [c["user_message"] for c in candidates]
+        if self.retrieval == "embedding":
+            self.vectors = VectorIndex(get_embedding_backend().embed(texts))
+        else:
+            self.matrix = SimilarityMatrix.build(texts)
+        # 감정 유사도는 고유 감정별로 한 번만 계산하기 위해 코드화
+        emotions = [c["emotion"] or "" for c in candidates]
+        self.emotion_labels = sorted(set(emotions))
+        label_positions = {label: i for i, label in enumerate(self.emotion_labels)}
+        self.emotion_codes = np.asarray([label_positions[e] for e in emotions], dtype=np.int64)
+
+    def text_scores(self, current_message: str, shortlist: int) -> Tuple[np.ndarray, np.ndarray]:
+        """
+        현재 메시지와 후보 간 텍스트 유사도
+
+        Args:
+            current_message: 현재 사용자 메시지
+            shortlist: embedding 방식에서 가져올 최근접 후보 수
+
+        Returns:
+            (후보 인덱스 배열, 텍스트 유사도 배열)
+        """
+        if self.retrieval == "embedding":
+            query = get_embedding_backend().embed_one(current_message)
+            neighbours = self.vectors.search(query, shortlist)
+            indices = np.asarray([i for i, _ in neighbours], dtype=np.int64)
+            # 부호 있는 해싱에서는 음수가 나올 수 있으므로 0으로 자름
+            scores = np.clip(np.asarray([score for _, score in neighbours], dtype=np.float64), 0.0, 1.0)
+            return indices, scores
+
+        return np.arange(len(self.candidates)), self.matrix.jaccard(current_message)
+
+    def emotion_scores(self, current_emotion: Optional[str]) -> np.ndarray:
+        """후보별 감정 유사도 배열"""
+        label_scores = np.asarray([
+            calculate_emotion_similarity(current_emotion, label or None)
+            for label in self.emotion_labels
+        ], dtype=np.float64)
+        return label_scores[self.emotion_codes] if len(label_scores) else np.zeros(0, dtype=np.float64)
+
+
+_CANDIDATE_INDEX_CACHE_SIZE = 256
+_candidate_index_cache: "OrderedDict[Tuple[UUID, UUID], CandidateIndex]" = OrderedDict()
+
+
+def _cached_candidate_index(key: Tuple[UUID, UUID], version: Tuple[Any, ...]) -> Optional[CandidateIndex]:
+    cached = _candidate_index_cache.get(key)
+    if cached is not None and cached.version == version:
+        _candidate_index_cache.move_to_end(key)
+        return cached
+    return None
+
+
+def _store_candidate_index(key: Tuple[UUID, UUID], index: CandidateIndex) -> None:
+    _candidate_index_cache[key] = index
+    _candidate_index_cache.move_to_end(key)
+    while len(_candidate_index_cache) > _CANDIDATE_INDEX_CACHE_SIZE:
+        _candidate_index_cache.popitem(last=False)
+
+
+def get_candidate_index(
     db: Session,
     user_id: UUID,
+    character_id: UUID
+) -> CandidateIndex:
+    """
+    후보 점수 행렬 가져오기 (인덱스 버전이 같으면 캐시 재사용, LRU)
+
+    Args:
+        db: 데이터베이스 세션
+        user_id: 사용자 ID
+        character_id: AI 캐릭터 ID
+
+    Returns:
+        CandidateIndex
+    """
+    key = (user_id, character_id)
+    version = get_exemplar_index_version(db, user_id, character_id)
+
+    cached = _cached_candidate_index(key, version)
+    if cached is not None:
+        return cached
+
+    candidates = [
+        exemplar_to_candidate(exemplar)
+        for exemplar in get_exemplars(db, user_id, character_id)
+    ]
+    index = CandidateIndex(version, candidates)
+    _store_candidate_index(key, index)
+    return index
+
+
+async def load_candidate_index(
+    db: AsyncSession,
+    user_id: UUID,
+    character_id: UUID
+) -> CandidateIndex:
+    """
+    get_candidate_index의 비동기 버전 (조회는 AsyncSession, 인덱스 구축은 워커 스레드)
+
+    Args:
+        db: 비동기 데이터베이스 세션
+        user_id: 사용자 ID
+        character_id: AI 캐릭터 ID
+
+    Returns:
+        CandidateIndex
+    """
+    key = (user_id, character_id)
+    version = await get_exemplar_index_version_async(db, user_id, character_id)
+
+    cached = _cached_candidate_index(key, version)
+    if cached is not None:
+        return cached
+
+    candidates = [
+        exemplar_to_candidate(exemplar)
+        for exemplar in await get_exemplars_async(db, user_id, character_id)
+    ]
+    index = await asyncio.to_thread(CandidateIndex, version, candidates)
+    _store_candidate_index(key, index)
+    return index
+
+
+def select_dynamic_few_shot_examples(
+    db: Optional[Session],
+    user_id: UUID,
     character_id: UUID,
     current_emotion: Optional[str],
     current_message: str,
-    count: int = 2
+    count: int = 2,
+    index: Optional[CandidateIndex] = None
 ) -> List[FewShotExample]:
     """
     사용자 히스토리 기반 동적 Few-shot 예제 선택
@@ -100,96 +305,51 @@ def select_dynamic_few_shot_examples(
         current_emotion: 현재 감정
         current_message: 현재 사용자 메시지
         count: 선택할 예제 수 (기본 2개)
+        index: 미리 조회한 후보 인덱스 (있으면 DB를 사용하지 않음)
 
     Returns:
         동적으로 선택된 Few-shot 예제 리스트
     """
-    # 1. 사용자의 최근 50개 대화 가져오기
-    past_conversations = db.query(Conversation).filter(
-        Conversation.user_id == user_id,
-        Conversation.character_id == character_id
-    ).order_by(
-        desc(Conversation.created_at)
-    ).limit(50).all()
+    # 1. 인덱스된 긍정 피드백 예제의 검색 인덱스 (변경 없으면 캐시 사용)
+    if index is None:
+        index = get_candidate_index(db, user_id, character_id)
 
-    if not past_conversations:
+    if not index.candidates:
         return []
 
-    # 2. 유사한 상황에서 긍정 피드백 받은 응답 찾기
-    similar_cases = []
-
-    for conv in past_conversations:
-        # 대화의 모든 메시지 가져오기
-        messages = db.query(Message).filter(
-            Message.conversation_id == conv.id
-        ).order_by(Message.created_at).all()
-
-        # 사용자 메시지와 AI 응답 쌍 분석
-        for i, msg in enumerate(messages):
-            if msg.role == "user" and i + 1 < len(messages):
-                ai_response = messages[i + 1]
-
-                # AI 응답인지 확인
-                if ai_response.role != "assistant":
-                    continue
-
-                # 텍스트 유사도 계산
-                text_similarity = calculate_text_similarity(
-                    current_message,
-                    msg.content
-                )
-
-                # 감정 유사도 계산 (메시지에 감정 정보가 있으면)
-                msg_emotion = getattr(msg, 'detected_emotion', None)
-                emotion_similarity = calculate_emotion_similarity(
-                    current_emotion,
-                    msg_emotion
-                )
-
-                # 종합 유사도 (텍스트 70%, 감정 30%)
-                total_similarity = text_similarity * 0.7 + emotion_similarity * 0.3
-
-                # 유사도 임계값 0.4 이상
-                if total_similarity >= 0.4:
-                    # AI 응답의 피드백 확인
-                    feedback = db.query(MessageFeedback).filter(
-                        MessageFeedback.message_id == ai_response.id,
-                        MessageFeedback.user_id == user_id
-                    ).first()
-
-                    # 긍정 피드백이 있으면 추가
-                    if feedback and feedback.is_helpful:
-                        similar_cases.append({
-                            "user_message": msg.content,
-                            "ai_response": ai_response.content,
-                            "similarity": total_similarity,
-                            "emotion": msg_emotion or current_emotion
-                        })
-
-    # 3. 유사도 순으로 정렬
-    similar_cases.sort(key=lambda x: x["similarity"], reverse=True)
-
-    # 4. FewShotExample로 변환 (상위 N개)
+    # 2. 텍스트가 유사한 후보를 한 번에 점수 계산
+    # 종합 유사도 (텍스트 70%, 감정 30%)
+    candidate_indices, text_similarity = index.text_scores(current_message, shortlist=max(count * 10, 50))
+    emotion_similarity = index.emotion_scores(current_emotion)[candidate_indices]
+    total_similarity = text_similarity * 0.7 + emotion_similarity * 0.3
+
+    # 3. 검색 방식별 유사도 임계값 이상 중 상위 N개
+    top_cases = SimilarityMatrix.top_k(total_similarity, count, threshold=index.threshold)
+
+    # 4. FewShotExample로 변환
     dynamic_examples = []
-    for case in similar_cases[:count]:
+    for position, similarity in top_cases:
+        candidate = index.candidates[candidate_indices[position]]
+        emotion = candidate["emotion"] or current_emotion
         dynamic_examples.append(FewShotExample(
-            emotion=case["emotion"] or "중립",
-            user_message=case["user_message"],
-            assistant_response=case["ai_response"],
-            notes=f"사용자 히스토리 기반 성공 사례 (유사도: {case['similarity']:.2f})"
+            emotion=emotion or "중립",
+            user_message=candidate["user_message"],
+            assistant_response=candidate["ai_response"],
+            notes=f"사용자 히스토리 기반 성공 사례 (유사도: {similarity:.2f})"
         ))
 
     return dynamic_examples
 
 
 def get_hybrid_few_shot_examples(
-    db: Session,
+    db: Optional[Session],
     user_id: UUID,
     character_id: UUID,
     current_emotion: Optional[str],
     current_message: str,
     total_count: int = 3,
-    dynamic_ratio: float = 0.5
+    dynamic_ratio: float = 0.5,
+    index: Optional[CandidateIndex] = None
 ) -> List[FewShotExample]:
     """
     동적 예제와 정적 예제를 혼합하여 반환
@@ -202,6 +362,7 @@ def get_hybrid_few_shot_examples(
         current_message: 현재 사용자 메시지
         total_count: 총 예제 수 (기본 3개)
         dynamic_ratio: 동적 예제 비율 (기본 0.5 = 50%)
+        index: 미리 조회한 후보 인덱스 (있으면 DB를 사용하지 않음)
 
     Returns:
         하이브리드 Few-shot 예제 리스트
@@ -219,7 +380,8 @@ def get_hybrid_few_shot_examples(
         character_id=character_id,
         current_emotion=current_emotion,
         current_message=current_message,
-        count=dynamic_count
+        count=dynamic_count,
+        index=index
     )
 
     # 부족한 개수는 정적 예제로 채우기
@@ -0,0 +1,116 @@
+"""
+임베딩 서비스 - CPU/오프라인에서 동작하는 교체 가능한 문장 임베딩 백엔드
+
+- hashing (기본값): 문자 n-gram을 부호 있는 해싱으로 고정 차원 벡터에 누적 (외부 의존성 없음)
+- sentence_transformers (선택): 로컬 소형 모델 (pip install sentence-transformers 필요)
+
+모든 백엔드는 L2 정규화된 float32 벡터를 반환하므로 내적 = 코사인 유사도입니다.
+"""
+import zlib
+from abc import ABC, abstractmethod
+from typing import List, Optional, Sequence
+
+import numpy as np
+
+from app.services.similarity_engine import char_ngrams
+
+
+class EmbeddingBackend(ABC):
+    """임베딩 백엔드 인터페이스"""
+
+    name = "base"
+    dim = 0
+
+    @abstractmethod
+    def embed(self, texts: Sequence[str]) -> np.ndarray:
+        """
+        문장 목록 임베딩
+
+        Args:
+            texts: 문장 목록
+
+        Returns:
+            (문장 수, dim) L2 정규화 float32 배열
+        """
+
+    def embed_one(self, text: str) -> np.ndarray:
+        """단일 문장 임베딩"""
+        return self.embed([text])[0]
+
+
+def _normalize_rows(vectors: np.ndarray) -> np.ndarray:
+    norms = np.linalg.norm(vectors, axis=1, keepdims=True)
+    norms[norms == 0] = 1.0
+    return (vectors / norms).astype(np.float32, copy=False)
+
+
+class HashingEmbeddingBackend(EmbeddingBackend):
+    """
+    문자 n-gram 해싱 임베딩
+
+    crc32 해시의 하위 비트로 차원을, 최상위 비트로 부호를 정해 충돌 편향을 상쇄합니다.
+    """
+
+    name = "hashing"
+
+    def __init__(self, dim: int = 512, ngram_sizes: Sequence[int] = (2, 3)):
+        self.dim = dim
+        self.ngram_sizes = tuple(ngram_sizes)
+
+    def embed(self, texts: Sequence[str]) -> np.ndarray:
+        vectors = np.zeros((len(texts), self.dim), dtype=np.float32)
+        for row, text in enumerate(texts):
+            for gram in char_ngrams(text, self.ngram_sizes):
+                hashed = zlib.crc32(gram.encode("utf-8"))
+                sign = -1.0 if hashed & 0x80000000 else 1.0
+                vectors[row, hashed % self.dim] += sign
+        return _normalize_rows(vectors)
+
+
+class SentenceTransformerBackend(EmbeddingBackend):
+    """로컬 sentence-transformers 모델 임베딩 (CPU)"""
+
+    name = "sentence_transformers"
+
+    def __init__(self, model_name: str):
+        from sentence_transformers import SentenceTransformer
+
+        self.model = SentenceTransformer(model_name, device="cpu")
+        self.dim = self.model.get_sentence_embedding_dimension()
+
+    def embed(self, texts: Sequence[str]) -> np.ndarray:
+        vectors = self.model.encode(
+            list(texts),
+            convert_to_numpy=True,
+            normalize_embeddings=True,
+            show_progress_bar=False
+        )
+        return vectors.astype(np.float32, copy=False)
+
+
+_backend: Optional[EmbeddingBackend] = None
+
+
+def get_embedding_backend() -> EmbeddingBackend:
+    """
+    설정에 따른 임베딩 백엔드 (싱글톤)
+
+    sentence_transformers를 불러올 수 없으면 hashing 백엔드로 대체합니다.
+    """
+    from app.core.config import settings
+
+    global _backend
+    if _backend is None:
+        if settings.EMBEDDING_BACKEND == "sentence_transformers":
+            try:
+                _backend = SentenceTransformerBackend(settings.EMBEDDING_MODEL)
+            except Exception as e:
+                print(f"⚠️ 임베딩 모델 로드 실패, hashing 백엔드 사용: {str(e)}")
+        if _backend is None:
+            _backend = HashingEmbeddingBackend(dim=settings.EMBEDDING_DIM)
+    return _backend
+
+
+def embed_texts(texts: List[str]) -> np.ndarray:
+    """설정된 백엔드로 문장 목록 임베딩"""
+    return get_embedding_backend().embed(texts)
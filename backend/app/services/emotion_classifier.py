@@ -0,0 +1,375 @@
+"""
+로컬 감정 분류기 - 감정 사전 + 문자 n-gram 선형 모델로 LLM 호출 없이 감정 분류
+
+detect_emotion은 모든 메시지를 500토큰 JSON 프롬프트로 Gemini에 보내고 최대 3초를 기다립니다.
+대부분의 메시지는 "불안해요", "고마워" 같은 뚜렷한 감정 표현을 담고 있으므로
+로컬 분류기로 먼저 판단하고, 확신도가 낮은 메시지만 LLM으로 넘깁니다.
+
+- 클래스: EMOTION_CATEGORIES의 감정 (키 순서 그대로)
+- 특징: 어절 단위 문자 2/3-gram (similarity_engine.char_ngrams) + 감정 사전 일치 수 + 기호(!, ?, ㅠ, ㅋ)
+- 점수: 감정 사전 가중치(코드 고정) + 학습된 특징 가중치(JSON 파일) → softmax
+- 확신도: 1위 감정 확률 (호출자가 임계값 미만이면 LLM 사용)
+- 가중치 파일이 없으면 감정 사전만으로 분류
+
+가중치는 train_emotion_classifier.py로 라벨 데이터(benchmarks/fixtures/emotion_messages.jsonl)에서 학습합니다.
+"""
+import json
+import unicodedata
+from dataclasses import dataclass, field
+from pathlib import Path
+from typing import Any, Dict, List, Optional, Sequence, Tuple
+
+import numpy as np
+
+from app.services.emotion_service import EMOTION_CATEGORIES
+from app.services.similarity_engine import char_ngrams
+
+
+DEFAULT_WEIGHTS_PATH = Path(__file__).with_name("emotion_classifier_weights.json")
+
+# 감정 사전 (EMOTION_CATEGORIES의 한국어 이름은 자동으로 포함)
+EMOTION_LEXICON = {
+    "joy": ["기쁘", "기뻐", "기뻤", "행복", "즐거", "즐겁", "기분 좋", "기분이 좋", "기분 최고", "재밌", "다행"],
+    "gratitude": ["감사", "고마", "고맙", "덕분"],
+    "excitement": ["신나", "신난", "설레", "설렘", "두근두근", "기대돼", "기대된", "흥분", "짜릿"],
+    "satisfaction": ["만족", "뿌듯", "해냈", "보람", "마음에 들", "자랑스러"],
+    "sadness": ["슬프", "슬퍼", "슬펐", "눈물", "울었", "울고", "울컥", "속상", "서럽", "서러", "그리워", "그립"],
+    "anger": ["화가", "화나", "화났", "짜증", "열받", "빡치", "빡쳐", "빡쳤", "억울", "어이없", "열불", "치밀"],
+    "anxiety": ["불안", "걱정", "초조", "긴장", "무서", "두려", "떨려", "조마조마", "어떡하지", "어쩌지"],
+    "stress": ["스트레스", "지쳐", "지쳤", "지친", "피곤", "벅차", "야근", "압박", "번아웃", "힘들어"],
+    "depression": ["우울", "무기력", "의미가 없", "공허", "허무", "하기 싫", "의욕", "가라앉", "포기하고 싶"],
+    "loneliness": ["외로", "외롭", "쓸쓸", "아무도 없", "고독", "소외", "혼자"],
+    "calm": ["평온", "편안", "차분", "여유", "잔잔", "평화", "느긋", "안정", "괜찮아졌"],
+    "curiosity": ["궁금", "알고 싶", "알려줘", "어떻게", "뭐예요", "뭐야?", "왜"],
+    "neutral": [],
+}
+
+# 감정 사전 일치 한 건당 점수 (특징 가중치와 별도로 고정)
+LEXICON_WEIGHT = 1.5
+MAX_LEXICON_HITS = 3
+
+# 감정 → 긍정/부정/중립 (detect_emotion 프롬프트의 감정 카테고리)
+EMOTION_GROUPS = {
+    "joy": "positive",
+    "gratitude": "positive",
+    "excitement": "positive",
+    "satisfaction": "positive",
+    "calm": "positive",
+    "sadness": "negative",
+    "anger": "negative",
+    "anxiety": "negative",
+    "stress": "negative",
+    "depression": "negative",
+    "loneliness": "negative",
+    "curiosity": "neutral",
+    "neutral": "neutral",
+}
+
+# 감정 → 응답 스타일 (detect_emotion 프롬프트의 응답 스타일 선택 가이드)
+RESPONSE_STYLES = {
+    "sadness": "empathetic",
+    "loneliness": "empathetic",
+    "depression": "empathetic",
+    "anxiety": "supportive",
+    "stress": "supportive",
+    "anger": "calming",
+    "joy": "encouraging",
+    "satisfaction": "encouraging",
+    "gratitude": "encouraging",
+    "excitement": "encouraging",
+    "calm": "balanced",
+    "curiosity": "balanced",
+    "neutral": "balanced",
+}
+
+# 강도 보정 표현
+INTENSIFIERS = ("너무", "정말", "진짜", "완전", "엄청", "매우", "미치겠", "죽겠", "폭발")
+EMPHASIS_MARKS = ("!!", "ㅠㅠ", "ㅜㅜ")
+
+# 감정이 약한 클래스의 최대 강도 (적응형 응답 지침이 붙지 않도록)
+MAX_INTENSITY = {"neutral": 0.2, "curiosity": 0.4, "calm": 0.5}
+
+# 부차적 감정으로 표시할 최소 확률
+SECONDARY_MIN_PROBABILITY = 0.15
+
+BIAS_FEATURE = "__bias__"
+
+
+def normalize_message(message: str) -> str:
+    """분류용 정규화 (NFC, 소문자, 연속 공백 정리)
+
+    NFKC는 ㅠ, ㅋ 같은 호환 자모를 조합용 자모로 바꾸므로 NFC를 사용합니다.
+    """
+    return " ".join(unicodedata.normalize("NFC", message).lower().split())
+
+
+def _lexicon_matches(text: str) -> Dict[str, List[str]]:
+    """감정별로 메시지에 나타난 사전 표현"""
+    matches = {}
+    for emotion, korean_name in EMOTION_CATEGORIES.items():
+        terms = [term for term in dict.fromkeys([korean_name, *EMOTION_LEXICON.get(emotion, [])]) if term in text]
+        if terms:
+            matches[emotion] = terms
+    return matches
+
+
+def extract_features(text: str) -> List[str]:
+    """
+    정규화된 메시지의 특징 이름 목록 (학습/분류 공통)
+
+    Args:
+        text: normalize_message 결과
+
+    Returns:
+        특징 이름 리스트 (중복 없음)
+    """
+    features = [BIAS_FEATURE]
+    features.extend(char_ngrams(text))
+    if "!" in text:
+        features.append("sym:!")
+    if "?" in text:
+        features.append("sym:?")
+    if "ㅠ" in text or "ㅜ" in text:
+        features.append("sym:ㅠ")
+    if "ㅋ" in text or "ㅎ" in text:
+        features.append("sym:ㅋ")
+    return features
+
+
+def _softmax(scores: np.ndarray) -> np.ndarray:
+    shifted = np.exp(scores - scores.max(axis=-1, keepdims=True))
+    return shifted / shifted.sum(axis=-1, keepdims=True)
+
+
+@dataclass
+class EmotionPrediction:
+    """
+    로컬 분류 결과
+
+    Attributes:
+        emotion: EMOTION_CATEGORIES 키
+        confidence: 1위 감정 확률 (0.0 ~ 1.0)
+        intensity: 감정 강도 추정값 (0.0 ~ 1.0)
+        secondary: 부차적 감정 키 (확률 순)
+        keywords: 일치한 감정 사전 표현
+    """
+    emotion: str
+    confidence: float
+    intensity: float
+    secondary: List[str] = field(default_factory=list)
+    keywords: List[str] = field(default_factory=list)
+
+    def to_emotion_data(self) -> Dict[str, Any]:
+        """detect_emotion과 같은 형식의 감정 분석 결과"""
+        return {
+            "primary_emotion": EMOTION_CATEGORIES[self.emotion],
+            "emotion_category": EMOTION_GROUPS[self.emotion],
+            "intensity": self.intensity,
+            "secondary_emotions": [EMOTION_CATEGORIES[emotion] for emotion in self.secondary],
+            "keywords": self.keywords,
+            "response_style": RESPONSE_STYLES[self.emotion],
+            "confidence": round(self.confidence, 3),
+            "source": "classifier"
+        }
+
+
+class EmotionClassifier:
+    """감정 사전 + 문자 n-gram 선형 분류기"""
+
+    def __init__(self, weights: Optional[Dict[str, Dict[str, float]]] = None):
+        """
+        Args:
+            weights: {특징 이름: {감정 키: 가중치}} (None이면 감정 사전만 사용)
+        """
+        self.labels = list(EMOTION_CATEGORIES)
+        self.label_index = {label: i for i, label in enumerate(self.labels)}
+
+        weights = weights or {}
+        self.feature_index = {name: i for i, name in enumerate(weights)}
+        self.weights = np.zeros((len(weights) + 1, len(self.labels)))  # 마지막 행: 모르는 특징
+        for name, per_label in weights.items():
+            row = self.feature_index[name]
+            for label, value in per_label.items():
+                if label in self.label_index:
+                    self.weights[row, self.label_index[label]] = value
+        self._unknown_row = len(weights)
+
+    @classmethod
+    def load(cls, path: Path = DEFAULT_WEIGHTS_PATH) -> "EmotionClassifier":
+        """가중치 파일로 분류기 생성 (파일이 없으면 감정 사전만 사용)"""
+        if not path.exists():
+            print(f"⚠️ 감정 분류기 가중치 파일 없음, 감정 사전만 사용: {path}")
+            return cls()
+        with open(path, encoding="utf-8") as f:
+            return cls(json.load(f)["weights"])
+
+    def scores(self, text: str) -> Tuple[np.ndarray, Dict[str, List[str]]]:
+        """
+        감정별 점수와 감정 사전 일치 결과
+
+        Args:
+            text: normalize_message 결과
+
+        Returns:
+            (감정별 점수 배열, {감정: 일치 표현})
+        """
+        rows = [self.feature_index.get(name, self._unknown_row) for name in extract_features(text)]
+        scores = self.weights[rows].sum(axis=0)
+        matches = _lexicon_matches(text)
+        for emotion, terms in matches.items():
+            scores[self.label_index[emotion]] += LEXICON_WEIGHT * min(len(terms), MAX_LEXICON_HITS)
+        return scores, matches
+
+    def predict(self, message: str) -> EmotionPrediction:
+        """
+        메시지 감정 분류
+
+        Args:
+            message: 사용자 메시지
+
+        Returns:
+            EmotionPrediction
+        """
+        text = normalize_message(message)
+        scores, matches = self.scores(text)
+        probabilities = _softmax(scores)
+        order = np.argsort(-probabilities)
+
+        emotion = self.labels[order[0]]
+        confidence = float(probabilities[order[0]])
+        secondary = [
+            self.labels[i] for i in order[1:3]
+            if probabilities[i] >= SECONDARY_MIN_PROBABILITY and self.labels[i] != "neutral"
+        ]
+        keywords = [term for terms in matches.values() for term in terms][:5]
+
+        return EmotionPrediction(
+            emotion=emotion,
+            confidence=confidence,
+            intensity=_estimate_intensity(text, emotion, confidence),
+            secondary=secondary,
+            keywords=keywords
+        )
+
+
+def _estimate_intensity(text: str, emotion: str, confidence: float) -> float:
+    """확신도와 강조 표현(너무, 진짜, !!, ㅠㅠ)으로 감정 강도 추정"""
+    intensifiers = sum(1 for word in INTENSIFIERS if word in text)
+    intensity = 0.3 + 0.3 * confidence + 0.1 * min(intensifiers, 2)
+    if any(mark in text for mark in EMPHASIS_MARKS):
+        intensity += 0.1
+    intensity = min(intensity, MAX_INTENSITY.get(emotion, 1.0))
+    return round(min(intensity, 1.0), 2)
+
+
+def train_weights(
+    samples: Sequence[Tuple[str, str]],
+    epochs: int = 300,
+    learning_rate: float = 0.5,
+    l2: float = 1e-3,
+    prune_below: float = 0.05
+) -> Dict[str, Dict[str, float]]:
+    """
+    라벨 데이터로 특징 가중치 학습 (softmax 회귀, 전체 배치 경사 하강)
+
+    감정 사전 점수는 고정값으로 더한 채 나머지 특징 가중치만 학습하므로,
+    학습 데이터에 없는 표현도 감정 사전으로 분류됩니다.
+
+    Args:
+        samples: (메시지, EMOTION_CATEGORIES 키) 목록
+        epochs: 반복 횟수
+        learning_rate: 학습률
+        l2: L2 정규화 계수
+        prune_below: 절댓값이 이보다 작은 가중치는 저장하지 않음
+
+    Returns:
+        {특징 이름: {감정 키: 가중치}}
+    """
+    labels = list(EMOTION_CATEGORIES)
+    base = EmotionClassifier()
+
+    feature_index: Dict[str, int] = {}
+    rows, offsets = [], []
+    for message, _ in samples:
+        text = normalize_message(message)
+        rows.append([feature_index.setdefault(name, len(feature_index)) for name in extract_features(text)])
+        offsets.append(base.scores(text)[0])
+
+    x = np.zeros((len(samples), len(feature_index)))
+    for i, row in enumerate(rows):
+        x[i, row] = 1.0
+    y = np.zeros((len(samples), len(labels)))
+    for i, (_, label) in enumerate(samples):
+        y[i, labels.index(label)] = 1.0
+    offsets = np.array(offsets)
+
+    w = np.zeros((len(feature_index), len(labels)))
+    for _ in range(epochs):
+        probabilities = _softmax(offsets + x @ w)
+        gradient = x.T @ (probabilities - y) / len(samples) + l2 * w
+        w -= learning_rate * gradient
+
+    weights = {}
+    for name, i in feature_index.items():
+        per_label = {
+            label: round(float(w[i, j]), 3)
+            for j, label in enumerate(labels)
+            if abs(w[i, j]) >= prune_below
+        }
+        if per_label:
+            weights[name] = per_label
+    return weights
+
+
+def load_labelled_messages(path: Path, split: Optional[str] = None) -> List[Tuple[str, str]]:
+    """
+    라벨 데이터(JSONL: {"text", "label", "split"}) 읽기
+
+    Args:
+        path: JSONL 파일 경로
+        split: "train" | "test" (None이면 전체)
+
+    Returns:
+        (메시지, 감정 키) 목록
+    """
+    samples = []
+    with open(path, encoding="utf-8") as f:
+        for line in f:
+            if not line.strip():
+                continue
+            item = json.loads(line)
+            if split is None or item.get("split") == split:
+                samples.append((item["text"], item["label"]))
+    return samples
+
+
+_classifier: Optional[EmotionClassifier] = None
+_stats = {"classified": 0, "escalated": 0}
+
+
+def get_emotion_classifier() -> EmotionClassifier:
+    """기본 가중치 파일로 만든 분류기 (싱글톤)"""
+    global _classifier
+    if _classifier is None:
+        _classifier = EmotionClassifier.load()
+    return _classifier
+
+
+def record_classifier_decision(escalated: bool) -> None:
+    """로컬 처리/LLM 위임 횟수 기록"""
+    _stats["escalated" if escalated else "classified"] += 1
+
+
+def get_classifier_stats() -> Dict[str, Any]:
+    """
+    프로세스 시작 이후 감정 감지 통계
+
+    Returns:
+        {"classified": 로컬 처리 수, "escalated": LLM 위임 수, "llm_calls_saved_ratio": 절감 비율}
+    """
+    total = _stats["classified"] + _stats["escalated"]
+    return {
+        **_stats,
+        "llm_calls_saved_ratio": round(_stats["classified"] / total, 3) if total else 0.0
+    }
+
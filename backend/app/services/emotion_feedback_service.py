@@ -5,7 +5,7 @@ from sqlalchemy.orm import Session
 from typing import Optional
 from uuid import UUID
 
-from app.services.llm_service import get_gemini_model
+from app.services.llm_client import generate_text
 from app.models.emotion_log import EmotionLog
 
 
@@ -117,12 +117,9 @@ async def generate_emotion_feedback(
     )
     
     # LLM으로 피드백 생성
-    model = get_gemini_model()
-    
     try:
-        response = model.generate_content(prompt)
-        feedback = response.text.strip()
-        return feedback
+        feedback = await generate_text(prompt, purpose="emotion_feedback")
+        return feedback.strip()
     except Exception as e:
         print(f"감정 피드백 생성 오류: {str(e)}")
         # 폴백 메시지
@@ -1,11 +1,13 @@
 """
 감정 감지 서비스 - 사용자 메시지에서 감정 상태 분석 및 적응형 응답 제안
+
+로컬 감정 분류기(emotion_classifier)로 먼저 분류하고, 확신도가 낮을 때만 LLM으로 분석합니다.
 """
-import google.generativeai as genai
 from typing import Dict, Any, Optional
 import json
 
 from app.core.config import settings
+from app.services.llm_client import generate_text, strip_json_code_fence
 
 
 # 감정 카테고리 정의
@@ -53,14 +55,20 @@ async def detect_emotion(message: str) -> Dict[str, Any]:
             "response_style": "balanced"
         }
 
-    # Gemini 모델 설정
-    model = genai.GenerativeModel(
-        model_name=settings.LLM_MODEL,
-        generation_config={
-            "temperature": 0.3,
-            "max_output_tokens": 500,
-        }
-    )
+    # 로컬 분류기 확신도가 충분하면 LLM 호출 생략
+    if settings.EMOTION_CLASSIFIER_ENABLED:
+        from app.services.emotion_classifier import get_emotion_classifier, record_classifier_decision  # 순환 import 방지
+
+        try:
+            prediction = get_emotion_classifier().predict(message)
+        except Exception as e:
+            print(f"⚠️ 로컬 감정 분류 오류, LLM 사용: {str(e)}")
+            prediction = None
+
+        escalated = prediction is None or prediction.confidence < settings.EMOTION_CLASSIFIER_MIN_CONFIDENCE
+        record_classifier_decision(escalated)
+        if not escalated:
+            return prediction.to_emotion_data()
 
     # 감정 분석 프롬프트
     prompt = f"""다음 메시지에서 사용자의 감정 상태를 분석해주세요.
@@ -95,20 +103,15 @@ async def detect_emotion(message: str) -> Dict[str, Any]:
 - intensity는 메시지에서 드러나는 감정의 강도 (0.0=없음, 1.0=매우 강함)"""
 
     try:
-        # 비동기 호출로 변경
-        response = await model.generate_content_async(prompt)
-        response_text = response.text.strip()
+        response_text = await generate_text(
+            prompt,
+            temperature=0.3,
+            max_output_tokens=500,
+            purpose="emotion"
+        )
 
         # JSON 추출 (```json``` 마크다운 제거)
-        if response_text.startswith("```json"):
-            response_text = response_text[7:]
-        if response_text.startswith("```"):
-            response_text = response_text[3:]
-        if response_text.endswith("```"):
-            response_text = response_text[:-3]
-        response_text = response_text.strip()
-
-        emotion_data = json.loads(response_text)
+        emotion_data = json.loads(strip_json_code_fence(response_text))
 
         # 기본값 설정
         emotion_data.setdefault("primary_emotion", "neutral")
@@ -0,0 +1,334 @@
+"""
+Few-shot 예제 인덱스 서비스
+
+긍정 피드백 받은 (사용자 메시지, AI 응답) 쌍을 사용자/캐릭터별로 미리 저장해두어,
+채팅 시 전체 히스토리를 다시 훑지 않고 인덱스된 예제만 점수화할 수 있게 합니다.
+
+- 피드백 기록 시 증분 업데이트 (긍정 → 추가, 부정으로 변경 → 삭제)
+- 사용자 메시지 감정은 백그라운드 작업으로 채움
+- 기존 데이터는 rebuild_exemplar_index로 일괄 구축 (backfill_few_shot_exemplars.py)
+"""
+from sqlalchemy.orm import Session
+from sqlalchemy.ext.asyncio import AsyncSession
+from sqlalchemy import desc, func, select
+from datetime import datetime
+from typing import Any, Dict, List, Optional, Set, Tuple
+from uuid import UUID
+
+from app.db.database import SessionLocal
+from app.models.conversation import Conversation
+from app.models.message import Message
+from app.models.message_feedback import MessageFeedback
+from app.models.few_shot_exemplar import FewShotExemplar
+from app.services.job_queue import job_queue
+from app.services.similarity_engine import char_ngrams
+
+
+def tokenize_text(text: str) -> Set[str]:
+    """
+    유사도 계산용 토큰화 (어절 단위 문자 n-gram)
+
+    Args:
+        text: 토큰화할 텍스트
+
+    Returns:
+        토큰 집합
+    """
+    return char_ngrams(text)
+
+
+def get_exemplars(
+    db: Session,
+    user_id: UUID,
+    character_id: UUID,
+    limit: Optional[int] = None
+) -> List[FewShotExemplar]:
+    """
+    사용자/캐릭터의 인덱스된 예제 조회 (최신순)
+
+    Args:
+        db: 데이터베이스 세션
+        user_id: 사용자 ID
+        character_id: AI 캐릭터 ID
+        limit: 최대 예제 수 (None이면 전체)
+
+    Returns:
+        예제 리스트
+    """
+    query = db.query(FewShotExemplar).filter(
+        FewShotExemplar.user_id == user_id,
+        FewShotExemplar.character_id == character_id
+    ).order_by(
+        desc(FewShotExemplar.created_at)
+    )
+    if limit is not None:
+        query = query.limit(limit)
+    return query.all()
+
+
+def get_exemplar_index_version(
+    db: Session,
+    user_id: UUID,
+    character_id: UUID
+) -> Tuple[int, Optional[datetime]]:
+    """
+    인덱스 변경 감지용 버전 (예제 수, 최종 수정 시각)
+
+    점수 행렬 캐시가 최신인지 확인할 때 예제 전체를 읽지 않고 집계 쿼리 한 번으로 판단합니다.
+
+    Args:
+        db: 데이터베이스 세션
+        user_id: 사용자 ID
+        character_id: AI 캐릭터 ID
+
+    Returns:
+        (예제 수, 최종 수정 시각)
+    """
+    count, latest = db.query(
+        func.count(FewShotExemplar.id),
+        func.max(FewShotExemplar.updated_at)
+    ).filter(
+        FewShotExemplar.user_id == user_id,
+        FewShotExemplar.character_id == character_id
+    ).one()
+    return count, latest
+
+
+async def get_exemplars_async(
+    db: AsyncSession,
+    user_id: UUID,
+    character_id: UUID
+) -> List[FewShotExemplar]:
+    """get_exemplars의 AsyncSession 버전 (채팅 경로용, 최신순 전체)"""
+    result = await db.execute(
+        select(FewShotExemplar).where(
+            FewShotExemplar.user_id == user_id,
+            FewShotExemplar.character_id == character_id
+        ).order_by(desc(FewShotExemplar.created_at))
+    )
+    return list(result.scalars().all())
+
+
+async def get_exemplar_index_version_async(
+    db: AsyncSession,
+    user_id: UUID,
+    character_id: UUID
+) -> Tuple[int, Optional[datetime]]:
+    """get_exemplar_index_version의 AsyncSession 버전 (채팅 경로용)"""
+    result = await db.execute(
+        select(
+            func.count(FewShotExemplar.id),
+            func.max(FewShotExemplar.updated_at)
+        ).where(
+            FewShotExemplar.user_id == user_id,
+            FewShotExemplar.character_id == character_id
+        )
+    )
+    count, latest = result.one()
+    return count, latest
+
+
+def _get_previous_message(db: Session, message: Message) -> Optional[Message]:
+    """같은 대화에서 바로 앞 메시지 조회"""
+    return db.query(Message).filter(
+        Message.conversation_id == message.conversation_id,
+        Message.created_at < message.created_at
+    ).order_by(
+        desc(Message.created_at)
+    ).first()
+
+
+def add_exemplar(
+    db: Session,
+    message: Message,
+    conversation: Conversation
+) -> Optional[FewShotExemplar]:
+    """
+    긍정 피드백 받은 AI 응답을 인덱스에 추가 (커밋은 호출자가 수행)
+
+    Args:
+        db: 데이터베이스 세션
+        message: 피드백 대상 AI 응답 메시지
+        conversation: 메시지가 속한 대화
+
+    Returns:
+        추가(또는 기존) 예제. 직전 메시지가 사용자 메시지가 아니면 None
+    """
+    if message.role != "assistant":
+        return None
+
+    existing = db.query(FewShotExemplar).filter(
+        FewShotExemplar.message_id == message.id
+    ).first()
+    if existing:
+        return existing
+
+    previous_message = _get_previous_message(db, message)
+    if not previous_message or previous_message.role != "user":
+        return None
+
+    exemplar = FewShotExemplar(
+        user_id=conversation.user_id,
+        character_id=conversation.character_id,
+        message_id=message.id,
+        user_message=previous_message.content,
+        assistant_response=message.content
+    )
+    db.add(exemplar)
+    return exemplar
+
+
+def remove_exemplar(db: Session, message_id: UUID) -> None:
+    """
+    인덱스에서 예제 삭제 (커밋은 호출자가 수행)
+
+    Args:
+        db: 데이터베이스 세션
+        message_id: AI 응답 메시지 ID
+    """
+    db.query(FewShotExemplar).filter(
+        FewShotExemplar.message_id == message_id
+    ).delete(synchronize_session=False)
+
+
+def sync_exemplar_for_feedback(
+    db: Session,
+    message: Message,
+    conversation: Conversation,
+    is_helpful: bool
+) -> Optional[FewShotExemplar]:
+    """
+    피드백 값에 맞춰 인덱스 갱신 (커밋은 호출자가 수행)
+
+    Args:
+        db: 데이터베이스 세션
+        message: 피드백 대상 메시지
+        conversation: 메시지가 속한 대화
+        is_helpful: 긍정 피드백 여부
+
+    Returns:
+        새로 추가된 예제 (없으면 None)
+    """
+    if is_helpful:
+        return add_exemplar(db, message, conversation)
+
+    remove_exemplar(db, message.id)
+    return None
+
+
+async def enqueue_exemplar_emotion_detection(exemplar: FewShotExemplar) -> None:
+    """
+    예제의 감정 감지를 백그라운드 작업으로 등록
+
+    Args:
+        exemplar: 커밋된 예제
+    """
+    if exemplar.emotion:
+        return
+    await job_queue.enqueue("few_shot_exemplar_emotion", {"exemplar_id": str(exemplar.id)})
+
+
+@job_queue.register("few_shot_exemplar_emotion")
+async def few_shot_exemplar_emotion_job(payload: dict):
+    from app.services.emotion_service import EMOTION_CATEGORIES, detect_emotion
+
+    db = SessionLocal()
+    try:
+        exemplar = db.query(FewShotExemplar).filter(
+            FewShotExemplar.id == UUID(payload["exemplar_id"])
+        ).first()
+        if not exemplar or exemplar.emotion:
+            return
+
+        emotion_data = await detect_emotion(exemplar.user_message)
+        primary_emotion = emotion_data.get("primary_emotion")
+        # 로컬 분류기와 LLM은 한국어 라벨("중립"), 짧은 메시지 기본값은 영어 키("neutral")
+        if primary_emotion and primary_emotion not in ("neutral", EMOTION_CATEGORIES["neutral"]):
+            exemplar.emotion = primary_emotion
+            db.commit()
+    finally:
+        db.close()
+
+
+def rebuild_exemplar_index(
+    db: Session,
+    user_id: Optional[UUID] = None
+) -> int:
+    """
+    기존 피드백으로부터 인덱스 일괄 구축 (누락된 예제만 추가)
+
+    lag() 윈도우 함수로 각 AI 응답의 직전 메시지를 붙인 뒤,
+    긍정 피드백이 있고 직전 메시지가 사용자 메시지인 쌍만 추가합니다.
+
+    Args:
+        db: 데이터베이스 세션
+        user_id: 특정 사용자만 구축 (None이면 전체)
+
+    Returns:
+        추가된 예제 수
+    """
+    previous_message = {
+        "partition_by": Message.conversation_id,
+        "order_by": Message.created_at,
+    }
+    paired_messages = select(
+        Message.id.label("message_id"),
+        Message.conversation_id.label("conversation_id"),
+        Message.role.label("role"),
+        Message.content.label("content"),
+        func.lag(Message.role).over(**previous_message).label("previous_role"),
+        func.lag(Message.content).over(**previous_message).label("previous_content"),
+    )
+    if user_id is not None:
+        paired_messages = paired_messages.where(
+            Message.conversation_id.in_(
+                select(Conversation.id).where(Conversation.user_id == user_id)
+            )
+        )
+    paired_messages = paired_messages.subquery()
+
+    query = select(
+        paired_messages.c.message_id,
+        paired_messages.c.previous_content,
+        paired_messages.c.content,
+        Conversation.user_id,
+        Conversation.character_id
+    ).join(
+        MessageFeedback,
+        MessageFeedback.message_id == paired_messages.c.message_id
+    ).join(
+        Conversation,
+        Conversation.id == paired_messages.c.conversation_id
+    ).outerjoin(
+        FewShotExemplar,
+        FewShotExemplar.message_id == paired_messages.c.message_id
+    ).where(
+        MessageFeedback.is_helpful.is_(True),
+        MessageFeedback.user_id == Conversation.user_id,
+        paired_messages.c.role == "assistant",
+        paired_messages.c.previous_role == "user",
+        FewShotExemplar.id.is_(None)
+    )
+
+    added = 0
+    for message_id, user_message, ai_response, owner_id, character_id in db.execute(query).all():
+        db.add(FewShotExemplar(
+            user_id=owner_id,
+            character_id=character_id,
+            message_id=message_id,
+            user_message=user_message,
+            assistant_response=ai_response
+        ))
+        added += 1
+
+    db.commit()
+    return added
+
+
+def exemplar_to_candidate(exemplar: FewShotExemplar) -> Dict[str, Any]:
+    """예제를 점수 계산용 딕셔너리로 변환"""
+    return {
+        "user_message": exemplar.user_message,
+        "ai_response": exemplar.assistant_response,
+        "emotion": exemplar.emotion
+    }
@@ -0,0 +1,136 @@
+"""
+백그라운드 작업 멱등 처리 - job_id 처리 기록(processed_jobs)으로 중복 실행 방지
+
+작업 큐는 임대가 만료된 작업을 다른 프로세스에서 다시 실행하므로(최소 한 번 실행),
+카운터 누적처럼 다시 실행하면 결과가 달라지는 작업은 처리 기록을 효과와 같은 트랜잭션으로 커밋합니다.
+이미 기록이 있으면 건너뛰고, 동시에 실행된 경우 늦게 커밋하는 쪽이 기본 키 충돌로 롤백됩니다.
+"""
+import time
+from datetime import datetime, timedelta, timezone
+from typing import Any, Awaitable, Callable, Optional
+
+from sqlalchemy.exc import IntegrityError
+from sqlalchemy.orm import Session
+
+from app.models.processed_job import ProcessedJob
+
+
+# 처리 기록 보관 기간 (작업 저장소의 임대 만료 시간보다 충분히 길게)
+PROCESSED_JOB_RETENTION_DAYS = 3
+
+# 오래된 처리 기록 정리 주기 (초, 프로세스별)
+PRUNE_INTERVAL_SECONDS = 3600.0
+
+_last_pruned_at = 0.0
+
+
+def is_job_processed(db: Session, job_id: str) -> bool:
+    """처리 기록 존재 여부"""
+    return db.get(ProcessedJob, job_id) is not None
+
+
+def mark_job_processed(db: Session, job_id: Optional[str], name: str) -> bool:
+    """
+    처리 기록을 세션에 추가 (커밋은 작업 효과와 함께)
+
+    Args:
+        db: 데이터베이스 세션
+        job_id: 작업 ID (없으면 기록하지 않음)
+        name: 작업 이름
+
+    Returns:
+        이미 처리된 작업이면 False
+    """
+    if not job_id:
+        return True
+    if is_job_processed(db, job_id):
+        print(f"♻️ 이미 처리된 백그라운드 작업 건너뜀 ({name}, {job_id})")
+        return False
+    db.add(ProcessedJob(job_id=job_id, name=name))
+    return True
+
+
+def prune_processed_jobs(db: Session, now: Optional[datetime] = None) -> int:
+    """
+    보관 기간이 지난 처리 기록 삭제
+
+    Args:
+        db: 데이터베이스 세션
+        now: 기준 시각 (기본값: 현재 UTC)
+
+    Returns:
+        삭제된 행 수
+    """
+    now = now or datetime.now(timezone.utc)
+    deleted = db.query(ProcessedJob).filter(
+        ProcessedJob.processed_at < now - timedelta(days=PROCESSED_JOB_RETENTION_DAYS)
+    ).delete(synchronize_session=False)
+    db.commit()
+    return deleted
+
+
+def _maybe_prune(db: Session) -> None:
+    global _last_pruned_at
+    if time.monotonic() - _last_pruned_at < PRUNE_INTERVAL_SECONDS:
+        return
+    _last_pruned_at = time.monotonic()
+    try:
+        deleted = prune_processed_jobs(db)
+        if deleted:
+            print(f"🧹 오래된 작업 처리 기록 {deleted}개 삭제")
+    except Exception as e:
+        db.rollback()
+        print(f"⚠️ 작업 처리 기록 정리 실패: {str(e)}")
+
+
+def _finish(db: Session, job_id: Optional[str], name: str, error: IntegrityError) -> None:
+    """커밋 충돌 처리: 다른 실행이 먼저 기록했으면 건너뛰고, 아니면 예외 전파"""
+    db.rollback()
+    if job_id and is_job_processed(db, job_id):
+        print(f"♻️ 동시에 실행된 백그라운드 작업 중복 반영 방지 ({name}, {job_id})")
+        return
+    raise error
+
+
+def run_job_once(
+    db: Session,
+    job_id: Optional[str],
+    name: str,
+    func: Callable[..., Any],
+    **kwargs
+) -> None:
+    """
+    동기 작업을 한 번만 반영 (func가 커밋하면 처리 기록도 함께 커밋됨)
+
+    Args:
+        db: 데이터베이스 세션
+        job_id: 작업 ID
+        name: 작업 이름
+        func: func(db, **kwargs) 형태의 작업 함수
+    """
+    if not mark_job_processed(db, job_id, name):
+        return
+    try:
+        func(db, **kwargs)
+        db.commit()
+    except IntegrityError as e:
+        _finish(db, job_id, name, e)
+    _maybe_prune(db)
+
+
+async def run_job_once_async(
+    db: Session,
+    job_id: Optional[str],
+    name: str,
+    func: Callable[..., Awaitable[Any]],
+    **kwargs
+) -> None:
+    """비동기 작업을 한 번만 반영 (run_job_once와 동일)"""
+    if not mark_job_processed(db, job_id, name):
+        return
+    try:
+        await func(db, **kwargs)
+        db.commit()
+    except IntegrityError as e:
+        _finish(db, job_id, name, e)
+    _maybe_prune(db)
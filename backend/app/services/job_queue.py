@@ -0,0 +1,484 @@
+"""
+백그라운드 작업 큐 서비스 - 응답 완료 후 처리할 작업을 비동기로 실행
+
+- 고정된 수의 워커로 동시 실행 수 제한
+- 실패 시 지수 백오프로 재시도
+- 작업을 저장소(SQLite 등)에 영속화하여 프로세스가 죽어도 재시작 시 복구
+- 작업마다 소유 프로세스(owner)와 임대 시각(claimed_at)을 기록하고 주기적으로 갱신하므로,
+  여러 프로세스가 같은 저장소를 써도 다른 프로세스가 실행 중인 작업은 가져가지 않음
+  (임대가 만료된 작업만 복구)
+- 메모리 큐가 가득 차면 저장소에만 남기고, 폴링으로 여유가 생길 때 가져옴
+"""
+import asyncio
+import json
+import sqlite3
+import threading
+import uuid
+from abc import ABC, abstractmethod
+from datetime import datetime, timedelta
+from typing import Any, Awaitable, Callable, Dict, List, Optional
+
+from app.core.config import settings
+
+
+JobHandler = Callable[[Dict[str, Any]], Awaitable[None]]
+
+
+class Job:
+    """큐에 등록되는 작업 단위"""
+
+    def __init__(
+        self,
+        name: str,
+        payload: Dict[str, Any],
+        job_id: Optional[str] = None,
+        attempts: int = 0
+    ):
+        self.id = job_id or str(uuid.uuid4())
+        self.name = name
+        self.payload = payload
+        self.attempts = attempts
+
+    def __repr__(self):
+        return f"<Job {self.name} {self.id} attempts={self.attempts}>"
+
+
+# ============================================
+# 영속화 백엔드
+# ============================================
+
+class JobStore(ABC):
+    """
+    작업 영속화 백엔드 인터페이스
+
+    owner는 작업을 메모리 큐에 올린 프로세스(JobQueue)의 ID입니다.
+    claimed_at은 소유 프로세스가 heartbeat로 갱신하며, 오래 갱신되지 않은 작업은 다른 프로세스가 가져갑니다.
+    """
+
+    @abstractmethod
+    def add(self, job: Job, owner: Optional[str]) -> None:
+        """작업 저장 (owner가 있으면 해당 프로세스가 소유한 상태로 저장)"""
+
+    @abstractmethod
+    def mark_running(self, job: Job) -> None:
+        ...
+
+    @abstractmethod
+    def mark_retry(self, job: Job, error: str) -> None:
+        ...
+
+    @abstractmethod
+    def mark_done(self, job: Job) -> None:
+        ...
+
+    @abstractmethod
+    def mark_failed(self, job: Job, error: str) -> None:
+        ...
+
+    @abstractmethod
+    def claim(self, owner: str, limit: int, stale_before: datetime) -> List[Job]:
+        """
+        소유자가 없거나 임대가 만료된 미완료 작업(pending/running)을 owner 소유로 가져오기
+
+        Args:
+            owner: 가져갈 프로세스 ID
+            limit: 최대 개수
+            stale_before: claimed_at이 이 시각보다 이전이면 임대 만료로 간주
+
+        Returns:
+            가져온 작업 (생성 순)
+        """
+
+    @abstractmethod
+    def heartbeat(self, owner: str) -> None:
+        """owner가 소유한 미완료 작업의 임대 갱신"""
+
+    @abstractmethod
+    def release(self, owner: str, job_ids: Optional[List[str]] = None) -> None:
+        """owner 소유 작업을 소유자 없음으로 되돌림 (job_ids가 없으면 전체)"""
+
+
+class InMemoryJobStore(JobStore):
+    """메모리 저장소 (프로세스 종료 시 작업 유실 - 개발/테스트용)"""
+
+    def __init__(self):
+        self._jobs: Dict[str, Dict[str, Any]] = {}
+
+    def add(self, job: Job, owner: Optional[str]) -> None:
+        self._jobs[job.id] = {
+            "job": job,
+            "status": "pending",
+            "error": None,
+            "owner": owner,
+            "claimed_at": datetime.utcnow()
+        }
+
+    def mark_running(self, job: Job) -> None:
+        self._jobs[job.id]["status"] = "running"
+
+    def mark_retry(self, job: Job, error: str) -> None:
+        self._jobs[job.id].update(status="pending", error=error)
+
+    def mark_done(self, job: Job) -> None:
+        self._jobs.pop(job.id, None)
+
+    def mark_failed(self, job: Job, error: str) -> None:
+        self._jobs[job.id].update(status="failed", error=error)
+
+    def claim(self, owner: str, limit: int, stale_before: datetime) -> List[Job]:
+        claimed = []
+        now = datetime.utcnow()
+        for entry in self._jobs.values():
+            if len(claimed) >= limit:
+                break
+            if entry["status"] not in ("pending", "running"):
+                continue
+            if entry["owner"] is not None and entry["claimed_at"] >= stale_before:
+                continue
+            entry.update(owner=owner, claimed_at=now)
+            claimed.append(entry["job"])
+        return claimed
+
+    def heartbeat(self, owner: str) -> None:
+        now = datetime.utcnow()
+        for entry in self._jobs.values():
+            if entry["owner"] == owner:
+                entry["claimed_at"] = now
+
+    def release(self, owner: str, job_ids: Optional[List[str]] = None) -> None:
+        for job_id, entry in self._jobs.items():
+            if entry["owner"] == owner and (job_ids is None or job_id in job_ids):
+                entry["owner"] = None
+
+
+class SQLiteJobStore(JobStore):
+    """
+    로컬 SQLite 저장소
+
+    완료된 작업은 삭제하고, 최종 실패한 작업은 status='failed'로 남겨 추후 확인할 수 있게 합니다.
+    같은 파일을 여러 프로세스가 공유할 수 있으며, claim은 BEGIN IMMEDIATE 트랜잭션으로 원자적으로 수행합니다.
+    """
+
+    def __init__(self, path: str):
+        self.path = path
+        self._conn: Optional[sqlite3.Connection] = None
+        self._lock = threading.Lock()
+
+    def _connection(self) -> sqlite3.Connection:
+        if self._conn is None:
+            self._conn = sqlite3.connect(self.path, check_same_thread=False, timeout=30.0)
+            self._conn.execute("PRAGMA journal_mode=WAL")
+            self._conn.execute("""
+                CREATE TABLE IF NOT EXISTS background_jobs (
+                    id TEXT PRIMARY KEY,
+                    name TEXT NOT NULL,
+                    payload TEXT NOT NULL,
+                    status TEXT NOT NULL,
+                    attempts INTEGER NOT NULL DEFAULT 0,
+                    last_error TEXT,
+                    owner TEXT,
+                    claimed_at TEXT,
+                    created_at TEXT NOT NULL,
+                    updated_at TEXT NOT NULL
+                )
+            """)
+            # 이전 버전 파일에는 소유/임대 컬럼이 없음 (소유자 없음 → 다음 claim에서 복구)
+            columns = {row[1] for row in self._conn.execute("PRAGMA table_info(background_jobs)")}
+            for column in ("owner", "claimed_at"):
+                if column not in columns:
+                    self._conn.execute(f"ALTER TABLE background_jobs ADD COLUMN {column} TEXT")
+            self._conn.execute(
+                "CREATE INDEX IF NOT EXISTS ix_background_jobs_status ON background_jobs (status)"
+            )
+            self._conn.commit()
+        return self._conn
+
+    def _execute(self, sql: str, params: tuple) -> None:
+        with self._lock:
+            conn = self._connection()
+            conn.execute(sql, params)
+            conn.commit()
+
+    def add(self, job: Job, owner: Optional[str]) -> None:
+        now = datetime.utcnow().isoformat()
+        self._execute(
+            "INSERT INTO background_jobs "
+            "(id, name, payload, status, attempts, owner, claimed_at, created_at, updated_at) "
+            "VALUES (?, ?, ?, 'pending', ?, ?, ?, ?, ?)",
+            (job.id, job.name, json.dumps(job.payload, ensure_ascii=False), job.attempts, owner, now, now, now)
+        )
+
+    def mark_running(self, job: Job) -> None:
+        self._execute(
+            "UPDATE background_jobs SET status = 'running', updated_at = ? WHERE id = ?",
+            (datetime.utcnow().isoformat(), job.id)
+        )
+
+    def mark_retry(self, job: Job, error: str) -> None:
+        self._execute(
+            "UPDATE background_jobs SET status = 'pending', attempts = ?, last_error = ?, updated_at = ? "
+            "WHERE id = ?",
+            (job.attempts, error, datetime.utcnow().isoformat(), job.id)
+        )
+
+    def mark_done(self, job: Job) -> None:
+        self._execute("DELETE FROM background_jobs WHERE id = ?", (job.id,))
+
+    def mark_failed(self, job: Job, error: str) -> None:
+        self._execute(
+            "UPDATE background_jobs SET status = 'failed', attempts = ?, last_error = ?, owner = NULL, "
+            "updated_at = ? WHERE id = ?",
+            (job.attempts, error, datetime.utcnow().isoformat(), job.id)
+        )
+
+    def claim(self, owner: str, limit: int, stale_before: datetime) -> List[Job]:
+        with self._lock:
+            conn = self._connection()
+            conn.execute("BEGIN IMMEDIATE")
+            try:
+                rows = conn.execute(
+                    "SELECT id, name, payload, attempts FROM background_jobs "
+                    "WHERE status IN ('pending', 'running') "
+                    "AND (owner IS NULL OR claimed_at IS NULL OR claimed_at < ?) "
+                    "ORDER BY created_at LIMIT ?",
+                    (stale_before.isoformat(), limit)
+                ).fetchall()
+                now = datetime.utcnow().isoformat()
+                conn.executemany(
+                    "UPDATE background_jobs SET owner = ?, claimed_at = ?, updated_at = ? WHERE id = ?",
+                    [(owner, now, now, row[0]) for row in rows]
+                )
+                conn.commit()
+            except Exception:
+                conn.rollback()
+                raise
+        return [
+            Job(name=name, payload=json.loads(payload), job_id=job_id, attempts=attempts)
+            for job_id, name, payload, attempts in rows
+        ]
+
+    def heartbeat(self, owner: str) -> None:
+        self._execute(
+            "UPDATE background_jobs SET claimed_at = ? "
+            "WHERE owner = ? AND status IN ('pending', 'running')",
+            (datetime.utcnow().isoformat(), owner)
+        )
+
+    def release(self, owner: str, job_ids: Optional[List[str]] = None) -> None:
+        if job_ids is None:
+            self._execute("UPDATE background_jobs SET owner = NULL WHERE owner = ?", (owner,))
+            return
+        with self._lock:
+            conn = self._connection()
+            conn.executemany(
+                "UPDATE background_jobs SET owner = NULL WHERE owner = ? AND id = ?",
+                [(owner, job_id) for job_id in job_ids]
+            )
+            conn.commit()
+
+
+# ============================================
+# 작업 큐
+# ============================================
+
+class JobQueue:
+    """
+    프로세스 내 비동기 작업 큐
+
+    핸들러에는 payload와 함께 "job_id"가 전달됩니다. 임대가 만료된 작업은 다른 프로세스에서
+    다시 실행될 수 있으므로, 부작용이 있는 핸들러는 job_id로 중복 실행을 막아야 합니다.
+
+    사용 예시:
+        @job_queue.register("conversation_summary")
+        async def summarize(payload): ...
+
+        await job_queue.enqueue("conversation_summary", {"conversation_id": "..."})
+    """
+
+    def __init__(
+        self,
+        store: JobStore,
+        workers: int = 2,
+        max_retries: int = 3,
+        retry_backoff: float = 2.0,
+        max_queue_size: int = 1000,
+        poll_interval: float = 5.0,
+        lease_timeout: float = 60.0
+    ):
+        self.store = store
+        self.workers = workers
+        self.max_retries = max_retries
+        self.retry_backoff = retry_backoff
+        self.max_queue_size = max_queue_size
+        self.poll_interval = poll_interval
+        self.lease_timeout = lease_timeout
+        self.owner_id = str(uuid.uuid4())
+        self._handlers: Dict[str, JobHandler] = {}
+        self._queue: Optional[asyncio.Queue] = None
+        self._worker_tasks: List[asyncio.Task] = []
+        self._poll_task: Optional[asyncio.Task] = None
+        self._retry_tasks: set = set()
+
+    def register(self, name: str) -> Callable[[JobHandler], JobHandler]:
+        """작업 핸들러 등록 데코레이터"""
+        def decorator(handler: JobHandler) -> JobHandler:
+            self._handlers[name] = handler
+            return handler
+        return decorator
+
+    @property
+    def running(self) -> bool:
+        return bool(self._worker_tasks)
+
+    async def enqueue(self, name: str, payload: Dict[str, Any]) -> Job:
+        """
+        작업 등록 (영속화 후 큐에 추가, 큐가 가득 차도 대기하지 않음)
+
+        Args:
+            name: 등록된 핸들러 이름
+            payload: JSON 직렬화 가능한 작업 데이터
+
+        Returns:
+            등록된 Job
+        """
+        if name not in self._handlers:
+            raise ValueError(f"등록되지 않은 작업입니다: {name}")
+
+        job = Job(name=name, payload=payload)
+        # 워커 시작 전이면 소유자 없이 저장만 하고, 폴링에서 가져와 실행
+        owner = self.owner_id if self.running else None
+        await asyncio.to_thread(self.store.add, job, owner)
+        if owner is not None:
+            await self._offer(job)
+        return job
+
+    async def start(self) -> None:
+        """워커 시작 및 미완료 작업 복구 (임대가 만료된 작업을 큐 여유만큼씩 가져옴)"""
+        if self.running:
+            return
+
+        self._get_queue()
+        self._worker_tasks = [
+            asyncio.create_task(self._worker(index))
+            for index in range(self.workers)
+        ]
+        self._poll_task = asyncio.create_task(self._poll_loop())
+
+    async def stop(self, timeout: float = 10.0) -> None:
+        """
+        워커 종료
+
+        대기 중인 작업을 timeout 동안 처리한 뒤 워커를 취소합니다.
+        처리하지 못한 작업은 소유를 해제해 저장소에 남기고, 다른 프로세스나 다음 시작 시 복구됩니다.
+        """
+        if self._poll_task is not None:
+            self._poll_task.cancel()
+            await asyncio.gather(self._poll_task, return_exceptions=True)
+            self._poll_task = None
+
+        if self._queue is not None and self.running:
+            try:
+                await asyncio.wait_for(self._queue.join(), timeout=timeout)
+            except asyncio.TimeoutError:
+                print("⚠️ 백그라운드 작업 종료 대기 시간 초과 (남은 작업은 재시작 시 복구)")
+
+        for task in list(self._worker_tasks) + list(self._retry_tasks):
+            task.cancel()
+        await asyncio.gather(*self._worker_tasks, *self._retry_tasks, return_exceptions=True)
+        self._worker_tasks = []
+        self._retry_tasks = set()
+        self._queue = None
+        await asyncio.to_thread(self.store.release, self.owner_id)
+
+    def _get_queue(self) -> asyncio.Queue:
+        if self._queue is None:
+            self._queue = asyncio.Queue(maxsize=self.max_queue_size)
+        return self._queue
+
+    async def _offer(self, job: Job) -> None:
+        """대기 없이 큐에 추가 (가득 차면 소유를 해제해 저장소에만 남김)"""
+        try:
+            self._get_queue().put_nowait(job)
+        except asyncio.QueueFull:
+            await asyncio.to_thread(self.store.release, self.owner_id, [job.id])
+
+    async def _poll_loop(self) -> None:
+        """임대 갱신 + 소유자 없는/임대 만료 작업을 큐 여유만큼 가져오기"""
+        recovered_total = 0
+        while True:
+            try:
+                await asyncio.to_thread(self.store.heartbeat, self.owner_id)
+                queue = self._get_queue()
+                free = queue.maxsize - queue.qsize()
+                if free > 0:
+                    stale_before = datetime.utcnow() - timedelta(seconds=self.lease_timeout)
+                    claimed = await asyncio.to_thread(self.store.claim, self.owner_id, free, stale_before)
+                    for job in claimed:
+                        await self._offer(job)
+                    if claimed:
+                        recovered_total += len(claimed)
+                        print(f"♻️ 저장소에서 백그라운드 작업 {len(claimed)}개 가져옴 (누적 {recovered_total}개)")
+            except asyncio.CancelledError:
+                raise
+            except Exception as e:
+                print(f"⚠️ 백그라운드 작업 폴링 오류: {str(e)}")
+            await asyncio.sleep(self.poll_interval)
+
+    async def _worker(self, index: int) -> None:
+        queue = self._get_queue()
+        while True:
+            job = await queue.get()
+            try:
+                await self._run(job)
+            finally:
+                queue.task_done()
+
+    async def _run(self, job: Job) -> None:
+        handler = self._handlers.get(job.name)
+        if handler is None:
+            await asyncio.to_thread(self.store.mark_failed, job, "등록되지 않은 작업")
+            return
+
+        await asyncio.to_thread(self.store.mark_running, job)
+        try:
+            await handler({**job.payload, "job_id": job.id})
+        except Exception as e:
+            job.attempts += 1
+            error = str(e)
+            if job.attempts > self.max_retries:
+                print(f"❌ 백그라운드 작업 실패 ({job.name}, {job.attempts}회 시도): {error}")
+                await asyncio.to_thread(self.store.mark_failed, job, error)
+                return
+
+            delay = self.retry_backoff * (2 ** (job.attempts - 1))
+            print(f"⚠️ 백그라운드 작업 재시도 예정 ({job.name}, {delay:.1f}초 후): {error}")
+            await asyncio.to_thread(self.store.mark_retry, job, error)
+            task = asyncio.create_task(self._requeue_later(job, delay))
+            self._retry_tasks.add(task)
+            task.add_done_callback(self._retry_tasks.discard)
+            return
+
+        await asyncio.to_thread(self.store.mark_done, job)
+
+    async def _requeue_later(self, job: Job, delay: float) -> None:
+        await asyncio.sleep(delay)
+        await self._offer(job)
+
+
+def create_job_store() -> JobStore:
+    """설정에 따른 작업 저장소 생성"""
+    if settings.JOB_QUEUE_BACKEND == "memory":
+        return InMemoryJobStore()
+    return SQLiteJobStore(settings.JOB_QUEUE_SQLITE_PATH)
+
+
+# 전역 작업 큐
+job_queue = JobQueue(
+    store=create_job_store(),
+    workers=settings.JOB_QUEUE_WORKERS,
+    max_retries=settings.JOB_QUEUE_MAX_RETRIES,
+    retry_backoff=settings.JOB_QUEUE_RETRY_BACKOFF,
+    max_queue_size=settings.JOB_QUEUE_MAX_SIZE,
+    poll_interval=settings.JOB_QUEUE_POLL_INTERVAL,
+    lease_timeout=settings.JOB_QUEUE_LEASE_TIMEOUT
+)
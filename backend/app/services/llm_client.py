@@ -0,0 +1,73 @@
+"""
+비동기 LLM 클라이언트 - 서비스 공통 Gemini 호출 계층
+
+모든 단발성(non-streaming) LLM 호출은 이 모듈을 거칩니다.
+- generate_content_async 사용 (이벤트 루프 차단 없음)
+- 호출별 타임아웃
+- 호출자 취소(클라이언트 연결 종료 등) 시 진행 중인 요청도 함께 취소
+- 모델 캐싱과 동시 호출 수 제한은 llm_gateway에서 처리
+"""
+import asyncio
+from typing import Optional
+
+from app.core.config import settings
+from app.services.llm_gateway import generate_content, get_model
+
+
+async def generate_text(
+    prompt: str,
+    temperature: Optional[float] = None,
+    max_output_tokens: Optional[int] = None,
+    timeout: Optional[float] = None,
+    purpose: str = "general"
+) -> str:
+    """
+    단발성 텍스트 생성 (비동기)
+
+    Args:
+        prompt: 프롬프트
+        temperature: 응답 창의성
+        max_output_tokens: 최대 출력 토큰 수
+        timeout: 최대 대기 시간 (초, 기본값: settings.LLM_REQUEST_TIMEOUT)
+        purpose: 호출 목적 (로깅용 - "summary", "memory", "emotion" 등)
+
+    Returns:
+        생성된 텍스트
+
+    Raises:
+        asyncio.TimeoutError: 시간 초과 (진행 중인 요청은 취소됨)
+        LLMCapacityError: 호출 슬롯 대기 시간 초과
+        Exception: Gemini API 오류
+    """
+    model = get_model(temperature=temperature, max_output_tokens=max_output_tokens)
+
+    try:
+        response = await asyncio.wait_for(
+            generate_content(model, prompt, purpose=purpose),
+            timeout=timeout or settings.LLM_REQUEST_TIMEOUT
+        )
+    except asyncio.TimeoutError:
+        print(f"⚠️ LLM 호출 시간 초과 ({purpose})")
+        raise
+
+    return response.text
+
+
+def strip_json_code_fence(text: str) -> str:
+    """
+    LLM 응답에서 ```json``` 마크다운 코드 블록 제거
+
+    Args:
+        text: LLM 응답 텍스트
+
+    Returns:
+        JSON 문자열
+    """
+    text = text.strip()
+    if text.startswith("```json"):
+        text = text[7:]
+    if text.startswith("```"):
+        text = text[3:]
+    if text.endswith("```"):
+        text = text[:-3]
+    return text.strip()
@@ -0,0 +1,353 @@
+"""
+LLM 게이트웨이 - Gemini 모델 인스턴스 캐싱 및 동시 호출 수 제한
+
+- (모델, generation_config) 조합별로 GenerativeModel 인스턴스를 재사용
+  (클라이언트/커넥션은 genai 기본 클라이언트를 공유)
+- 전체 동시 호출 수 + 목적 그룹별 동시 호출 수를 세마포어로 제한하고,
+  슬롯이 빌 때까지 대기(큐잉)하다가 LLM_QUEUE_TIMEOUT을 넘기면 LLMCapacityError
+- 백그라운드 작업(요약/메모리)은 별도 그룹으로 묶어 전체 슬롯을 모두 차지하지 못하게 하여
+  채팅 응답용 용량을 항상 남겨둠
+- GEMINI_API_ENDPOINT / GEMINI_TRANSPORT 설정으로 로컬 가짜 Gemini 서버(fake_gemini_server.py)에 연결 가능
+- REST 전송의 동기 호출은 전용 스레드 풀(LLM_MAX_CONCURRENCY개)에서 실행하고 HTTP 타임아웃을 지정하므로,
+  호출자가 타임아웃으로 포기해도 남은 스레드 수가 제한되고 기본 스레드 풀(asyncio.to_thread)을 차지하지 않음
+- 동기 API만 있는 컨텍스트 캐시 생성(create_cached_content)도 같은 슬롯과 스레드 풀을 거침
+"""
+import asyncio
+import threading
+from concurrent.futures import ThreadPoolExecutor
+from contextlib import asynccontextmanager
+from functools import partial
+from typing import Any, AsyncGenerator, Dict, Optional, Tuple
+
+import google.generativeai as genai
+
+from app.core.config import settings
+
+
+class LLMCapacityError(Exception):
+    """대기 시간 내에 LLM 호출 슬롯을 확보하지 못함"""
+    pass
+
+
+# 목적(purpose) → 동시성 그룹
+# interactive: 사용자가 응답을 기다리는 호출 / background: 응답 후 처리되는 호출
+PURPOSE_GROUPS = {
+    "chat": "interactive",
+    "emotion": "interactive",
+    "emotion_feedback": "interactive",
+    "summary": "background",
+    "memory": "background",
+}
+
+
+def _configure_gemini() -> None:
+    """Gemini API 설정 (엔드포인트/전송 방식은 설정값이 있을 때만 지정)"""
+    options: Dict[str, Any] = {"api_key": settings.GOOGLE_API_KEY}
+    if settings.GEMINI_TRANSPORT:
+        options["transport"] = settings.GEMINI_TRANSPORT
+    if settings.GEMINI_API_ENDPOINT:
+        options["client_options"] = {"api_endpoint": settings.GEMINI_API_ENDPOINT}
+    genai.configure(**options)
+
+
+_configure_gemini()
+
+
+# ============================================
+# 모델 인스턴스 캐시
+# ============================================
+
+_model_cache: Dict[Tuple[str, Tuple[Tuple[str, Any], ...]], genai.GenerativeModel] = {}
+_model_cache_lock = threading.Lock()
+
+
+def build_generation_config(
+    temperature: Optional[float] = None,
+    max_output_tokens: Optional[int] = None
+) -> Dict[str, Any]:
+    """설정 기본값을 채운 generation_config"""
+    return {
+        "temperature": settings.LLM_TEMPERATURE if temperature is None else temperature,
+        "max_output_tokens": max_output_tokens or settings.LLM_MAX_OUTPUT_TOKENS,
+    }
+
+
+def get_model(
+    temperature: Optional[float] = None,
+    max_output_tokens: Optional[int] = None,
+    model_name: Optional[str] = None
+) -> genai.GenerativeModel:
+    """
+    캐시된 Gemini 모델 인스턴스 가져오기
+
+    Args:
+        temperature: 응답 창의성 (기본값: settings.LLM_TEMPERATURE)
+        max_output_tokens: 최대 출력 토큰 수 (기본값: settings.LLM_MAX_OUTPUT_TOKENS)
+        model_name: 모델 이름 (기본값: settings.LLM_MODEL)
+
+    Returns:
+        GenerativeModel 인스턴스 (같은 설정이면 같은 인스턴스)
+    """
+    model_name = model_name or settings.LLM_MODEL
+    generation_config = build_generation_config(temperature, max_output_tokens)
+    key = (model_name, tuple(sorted(generation_config.items())))
+
+    model = _model_cache.get(key)
+    if model is None:
+        with _model_cache_lock:
+            model = _model_cache.get(key)
+            if model is None:
+                model = genai.GenerativeModel(
+                    model_name=model_name,
+                    generation_config=generation_config
+                )
+                _model_cache[key] = model
+    return model
+
+
+# ============================================
+# 동시성 제한
+# ============================================
+
+class ConcurrencyLimiter:
+    """
+    전체 + 그룹별 세마포어로 동시 호출 수 제한
+
+    그룹 세마포어를 먼저 얻은 뒤 전체 세마포어를 얻으므로,
+    그룹 한도에 걸려 대기 중인 호출은 전체 슬롯을 점유하지 않습니다.
+    """
+
+    def __init__(
+        self,
+        global_limit: int,
+        group_limits: Dict[str, int],
+        queue_timeout: float
+    ):
+        self.global_limit = global_limit
+        self.group_limits = group_limits
+        self.queue_timeout = queue_timeout
+        self._global = asyncio.Semaphore(global_limit)
+        self._groups = {
+            group: asyncio.Semaphore(limit)
+            for group, limit in group_limits.items()
+        }
+        self.in_flight: Dict[str, int] = {}
+
+    async def _acquire(self, semaphore: asyncio.Semaphore, timeout: float, purpose: str) -> None:
+        try:
+            await asyncio.wait_for(semaphore.acquire(), timeout=timeout)
+        except asyncio.TimeoutError:
+            raise LLMCapacityError(f"LLM 호출 대기 시간 초과 ({purpose})")
+
+    @asynccontextmanager
+    async def slot(self, purpose: str):
+        """
+        호출 슬롯 확보
+
+        Args:
+            purpose: 호출 목적 ("chat", "summary" 등)
+
+        Raises:
+            LLMCapacityError: queue_timeout 내에 슬롯을 확보하지 못함
+        """
+        loop = asyncio.get_running_loop()
+        deadline = loop.time() + self.queue_timeout
+        group_semaphore = self._groups.get(PURPOSE_GROUPS.get(purpose, "interactive"))
+
+        if group_semaphore is not None:
+            await self._acquire(group_semaphore, self.queue_timeout, purpose)
+        try:
+            await self._acquire(self._global, max(deadline - loop.time(), 0.0), purpose)
+            self.in_flight[purpose] = self.in_flight.get(purpose, 0) + 1
+            try:
+                yield
+            finally:
+                self.in_flight[purpose] -= 1
+                self._global.release()
+        finally:
+            if group_semaphore is not None:
+                group_semaphore.release()
+
+
+_limiter: Optional[ConcurrencyLimiter] = None
+
+
+def get_limiter() -> ConcurrencyLimiter:
+    """전역 동시성 제한기 (싱글톤)"""
+    global _limiter
+    if _limiter is None:
+        _limiter = ConcurrencyLimiter(
+            global_limit=settings.LLM_MAX_CONCURRENCY,
+            group_limits={"background": settings.LLM_BACKGROUND_CONCURRENCY},
+            queue_timeout=settings.LLM_QUEUE_TIMEOUT
+        )
+    return _limiter
+
+
+# ============================================
+# 호출
+# ============================================
+
+def _uses_rest_transport() -> bool:
+    # REST 전송은 비동기 클라이언트를 지원하지 않으므로 동기 호출을 스레드로 넘김
+    return settings.GEMINI_TRANSPORT == "rest"
+
+
+_rest_executor: Optional[ThreadPoolExecutor] = None
+_rest_executor_lock = threading.Lock()
+
+
+def get_rest_executor() -> ThreadPoolExecutor:
+    """
+    REST 전송(및 동기 API만 있는 호출) 전용 스레드 풀 (싱글톤)
+
+    스레드는 취소할 수 없으므로 호출자가 타임아웃으로 포기한 호출도 끝날 때까지 스레드를 점유합니다.
+    풀 크기를 전체 동시 호출 수로 고정해, 포기된 호출이 쌓여도 실제 동시 HTTP 요청 수는 늘지 않습니다
+    (남는 호출은 풀 대기열에서 기다리다가 호출자 타임아웃 시 시작 전에 취소됨).
+    """
+    global _rest_executor
+    if _rest_executor is None:
+        with _rest_executor_lock:
+            if _rest_executor is None:
+                _rest_executor = ThreadPoolExecutor(
+                    max_workers=settings.LLM_MAX_CONCURRENCY,
+                    thread_name_prefix="gemini-rest"
+                )
+    return _rest_executor
+
+
+def _rest_request_options() -> Dict[str, Any]:
+    # 포기된 호출의 스레드도 HTTP 타임아웃 후에는 반드시 반환되도록 함
+    return {"timeout": settings.LLM_REQUEST_TIMEOUT}
+
+
+async def _run_rest(func, *args, **kwargs):
+    """동기 REST 호출을 전용 스레드 풀에서 실행"""
+    loop = asyncio.get_running_loop()
+    return await loop.run_in_executor(get_rest_executor(), partial(func, *args, **kwargs))
+
+
+async def generate_content(
+    model: genai.GenerativeModel,
+    contents: Any,
+    purpose: str = "general"
+):
+    """
+    단발성 생성 호출 (슬롯 확보 후 실행)
+
+    Args:
+        model: get_model()로 얻은 모델
+        contents: 프롬프트 또는 메시지 목록
+        purpose: 호출 목적
+
+    Returns:
+        GenerateContentResponse
+    """
+    async with get_limiter().slot(purpose):
+        if _uses_rest_transport():
+            return await _run_rest(
+                model.generate_content,
+                contents,
+                request_options=_rest_request_options()
+            )
+        return await model.generate_content_async(contents)
+
+
+async def create_cached_content(purpose: str = "chat", **kwargs):
+    """
+    컨텍스트 캐시(cachedContents) 생성 (슬롯 확보 후 전용 스레드 풀에서 실행)
+
+    SDK에 비동기 생성 API가 없으므로 전송 방식과 관계없이 동기 호출을 스레드 풀로 넘깁니다.
+
+    Args:
+        purpose: 호출 목적 (캐시를 쓰는 생성 호출과 같은 그룹)
+        **kwargs: genai.caching.CachedContent.create 인자
+
+    Returns:
+        CachedContent
+    """
+    async with get_limiter().slot(purpose):
+        return await _run_rest(genai.caching.CachedContent.create, **kwargs)
+
+
+def _record_usage(usage: Optional[Dict[str, int]], chunk: Any) -> None:
+    # 사용량은 보통 마지막 청크에 담겨 오므로 값이 있는 청크로 덮어씀
+    metadata = getattr(chunk, "usage_metadata", None)
+    if usage is None or metadata is None or not metadata.prompt_token_count:
+        return
+    usage["prompt_tokens"] = metadata.prompt_token_count
+    usage["cached_tokens"] = metadata.cached_content_token_count or 0
+
+
+async def stream_content(
+    model: genai.GenerativeModel,
+    contents: Any,
+    purpose: str = "chat",
+    usage: Optional[Dict[str, int]] = None
+) -> AsyncGenerator[str, None]:
+    """
+    스트리밍 생성 호출 (스트림이 끝날 때까지 슬롯 유지)
+
+    Args:
+        model: get_model()로 얻은 모델
+        contents: 프롬프트 또는 메시지 목록
+        purpose: 호출 목적
+        usage: 전달하면 응답의 usage_metadata로 {"prompt_tokens", "cached_tokens"}를 채움
+
+    Yields:
+        str: 생성된 텍스트 청크
+    """
+    async with get_limiter().slot(purpose):
+        if _uses_rest_transport():
+            async for text in _stream_in_thread(model, contents, usage):
+                yield text
+            return
+
+        response = await model.generate_content_async(contents, stream=True)
+        async for chunk in response:
+            _record_usage(usage, chunk)
+            if chunk.text:
+                yield chunk.text
+
+
+async def _stream_in_thread(
+    model: genai.GenerativeModel,
+    contents: Any,
+    usage: Optional[Dict[str, int]] = None
+) -> AsyncGenerator[str, None]:
+    """동기 스트리밍 응답을 REST 스레드 풀에서 읽어 비동기로 전달"""
+    loop = asyncio.get_running_loop()
+    queue: asyncio.Queue = asyncio.Queue()
+    done = object()
+    stopped = threading.Event()
+
+    def produce():
+        try:
+            response = model.generate_content(
+                contents,
+                stream=True,
+                request_options=_rest_request_options()
+            )
+            for chunk in response:
+                # 소비 측이 중단되면 다음 청크에서 읽기를 멈추고 스레드 반환
+                if stopped.is_set():
+                    return
+                _record_usage(usage, chunk)
+                if chunk.text:
+                    loop.call_soon_threadsafe(queue.put_nowait, chunk.text)
+            loop.call_soon_threadsafe(queue.put_nowait, done)
+        except Exception as e:
+            loop.call_soon_threadsafe(queue.put_nowait, e)
+
+    future = loop.run_in_executor(get_rest_executor(), produce)
+    try:
+        while True:
+            item = await queue.get()
+            if item is done:
+                break
+            if isinstance(item, Exception):
+                raise item
+            yield item
+    finally:
+        stopped.set()
+        future.cancel()  # 아직 시작하지 않았으면 실행하지 않음
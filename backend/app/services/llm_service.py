@@ -1,28 +1,23 @@
 """
 LLM 서비스 - Gemini API 통합 (Advanced Prompt Engineering)
 """
-import google.generativeai as genai
-from typing import AsyncGenerator, Dict, List, Optional
+from typing import Any, AsyncGenerator, Dict, List, Optional
 from app.core.config import settings
 from app.prompts.prompt_builder import build_counseling_prompt
-
-# Gemini API 설정
-genai.configure(api_key=settings.GOOGLE_API_KEY)
+from app.services.llm_gateway import get_model, stream_content
+from app.services.prompt_cache import apply_prompt_cache, invalidate_prompt_cache
+from app.services.token_counter import count_messages_tokens
 
 
 def get_gemini_model():
-    """Gemini 모델 인스턴스 가져오기"""
-    return genai.GenerativeModel(
-        model_name=settings.LLM_MODEL,
-        generation_config={
-            "temperature": settings.LLM_TEMPERATURE,
-            "max_output_tokens": settings.LLM_MAX_OUTPUT_TOKENS,
-        }
-    )
+    """Gemini 모델 인스턴스 가져오기 (게이트웨이 캐시)"""
+    return get_model()
 
 
 async def stream_gemini_response(
-    messages: List[Dict[str, str]]
+    messages: List[Dict[str, str]],
+    prompt_prefix: Optional[str] = None,
+    cache_info: Optional[Dict[str, Any]] = None
 ) -> AsyncGenerator[str, None]:
     """
     Gemini API로부터 스트리밍 응답 받기
@@ -32,6 +27,10 @@ async def stream_gemini_response(
     Args:
         messages: 대화 히스토리 [{"role": "user"/"assistant", "content": "..."}]
                   (이미 고급 프롬프팅이 적용된 상태)
+        prompt_prefix: 첫 메시지 맨 앞의 시스템 프롬프트 고정 앞부분
+                       (GEMINI_CONTEXT_CACHE_ENABLED면 컨텍스트 캐시로 전송)
+        cache_info: 전달하면 {"prompt_cache": "hit"|"miss"|None, "cached_tokens"}를 채움
+                    (캐시를 쓴 경우 앞부분 + 뒷부분 + 히스토리 전체 입력 토큰 "input_tokens"도 채움)
 
     Yields:
         str: 생성된 텍스트 청크
@@ -47,23 +46,59 @@ async def stream_gemini_response(
             "parts": msg["content"]
         })
 
-    try:
-        # 비동기 스트리밍 응답 생성
-        response = await model.generate_content_async(
-            gemini_messages,
-            stream=True
-        )
+    # 고정 앞부분은 컨텍스트 캐시로 대체 (캐시를 쓸 수 없으면 그대로 전송)
+    cached_model, cached_messages, info = await apply_prompt_cache(gemini_messages, prompt_prefix)
+    if cache_info is not None:
+        cache_info.update(info)
 
-        # 청크 단위로 응답 생성 (비동기 반복)
-        async for chunk in response:
-            if chunk.text:
-                yield chunk.text
+    try:
+        if cached_model is not None:
+            started = False
+            usage: Dict[str, int] = {}
+            try:
+                async for text in stream_content(cached_model, cached_messages, purpose="chat", usage=usage):
+                    started = True
+                    yield text
+                if cache_info is not None:
+                    _record_cached_usage(cache_info, usage, messages)
+                return
+            except Exception as e:
+                # 서버에서 캐시가 먼저 만료된 경우 등: 첫 청크 전이면 캐시 없이 한 번 더 시도
+                if started:
+                    raise
+                print(f"⚠️ 프롬프트 캐시 사용 실패, 캐시 없이 재시도: {str(e)}")
+                invalidate_prompt_cache(prompt_prefix)
+                if cache_info is not None:
+                    cache_info.update({"prompt_cache": None, "cached_tokens": 0})
+
+        # 비동기 스트리밍 응답 생성 (게이트웨이 슬롯 확보 후, 청크 단위로 전달)
+        async for text in stream_content(model, gemini_messages, purpose="chat"):
+            yield text
 
     except Exception as e:
         print(f"Gemini API 오류: {str(e)}")
         raise Exception(f"AI 응답 생성 중 오류가 발생했습니다: {str(e)}")
 
 
+def _record_cached_usage(
+    cache_info: Dict[str, Any],
+    usage: Dict[str, int],
+    messages: List[Dict[str, str]]
+) -> None:
+    """
+    캐시를 쓴 요청의 전체 입력 토큰 기록 (절약 토큰이 전체 입력을 넘지 않도록)
+
+    응답의 usage_metadata가 있으면 그 값을, 없으면 전송한 메시지 전체의 근사치를 사용합니다.
+    """
+    if usage.get("prompt_tokens"):
+        cache_info["input_tokens"] = usage["prompt_tokens"]
+        if cache_info.get("prompt_cache") == "hit" and usage.get("cached_tokens"):
+            cache_info["cached_tokens"] = usage["cached_tokens"]
+    else:
+        cache_info["input_tokens"] = count_messages_tokens(messages)
+    cache_info["cached_tokens"] = min(cache_info.get("cached_tokens", 0), cache_info["input_tokens"])
+
+
 def build_system_prompt(character_name: str, personality: str, system_prompt: str = None) -> str:
     """
     AI 캐릭터 기반 시스템 프롬프트 구성
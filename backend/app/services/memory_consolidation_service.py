@@ -0,0 +1,277 @@
+"""
+메모리 통합 서비스 - 추출된 사용자 메모리의 중복 병합, 신뢰도 감쇠, 개수 제한
+
+메모리 추출은 10개 메시지마다 새 항목을 만들기 때문에, 그대로 쌓으면 같은 사실이
+여러 번 저장되고 (사용자, 캐릭터)당 메모리가 대화 기간에 비례해 늘어납니다.
+
+- 중복 병합: 정규화 텍스트 해시가 같거나 글자 바이그램 유사도가 높으면 기존 메모리를 강화
+  (신뢰도 noisy-or 결합, 언급 횟수 증가)
+- 신뢰도 감쇠: 마지막 갱신 이후 타입별 반감기로 신뢰도 감소
+- 개수 제한: 신뢰도가 너무 낮아진 메모리를 삭제하고, 최대 개수를 넘으면 신뢰도 낮은 순으로 삭제
+- 상위 K 투영: 타입별 신뢰도 상위 K개에 projection_rank를 기록해 컨텍스트 조회가 일정 크기만 읽도록 함
+"""
+import hashlib
+import re
+import unicodedata
+from dataclasses import dataclass
+from datetime import datetime, timezone
+from typing import Any, Dict, List, Optional, Set, Tuple
+from uuid import UUID
+
+from sqlalchemy.orm import Session
+
+from app.models.user_memory import UserMemory
+from app.services.memory_retrieval_service import MEMORY_TEXT_KEYS
+
+
+# 타입별 신뢰도 반감기 (일)
+MEMORY_HALF_LIFE_DAYS = {
+    "fact": 365.0,
+    "preference": 180.0,
+    "emotion_pattern": 90.0,
+    "tone_preference": 90.0,
+}
+DEFAULT_HALF_LIFE_DAYS = 180.0
+
+# 감쇠 적용 최소 간격 (일) - 짧은 간격마다 모든 행을 다시 쓰지 않도록
+DECAY_MIN_INTERVAL_DAYS = 1.0
+
+# 이보다 신뢰도가 낮아지면 삭제
+EVICT_CONFIDENCE = 0.3
+
+# (사용자, 캐릭터)당 최대 메모리 수
+MAX_MEMORIES_PER_CHARACTER = 200
+
+# 같은 메모리로 볼 글자 바이그램 자카드 유사도
+NEAR_DUPLICATE_SIMILARITY = 0.8
+
+# 컨텍스트 조회 대상 타입별 상위 K (관련도 재정렬 여유분 포함)
+MEMORY_PROJECTION_TOP_K = {
+    "fact": 20,
+    "preference": 20,
+    "emotion_pattern": 10,
+    "tone_preference": 1,
+}
+
+_NORMALIZE_PATTERN = re.compile(r"[\W_]+", re.UNICODE)
+
+
+@dataclass
+class MemoryCandidate:
+    """추출된 메모리 후보"""
+    memory_type: str
+    content: Dict[str, Any]
+    confidence: float
+
+
+def normalize_memory_text(text: str) -> str:
+    """비교용 정규화 (NFKC, 소문자, 공백/문장부호 제거)"""
+    return _NORMALIZE_PATTERN.sub("", unicodedata.normalize("NFKC", text).lower())
+
+
+def _memory_text(memory_type: str, content: Dict[str, Any]) -> str:
+    key = MEMORY_TEXT_KEYS.get(memory_type)
+    if key and isinstance(content, dict):
+        return str(content.get(key, ""))
+    return ""
+
+
+def memory_content_hash(memory_type: str, content: Dict[str, Any]) -> str:
+    """
+    메모리 중복 판별 해시
+
+    대화 스타일(tone_preference)은 (사용자, 캐릭터)당 하나만 유지하므로 타입만으로 해시합니다.
+
+    Args:
+        memory_type: 메모리 타입
+        content: 메모리 내용
+
+    Returns:
+        sha256 16진수 문자열
+    """
+    if memory_type in MEMORY_TEXT_KEYS:
+        key_text = normalize_memory_text(_memory_text(memory_type, content))
+    else:
+        key_text = ""
+    return hashlib.sha256(f"{memory_type}\0{key_text}".encode("utf-8")).hexdigest()
+
+
+def _bigrams(text: str) -> Set[str]:
+    if len(text) < 2:
+        return {text} if text else set()
+    return {text[i:i + 2] for i in range(len(text) - 1)}
+
+
+def text_similarity(a: str, b: str) -> float:
+    """정규화 텍스트의 글자 바이그램 자카드 유사도 (0.0 ~ 1.0)"""
+    a_grams, b_grams = _bigrams(a), _bigrams(b)
+    if not a_grams or not b_grams:
+        return 0.0
+    return len(a_grams & b_grams) / len(a_grams | b_grams)
+
+
+def decayed_confidence(confidence: float, memory_type: str, elapsed_days: float) -> float:
+    """반감기 기준 신뢰도 감쇠"""
+    half_life = MEMORY_HALF_LIFE_DAYS.get(memory_type, DEFAULT_HALF_LIFE_DAYS)
+    return confidence * 0.5 ** (max(elapsed_days, 0.0) / half_life)
+
+
+def _combine_confidence(a: float, b: float) -> float:
+    """독립 근거 결합 (noisy-or): 같은 내용이 반복되면 신뢰도 상승"""
+    return 1.0 - (1.0 - a) * (1.0 - b)
+
+
+def _apply_decay(memory: UserMemory, now: datetime) -> None:
+    basis = memory.confidence_updated_at or memory.updated_at
+    if basis is None:
+        return
+    if basis.tzinfo is None:
+        basis = basis.replace(tzinfo=timezone.utc)
+    elapsed_days = (now - basis).total_seconds() / 86400
+    if elapsed_days < DECAY_MIN_INTERVAL_DAYS:
+        return
+    memory.confidence_score = decayed_confidence(
+        memory.confidence_score or 0.0, memory.memory_type, elapsed_days
+    )
+    memory.confidence_updated_at = now
+
+
+def _find_near_duplicate(
+    memories: List[UserMemory],
+    memory_type: str,
+    normalized: str
+) -> Optional[UserMemory]:
+    """같은 타입에서 유사도가 가장 높은 메모리 (기준 미달이면 None)"""
+    if not normalized:
+        return None
+    best, best_score = None, NEAR_DUPLICATE_SIMILARITY
+    for memory in memories:
+        if memory.memory_type != memory_type:
+            continue
+        score = text_similarity(normalized, normalize_memory_text(_memory_text(memory_type, memory.content)))
+        if score >= best_score:
+            best, best_score = memory, score
+    return best
+
+
+def consolidate_memories(
+    db: Session,
+    user_id: UUID,
+    character_id: UUID,
+    candidates: List[MemoryCandidate],
+    conversation_id: Optional[UUID] = None,
+    now: Optional[datetime] = None
+) -> List[UserMemory]:
+    """
+    추출된 메모리 후보를 기존 메모리에 통합 (커밋은 호출자가 수행)
+
+    기존 메모리 수가 MAX_MEMORIES_PER_CHARACTER로 제한되므로 비용은 대화 기간과 무관합니다.
+
+    Args:
+        db: 데이터베이스 세션
+        user_id: 사용자 ID
+        character_id: AI 캐릭터 ID
+        candidates: 추출된 메모리 후보
+        conversation_id: 출처 대화 ID
+        now: 기준 시각 (기본값: 현재 UTC)
+
+    Returns:
+        새로 추가되었거나 강화된 메모리 리스트
+    """
+    now = now or datetime.now(timezone.utc)
+
+    existing = db.query(UserMemory).filter(
+        UserMemory.user_id == user_id,
+        UserMemory.character_id == character_id
+    ).order_by(UserMemory.created_at).all()
+
+    # 1. 감쇠 적용 + 기존 중복 병합 (해시 없는 이전 데이터 포함)
+    by_key: Dict[Tuple[str, str], UserMemory] = {}
+    kept: List[UserMemory] = []
+    for memory in existing:
+        _apply_decay(memory, now)
+        content_hash = memory_content_hash(memory.memory_type, memory.content)
+        if memory.content_hash != content_hash:
+            memory.content_hash = content_hash
+
+        first = by_key.get((memory.memory_type, content_hash))
+        if first is not None:
+            first.confidence_score = _combine_confidence(first.confidence_score, memory.confidence_score)
+            first.mention_count = (first.mention_count or 1) + (memory.mention_count or 1)
+            db.delete(memory)
+            continue
+        by_key[(memory.memory_type, content_hash)] = memory
+        kept.append(memory)
+
+    # 2. 후보 통합: 같은 해시 → 유사 텍스트 → 새 메모리
+    touched: List[UserMemory] = []
+    touched_ids: Set[int] = set()
+    for candidate in candidates:
+        confidence = min(max(float(candidate.confidence), 0.0), 1.0)
+        content_hash = memory_content_hash(candidate.memory_type, candidate.content)
+        target = by_key.get((candidate.memory_type, content_hash))
+        if target is None:
+            target = _find_near_duplicate(
+                kept,
+                candidate.memory_type,
+                normalize_memory_text(_memory_text(candidate.memory_type, candidate.content))
+            )
+
+        if target is not None:
+            if candidate.memory_type == "tone_preference":
+                # 대화 스타일은 최신 추출 결과로 교체
+                target.content = candidate.content
+                target.confidence_score = max(target.confidence_score, confidence)
+            else:
+                target.confidence_score = _combine_confidence(target.confidence_score, confidence)
+            target.mention_count = (target.mention_count or 1) + 1
+            target.confidence_updated_at = now
+            target.source_conversation_id = conversation_id
+        else:
+            target = UserMemory(
+                user_id=user_id,
+                character_id=character_id,
+                memory_type=candidate.memory_type,
+                content=candidate.content,
+                confidence_score=confidence,
+                content_hash=content_hash,
+                mention_count=1,
+                confidence_updated_at=now,
+                source_conversation_id=conversation_id
+            )
+            db.add(target)
+            by_key[(candidate.memory_type, content_hash)] = target
+            kept.append(target)
+
+        if id(target) not in touched_ids:
+            touched.append(target)
+            touched_ids.add(id(target))
+
+    # 3. 삭제: 신뢰도가 너무 낮은 메모리, 최대 개수 초과분 (신뢰도 낮은 순)
+    alive = []
+    for memory in kept:
+        if memory.confidence_score < EVICT_CONFIDENCE and id(memory) not in touched_ids:
+            db.delete(memory)
+        else:
+            alive.append(memory)
+
+    alive.sort(key=lambda memory: memory.confidence_score, reverse=True)
+    for memory in alive[MAX_MEMORIES_PER_CHARACTER:]:
+        db.delete(memory)
+    alive = alive[:MAX_MEMORIES_PER_CHARACTER]
+
+    # 4. 타입별 상위 K 투영 갱신
+    ranks: Dict[str, int] = {}
+    for memory in alive:
+        rank = ranks.get(memory.memory_type, 0) + 1
+        ranks[memory.memory_type] = rank
+        projection_rank = rank if rank <= MEMORY_PROJECTION_TOP_K.get(memory.memory_type, 0) else None
+        if memory.projection_rank != projection_rank:
+            memory.projection_rank = projection_rank
+
+    evicted = len(kept) - len(alive)
+    if evicted:
+        print(f"🧹 메모리 정리: {evicted}개 삭제 (낮은 신뢰도 또는 최대 {MAX_MEMORIES_PER_CHARACTER}개 초과)")
+
+    alive_ids = {id(memory) for memory in alive}
+    return [memory for memory in touched if id(memory) in alive_ids]
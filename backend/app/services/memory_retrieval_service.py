@@ -0,0 +1,111 @@
+"""
+메모리 검색 서비스 - 현재 메시지와 관련된 사용자 메모리를 우선 선택
+
+사용자/캐릭터별로 메모리 임베딩 인덱스를 캐시하고,
+(관련도 60% + 신뢰도 40%) 순으로 메모리를 정렬합니다.
+"""
+from collections import OrderedDict
+from typing import Any, Dict, List, Optional, Tuple
+from uuid import UUID
+
+from app.models.user_memory import UserMemory
+from app.services.embedding_service import get_embedding_backend
+from app.services.vector_index import VectorIndex
+
+
+# 메모리 타입별 검색 대상 텍스트 키 (tone_preference는 검색 대상 아님)
+MEMORY_TEXT_KEYS = {
+    "fact": "fact",
+    "preference": "preference",
+    "emotion_pattern": "pattern",
+}
+
+# 관련도 순으로 다시 정렬할 최대 메모리 수 (나머지는 신뢰도 순)
+MAX_RANKED_MEMORIES = 50
+
+
+def get_memory_text(memory: UserMemory) -> str:
+    """메모리 내용에서 검색용 텍스트 추출"""
+    content = memory.content or {}
+    key = MEMORY_TEXT_KEYS.get(memory.memory_type)
+    if key and isinstance(content, dict):
+        return str(content.get(key, ""))
+    return ""
+
+
+class MemoryIndex:
+    """사용자/캐릭터별 메모리 임베딩 인덱스"""
+
+    def __init__(self, version: Tuple[Any, ...], memories: List[UserMemory]):
+        self.version = version
+        self.memory_ids = [memory.id for memory in memories]
+        self.vectors = VectorIndex(
+            get_embedding_backend().embed([get_memory_text(memory) for memory in memories])
+        )
+
+
+_MEMORY_INDEX_CACHE_SIZE = 256
+_memory_index_cache: "OrderedDict[Tuple[UUID, UUID], MemoryIndex]" = OrderedDict()
+
+
+def _get_memory_index(
+    user_id: UUID,
+    character_id: UUID,
+    memories: List[UserMemory]
+) -> MemoryIndex:
+    """메모리 인덱스 가져오기 (메모리 id/수정 시각이 같으면 캐시 재사용, LRU)"""
+    key = (user_id, character_id)
+    version = tuple((memory.id, memory.updated_at) for memory in memories)
+
+    cached = _memory_index_cache.get(key)
+    if cached is not None and cached.version == version:
+        _memory_index_cache.move_to_end(key)
+        return cached
+
+    index = MemoryIndex(version, memories)
+    _memory_index_cache[key] = index
+    _memory_index_cache.move_to_end(key)
+    while len(_memory_index_cache) > _MEMORY_INDEX_CACHE_SIZE:
+        _memory_index_cache.popitem(last=False)
+    return index
+
+
+def rank_memories_by_relevance(
+    user_id: UUID,
+    character_id: UUID,
+    memories: List[UserMemory],
+    query_text: Optional[str]
+) -> List[UserMemory]:
+    """
+    현재 메시지와의 관련도를 반영해 메모리 정렬
+
+    Args:
+        user_id: 사용자 ID
+        character_id: AI 캐릭터 ID
+        memories: 신뢰도 순으로 조회된 메모리 목록
+        query_text: 현재 사용자 메시지 (없으면 입력 순서 유지)
+
+    Returns:
+        정렬된 메모리 목록
+    """
+    if not query_text or not query_text.strip():
+        return memories
+
+    searchable = [memory for memory in memories if memory.memory_type in MEMORY_TEXT_KEYS]
+    if not searchable:
+        return memories
+
+    index = _get_memory_index(user_id, character_id, searchable)
+    query = get_embedding_backend().embed_one(query_text)
+    relevance: Dict[UUID, float] = {
+        index.memory_ids[row]: max(score, 0.0)
+        for row, score in index.vectors.search(query, min(len(searchable), MAX_RANKED_MEMORIES))
+    }
+
+    ranked = sorted(
+        (memory for memory in searchable if memory.id in relevance),
+        key=lambda memory: relevance[memory.id] * 0.6 + (memory.confidence_score or 0.0) * 0.4,
+        reverse=True
+    )
+    remaining = [memory for memory in memories if memory.id not in relevance]
+    return ranked + remaining
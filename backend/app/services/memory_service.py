@@ -1,14 +1,16 @@
 """
 메모리 추출 및 관리 서비스 - 대화에서 사용자 정보 자동 학습
 """
-import google.generativeai as genai
+import json
 from sqlalchemy.orm import Session
 from typing import List, Dict, Any
 from uuid import UUID
 
 from app.models.message import Message
 from app.models.user_memory import UserMemory
-from app.core.config import settings
+from app.services.context_cache import invalidate_context
+from app.services.memory_consolidation_service import MemoryCandidate, consolidate_memories
+from app.services.llm_client import generate_text, strip_json_code_fence
 
 
 async def extract_user_memories(
@@ -34,15 +36,6 @@ async def extract_user_memories(
     if len(messages) < 4:  # 최소 4개 메시지 필요 (2왕복)
         return []
 
-    # Gemini 모델 설정
-    model = genai.GenerativeModel(
-        model_name=settings.LLM_MODEL,
-        generation_config={
-            "temperature": 0.3,  # 정확한 정보 추출을 위해 낮은 temperature
-            "max_output_tokens": 1000,
-        }
-    )
-
     # 대화 텍스트 생성
     conversation_text = "\n".join([
         f"{'사용자' if msg.role == 'user' else 'AI'}: {msg.content}"
@@ -101,84 +94,74 @@ async def extract_user_memories(
 - 반드시 유효한 JSON 형식으로만 응답하세요"""
 
     try:
-        response = model.generate_content(prompt)
-        response_text = response.text.strip()
+        response_text = await generate_text(
+            prompt,
+            temperature=0.3,  # 정확한 정보 추출을 위해 낮은 temperature
+            max_output_tokens=1000,
+            purpose="memory"
+        )
 
         # JSON 추출 (```json``` 마크다운 제거)
-        if response_text.startswith("```json"):
-            response_text = response_text[7:]
-        if response_text.startswith("```"):
-            response_text = response_text[3:]
-        if response_text.endswith("```"):
-            response_text = response_text[:-3]
-        response_text = response_text.strip()
-
-        import json
-        extracted = json.loads(response_text)
+        extracted = json.loads(strip_json_code_fence(response_text))
 
-        memories = []
+        candidates = []
 
-        # 사실 정보 저장
+        # 사실 정보
         for fact_data in extracted.get("facts", []):
-            memory = UserMemory(
-                user_id=user_id,
-                character_id=character_id,
-                memory_type="fact",
-                content={"fact": fact_data["fact"]},
-                confidence_score=fact_data.get("confidence", 0.7),
-                source_conversation_id=conversation_id
-            )
-            memories.append(memory)
-
-        # 선호도 저장
+            if fact_data.get("fact"):
+                candidates.append(MemoryCandidate(
+                    memory_type="fact",
+                    content={"fact": fact_data["fact"]},
+                    confidence=fact_data.get("confidence", 0.7)
+                ))
+
+        # 선호도
         for pref_data in extracted.get("preferences", []):
-            memory = UserMemory(
-                user_id=user_id,
-                character_id=character_id,
-                memory_type="preference",
-                content={"preference": pref_data["preference"]},
-                confidence_score=pref_data.get("confidence", 0.7),
-                source_conversation_id=conversation_id
-            )
-            memories.append(memory)
-
-        # 감정 패턴 저장
+            if pref_data.get("preference"):
+                candidates.append(MemoryCandidate(
+                    memory_type="preference",
+                    content={"preference": pref_data["preference"]},
+                    confidence=pref_data.get("confidence", 0.7)
+                ))
+
+        # 감정 패턴
         for pattern_data in extracted.get("emotion_patterns", []):
-            memory = UserMemory(
-                user_id=user_id,
-                character_id=character_id,
-                memory_type="emotion_pattern",
-                content={"pattern": pattern_data["pattern"]},
-                confidence_score=pattern_data.get("confidence", 0.7),
-                source_conversation_id=conversation_id
-            )
-            memories.append(memory)
-
-        # 대화 스타일 저장
+            if pattern_data.get("pattern"):
+                candidates.append(MemoryCandidate(
+                    memory_type="emotion_pattern",
+                    content={"pattern": pattern_data["pattern"]},
+                    confidence=pattern_data.get("confidence", 0.7)
+                ))
+
+        # 대화 스타일
         tone_prefs = extracted.get("tone_preferences")
         if tone_prefs and isinstance(tone_prefs, dict):
             confidence = tone_prefs.pop("confidence", 0.7)
-            memory = UserMemory(
-                user_id=user_id,
-                character_id=character_id,
+            candidates.append(MemoryCandidate(
                 memory_type="tone_preference",
                 content=tone_prefs,
-                confidence_score=confidence,
-                source_conversation_id=conversation_id
-            )
-            memories.append(memory)
+                confidence=confidence
+            ))
 
-        # 메모리 저장
-        if memories:
-            for memory in memories:
-                db.add(memory)
+        # 기존 메모리에 통합 (중복 병합, 감쇠, 개수 제한, 상위 K 투영 갱신)
+        memories = []
+        if candidates:
+            memories = consolidate_memories(
+                db,
+                user_id=user_id,
+                character_id=character_id,
+                candidates=candidates,
+                conversation_id=conversation_id
+            )
             db.commit()
-            print(f"✅ {len(memories)}개의 메모리 추출 및 저장 완료")
+            invalidate_context(user_id, character_id)
+            print(f"✅ {len(candidates)}개의 메모리 추출, {len(memories)}개 저장/강화 완료")
 
         return memories
 
     except Exception as e:
         print(f"메모리 추출 오류: {str(e)}")
+        db.rollback()
         return []
 
 
@@ -0,0 +1,137 @@
+"""
+메시지 윈도우 서비스 - 대화별 최근 N개 메시지 링 버퍼
+
+채팅 턴마다 메시지를 다시 조회하는 대신, 대화별로 최근 메시지를 deque(maxlen=N)에 유지합니다.
+
+- 사용자/AI 메시지 저장(커밋) 직후 append (이미 로드된 대화만, O(1))
+- 버퍼가 없으면 created_at DESC 조회 결과로 채움 (hydrate)
+- 대화 삭제 시 discard
+
+버퍼는 프로세스 내에만 존재하므로, 여러 프로세스가 같은 대화에 쓰는 배포에서는
+MESSAGE_WINDOW_ENABLED=False로 두고 매 턴 조회하도록 합니다.
+"""
+import threading
+from collections import OrderedDict, deque
+from typing import Deque, Dict, List, Optional
+from uuid import UUID
+
+
+class MessageWindowStore:
+    """대화별 최근 메시지 링 버퍼 (대화 수는 LRU로 제한)"""
+
+    def __init__(self, window_size: int = 20, max_conversations: int = 4096):
+        self.window_size = window_size
+        self.max_conversations = max_conversations
+        self._windows: "OrderedDict[str, Deque[Dict[str, str]]]" = OrderedDict()
+        self._lock = threading.Lock()
+
+    def __len__(self) -> int:
+        return len(self._windows)
+
+    def get(self, conversation_id: UUID) -> Optional[List[Dict[str, str]]]:
+        """
+        최근 메시지 가져오기
+
+        Args:
+            conversation_id: 대화 ID
+
+        Returns:
+            [{"role", "content", "token_count"}, ...] 시간순, 버퍼가 없으면 None
+        """
+        key = str(conversation_id)
+        with self._lock:
+            window = self._windows.get(key)
+            if window is None:
+                return None
+            self._windows.move_to_end(key)
+            return list(window)
+
+    def hydrate(self, conversation_id: UUID, messages: List[Dict[str, str]]) -> None:
+        """
+        DB에서 조회한 최근 메시지로 버퍼 채우기
+
+        Args:
+            conversation_id: 대화 ID
+            messages: 최근 메시지 (시간순)
+        """
+        key = str(conversation_id)
+        with self._lock:
+            self._windows[key] = deque(
+                (
+                    {"role": msg["role"], "content": msg["content"], "token_count": msg.get("token_count")}
+                    for msg in messages
+                ),
+                maxlen=self.window_size
+            )
+            self._windows.move_to_end(key)
+            while len(self._windows) > self.max_conversations:
+                self._windows.popitem(last=False)
+
+    def append(
+        self,
+        conversation_id: UUID,
+        role: str,
+        content: str,
+        token_count: Optional[int] = None
+    ) -> None:
+        """
+        저장된 메시지 추가 (버퍼가 없는 대화는 다음 조회 시 DB에서 채움)
+
+        Args:
+            conversation_id: 대화 ID
+            role: 'user' 또는 'assistant'
+            content: 메시지 내용
+            token_count: 메시지 토큰 수 (선택)
+        """
+        with self._lock:
+            window = self._windows.get(str(conversation_id))
+            if window is not None:
+                window.append({"role": role, "content": content, "token_count": token_count})
+
+    def discard(self, conversation_id: UUID) -> None:
+        """대화 버퍼 제거"""
+        with self._lock:
+            self._windows.pop(str(conversation_id), None)
+
+
+_store: Optional[MessageWindowStore] = None
+_store_initialized = False
+
+
+def get_message_windows() -> Optional[MessageWindowStore]:
+    """
+    설정에 따른 메시지 윈도우 저장소 (싱글톤)
+
+    Returns:
+        MessageWindowStore 또는 None (MESSAGE_WINDOW_ENABLED=False)
+    """
+    from app.core.config import settings
+
+    global _store, _store_initialized
+    if not _store_initialized:
+        if settings.MESSAGE_WINDOW_ENABLED:
+            _store = MessageWindowStore(
+                window_size=settings.MESSAGE_WINDOW_SIZE,
+                max_conversations=settings.MESSAGE_WINDOW_MAX_CONVERSATIONS
+            )
+        _store_initialized = True
+    return _store
+
+
+def record_message(
+    conversation_id: UUID,
+    role: str,
+    content: str,
+    token_count: Optional[int] = None
+) -> None:
+    """메시지 저장(커밋) 후 호출 - 로드된 버퍼에 추가"""
+    store = get_message_windows()
+    if store is not None:
+        store.append(conversation_id, role, content, token_count)
+
+
+def discard_conversation(conversation_id: UUID) -> None:
+    """대화 삭제 후 호출 - 버퍼 제거"""
+    store = get_message_windows()
+    if store is not None:
+        store.discard(conversation_id)
@@ -1,17 +1,35 @@
 """
 사용자 프롬프트 선호도 학습 서비스
+
+피드백마다 누적 카운터(길이 구간별 점수 합/개수, 이모지 유무별 점수 합/개수, 피드백 수)를
+O(1)로 갱신하고, 선호도는 카운터에서 바로 계산합니다.
 """
 from sqlalchemy.orm import Session
-from sqlalchemy import desc, func
-from typing import Optional, Dict
+from sqlalchemy import and_, exists, func, or_
+from sqlalchemy.dialects.postgresql import insert
+from typing import Any, Dict, List, Optional, Tuple
 from uuid import UUID
 from datetime import datetime, timedelta
 
 from app.models.user_prompt_preference import UserPromptPreference
 from app.models.message_feedback import MessageFeedback
-from app.models.conversation_rating import ConversationRating
 from app.models.message import Message
 from app.models.conversation import Conversation
+from app.services.context_cache import invalidate_context
+
+
+# 선호도 행이 없을 때 사용하는 기본값 (채팅 경로에서는 행을 만들지 않음)
+DEFAULT_PREFERENCE: Dict[str, Any] = {
+    "preferred_response_length": "medium",
+    "preferred_tone": "mixed",
+    "emoji_preference": "moderate",
+    "preferred_few_shot_count": 3,
+    "confidence_score": 0.0
+}
+
+# 선호도 갱신 워커 기준: 마지막 업데이트 후 경과 일수(새 대화/피드백이 있을 때만), 새 대화 수
+STALE_AFTER_DAYS = 7
+STALE_NEW_CONVERSATIONS = 10
 
 
 def get_or_create_preference(
@@ -39,11 +57,7 @@ def get_or_create_preference(
         preference = UserPromptPreference(
             user_id=user_id,
             character_id=character_id,
-            preferred_response_length="medium",
-            preferred_tone="mixed",
-            emoji_preference="moderate",
-            preferred_few_shot_count=3,
-            confidence_score=0.0
+            **DEFAULT_PREFERENCE
         )
         db.add(preference)
         db.commit()
@@ -52,15 +66,12 @@ def get_or_create_preference(
     return preference
 
 
-def update_user_preferences(
-    db: Session,
-    user_id: UUID,
-    character_id: UUID
-) -> UserPromptPreference:
+def lock_preference(db: Session, user_id: UUID, character_id: UUID) -> UserPromptPreference:
     """
-    사용자 선호도 업데이트
+    선호도 행을 잠가서 가져오기 (없으면 기본값으로 생성, 커밋은 호출자가 수행)
 
-    최근 피드백과 대화 패턴을 분석하여 선호도를 학습합니다.
+    INSERT ... ON CONFLICT DO NOTHING 후 SELECT ... FOR UPDATE로 다시 조회하므로,
+    행이 없을 때 동시에 호출돼도 고유 제약 위반 없이 같은 행을 차례로 잠급니다.
 
     Args:
         db: 데이터베이스 세션
@@ -68,156 +79,235 @@ def update_user_preferences(
         character_id: AI 캐릭터 ID
 
     Returns:
-        업데이트된 UserPromptPreference
+        잠긴 UserPromptPreference
     """
-    preference = get_or_create_preference(db, user_id, character_id)
+    db.execute(
+        insert(UserPromptPreference).values(
+            user_id=user_id,
+            character_id=character_id,
+            total_conversations=0,
+            total_feedbacks=0,
+            positive_feedback_ratio=0.0,
+            **DEFAULT_PREFERENCE
+        ).on_conflict_do_nothing(
+            index_elements=[UserPromptPreference.user_id, UserPromptPreference.character_id]
+        )
+    )
 
-    # 최근 30일간의 대화 및 피드백 수집
-    recent_cutoff = datetime.utcnow() - timedelta(days=30)
+    return db.query(UserPromptPreference).filter(
+        UserPromptPreference.user_id == user_id,
+        UserPromptPreference.character_id == character_id
+    ).with_for_update().populate_existing().one()
 
-    # 1. 최근 대화 수집
-    conversations = db.query(Conversation).filter(
-        Conversation.user_id == user_id,
-        Conversation.character_id == character_id,
-        Conversation.created_at >= recent_cutoff
-    ).all()
 
-    conversation_ids = [conv.id for conv in conversations]
+# 응답 길이 구간 (글자 수 기준, 순서대로 동점 시 우선)
+LENGTH_CATEGORIES = ("short", "medium", "long")
 
-    # 2. 피드백 수집
-    feedbacks = db.query(MessageFeedback).join(Message).filter(
-        Message.conversation_id.in_(conversation_ids),
-        MessageFeedback.user_id == user_id
-    ).all()
+# 이모지 포함 여부 판단에 사용하는 문자
+FEEDBACK_EMOJIS = "😊😢😡😍🎉💪👍👎🙏"
 
-    # 3. 평가 수집
-    ratings = db.query(ConversationRating).filter(
-        ConversationRating.conversation_id.in_(conversation_ids),
-        ConversationRating.user_id == user_id
-    ).all()
 
-    # 통계 업데이트
-    preference.total_conversations = len(conversations)
-    preference.total_feedbacks = len(feedbacks)
+def _length_category(content: str) -> str:
+    """응답 길이 구간 분류"""
+    length = len(content)
+    if length < 100:
+        return "short"
+    elif length < 300:
+        return "medium"
+    return "long"
 
-    if feedbacks:
-        positive_count = sum(1 for f in feedbacks if f.is_helpful)
-        preference.positive_feedback_ratio = positive_count / len(feedbacks)
 
-    # 4. 응답 길이 선호도 학습
-    preference.preferred_response_length = _learn_length_preference(
-        db, feedbacks, conversation_ids
-    )
+def _has_emoji(content: str) -> bool:
+    """이모지 포함 여부 간단 체크"""
+    return any(char in content for char in FEEDBACK_EMOJIS)
+
+
+def _reset_counters(preference: UserPromptPreference) -> None:
+    """누적 학습 카운터 초기화"""
+    preference.total_feedbacks = 0
+    preference.positive_feedbacks = 0
+    for category in LENGTH_CATEGORIES:
+        setattr(preference, f"length_{category}_score", 0)
+        setattr(preference, f"length_{category}_count", 0)
+    preference.emoji_score = 0
+    preference.emoji_count = 0
+    preference.plain_score = 0
+    preference.plain_count = 0
+
+
+def _apply_feedback(
+    preference: UserPromptPreference,
+    content: str,
+    score_delta: int,
+    count_delta: int,
+    positive_delta: int
+) -> None:
+    """피드백 하나를 누적 카운터에 반영 (길이 구간, 이모지 여부, 긍정 수)"""
+    category = _length_category(content)
+    setattr(preference, f"length_{category}_score", (getattr(preference, f"length_{category}_score") or 0) + score_delta)
+    setattr(preference, f"length_{category}_count", (getattr(preference, f"length_{category}_count") or 0) + count_delta)
+
+    prefix = "emoji" if _has_emoji(content) else "plain"
+    setattr(preference, f"{prefix}_score", (getattr(preference, f"{prefix}_score") or 0) + score_delta)
+    setattr(preference, f"{prefix}_count", (getattr(preference, f"{prefix}_count") or 0) + count_delta)
 
-    # 5. 이모지 선호도 학습
-    preference.emoji_preference = _learn_emoji_preference(
-        db, feedbacks, conversation_ids
+    preference.total_feedbacks = (preference.total_feedbacks or 0) + count_delta
+    preference.positive_feedbacks = (preference.positive_feedbacks or 0) + positive_delta
+
+
+def _refresh_learned_preferences(preference: UserPromptPreference) -> None:
+    """누적 카운터로 선호도/통계/신뢰도 다시 계산 (DB 조회 없음)"""
+    total_feedbacks = preference.total_feedbacks or 0
+    preference.positive_feedback_ratio = (
+        (preference.positive_feedbacks or 0) / total_feedbacks if total_feedbacks else 0.0
     )
 
-    # 6. 톤 선호도 학습 (향후 구현)
+    # 응답 길이 선호도 학습
+    preference.preferred_response_length = _learn_length_preference(preference)
+
+    # 이모지 선호도 학습
+    preference.emoji_preference = _learn_emoji_preference(preference)
+
+    # 톤 선호도 학습 (향후 구현)
     # preference.preferred_tone = _learn_tone_preference(...)
 
-    # 7. 신뢰도 점수 계산
-    preference.confidence_score = _calculate_confidence(len(feedbacks), len(conversations))
+    # 신뢰도 점수 계산
+    preference.confidence_score = _calculate_confidence(
+        total_feedbacks, preference.total_conversations or 0
+    )
 
     preference.last_updated = datetime.utcnow()
 
+
+def record_feedback_signal(
+    db: Session,
+    user_id: UUID,
+    character_id: UUID,
+    message: Message,
+    is_helpful: bool,
+    previous_is_helpful: Optional[bool] = None
+) -> Optional[UserPromptPreference]:
+    """
+    메시지 피드백을 선호도 누적 카운터에 반영 (O(1), 커밋은 호출자가 수행)
+
+    선호도 행을 잠근 뒤(없으면 INSERT ... ON CONFLICT DO NOTHING으로 만든 뒤) 카운터를 갱신하고 선호도를 바로 다시 계산하므로,
+    별도의 전체 재계산 없이 항상 최신 상태를 유지합니다.
+
+    Args:
+        db: 데이터베이스 세션
+        user_id: 사용자 ID
+        character_id: AI 캐릭터 ID
+        message: 피드백 대상 메시지
+        is_helpful: 새 피드백 값
+        previous_is_helpful: 기존 피드백 값 (새 피드백이면 None)
+
+    Returns:
+        갱신된 UserPromptPreference 또는 None (반영 대상이 아닌 경우)
+    """
+    if message.role != "assistant" or previous_is_helpful == is_helpful:
+        return None
+
+    # 첫 피드백이 동시에 들어와도 행은 하나만 생기고, 나머지는 잠금을 기다린 뒤 이어서 반영
+    preference = lock_preference(db, user_id, character_id)
+
+    score = 1 if is_helpful else -1
+    if previous_is_helpful is None:
+        # 새 피드백
+        _apply_feedback(preference, message.content, score, 1, 1 if is_helpful else 0)
+    else:
+        # 피드백 변경 (좋아요 ↔ 싫어요): 점수만 2만큼 이동
+        _apply_feedback(preference, message.content, 2 * score, 0, 1 if is_helpful else -1)
+
+    _refresh_learned_preferences(preference)
+    return preference
+
+
+def update_user_preferences(
+    db: Session,
+    user_id: UUID,
+    character_id: UUID
+) -> UserPromptPreference:
+    """
+    사용자 선호도 전체 재계산
+
+    누적 카운터를 피드백 기록에서 다시 만듭니다 (쿼리 2번, 카운터 초기화/보정용).
+    평소에는 record_feedback_signal이 피드백마다 카운터를 갱신합니다.
+    재계산 중 들어온 피드백 반영이 덮어써지지 않도록 커밋까지 선호도 행을 잠급니다.
+
+    Args:
+        db: 데이터베이스 세션
+        user_id: 사용자 ID
+        character_id: AI 캐릭터 ID
+
+    Returns:
+        업데이트된 UserPromptPreference
+    """
+    preference = lock_preference(db, user_id, character_id)
+
+    # 1. 대화 수
+    preference.total_conversations = db.query(func.count(Conversation.id)).filter(
+        Conversation.user_id == user_id,
+        Conversation.character_id == character_id
+    ).scalar() or 0
+
+    # 2. AI 응답에 대한 피드백 (메시지 내용과 함께 한 번에 조회)
+    feedback_rows = db.query(Message.content, MessageFeedback.is_helpful).join(
+        MessageFeedback, MessageFeedback.message_id == Message.id
+    ).join(
+        Conversation, Conversation.id == Message.conversation_id
+    ).filter(
+        Conversation.user_id == user_id,
+        Conversation.character_id == character_id,
+        MessageFeedback.user_id == user_id,
+        Message.role == "assistant"
+    ).all()
+
+    _reset_counters(preference)
+    for content, is_helpful in feedback_rows:
+        _apply_feedback(preference, content, 1 if is_helpful else -1, 1, 1 if is_helpful else 0)
+
+    _refresh_learned_preferences(preference)
+
     db.commit()
     db.refresh(preference)
 
+    invalidate_context(user_id, character_id)
+
     return preference
 
 
-def _learn_length_preference(
-    db: Session,
-    feedbacks: list,
-    conversation_ids: list
-) -> str:
+def _learn_length_preference(preference: UserPromptPreference) -> str:
     """
     응답 길이 선호도 학습
 
-    긍정 피드백을 받은 메시지의 길이 패턴을 분석합니다.
+    길이 구간별 피드백 평균 점수(긍정: 1, 부정: -1)가 가장 높은 구간을 선택합니다.
     """
-    if not feedbacks:
-        return "medium"  # 기본값
-
-    # 피드백별 메시지 길이 수집
-    length_feedbacks = {"short": [], "medium": [], "long": []}
-
-    for feedback in feedbacks:
-        message = db.query(Message).filter(Message.id == feedback.message_id).first()
-        if not message or message.role != "assistant":
-            continue
-
-        # 메시지 길이 분류
-        msg_length = len(message.content)
-        if msg_length < 100:
-            category = "short"
-        elif msg_length < 300:
-            category = "medium"
-        else:
-            category = "long"
-
-        # 피드백 점수화 (긍정: 1, 부정: -1)
-        score = 1 if feedback.is_helpful else -1
-        length_feedbacks[category].append(score)
-
-    # 각 길이 카테고리의 평균 점수 계산
     length_scores = {}
-    for category, scores in length_feedbacks.items():
-        if scores:
-            length_scores[category] = sum(scores) / len(scores)
-        else:
-            length_scores[category] = 0
+    for category in LENGTH_CATEGORIES:
+        count = getattr(preference, f"length_{category}_count") or 0
+        score = getattr(preference, f"length_{category}_score") or 0
+        length_scores[category] = score / count if count else 0
 
-    # 가장 높은 점수를 받은 길이 선택
-    if not length_scores or max(length_scores.values()) <= 0:
-        return "medium"  # 긍정 피드백이 없으면 기본값
+    # 긍정 피드백이 없으면 기본값
+    if max(length_scores.values()) <= 0:
+        return "medium"
 
     preferred = max(length_scores.items(), key=lambda x: x[1])
     return preferred[0]
 
 
-def _learn_emoji_preference(
-    db: Session,
-    feedbacks: list,
-    conversation_ids: list
-) -> str:
+def _learn_emoji_preference(preference: UserPromptPreference) -> str:
     """
     이모지 사용 선호도 학습
 
-    이모지가 포함된 메시지에 대한 피드백을 분석합니다.
+    이모지가 포함된 응답과 없는 응답의 피드백 평균 점수를 비교합니다.
     """
-    if not feedbacks:
+    if not (preference.emoji_count or preference.plain_count):
         return "moderate"  # 기본값
 
-    emoji_feedback_scores = []
-    non_emoji_feedback_scores = []
-
-    for feedback in feedbacks:
-        message = db.query(Message).filter(Message.id == feedback.message_id).first()
-        if not message or message.role != "assistant":
-            continue
-
-        # 이모지 포함 여부 간단 체크 (유니코드 범위로 검사 가능하지만 간단히 처리)
-        has_emoji = any(char in message.content for char in "😊😢😡😍🎉💪👍👎🙏")
-
-        score = 1 if feedback.is_helpful else -1
-
-        if has_emoji:
-            emoji_feedback_scores.append(score)
-        else:
-            non_emoji_feedback_scores.append(score)
-
     # 이모지 있을 때와 없을 때의 평균 점수
-    emoji_avg = (
-        sum(emoji_feedback_scores) / len(emoji_feedback_scores)
-        if emoji_feedback_scores else 0
-    )
-    non_emoji_avg = (
-        sum(non_emoji_feedback_scores) / len(non_emoji_feedback_scores)
-        if non_emoji_feedback_scores else 0
-    )
+    emoji_avg = preference.emoji_score / preference.emoji_count if preference.emoji_count else 0
+    non_emoji_avg = preference.plain_score / preference.plain_count if preference.plain_count else 0
 
     # 이모지 선호도 결정
     if emoji_avg > non_emoji_avg + 0.3:
@@ -253,40 +343,88 @@ def _calculate_confidence(feedback_count: int, conversation_count: int) -> float
     return round(confidence, 2)
 
 
-def should_update_preferences(
-    db: Session,
-    user_id: UUID,
-    character_id: UUID
-) -> bool:
+def find_stale_preferences(db: Session, batch_size: int) -> List[Tuple[UUID, UUID]]:
     """
-    선호도 업데이트가 필요한지 판단
+    갱신이 필요한 (사용자, 캐릭터) 목록
+
+    - 선호도 행이 없지만 대화가 있는 경우 (행 생성 + 대화 수 반영)
+    - 마지막 업데이트 후 STALE_AFTER_DAYS일 경과, 그 사이 새 대화나 피드백이 있음
+      (변화가 없는 사용자는 다시 계산해도 결과가 같으므로 제외)
+    - 마지막 업데이트 후 새로운 대화가 STALE_NEW_CONVERSATIONS개 이상
 
     Args:
         db: 데이터베이스 세션
-        user_id: 사용자 ID
-        character_id: AI 캐릭터 ID
+        batch_size: 최대 개수
 
     Returns:
-        업데이트 필요 여부
+        (user_id, character_id) 리스트 (오래된 순)
     """
-    preference = get_or_create_preference(db, user_id, character_id)
-
-    # 1. 최초 생성이거나 한 번도 업데이트되지 않음
-    if preference.confidence_score == 0.0:
-        return True
+    missing = db.query(Conversation.user_id, Conversation.character_id).outerjoin(
+        UserPromptPreference,
+        and_(
+            UserPromptPreference.user_id == Conversation.user_id,
+            UserPromptPreference.character_id == Conversation.character_id
+        )
+    ).filter(
+        UserPromptPreference.id.is_(None)
+    ).distinct().limit(batch_size).all()
 
-    # 2. 마지막 업데이트 후 7일 경과
-    if datetime.utcnow() - preference.last_updated > timedelta(days=7):
-        return True
+    remaining = batch_size - len(missing)
+    if remaining <= 0:
+        return [tuple(row) for row in missing]
 
-    # 3. 마지막 업데이트 후 새로운 대화가 10개 이상
     new_conversations = db.query(func.count(Conversation.id)).filter(
-        Conversation.user_id == user_id,
-        Conversation.character_id == character_id,
-        Conversation.created_at > preference.last_updated
-    ).scalar()
+        Conversation.user_id == UserPromptPreference.user_id,
+        Conversation.character_id == UserPromptPreference.character_id,
+        Conversation.created_at > UserPromptPreference.last_updated
+    ).correlate(UserPromptPreference).scalar_subquery()
+
+    has_new_conversation = exists().where(
+        Conversation.user_id == UserPromptPreference.user_id,
+        Conversation.character_id == UserPromptPreference.character_id,
+        Conversation.created_at > UserPromptPreference.last_updated
+    ).correlate(UserPromptPreference)
+
+    has_new_feedback = exists().where(
+        MessageFeedback.user_id == UserPromptPreference.user_id,
+        MessageFeedback.updated_at > UserPromptPreference.last_updated,
+        Message.id == MessageFeedback.message_id,
+        Conversation.id == Message.conversation_id,
+        Conversation.character_id == UserPromptPreference.character_id
+    ).correlate(UserPromptPreference)
+
+    stale = db.query(UserPromptPreference.user_id, UserPromptPreference.character_id).filter(
+        or_(
+            and_(
+                UserPromptPreference.last_updated < datetime.utcnow() - timedelta(days=STALE_AFTER_DAYS),
+                or_(has_new_conversation, has_new_feedback)
+            ),
+            new_conversations >= STALE_NEW_CONVERSATIONS
+        )
+    ).order_by(
+        UserPromptPreference.last_updated
+    ).limit(remaining).all()
+
+    return [tuple(row) for row in missing] + [tuple(row) for row in stale]
 
-    if new_conversations >= 10:
-        return True
 
-    return False
+def refresh_stale_preferences(db: Session, batch_size: int = 100) -> int:
+    """
+    오래된 선호도를 한 배치만큼 재계산 (선호도 갱신 워커에서 호출)
+
+    Args:
+        db: 데이터베이스 세션
+        batch_size: 한 번에 처리할 최대 개수
+
+    Returns:
+        갱신한 선호도 수
+    """
+    refreshed = 0
+    for user_id, character_id in find_stale_preferences(db, batch_size):
+        try:
+            update_user_preferences(db, user_id, character_id)
+            refreshed += 1
+        except Exception as e:
+            db.rollback()
+            print(f"⚠️ 선호도 갱신 실패 (user={user_id}, character={character_id}): {str(e)}")
+    return refreshed
@@ -0,0 +1,111 @@
+"""
+선호도 갱신 워커 - 오래된 사용자 선호도를 주기적으로 배치 재계산
+
+채팅 요청은 선호도를 읽기만 하고(캐시된 사용자 섹션), 재계산은 이 워커가 담당합니다.
+피드백은 기록 시점에 누적 카운터로 바로 반영되므로, 워커는 대화 수/신뢰도 갱신과
+선호도 행이 없는 (사용자, 캐릭터) 생성만 처리합니다.
+
+- 배치가 가득 차면 바로 다음 배치를 처리하고, 아니면 PREFERENCE_REFRESH_INTERVAL만큼 대기
+- 워커는 프로세스마다 시작되지만, 배치마다 DB 임대(worker_leases)를 갱신한 프로세스 하나만 실행
+- DB 작업은 동기 세션이므로 스레드에서 실행
+"""
+import asyncio
+import uuid
+from typing import Optional
+
+from app.core.config import settings
+from app.db.database import SessionLocal
+from app.services.preference_learning_service import refresh_stale_preferences
+from app.services.worker_lease import acquire_worker_lease, release_worker_lease
+
+
+LEASE_NAME = "preference_refresh"
+
+
+def run_preference_refresh(batch_size: int, owner: str, lease_ttl: float) -> Optional[int]:
+    """
+    임대를 가진 경우에만 선호도 갱신 배치 한 번 실행 (새 세션 사용)
+
+    Args:
+        batch_size: 한 번에 처리할 최대 개수
+        owner: 프로세스 ID
+        lease_ttl: 임대 유지 시간 (초)
+
+    Returns:
+        갱신한 선호도 수 또는 None (다른 프로세스가 임대 중)
+    """
+    db = SessionLocal()
+    try:
+        if not acquire_worker_lease(db, LEASE_NAME, owner, lease_ttl):
+            return None
+        return refresh_stale_preferences(db, batch_size)
+    finally:
+        db.close()
+
+
+def release_preference_refresh(owner: str) -> None:
+    """종료 시 임대 반납"""
+    db = SessionLocal()
+    try:
+        release_worker_lease(db, LEASE_NAME, owner)
+    finally:
+        db.close()
+
+
+class PreferenceRefreshWorker:
+    """주기적으로 오래된 선호도를 갱신하는 백그라운드 작업"""
+
+    def __init__(self, interval: float = 600.0, batch_size: int = 100, lease_ttl: Optional[float] = None):
+        self.interval = interval
+        self.batch_size = batch_size
+        # 배치 사이 대기보다 길어야 임대를 가진 프로세스가 계속 이어서 실행
+        self.lease_ttl = lease_ttl or interval * 2
+        self.owner_id = str(uuid.uuid4())
+        self._task: Optional[asyncio.Task] = None
+
+    @property
+    def running(self) -> bool:
+        return self._task is not None
+
+    async def start(self) -> None:
+        """워커 시작"""
+        if self.running:
+            return
+        self._task = asyncio.create_task(self._loop())
+
+    async def stop(self) -> None:
+        """워커 종료 (진행 중인 배치는 스레드에서 끝까지 실행됨)"""
+        if self._task is None:
+            return
+        self._task.cancel()
+        await asyncio.gather(self._task, return_exceptions=True)
+        self._task = None
+        try:
+            await asyncio.to_thread(release_preference_refresh, self.owner_id)
+        except Exception as e:
+            print(f"⚠️ 선호도 갱신 임대 반납 실패: {str(e)}")
+
+    async def _loop(self) -> None:
+        while True:
+            refreshed = None
+            try:
+                refreshed = await asyncio.to_thread(
+                    run_preference_refresh, self.batch_size, self.owner_id, self.lease_ttl
+                )
+                if refreshed:
+                    print(f"🔄 선호도 갱신: {refreshed}개")
+            except Exception as e:
+                print(f"⚠️ 선호도 갱신 배치 오류: {str(e)}")
+
+            # 밀린 작업이 남아 있으면 바로 다음 배치 처리 (임대가 없으면 대기 후 다시 시도)
+            if refreshed is None or refreshed < self.batch_size:
+                await asyncio.sleep(self.interval)
+            else:
+                await asyncio.sleep(0)
+
+
+# 전역 선호도 갱신 워커
+preference_refresh_worker = PreferenceRefreshWorker(
+    interval=settings.PREFERENCE_REFRESH_INTERVAL,
+    batch_size=settings.PREFERENCE_REFRESH_BATCH_SIZE
+)
@@ -0,0 +1,205 @@
+"""
+프롬프트 캐시 서비스 - Gemini 컨텍스트 캐시(cachedContents)로 시스템 프롬프트 고정 앞부분 재사용
+
+기본 지침, CoT, 캐릭터 역할로 이루어진 고정 앞부분은 대화 턴 사이에 바뀌지 않으므로
+한 번 cachedContents로 만들어 두고, 이후 턴에서는 변동 뒷부분과 대화 메시지만 보냅니다.
+캐시된 입력 토큰은 할인 요금으로 과금되고 첫 토큰 지연도 줄어듭니다.
+
+- 앞부분 텍스트 해시 → (캐시 이름, 모델 인스턴스, 토큰 수, 만료 시각)을 프로세스 내에 기록 (LRU)
+- 만료 직전이면 새로 생성하고, 같은 앞부분을 동시에 여러 번 만들지 않도록 생성 작업을 공유
+- 너무 짧거나 생성에 실패한 앞부분은 TTL 동안 캐시 없이 전송 (생성 재시도 폭주 방지)
+- 캐시 생성은 LLM 게이트웨이(create_cached_content)를 거쳐 동시 호출 제한과 전용 스레드 풀을 공유
+- GEMINI_CONTEXT_CACHE_ENABLED=False(기본값)면 사용하지 않음
+
+로컬에서는 fake_gemini_server.py의 cachedContents 엔드포인트로 확인할 수 있습니다.
+"""
+import asyncio
+import datetime
+import hashlib
+import time
+from collections import OrderedDict
+from dataclasses import dataclass
+from typing import Any, Dict, List, Optional, Tuple
+
+import google.generativeai as genai
+
+from app.core.config import settings
+from app.services.llm_gateway import build_generation_config, create_cached_content
+from app.services.token_counter import count_tokens
+
+
+# 서버 만료 직전의 캐시는 쓰지 않고 새로 생성 (초)
+EXPIRY_MARGIN_SECONDS = 30.0
+
+
+@dataclass
+class CachedPrefix:
+    """
+    고정 앞부분 캐시 항목
+
+    Attributes:
+        name: cachedContents 이름 (None이면 캐시하지 않는 앞부분)
+        model: 캐시를 컨텍스트로 쓰는 GenerativeModel
+        token_count: 캐시된 입력 토큰 수
+        expires_at: 로컬 만료 시각 (time.monotonic 기준)
+    """
+    name: Optional[str]
+    model: Any
+    token_count: int
+    expires_at: float
+
+
+class PromptPrefixCache:
+    """고정 앞부분 → Gemini 컨텍스트 캐시 대응표 (이벤트 루프 안에서만 사용)"""
+
+    def __init__(
+        self,
+        model_name: str,
+        ttl: int = 600,
+        min_tokens: int = 1024,
+        max_entries: int = 256
+    ):
+        self.model_name = model_name
+        self.ttl = ttl
+        self.min_tokens = min_tokens
+        self.max_entries = max_entries
+        self._entries: "OrderedDict[str, CachedPrefix]" = OrderedDict()
+        self._pending: Dict[str, asyncio.Future] = {}
+
+    def __len__(self) -> int:
+        return len(self._entries)
+
+    def _key(self, prefix: str) -> str:
+        return hashlib.sha256(f"{self.model_name}\0{prefix}".encode("utf-8")).hexdigest()
+
+    async def acquire(self, prefix: str) -> Tuple[Optional[CachedPrefix], Optional[str]]:
+        """
+        고정 앞부분의 컨텍스트 캐시 가져오기 (없으면 생성)
+
+        Args:
+            prefix: 시스템 프롬프트 고정 앞부분
+
+        Returns:
+            (CachedPrefix, "hit" | "miss") 또는 캐시를 쓰지 않으면 (None, None)
+        """
+        key = self._key(prefix)
+        entry = self._entries.get(key)
+        if entry is not None and entry.expires_at > time.monotonic():
+            self._entries.move_to_end(key)
+            return (entry, "hit") if entry.name else (None, None)
+
+        # 생성 중인 작업이 있으면 함께 기다림 (호출자가 취소되어도 생성은 끝까지 진행)
+        status = "hit"
+        task = self._pending.get(key)
+        if task is None:
+            status = "miss"
+            task = asyncio.ensure_future(self._create(key, prefix))
+            self._pending[key] = task
+            task.add_done_callback(lambda _: self._pending.pop(key, None))
+
+        entry = await asyncio.shield(task)
+        return (entry, status) if entry.name else (None, None)
+
+    def invalidate(self, prefix: str) -> None:
+        """앞부분 캐시 항목 제거 (서버에서 캐시가 사라진 경우 등)"""
+        self._entries.pop(self._key(prefix), None)
+
+    async def _create(self, key: str, prefix: str) -> CachedPrefix:
+        """cachedContents 생성 (실패/최소 크기 미달은 캐시하지 않는 항목으로 기록)"""
+        token_count = count_tokens(prefix)
+        name = None
+        model = None
+
+        if token_count >= self.min_tokens:
+            try:
+                cached = await create_cached_content(
+                    model=self.model_name,
+                    system_instruction=prefix,
+                    ttl=datetime.timedelta(seconds=self.ttl)
+                )
+                model = genai.GenerativeModel.from_cached_content(
+                    cached,
+                    generation_config=build_generation_config()
+                )
+                name = cached.name
+                token_count = cached.usage_metadata.total_token_count or token_count
+                print(f"✅ 프롬프트 캐시 생성: {name} ({token_count} 토큰)")
+            except Exception as e:
+                print(f"⚠️ 프롬프트 캐시 생성 실패, 캐시 없이 전송: {str(e)}")
+
+        entry = CachedPrefix(
+            name=name,
+            model=model,
+            token_count=token_count,
+            expires_at=time.monotonic() + self.ttl - EXPIRY_MARGIN_SECONDS
+        )
+        self._entries[key] = entry
+        self._entries.move_to_end(key)
+        while len(self._entries) > self.max_entries:
+            self._entries.popitem(last=False)
+        return entry
+
+
+_cache: Optional[PromptPrefixCache] = None
+
+
+def get_prompt_cache() -> Optional[PromptPrefixCache]:
+    """
+    설정에 따른 프롬프트 캐시 (싱글톤)
+
+    Returns:
+        PromptPrefixCache 또는 None (GEMINI_CONTEXT_CACHE_ENABLED=False)
+    """
+    global _cache
+    if not settings.GEMINI_CONTEXT_CACHE_ENABLED:
+        return None
+    if _cache is None:
+        _cache = PromptPrefixCache(
+            model_name=settings.LLM_MODEL,
+            ttl=settings.GEMINI_CONTEXT_CACHE_TTL,
+            min_tokens=settings.GEMINI_CONTEXT_CACHE_MIN_TOKENS,
+            max_entries=settings.GEMINI_CONTEXT_CACHE_MAX_ENTRIES
+        )
+    return _cache
+
+
+async def apply_prompt_cache(
+    contents: List[Dict[str, Any]],
+    prompt_prefix: Optional[str]
+) -> Tuple[Any, List[Dict[str, Any]], Dict[str, Any]]:
+    """
+    첫 메시지 맨 앞의 고정 앞부분을 컨텍스트 캐시로 대체
+
+    Args:
+        contents: Gemini 형식 메시지 [{"role", "parts"}] (첫 메시지가 고정 앞부분으로 시작)
+        prompt_prefix: 시스템 프롬프트 고정 앞부분
+
+    Returns:
+        (캐시 모델 또는 None, 앞부분을 뺀 메시지, {"prompt_cache": "hit"|"miss"|None, "cached_tokens"})
+    """
+    info = {"prompt_cache": None, "cached_tokens": 0}
+    cache = get_prompt_cache()
+    if cache is None or not prompt_prefix or not contents:
+        return None, contents, info
+
+    first = contents[0]
+    if first["role"] != "user" or not first["parts"].startswith(prompt_prefix):
+        return None, contents, info
+
+    entry, status = await cache.acquire(prompt_prefix)
+    if entry is None:
+        return None, contents, info
+
+    info["prompt_cache"] = status
+    # 생성 직후(miss)는 캐시 생성 비용이 들므로 절약분 없음
+    info["cached_tokens"] = entry.token_count if status == "hit" else 0
+
+    remainder = first["parts"][len(prompt_prefix):].lstrip("\n")
+    return entry.model, [{"role": "user", "parts": remainder}] + contents[1:], info
+
+
+def invalidate_prompt_cache(prompt_prefix: Optional[str]) -> None:
+    """고정 앞부분 캐시 항목 제거 (다음 요청에서 새로 생성)"""
+    cache = get_prompt_cache()
+    if cache is not None and prompt_prefix:
+        cache.invalidate(prompt_prefix)
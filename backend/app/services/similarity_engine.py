@@ -0,0 +1,174 @@
+"""
+유사도 점수 엔진 - 해시된 문자 n-gram 희소 행렬 기반 벡터화 Jaccard
+
+한국어는 교착어라 공백 토큰("불안해요" vs "불안해서")이 거의 겹치지 않으므로,
+어절 내부의 문자 2/3-gram을 특징으로 사용합니다.
+
+- 후보 문장들을 (후보 수 × 특징 수) 이진 CSR 행렬로 한 번만 구축
+- 현재 메시지와 전체 후보의 Jaccard를 희소 행렬-벡터 곱 한 번으로 계산
+- top-k는 argpartition으로 선택
+"""
+import zlib
+from typing import Iterable, List, Optional, Sequence, Set, Tuple
+
+import numpy as np
+from scipy import sparse
+
+
+DEFAULT_NGRAM_SIZES = (2, 3)
+DEFAULT_N_FEATURES = 2 ** 18
+
+
+def char_ngrams(text: str, ngram_sizes: Sequence[int] = DEFAULT_NGRAM_SIZES) -> Set[str]:
+    """
+    어절 단위 문자 n-gram 추출
+
+    어절 앞뒤에 경계 표시(공백)를 붙여 "불안" 같은 짧은 어절도 특징을 갖도록 합니다.
+
+    Args:
+        text: 원문
+        ngram_sizes: n-gram 길이 목록
+
+    Returns:
+        n-gram 집합
+    """
+    grams = set()
+    if not text:
+        return grams
+
+    for word in text.lower().split():
+        padded = f" {word} "
+        for n in ngram_sizes:
+            if len(padded) < n:
+                continue
+            for i in range(len(padded) - n + 1):
+                grams.add(padded[i:i + n])
+    return grams
+
+
+def hash_features(grams: Iterable[str], n_features: int = DEFAULT_N_FEATURES) -> np.ndarray:
+    """
+    n-gram을 특징 인덱스로 해싱 (프로세스 간 안정적인 crc32 사용)
+
+    Args:
+        grams: n-gram 목록
+        n_features: 특징 공간 크기
+
+    Returns:
+        정렬된 고유 특징 인덱스 배열
+    """
+    indices = [zlib.crc32(gram.encode("utf-8")) % n_features for gram in grams]
+    return np.unique(np.asarray(indices, dtype=np.int64))
+
+
+class SimilarityMatrix:
+    """
+    후보 문장들의 해시된 n-gram 이진 행렬
+
+    사용 예시:
+        matrix = SimilarityMatrix.build(["요즘 너무 불안해요", ...])
+        scores = matrix.jaccard("불안해서 잠이 안 와요")
+        top = matrix.top_k(scores, k=3)
+    """
+
+    def __init__(self, matrix: sparse.csr_matrix, n_features: int, ngram_sizes: Sequence[int]):
+        self.matrix = matrix
+        self.n_features = n_features
+        self.ngram_sizes = tuple(ngram_sizes)
+        # 후보별 특징 수 (|A|)
+        self.row_sizes = np.diff(matrix.indptr).astype(np.float64)
+
+    @classmethod
+    def build(
+        cls,
+        texts: Sequence[str],
+        n_features: int = DEFAULT_N_FEATURES,
+        ngram_sizes: Sequence[int] = DEFAULT_NGRAM_SIZES
+    ) -> "SimilarityMatrix":
+        """
+        후보 문장 목록으로 행렬 구축
+
+        Args:
+            texts: 후보 문장 목록
+            n_features: 특징 공간 크기
+            ngram_sizes: n-gram 길이 목록
+
+        Returns:
+            SimilarityMatrix
+        """
+        indptr = [0]
+        indices: List[np.ndarray] = []
+        for text in texts:
+            features = hash_features(char_ngrams(text, ngram_sizes), n_features)
+            indices.append(features)
+            indptr.append(indptr[-1] + len(features))
+
+        column_indices = np.concatenate(indices) if indices else np.zeros(0, dtype=np.int64)
+        data = np.ones(len(column_indices), dtype=np.float32)
+        matrix = sparse.csr_matrix(
+            (data, column_indices, np.asarray(indptr, dtype=np.int64)),
+            shape=(len(texts), n_features)
+        )
+        return cls(matrix, n_features, ngram_sizes)
+
+    def __len__(self) -> int:
+        return self.matrix.shape[0]
+
+    def query_vector(self, text: str) -> np.ndarray:
+        """질의 문장의 특징 인덱스"""
+        return hash_features(char_ngrams(text, self.ngram_sizes), self.n_features)
+
+    def jaccard(self, text: str) -> np.ndarray:
+        """
+        질의 문장과 전체 후보 간 Jaccard 유사도 (벡터 연산 한 번)
+
+        Args:
+            text: 질의 문장
+
+        Returns:
+            후보별 유사도 배열 (0.0-1.0)
+        """
+        query = self.query_vector(text)
+        if len(self) == 0 or len(query) == 0:
+            return np.zeros(len(self), dtype=np.float64)
+
+        # |A ∩ B| = 후보 행렬(CSR) × 질의 이진 벡터
+        # (밀집 벡터와의 곱이 희소 열 벡터와의 곱보다 오버헤드가 훨씬 작음)
+        query_vector = np.zeros(self.n_features, dtype=np.float32)
+        query_vector[query] = 1.0
+        intersection = (self.matrix @ query_vector).astype(np.float64)
+        # 질의 특징이 하나 이상이므로 union > 0
+        union = self.row_sizes + len(query) - intersection
+        return intersection / union
+
+    @staticmethod
+    def top_k(
+        scores: np.ndarray,
+        k: int,
+        threshold: Optional[float] = None
+    ) -> List[Tuple[int, float]]:
+        """
+        상위 k개 후보 선택
+
+        Args:
+            scores: 후보별 점수
+            k: 선택할 개수
+            threshold: 최소 점수 (선택)
+
+        Returns:
+            [(후보 인덱스, 점수), ...] 점수 내림차순
+        """
+        if k <= 0 or len(scores) == 0:
+            return []
+
+        if k < len(scores):
+            candidates = np.argpartition(-scores, k - 1)[:k]
+        else:
+            candidates = np.arange(len(scores))
+        ordered = candidates[np.argsort(-scores[candidates], kind="stable")]
+
+        return [
+            (int(index), float(scores[index]))
+            for index in ordered
+            if threshold is None or scores[index] >= threshold
+        ]
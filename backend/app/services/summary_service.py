@@ -1,20 +1,47 @@
 """
 대화 요약 서비스 - 자동 대화 요약 및 토큰 최적화
+
+- 메시지 20개마다 구간 요약 생성, 대화의 summarized_until(요약 워터마크)을 이동
+- 구간 요약이 쌓이면 오래된 것을 대화당 하나의 누적 요약으로 합침 (계층적 요약)
+- 컨텍스트에는 누적 요약 + 최근 구간 요약(최대 3개)만 사용되므로 긴 대화에서도 크기가 일정
 """
-import google.generativeai as genai
 from sqlalchemy.orm import Session
 from typing import List, Optional
 from uuid import UUID
 
 from app.models.message import Message
-from app.models.conversation_summary import ConversationSummary
-from app.core.config import settings
+from app.models.conversation import Conversation
+from app.models.conversation_summary import (
+    ConversationSummary,
+    SUMMARY_LEVEL_CHUNK,
+    SUMMARY_LEVEL_ROLLING
+)
+from app.services.context_cache import invalidate_context
+from app.services.llm_client import generate_text
+from app.services.token_counter import count_tokens
+
+
+# 구간 요약 단위 (메시지 수)
+SUMMARY_CHUNK_SIZE = 20
+# 누적 요약에 합치지 않고 유지할 최대 구간 요약 수 (넘으면 최신 1개만 남기고 합침)
+MAX_CHUNK_SUMMARIES = 3
+
+
+def _pending_messages_query(db: Session, conversation_id: UUID, summarized_until):
+    """요약 워터마크 이후 메시지 (시간순, 대화별 created_at 인덱스 범위 조회)"""
+    query = db.query(Message).filter(Message.conversation_id == conversation_id)
+    if summarized_until is not None:
+        query = query.filter(Message.created_at > summarized_until)
+    return query.order_by(Message.created_at)
 
 
 def check_summary_trigger(db: Session, conversation_id: UUID) -> bool:
     """
     요약 트리거 조건 확인 (20개 메시지마다)
 
+    전체 메시지/요약을 세지 않고, 대화의 요약 워터마크 이후 메시지를
+    최대 SUMMARY_CHUNK_SIZE개까지만 확인합니다 (대화 길이와 무관).
+
     Args:
         db: 데이터베이스 세션
         conversation_id: 대화 ID
@@ -22,22 +49,16 @@ def check_summary_trigger(db: Session, conversation_id: UUID) -> bool:
     Returns:
         요약이 필요한지 여부
     """
-    # 전체 메시지 수
-    total_messages = db.query(Message).filter(
-        Message.conversation_id == conversation_id
-    ).count()
-
-    # 이미 요약된 메시지 수
-    summaries = db.query(ConversationSummary).filter(
-        ConversationSummary.conversation_id == conversation_id
-    ).all()
-
-    summarized_count = sum(s.message_count for s in summaries)
+    summarized_until = db.query(Conversation.summarized_until).filter(
+        Conversation.id == conversation_id
+    ).scalar()
 
     # 미요약 메시지가 20개 이상이면 요약 필요
-    unsummarized_count = total_messages - summarized_count
+    pending_count = _pending_messages_query(
+        db, conversation_id, summarized_until
+    ).with_entities(Message.id).limit(SUMMARY_CHUNK_SIZE).count()
 
-    return unsummarized_count >= 20
+    return pending_count >= SUMMARY_CHUNK_SIZE
 
 
 async def generate_summary(messages: List[Message]) -> str:
@@ -50,15 +71,6 @@ async def generate_summary(messages: List[Message]) -> str:
     Returns:
         요약 텍스트
     """
-    # Gemini 모델 설정
-    model = genai.GenerativeModel(
-        model_name=settings.LLM_MODEL,
-        generation_config={
-            "temperature": 0.3,  # 요약은 좀 더 정확하게
-            "max_output_tokens": 500,
-        }
-    )
-
     # 메시지를 텍스트로 변환
     conversation_text = "\n".join([
         f"{'사용자' if msg.role == 'user' else 'AI'}: {msg.content}"
@@ -80,14 +92,95 @@ async def generate_summary(messages: List[Message]) -> str:
 요약 (3-5문장):"""
 
     try:
-        response = model.generate_content(prompt)
-        return response.text
+        return await generate_text(
+            prompt,
+            temperature=0.3,  # 요약은 좀 더 정확하게
+            max_output_tokens=500,
+            purpose="summary"
+        )
     except Exception as e:
         print(f"요약 생성 오류: {str(e)}")
         # 오류 시 간단한 요약 반환
         return f"{len(messages)}개의 메시지가 교환되었습니다."
 
 
+async def generate_rolling_summary(
+    previous_summary: Optional[str],
+    chunk_summaries: List[str]
+) -> Optional[str]:
+    """
+    누적 요약과 이후 구간 요약들을 하나의 누적 요약으로 합치기
+
+    Args:
+        previous_summary: 기존 누적 요약 (없으면 None)
+        chunk_summaries: 합칠 구간 요약 (시간순)
+
+    Returns:
+        새 누적 요약 텍스트 또는 None (생성 실패 시, 구간 요약을 그대로 유지)
+    """
+    sections = []
+    if previous_summary:
+        sections.append(f"[지금까지의 요약]\n{previous_summary}")
+    sections.extend(
+        f"[이후 대화 {index}]\n{summary}"
+        for index, summary in enumerate(chunk_summaries, start=1)
+    )
+    summaries_text = "\n\n".join(sections)
+
+    prompt = f"""다음은 한 대화를 시간순으로 나눠 요약한 내용입니다.
+전체 흐름을 하나의 요약으로 합쳐주세요.
+
+유지할 내용:
+- 사용자의 감정 변화
+- 반복되거나 중요한 주제
+- AI가 제공한 조언과 사용자의 반응
+- 중요한 결정이나 인사이트
+
+{summaries_text}
+
+통합 요약 (5-7문장):"""
+
+    try:
+        return await generate_text(
+            prompt,
+            temperature=0.3,
+            max_output_tokens=600,
+            purpose="summary"
+        )
+    except Exception as e:
+        print(f"⚠️ 누적 요약 생성 오류, 구간 요약 유지: {str(e)}")
+        return None
+
+
+def _fold_into_rolling_summary(
+    db: Session,
+    conversation_id: UUID,
+    rolling: Optional[ConversationSummary],
+    to_fold: List[ConversationSummary],
+    rolling_text: str
+) -> None:
+    """구간 요약을 누적 요약(대화당 1개)에 반영하고 삭제 (커밋은 호출자가 수행)"""
+    folded_count = sum(chunk.message_count for chunk in to_fold)
+    if rolling:
+        rolling.summary = rolling_text
+        rolling.message_count += folded_count
+        rolling.end_message_id = to_fold[-1].end_message_id
+    else:
+        db.add(ConversationSummary(
+            conversation_id=conversation_id,
+            summary=rolling_text,
+            message_count=folded_count,
+            level=SUMMARY_LEVEL_ROLLING,
+            start_message_id=to_fold[0].start_message_id,
+            end_message_id=to_fold[-1].end_message_id
+        ))
+
+    for chunk in to_fold:
+        db.delete(chunk)
+
+    print(f"✅ 누적 요약 갱신: 구간 요약 {len(to_fold)}개 ({folded_count}개 메시지) 합침")
+
+
 async def create_conversation_summary(
     db: Session,
     conversation_id: UUID
@@ -95,6 +188,13 @@ async def create_conversation_summary(
     """
     대화 요약 자동 생성
 
+    요약 워터마크 이후 메시지 20개를 구간 요약으로 저장하고 워터마크를 옮깁니다.
+    구간 요약이 MAX_CHUNK_SUMMARIES개를 넘으면 최신 1개만 남기고 나머지를 누적 요약에 합칩니다.
+    합치는 입력은 누적 요약 + 구간 요약 몇 개로 크기가 일정하므로,
+    대화가 길어져도 요약 비용과 컨텍스트 크기가 늘지 않습니다.
+
+    LLM 호출은 모두 쓰기 전에 끝내고, 쓰기는 짧은 트랜잭션 하나로 처리합니다.
+
     Args:
         db: 데이터베이스 세션
         conversation_id: 대화 ID
@@ -102,40 +202,83 @@ async def create_conversation_summary(
     Returns:
         생성된 요약 객체 또는 None
     """
-    # 이미 요약된 메시지 수 계산
-    existing_summaries = db.query(ConversationSummary).filter(
-        ConversationSummary.conversation_id == conversation_id
-    ).all()
-
-    summarized_count = sum(s.message_count for s in existing_summaries)
+    conversation = db.query(Conversation).filter(Conversation.id == conversation_id).first()
+    if not conversation:
+        return None
 
-    # 미요약 메시지 가져오기
-    all_messages = db.query(Message).filter(
-        Message.conversation_id == conversation_id
-    ).order_by(Message.created_at).all()
+    summarized_until = conversation.summarized_until
 
-    # 요약할 메시지 (20개씩)
-    messages_to_summarize = all_messages[summarized_count:summarized_count + 20]
+    # 요약할 메시지 (워터마크 이후 20개)
+    messages_to_summarize = _pending_messages_query(
+        db, conversation_id, summarized_until
+    ).limit(SUMMARY_CHUNK_SIZE).all()
 
-    if len(messages_to_summarize) < 20:
+    if len(messages_to_summarize) < SUMMARY_CHUNK_SIZE:
         return None  # 20개 미만이면 요약하지 않음
 
     # 요약 생성
     summary_text = await generate_summary(messages_to_summarize)
 
+    # 새 구간 요약을 더하면 한도를 넘는 경우, 기존 구간 요약을 모두 누적 요약에 합침
+    chunks = db.query(ConversationSummary).filter(
+        ConversationSummary.conversation_id == conversation_id,
+        ConversationSummary.level == SUMMARY_LEVEL_CHUNK
+    ).order_by(ConversationSummary.created_at).all()
+
+    rolling = None
+    rolling_text = None
+    if len(chunks) + 1 > MAX_CHUNK_SUMMARIES:
+        rolling = db.query(ConversationSummary).filter(
+            ConversationSummary.conversation_id == conversation_id,
+            ConversationSummary.level == SUMMARY_LEVEL_ROLLING
+        ).first()
+        rolling_text = await generate_rolling_summary(
+            rolling.summary if rolling else None,
+            [chunk.summary for chunk in chunks]
+        )
+
+    # 워터마크 이동 (같은 구간을 다른 작업이 먼저 요약했으면 중단)
+    # updated_at을 그대로 지정해 onupdate로 대화 최근 수정 순서가 바뀌지 않도록 함
+    watermark_filter = (
+        Conversation.summarized_until.is_(None)
+        if summarized_until is None
+        else Conversation.summarized_until == summarized_until
+    )
+    moved = db.query(Conversation).filter(
+        Conversation.id == conversation_id,
+        watermark_filter
+    ).update(
+        {
+            Conversation.summarized_until: messages_to_summarize[-1].created_at,
+            Conversation.updated_at: Conversation.updated_at
+        },
+        synchronize_session=False
+    )
+    if not moved:
+        db.rollback()
+        return None
+
     # 요약 저장
     summary = ConversationSummary(
         conversation_id=conversation_id,
         summary=summary_text,
         message_count=len(messages_to_summarize),
+        level=SUMMARY_LEVEL_CHUNK,
         start_message_id=messages_to_summarize[0].id,
         end_message_id=messages_to_summarize[-1].id
     )
-
     db.add(summary)
+
+    # 누적 요약 생성에 실패하면 구간 요약을 그대로 두고 다음 요약 때 다시 합침
+    if rolling_text:
+        _fold_into_rolling_summary(db, conversation_id, rolling, chunks, rolling_text)
+
     db.commit()
     db.refresh(summary)
 
+    # 다른 대화 요약(합쳐진 누적 요약 포함)이 캐시되어 있으므로 컨텍스트 캐시 무효화
+    invalidate_context(conversation.user_id, conversation.character_id)
+
     print(f"✅ 대화 요약 생성: {len(messages_to_summarize)}개 메시지")
 
     return summary
@@ -162,14 +305,14 @@ def get_token_usage_stats(db: Session, conversation_id: UUID) -> dict:
         ConversationSummary.conversation_id == conversation_id
     ).all()
 
-    # 토큰 추정
+    # 토큰 계산 (저장된 메시지 토큰 수 재사용)
     total_message_tokens = sum(
-        len(msg.content.split()) + len(msg.content) // 4
+        msg.token_count if msg.token_count is not None else count_tokens(msg.content)
         for msg in messages
     )
 
     total_summary_tokens = sum(
-        len(s.summary.split()) + len(s.summary) // 4
+        count_tokens(s.summary)
         for s in summaries
     )
 
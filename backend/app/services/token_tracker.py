@@ -113,10 +113,14 @@ class TokenTracker:
         output_tokens: int,
         conversation_id: Optional[UUID] = None,
         model_name: Optional[str] = None,
-        purpose: Optional[str] = "chat"
+        purpose: Optional[str] = "chat",
+        prompt_cache_hit: Optional[bool] = None,
+        cached_input_tokens: int = 0
     ) -> TokenUsage:
         """
         토큰 사용 내역 기록
+
+        prompt_cache_hit/cached_input_tokens는 Gemini 컨텍스트 캐시 적중 여부와 절약한 입력 토큰입니다.
         """
         total = input_tokens + output_tokens
         
@@ -128,7 +132,9 @@ class TokenTracker:
             output_tokens=output_tokens,
             total_tokens=total,
             model_name=model_name,
-            purpose=purpose
+            purpose=purpose,
+            prompt_cache_hit=prompt_cache_hit,
+            cached_input_tokens=cached_input_tokens
         )
         db.add(usage)
         
@@ -0,0 +1,133 @@
+"""
+벡터 인덱스 - NumPy 기반 근사 최근접 이웃(IVF) 검색
+
+- 벡터 수가 적으면 전체 내적(정확 검색)
+- 많으면 k-means로 nlist개 클러스터를 만들고, 질의와 가까운 nprobe개 클러스터만 검색
+- 벡터는 L2 정규화되어 있다고 가정 (내적 = 코사인 유사도)
+"""
+from typing import List, Optional, Tuple
+
+import numpy as np
+from scipy import sparse
+
+from app.services.similarity_engine import SimilarityMatrix
+
+
+class VectorIndex:
+    """
+    정규화된 벡터 집합에 대한 최근접 이웃 검색
+
+    사용 예시:
+        index = VectorIndex(embed_texts(texts))
+        results = index.search(embed_texts([query])[0], k=5)  # [(행 번호, 코사인), ...]
+    """
+
+    def __init__(
+        self,
+        vectors: np.ndarray,
+        ivf_min_size: int = 4096,
+        nlist: Optional[int] = None,
+        nprobe: int = 8,
+        kmeans_iterations: int = 8,
+        seed: int = 0
+    ):
+        self.vectors = np.ascontiguousarray(vectors, dtype=np.float32)
+        self.nprobe = nprobe
+        self.centroids: Optional[np.ndarray] = None
+        # IVF: 클러스터 순으로 재배열한 벡터와 원래 행 번호, 클러스터 경계
+        self.list_vectors: Optional[np.ndarray] = None
+        self.list_ids: Optional[np.ndarray] = None
+        self.list_bounds: Optional[np.ndarray] = None
+
+        if len(self.vectors) >= ivf_min_size:
+            nlist = nlist or int(np.sqrt(len(self.vectors)))
+            self._train(nlist, kmeans_iterations, seed)
+
+    def __len__(self) -> int:
+        return len(self.vectors)
+
+    @property
+    def is_approximate(self) -> bool:
+        return self.centroids is not None
+
+    def _assign(self, centroids: np.ndarray, chunk_size: int = 8192) -> np.ndarray:
+        """각 벡터를 가장 가까운 중심에 배정 (메모리 절약을 위해 청크 단위)"""
+        assignments = np.empty(len(self.vectors), dtype=np.int64)
+        for start in range(0, len(self.vectors), chunk_size):
+            chunk = self.vectors[start:start + chunk_size]
+            assignments[start:start + chunk_size] = np.argmax(chunk @ centroids.T, axis=1)
+        return assignments
+
+    def _train(self, nlist: int, iterations: int, seed: int) -> None:
+        """구면 k-means로 클러스터 중심 학습 후 역색인 구성"""
+        rng = np.random.default_rng(seed)
+        centroids = self.vectors[rng.choice(len(self.vectors), size=nlist, replace=False)].copy()
+
+        assignments = self._assign(centroids)
+        for _ in range(iterations):
+            # 클러스터별 벡터 합 = (클러스터 × 벡터) 원-핫 희소 행렬 × 벡터
+            membership = sparse.csr_matrix(
+                (np.ones(len(self.vectors), dtype=np.float32), (assignments, np.arange(len(self.vectors)))),
+                shape=(nlist, len(self.vectors))
+            )
+            sums = np.asarray(membership @ self.vectors, dtype=np.float32)
+            counts = np.bincount(assignments, minlength=nlist)
+
+            # 빈 클러스터는 임의의 벡터로 다시 시작
+            empty = counts == 0
+            if empty.any():
+                sums[empty] = self.vectors[rng.choice(len(self.vectors), size=int(empty.sum()))]
+
+            norms = np.linalg.norm(sums, axis=1, keepdims=True)
+            norms[norms == 0] = 1.0
+            centroids = (sums / norms).astype(np.float32)
+            assignments = self._assign(centroids)
+
+        # 같은 클러스터 벡터를 연속 메모리에 두어 검색 시 복사 없이 슬라이스로 계산
+        self.centroids = centroids
+        order = np.argsort(assignments, kind="stable")
+        self.list_vectors = np.ascontiguousarray(self.vectors[order])
+        self.list_ids = order
+        self.list_bounds = np.searchsorted(assignments[order], np.arange(nlist + 1))
+
+    def search(
+        self,
+        query: np.ndarray,
+        k: int,
+        threshold: Optional[float] = None
+    ) -> List[Tuple[int, float]]:
+        """
+        최근접 이웃 검색
+
+        Args:
+            query: 정규화된 질의 벡터
+            k: 반환할 개수
+            threshold: 최소 코사인 유사도 (선택)
+
+        Returns:
+            [(행 번호, 코사인 유사도), ...] 유사도 내림차순
+        """
+        if len(self) == 0 or k <= 0:
+            return []
+
+        query = query.astype(np.float32, copy=False)
+        if not self.is_approximate:
+            return SimilarityMatrix.top_k(self.vectors @ query, k, threshold)
+
+        nprobe = min(self.nprobe, len(self.centroids))
+        probes = np.argpartition(-(self.centroids @ query), nprobe - 1)[:nprobe]
+
+        ids = []
+        scores = []
+        for probe in probes:
+            start, end = self.list_bounds[probe], self.list_bounds[probe + 1]
+            if start == end:
+                continue
+            ids.append(self.list_ids[start:end])
+            scores.append(self.list_vectors[start:end] @ query)
+        if not ids:
+            return []
+
+        ids = np.concatenate(ids)
+        local = SimilarityMatrix.top_k(np.concatenate(scores), k, threshold)
+        return [(int(ids[i]), score) for i, score in local]
@@ -0,0 +1,52 @@
+"""
+워커 임대 서비스 - 여러 프로세스(uvicorn workers, 여러 서버) 중 하나만 주기 작업을 실행
+
+worker_leases 행 하나를 upsert로 가져가며, 만료 시각 비교는 DB 시계(now())로 해
+서버 간 시계 차이의 영향을 받지 않습니다.
+"""
+from datetime import timedelta
+
+from sqlalchemy import func, or_, update
+from sqlalchemy.dialects.postgresql import insert
+from sqlalchemy.orm import Session
+
+from app.models.worker_lease import WorkerLease
+
+
+def acquire_worker_lease(db: Session, name: str, owner: str, ttl_seconds: float) -> bool:
+    """
+    임대 획득 또는 갱신 (없거나, 만료됐거나, 이미 내 것이면 성공)
+
+    Args:
+        db: 데이터베이스 세션
+        name: 워커 이름
+        owner: 프로세스 ID
+        ttl_seconds: 임대 유지 시간 (초)
+
+    Returns:
+        임대를 가졌으면 True
+    """
+    expires_at = func.now() + timedelta(seconds=ttl_seconds)
+    stmt = insert(WorkerLease).values(
+        name=name,
+        owner=owner,
+        expires_at=expires_at
+    ).on_conflict_do_update(
+        index_elements=[WorkerLease.name],
+        set_={"owner": owner, "expires_at": expires_at},
+        where=or_(WorkerLease.owner == owner, WorkerLease.expires_at < func.now())
+    )
+    result = db.execute(stmt)
+    db.commit()
+    return result.rowcount == 1
+
+
+def release_worker_lease(db: Session, name: str, owner: str) -> None:
+    """내 임대를 바로 만료시켜 다른 프로세스가 이어받도록 함"""
+    db.execute(
+        update(WorkerLease).where(
+            WorkerLease.name == name,
+            WorkerLease.owner == owner
+        ).values(expires_at=func.now())
+    )
+    db.commit()
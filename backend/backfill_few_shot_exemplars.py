@@ -0,0 +1,37 @@
+"""
+기존 메시지 피드백으로 Few-shot 예제 인덱스(few_shot_exemplars) 구축
+
+few_shot_exemplars 테이블 생성 후 한 번 실행합니다. (이미 인덱스된 메시지는 건너뜀)
+감정(emotion)은 비워두며, 이후 피드백이 기록되는 예제부터 백그라운드로 채워집니다.
+"""
+import sys
+from pathlib import Path
+
+backend_dir = Path(__file__).parent
+sys.path.insert(0, str(backend_dir))
+
+from app.db.database import engine, SessionLocal
+from app.models.few_shot_exemplar import FewShotExemplar
+from app.services.few_shot_index_service import rebuild_exemplar_index
+
+
+def backfill_few_shot_exemplars():
+    """few_shot_exemplars 테이블 생성 및 기존 긍정 피드백 인덱싱"""
+    print("Creating few_shot_exemplars table...")
+    FewShotExemplar.__table__.create(bind=engine, checkfirst=True)
+
+    db = SessionLocal()
+    try:
+        print("Indexing helpful feedback...")
+        added = rebuild_exemplar_index(db)
+        print(f"✅ {added}개의 예제가 인덱스에 추가되었습니다.")
+    except Exception as e:
+        db.rollback()
+        print(f"❌ Error: {e}")
+        raise
+    finally:
+        db.close()
+
+
+if __name__ == "__main__":
+    backfill_few_shot_exemplars()
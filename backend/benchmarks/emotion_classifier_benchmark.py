@@ -0,0 +1,101 @@
+"""
+로컬 감정 분류기 벤치마크 (LLM 호출 절감률 / 라벨 일치율 / 분류 지연 시간)
+
+라벨 데이터(benchmarks/fixtures/emotion_messages.jsonl)를 분류해 확신도 임계값별로
+- 절감: 로컬 분류로 끝나 LLM을 호출하지 않은 메시지 비율
+- 로컬 일치: 로컬로 처리한 메시지 중 라벨과 감정이 같은 비율
+- 스타일 일치: 로컬로 처리한 메시지 중 응답 스타일(response_style)이 같은 비율
+- 전체 일치: 전체 메시지 중 로컬 분류가 라벨과 감정이 같은 비율 (LLM으로 넘긴 메시지는 포함하지 않음)
+- LLM 위임: 확신도가 임계값보다 낮아 LLM으로 넘긴 메시지 비율
+을 출력합니다. 라벨은 detect_emotion 프롬프트 기준으로 사람이 붙였습니다.
+
+사용법:
+    python benchmarks/emotion_classifier_benchmark.py
+    python benchmarks/emotion_classifier_benchmark.py --split all --thresholds 0.4 0.6 0.8
+"""
+import argparse
+import statistics
+import sys
+import time
+from pathlib import Path
+
+backend_dir = Path(__file__).resolve().parent.parent
+sys.path.insert(0, str(backend_dir))
+
+from app.services.emotion_classifier import (
+    RESPONSE_STYLES,
+    EmotionClassifier,
+    load_labelled_messages,
+)
+
+
+DEFAULT_DATA_PATH = Path(__file__).resolve().parent / "fixtures" / "emotion_messages.jsonl"
+
+
+def evaluate(classifier: EmotionClassifier, samples, thresholds):
+    predictions = [classifier.predict(message) for message, _ in samples]
+    rows = []
+    for threshold in thresholds:
+        local = [
+            (prediction, label) for prediction, (_, label) in zip(predictions, samples)
+            if prediction.confidence >= threshold
+        ]
+        emotion_hits = sum(1 for prediction, label in local if prediction.emotion == label)
+        style_hits = sum(
+            1 for prediction, label in local if RESPONSE_STYLES[prediction.emotion] == RESPONSE_STYLES[label]
+        )
+        escalated = len(samples) - len(local)
+        rows.append({
+            "threshold": threshold,
+            "saved": len(local) / len(samples),
+            "local_agreement": emotion_hits / len(local) if local else 0.0,
+            "style_agreement": style_hits / len(local) if local else 0.0,
+            "overall_agreement": emotion_hits / len(samples),
+            "escalation": escalated / len(samples),
+        })
+    return rows
+
+
+def measure_latency(classifier: EmotionClassifier, samples, repeat: int) -> float:
+    """메시지당 분류 시간 중앙값 (마이크로초)"""
+    timings = []
+    for _ in range(repeat):
+        for message, _ in samples:
+            start = time.perf_counter()
+            classifier.predict(message)
+            timings.append((time.perf_counter() - start) * 1_000_000)
+    return statistics.median(timings)
+
+
+def main():
+    parser = argparse.ArgumentParser(description="로컬 감정 분류기 벤치마크")
+    parser.add_argument("--data", type=Path, default=DEFAULT_DATA_PATH)
+    parser.add_argument("--split", default="test", help="평가할 분할 (train | test | all)")
+    parser.add_argument("--thresholds", type=float, nargs="+", default=[0.0, 0.4, 0.5, 0.6, 0.7, 0.8])
+    parser.add_argument("--repeat", type=int, default=20)
+    args = parser.parse_args()
+
+    samples = load_labelled_messages(args.data, None if args.split == "all" else args.split)
+    print(f"라벨 데이터: {len(samples)}개 ({args.split})")
+
+    for model_label, classifier in (
+        ("감정 사전만", EmotionClassifier()),
+        ("사전 + 학습 가중치", EmotionClassifier.load()),
+    ):
+        print()
+        print(f"[{model_label}] 분류 지연 시간 중앙값: {measure_latency(classifier, samples, args.repeat):.1f}µs")
+        print(
+            f"{'임계값':>6} | {'LLM 절감':>8} | {'로컬 일치':>8} | {'스타일 일치':>10} | "
+            f"{'전체 일치':>8} | {'LLM 위임':>8}"
+        )
+        print("-" * 67)
+        for row in evaluate(classifier, samples, args.thresholds):
+            print(
+                f"{row['threshold']:>6.2f} | {row['saved']:>8.1%} | {row['local_agreement']:>8.1%} | "
+                f"{row['style_agreement']:>10.1%} | {row['overall_agreement']:>8.1%} | "
+                f"{row['escalation']:>8.1%}"
+            )
+
+
+if __name__ == "__main__":
+    main()
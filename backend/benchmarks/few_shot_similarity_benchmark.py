@@ -0,0 +1,99 @@
+"""
+Few-shot 유사도 점수 벤치마크
+
+기존 방식(후보마다 공백 토큰 set Jaccard를 파이썬 루프로 계산)과
+SimilarityMatrix(해시된 문자 n-gram 희소 행렬, 벡터 연산 한 번)를 비교합니다.
+
+사용법:
+    python benchmarks/few_shot_similarity_benchmark.py
+    python benchmarks/few_shot_similarity_benchmark.py --sizes 100 10000 100000 --queries 20
+"""
+import argparse
+import random
+import sys
+import time
+from pathlib import Path
+
+backend_dir = Path(__file__).resolve().parent.parent
+sys.path.insert(0, str(backend_dir))
+
+from app.services.similarity_engine import SimilarityMatrix
+
+
+SUBJECTS = ["요즘", "오늘", "어제", "회사에서", "학교에서", "집에서", "친구랑", "가족이랑", "밤마다", "주말에"]
+TOPICS = ["일이", "시험이", "관계가", "잠이", "돈 문제가", "건강이", "미래가", "연애가", "상사가", "과제가"]
+FEELINGS = ["너무 불안해요", "불안해서 잠이 안 와요", "스트레스 받아요", "우울해요", "화가 나요",
+            "외로워요", "답답해요", "걱정돼요", "지쳐요", "기분이 좋아요"]
+ENDINGS = ["", " 어떻게 해야 할지 모르겠어요", " 계속 생각나요", " 아무것도 하기 싫어요", " 조금 나아졌어요"]
+
+
+def make_sentence(rng: random.Random) -> str:
+    return f"{rng.choice(SUBJECTS)} {rng.choice(TOPICS)} {rng.choice(FEELINGS)}{rng.choice(ENDINGS)}"
+
+
+def legacy_text_similarity(text1: str, text2: str) -> float:
+    """기존 calculate_text_similarity (공백 토큰 set Jaccard)"""
+    if not text1 or not text2:
+        return 0.0
+    tokens1 = set(text1.lower().split())
+    tokens2 = set(text2.lower().split())
+    if not tokens1 or not tokens2:
+        return 0.0
+    union = tokens1 | tokens2
+    return len(tokens1 & tokens2) / len(union) if union else 0.0
+
+
+def legacy_top_k(query: str, candidates, k: int):
+    scored = [(i, legacy_text_similarity(query, text)) for i, text in enumerate(candidates)]
+    scored.sort(key=lambda item: item[1], reverse=True)
+    return scored[:k]
+
+
+def run(size: int, queries: int, k: int, seed: int) -> dict:
+    rng = random.Random(seed)
+    candidates = [make_sentence(rng) for _ in range(size)]
+    query_texts = [make_sentence(rng) for _ in range(queries)]
+
+    start = time.perf_counter()
+    matrix = SimilarityMatrix.build(candidates)
+    build_ms = (time.perf_counter() - start) * 1000
+
+    start = time.perf_counter()
+    for query in query_texts:
+        legacy_top_k(query, candidates, k)
+    legacy_ms = (time.perf_counter() - start) * 1000 / queries
+
+    start = time.perf_counter()
+    for query in query_texts:
+        SimilarityMatrix.top_k(matrix.jaccard(query), k)
+    vector_ms = (time.perf_counter() - start) * 1000 / queries
+
+    return {
+        "size": size,
+        "build_ms": build_ms,
+        "legacy_ms": legacy_ms,
+        "vector_ms": vector_ms,
+        "speedup": legacy_ms / vector_ms if vector_ms > 0 else float("inf"),
+    }
+
+
+def main():
+    parser = argparse.ArgumentParser(description="Few-shot 유사도 점수 벤치마크")
+    parser.add_argument("--sizes", type=int, nargs="+", default=[100, 10_000, 100_000])
+    parser.add_argument("--queries", type=int, default=20, help="크기별 질의 수")
+    parser.add_argument("--k", type=int, default=3)
+    parser.add_argument("--seed", type=int, default=42)
+    args = parser.parse_args()
+
+    print(f"{'후보 수':>10} | {'행렬 구축(ms)':>14} | {'기존 루프(ms/질의)':>18} | {'벡터화(ms/질의)':>16} | {'배속':>8}")
+    print("-" * 80)
+    for size in args.sizes:
+        result = run(size, args.queries, args.k, args.seed)
+        print(
+            f"{result['size']:>10,} | {result['build_ms']:>14.1f} | {result['legacy_ms']:>18.3f} | "
+            f"{result['vector_ms']:>16.3f} | {result['speedup']:>7.1f}x"
+        )
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,107 @@
+"""
+Few-shot 유사도 임계값 보정 (n-gram Jaccard ↔ 임베딩 코사인)
+
+동적 Few-shot은 종합 유사도(텍스트 70% + 감정 30%)가 임계값 이상인 후보만 사용합니다.
+임계값 0.4는 문자 n-gram Jaccard 점수 기준으로 정한 값이라, 분포가 다른 임베딩 코사인 점수에
+그대로 쓰면 통과하는 예제의 비율이 달라집니다.
+
+라벨 데이터(benchmarks/fixtures/emotion_messages.jsonl)의 모든 (질의, 후보) 쌍에 대해
+n-gram 방식이 임계값을 통과시키는 비율과 같은 비율이 되는 임베딩 임계값을 구하고,
+질의별로 선택되는 상위 k개 예제가 두 방식에서 얼마나 겹치는지 출력합니다.
+결과는 dynamic_few_shot_service.FEW_SHOT_SIMILARITY_THRESHOLDS에 기록합니다.
+
+사용법:
+    python benchmarks/few_shot_threshold_calibration.py
+    python benchmarks/few_shot_threshold_calibration.py --backend sentence_transformers --k 2
+"""
+import argparse
+import sys
+from pathlib import Path
+
+import numpy as np
+
+backend_dir = Path(__file__).resolve().parent.parent
+sys.path.insert(0, str(backend_dir))
+
+from app.services.dynamic_few_shot_service import FEW_SHOT_SIMILARITY_THRESHOLDS, calculate_emotion_similarity
+from app.services.embedding_service import HashingEmbeddingBackend, SentenceTransformerBackend
+from app.services.emotion_classifier import load_labelled_messages
+from app.services.emotion_service import EMOTION_CATEGORIES
+from app.services.similarity_engine import SimilarityMatrix
+
+
+DEFAULT_DATA_PATH = Path(__file__).resolve().parent / "fixtures" / "emotion_messages.jsonl"
+NGRAM_THRESHOLD = FEW_SHOT_SIMILARITY_THRESHOLDS["ngram"]
+TEXT_WEIGHT, EMOTION_WEIGHT = 0.7, 0.3
+
+
+def pair_scores(texts, emotions, embeddings):
+    """모든 (질의, 후보) 쌍의 종합 유사도 (자기 자신 제외)"""
+    matrix = SimilarityMatrix.build(texts)
+    labels = sorted(set(emotions))
+    label_scores = {(a, b): calculate_emotion_similarity(a, b) for a in labels for b in labels}
+
+    ngram_rows, embedding_rows = [], []
+    for i, text in enumerate(texts):
+        emotion = np.asarray([label_scores[(emotions[i], other)] for other in emotions])
+        cosine = np.clip(embeddings @ embeddings[i], 0.0, 1.0)
+        ngram = TEXT_WEIGHT * matrix.jaccard(text) + EMOTION_WEIGHT * emotion
+        embedding = TEXT_WEIGHT * cosine + EMOTION_WEIGHT * emotion
+        mask = np.arange(len(texts)) != i
+        ngram_rows.append(ngram[mask])
+        embedding_rows.append(embedding[mask])
+    return np.asarray(ngram_rows), np.asarray(embedding_rows)
+
+
+def selected(scores: np.ndarray, threshold: float, k: int) -> set:
+    return {int(i) for i, _ in SimilarityMatrix.top_k(scores, k, threshold=threshold)}
+
+
+def main():
+    parser = argparse.ArgumentParser(description="Few-shot 유사도 임계값 보정")
+    parser.add_argument("--data", type=Path, default=DEFAULT_DATA_PATH)
+    parser.add_argument("--backend", default="hashing", help="hashing | sentence_transformers")
+    parser.add_argument("--dim", type=int, default=512, help="hashing 백엔드 차원")
+    parser.add_argument("--model", default="snunlp/KR-SBERT-V40K-klueNLI-augSTS")
+    parser.add_argument("--k", type=int, default=2, help="질의별 동적 예제 수")
+    args = parser.parse_args()
+
+    samples = load_labelled_messages(args.data)
+    texts = [text for text, _ in samples]
+    emotions = [EMOTION_CATEGORIES[label] for _, label in samples]
+    if args.backend == "sentence_transformers":
+        backend = SentenceTransformerBackend(args.model)
+    else:
+        backend = HashingEmbeddingBackend(dim=args.dim)
+
+    ngram, embedding = pair_scores(texts, emotions, backend.embed(texts))
+    accept_rate = float((ngram >= NGRAM_THRESHOLD).mean())
+    # 같은 통과 비율이 되는 임베딩 임계값 (분위수)
+    embedding_threshold = float(np.quantile(embedding, 1.0 - accept_rate))
+
+    overlaps, ngram_counts, embedding_counts = [], [], []
+    for ngram_row, embedding_row in zip(ngram, embedding):
+        a = selected(ngram_row, NGRAM_THRESHOLD, args.k)
+        b = selected(embedding_row, embedding_threshold, args.k)
+        ngram_counts.append(len(a))
+        embedding_counts.append(len(b))
+        if a or b:
+            overlaps.append(len(a & b) / len(a | b))
+    naive_rate = float((embedding >= NGRAM_THRESHOLD).mean())
+
+    print(f"라벨 데이터: {len(texts)}개 메시지, {ngram.size:,}개 (질의, 후보) 쌍, 백엔드: {backend.name}")
+    print()
+    print(f"{'방식':<24} | {'임계값':>6} | {'통과 비율':>8} | {'질의당 선택':>10}")
+    print("-" * 60)
+    print(f"{'n-gram Jaccard':<24} | {NGRAM_THRESHOLD:>6.3f} | {accept_rate:>8.2%} | {np.mean(ngram_counts):>10.2f}")
+    print(f"{'임베딩 (임계값 그대로)':<24} | {NGRAM_THRESHOLD:>6.3f} | {naive_rate:>8.2%} | {'-':>10}")
+    print(
+        f"{'임베딩 (보정)':<24} | {embedding_threshold:>6.3f} | "
+        f"{float((embedding >= embedding_threshold).mean()):>8.2%} | {np.mean(embedding_counts):>10.2f}"
+    )
+    print()
+    print(f"질의별 선택 예제 겹침 (Jaccard 평균, k={args.k}): {np.mean(overlaps) if overlaps else 0.0:.2%}")
+
+
+if __name__ == "__main__":
+    main()
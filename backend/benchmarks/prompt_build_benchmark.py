@@ -0,0 +1,88 @@
+"""
+프롬프트 빌드 벤치마크
+
+정적 조각 캐시를 매번 비우는 경우(기존처럼 요청마다 모든 조각을 렌더링하고 토큰 수 계산)와
+컴파일된 조각을 재사용하는 경우의 build_sections + 패킹 + 렌더링 시간을 비교합니다.
+
+사용법:
+    python benchmarks/prompt_build_benchmark.py
+    python benchmarks/prompt_build_benchmark.py --iterations 5000 --budget 2500
+"""
+import argparse
+import sys
+import time
+from pathlib import Path
+
+backend_dir = Path(__file__).resolve().parent.parent
+sys.path.insert(0, str(backend_dir))
+
+from app.prompts.context_packer import pack_sections, render_sections
+from app.prompts.prompt_builder import PromptBuilder
+
+
+USER_CONTEXT = {
+    "character_name": "마음이",
+    "character_personality": "전문적인 심리 상담사",
+    "conversation_count": 12,
+    "known_facts": ["대학생", "기숙사에 살고 있음", "다음 달에 기말고사"],
+    "preferences": ["짧은 조언 선호"],
+    "recent_conversations": ["시험 불안에 대해 이야기함", "룸메이트와의 갈등"],
+    "current_conversation_summary": "시험을 앞두고 잠을 잘 못 자고 있음",
+}
+
+USER_PREFERENCE = {
+    "confidence_score": 0.8,
+    "preferred_response_length": "short",
+    "preferred_tone": "casual",
+    "emoji_preference": "minimal",
+}
+
+SCENARIOS = {
+    "기본": {"emotion": "불안", "few_shot_count": 2},
+    "선호도+CoT": {"emotion": "우울", "few_shot_count": 2, "use_cot": True, "user_preference": USER_PREFERENCE},
+    "위기+전체": {
+        "emotion": "우울",
+        "few_shot_count": 2,
+        "use_cot": True,
+        "user_preference": USER_PREFERENCE,
+        "user_context": USER_CONTEXT,
+        "crisis_level": "critical",
+    },
+}
+
+
+def build_once(builder: PromptBuilder, budget, kwargs: dict) -> str:
+    sections = builder.build_sections(**kwargs)
+    return render_sections(pack_sections(sections, budget))
+
+
+def run(builder: PromptBuilder, kwargs: dict, iterations: int, budget, cached: bool) -> float:
+    PromptBuilder.clear_compiled_cache()
+    build_once(builder, budget, kwargs)
+
+    start = time.perf_counter()
+    for _ in range(iterations):
+        if not cached:
+            PromptBuilder.clear_compiled_cache()
+        build_once(builder, budget, kwargs)
+    return (time.perf_counter() - start) * 1_000_000 / iterations
+
+
+def main():
+    parser = argparse.ArgumentParser(description="프롬프트 빌드 벤치마크")
+    parser.add_argument("--iterations", type=int, default=2000)
+    parser.add_argument("--budget", type=int, default=None, help="시스템 프롬프트 토큰 예산 (기본: 제한 없음)")
+    args = parser.parse_args()
+
+    builder = PromptBuilder()
+
+    print(f"{'시나리오':<12} | {'매번 렌더링(µs)':>15} | {'캐시(µs)':>10} | {'배속':>6}")
+    print("-" * 54)
+    for name, kwargs in SCENARIOS.items():
+        uncached = run(builder, kwargs, args.iterations, args.budget, cached=False)
+        cached = run(builder, kwargs, args.iterations, args.budget, cached=True)
+        print(f"{name:<12} | {uncached:>15.1f} | {cached:>10.1f} | {uncached / cached:>5.1f}x")
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,175 @@
+"""
+토큰 수 근사 보정 (token_counter 문자 종류별 계수 ↔ Gemini count_tokens)
+
+token_counter.count_tokens는 한글 음절/영문/한자·가나/기호/이모지별 계수로 토큰 수를 근사합니다.
+benchmarks/fixtures/token_counts.jsonl의 한국어/혼합/영어 텍스트에 대해 Gemini count_tokens 결과
+(gemini_tokens)를 기록해 두고, 문자 종류별 글자 수로 계수를 최소제곱 적합한 뒤
+현재 계수와 적합 계수의 상대 오차를 종류별로 출력합니다.
+오차 한도는 tests/test_token_counter.py가 기록된 결과로 검사합니다.
+
+사용법:
+    # 1) 실제 토큰 수 기록 (GOOGLE_API_KEY 필요, 픽스처의 gemini_tokens를 채움)
+    python benchmarks/token_counter_calibration.py --collect --model gemini-2.0-flash
+    # 2) 계수 적합 및 오차 비교
+    python benchmarks/token_counter_calibration.py
+"""
+import argparse
+import json
+import sys
+from contextlib import contextmanager
+from pathlib import Path
+
+import numpy as np
+
+backend_dir = Path(__file__).resolve().parent.parent
+sys.path.insert(0, str(backend_dir))
+
+from app.services import token_counter
+from app.services.token_counter import _SEGMENT_PATTERN, count_tokens
+
+
+DEFAULT_DATA_PATH = Path(__file__).resolve().parent / "fixtures" / "token_counts.jsonl"
+FEATURES = ["hangul", "latin", "cjk", "symbol", "emoji"]
+
+
+def load_samples(path: Path):
+    with path.open(encoding="utf-8") as f:
+        return [json.loads(line) for line in f if line.strip()]
+
+
+def save_samples(path: Path, samples) -> None:
+    with path.open("w", encoding="utf-8") as f:
+        for sample in samples:
+            f.write(json.dumps(sample, ensure_ascii=False) + "\n")
+
+
+def collect(path: Path, model_name: str) -> None:
+    """Gemini count_tokens로 픽스처의 gemini_tokens 채우기"""
+    from app.services.llm_gateway import get_model
+
+    model = get_model(model_name=model_name)
+    samples = load_samples(path)
+    for sample in samples:
+        sample["gemini_tokens"] = model.count_tokens(sample["text"]).total_token_count
+        sample["model"] = model_name
+    save_samples(path, samples)
+    print(f"✅ {len(samples)}개 텍스트의 토큰 수 기록: {path}")
+
+
+def script_counts(text: str) -> tuple:
+    """(문자 종류별 글자 수 벡터, 숫자 자리 수)"""
+    counts = dict.fromkeys(FEATURES, 0)
+    digits = 0
+    for match in _SEGMENT_PATTERN.finditer(text):
+        kind, length = match.lastgroup, match.end() - match.start()
+        if kind in ("hangul", "latin", "cjk"):
+            counts[kind] += length
+        elif kind == "digit":
+            digits += length
+        elif kind == "other":
+            counts["emoji" if ord(match.group()) > 0xFFFF else "symbol"] += 1
+    return [counts[name] for name in FEATURES], digits
+
+
+def current_coefficients() -> dict:
+    return {
+        "hangul": token_counter.HANGUL_TOKENS_PER_SYLLABLE,
+        "latin": 1.0 / token_counter.LATIN_CHARS_PER_TOKEN,
+        "cjk": token_counter.CJK_TOKENS_PER_CHAR,
+        "symbol": token_counter.SYMBOL_TOKENS_PER_CHAR,
+        "emoji": token_counter.EMOJI_TOKENS_PER_CHAR,
+    }
+
+
+def fit_coefficients(samples) -> dict:
+    """
+    글자당 토큰 계수 최소제곱 적합 (숫자는 자리당 1토큰으로 고정)
+
+    어절/단어별 최소 1토큰 하한은 무시하므로 짧은 텍스트가 많으면 계수가 약간 커집니다.
+    픽스처에 없는 문자 종류는 현재 계수를 유지합니다.
+    """
+    rows, targets = [], []
+    for sample in samples:
+        features, digits = script_counts(sample["text"])
+        rows.append(features)
+        targets.append(sample["gemini_tokens"] - digits)
+    X, y = np.asarray(rows, dtype=float), np.asarray(targets, dtype=float)
+
+    fitted = current_coefficients()
+    present = X.sum(axis=0) > 0
+    solution, *_ = np.linalg.lstsq(X[:, present], y, rcond=None)
+    for name, value in zip(np.asarray(FEATURES)[present], solution):
+        fitted[name] = max(float(value), 0.0)
+    return fitted
+
+
+@contextmanager
+def coefficients(values: dict):
+    """token_counter 모듈 계수를 잠시 바꿔 count_tokens 평가"""
+    names = {
+        "hangul": "HANGUL_TOKENS_PER_SYLLABLE",
+        "cjk": "CJK_TOKENS_PER_CHAR",
+        "symbol": "SYMBOL_TOKENS_PER_CHAR",
+        "emoji": "EMOJI_TOKENS_PER_CHAR",
+    }
+    original = {attr: getattr(token_counter, attr) for attr in [*names.values(), "LATIN_CHARS_PER_TOKEN"]}
+    try:
+        for key, attr in names.items():
+            setattr(token_counter, attr, values[key])
+        token_counter.LATIN_CHARS_PER_TOKEN = 1.0 / values["latin"] if values["latin"] else float("inf")
+        yield
+    finally:
+        for attr, value in original.items():
+            setattr(token_counter, attr, value)
+
+
+def relative_errors(samples) -> np.ndarray:
+    return np.asarray([
+        abs(count_tokens(s["text"]) - s["gemini_tokens"]) / s["gemini_tokens"] for s in samples
+    ])
+
+
+def main():
+    parser = argparse.ArgumentParser(description="토큰 수 근사 계수 보정")
+    parser.add_argument("--data", type=Path, default=DEFAULT_DATA_PATH)
+    parser.add_argument("--collect", action="store_true", help="Gemini count_tokens로 gemini_tokens 기록")
+    parser.add_argument("--model", default="gemini-2.0-flash", help="--collect에 쓸 모델")
+    args = parser.parse_args()
+
+    if args.collect:
+        collect(args.data, args.model)
+
+    samples = [s for s in load_samples(args.data) if s.get("gemini_tokens")]
+    if not samples:
+        print(f"⚠️ 기록된 토큰 수가 없습니다. 먼저 --collect로 {args.data.name}을 채워주세요.")
+        return
+
+    current = current_coefficients()
+    fitted = fit_coefficients(samples)
+    kinds = sorted({s["kind"] for s in samples})
+    models = sorted({s.get("model", "?") for s in samples})
+
+    print(f"픽스처: {len(samples)}개 텍스트 ({', '.join(kinds)}), 모델: {', '.join(models)}")
+    print()
+    print(f"{'계수 (글자당 토큰)':<20} | {'현재':>8} | {'적합':>8}")
+    print("-" * 44)
+    for name in FEATURES:
+        print(f"{name:<20} | {current[name]:>8.3f} | {fitted[name]:>8.3f}")
+    print()
+    print(f"{'종류':<10} | {'개수':>4} | {'현재 평균':>9} | {'현재 최대':>9} | {'적합 평균':>9} | {'적합 최대':>9}")
+    print("-" * 68)
+    for kind in [*kinds, "전체"]:
+        group = samples if kind == "전체" else [s for s in samples if s["kind"] == kind]
+        base = relative_errors(group)
+        with coefficients(fitted):
+            tuned = relative_errors(group)
+        print(
+            f"{kind:<10} | {len(group):>4} | {base.mean():>9.1%} | {base.max():>9.1%} | "
+            f"{tuned.mean():>9.1%} | {tuned.max():>9.1%}"
+        )
+    print()
+    print("적합 계수가 더 나으면 token_counter.py의 계수를 갱신하고 테스트로 오차 한도를 확인하세요.")
+
+
+if __name__ == "__main__":
+    main()
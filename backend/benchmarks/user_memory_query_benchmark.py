@@ -0,0 +1,191 @@
+"""
+사용자 메모리 조회 벤치마크 (전체 조회 + Python 분류 vs 컨텍스트 로더의 상위 K 투영 조회)
+
+DATABASE_URL의 데이터베이스에 임시 스키마(benchmark_user_memory)를 만들고 그 안에
+user_memory 테이블을 만들어 대상 사용자 1명에 메모리 N개(+ 다른 사용자 메모리)를 채운 뒤,
+통합 서비스처럼 타입별 신뢰도 상위 K개에 projection_rank를 기록합니다.
+
+컨텍스트 로더가 실제로 쓰는 메모리 서브쿼리(context_loader._MEMORIES_SUBQUERY)를
+search_path만 바꿔 그대로 실행하고, 단일 컬럼 인덱스만 있을 때와
+ix_user_memory_projection 부분 인덱스를 추가한 뒤의 조회 지연 시간과 전송 행 수를
+기존 전체 조회 + Python 분류와 비교합니다. 끝나면 스키마를 삭제합니다.
+
+사용법:
+    python benchmarks/user_memory_query_benchmark.py
+    python benchmarks/user_memory_query_benchmark.py --memories 10000 --noise-users 9 --repeat 20
+"""
+import argparse
+import statistics
+import sys
+import time
+import uuid
+from pathlib import Path
+
+from sqlalchemy import text
+
+backend_dir = Path(__file__).resolve().parent.parent
+sys.path.insert(0, str(backend_dir))
+
+from app.db.database import engine
+from app.services.context_loader import _MEMORIES_SUBQUERY
+from app.services.memory_consolidation_service import MEMORY_PROJECTION_TOP_K
+
+
+SCHEMA = "benchmark_user_memory"
+MEMORY_TYPES = ["fact", "preference", "emotion_pattern", "tone_preference"]
+
+# 기존 get_user_memories: 임계값 이상 전체 조회 후 Python에서 분류
+FULL_QUERY = text("""
+    SELECT id, memory_type, content, confidence_score, updated_at
+    FROM user_memory
+    WHERE user_id = :user_id
+      AND character_id = :character_id
+      AND confidence_score >= :confidence_threshold
+    ORDER BY confidence_score DESC
+""")
+
+# 컨텍스트 로더: 타입별 상위 K개(projection_rank)만 jsonb 배열 하나로 조회
+PROJECTION_QUERY = text(f"SELECT ({_MEMORIES_SUBQUERY}) AS memories")
+
+TYPE_LIMIT_CASE = " ".join(
+    f"WHEN '{memory_type}' THEN {top_k}" for memory_type, top_k in MEMORY_PROJECTION_TOP_K.items()
+)
+
+
+def setup(conn, memories: int, noise_users: int, user_id: uuid.UUID, character_id: uuid.UUID):
+    conn.execute(text(f"DROP SCHEMA IF EXISTS {SCHEMA} CASCADE"))
+    conn.execute(text(f"CREATE SCHEMA {SCHEMA}"))
+    conn.execute(text(f"SET search_path TO {SCHEMA}"))
+    conn.execute(text("""
+        CREATE TABLE user_memory (
+            id UUID PRIMARY KEY DEFAULT gen_random_uuid(),
+            user_id UUID NOT NULL,
+            character_id UUID NOT NULL,
+            memory_type VARCHAR(50) NOT NULL,
+            content JSONB NOT NULL,
+            confidence_score FLOAT NOT NULL,
+            projection_rank INTEGER,
+            updated_at TIMESTAMPTZ NOT NULL DEFAULT now()
+        )
+    """))
+    # 기존 user_memory와 같은 단일 컬럼 인덱스
+    for column in ("user_id", "character_id", "memory_type", "confidence_score"):
+        conn.execute(text(f"CREATE INDEX user_memory_{column}_idx ON user_memory ({column})"))
+
+    insert = text("""
+        INSERT INTO user_memory (user_id, character_id, memory_type, content, confidence_score)
+        SELECT
+            :user_id,
+            :character_id,
+            (ARRAY['fact', 'preference', 'emotion_pattern', 'tone_preference'])[1 + (i % 4)],
+            jsonb_build_object('fact', '벤치마크 메모리 ' || i::TEXT),
+            0.5 + random() * 0.5
+        FROM generate_series(1, :count) AS i
+    """)
+    conn.execute(insert, {"user_id": user_id, "character_id": character_id, "count": memories})
+    for _ in range(noise_users):
+        conn.execute(insert, {"user_id": uuid.uuid4(), "character_id": character_id, "count": memories})
+
+    # 통합 서비스(consolidate_memories)처럼 (사용자, 캐릭터, 타입)별 상위 K개에 순위 기록
+    conn.execute(text(f"""
+        UPDATE user_memory um
+        SET projection_rank = ranked.rn
+        FROM (
+            SELECT
+                id, memory_type,
+                ROW_NUMBER() OVER (
+                    PARTITION BY user_id, character_id, memory_type ORDER BY confidence_score DESC
+                ) AS rn
+            FROM user_memory
+        ) ranked
+        WHERE ranked.id = um.id
+          AND ranked.rn <= (CASE ranked.memory_type {TYPE_LIMIT_CASE} ELSE 0 END)
+    """))
+    conn.execute(text("ANALYZE user_memory"))
+    conn.commit()
+
+
+def bucket_full(rows) -> int:
+    """기존 방식: 전체 행을 타입별로 나눈 뒤 상위 K만 사용"""
+    buckets = {memory_type: [] for memory_type in MEMORY_TYPES}
+    for row in rows:
+        buckets[row.memory_type].append(row)
+    return sum(
+        len(buckets[memory_type][:MEMORY_PROJECTION_TOP_K.get(memory_type, 0)])
+        for memory_type in MEMORY_TYPES
+    )
+
+
+def measure(conn, query, params: dict, repeat: int, projection: bool) -> dict:
+    timings = []
+    fetched = used = 0
+    for _ in range(repeat):
+        start = time.perf_counter()
+        if projection:
+            rows = conn.execute(query, params).scalar() or []
+            used = len(rows)
+        else:
+            rows = conn.execute(query, params).fetchall()
+            used = bucket_full(rows)
+        timings.append((time.perf_counter() - start) * 1000)
+        fetched = len(rows)
+    return {"median_ms": statistics.median(timings), "fetched": fetched, "used": used}
+
+
+def main():
+    parser = argparse.ArgumentParser(description="사용자 메모리 조회 벤치마크")
+    parser.add_argument("--memories", type=int, default=10_000, help="사용자당 메모리 수")
+    parser.add_argument("--noise-users", type=int, default=4, help="같은 캐릭터의 다른 사용자 수")
+    parser.add_argument("--repeat", type=int, default=20)
+    parser.add_argument("--confidence-threshold", type=float, default=0.7)
+    args = parser.parse_args()
+
+    user_id, character_id = uuid.uuid4(), uuid.uuid4()
+    params = {
+        "user_id": user_id,
+        "character_id": character_id,
+        "confidence_threshold": args.confidence_threshold
+    }
+
+    with engine.connect() as conn:
+        try:
+            print(f"테이블 준비: 사용자당 {args.memories:,}개 × {args.noise_users + 1}명...")
+            setup(conn, args.memories, args.noise_users, user_id, character_id)
+
+            results = []
+            for index_label in ("단일 컬럼", "투영 인덱스"):
+                conn.execute(text(f"SET search_path TO {SCHEMA}"))
+                if index_label == "투영 인덱스":
+                    # app/models/user_memory.py의 ix_user_memory_projection과 같은 부분 인덱스
+                    conn.execute(text("""
+                        CREATE INDEX ix_user_memory_projection
+                        ON user_memory (user_id, character_id)
+                        WHERE projection_rank IS NOT NULL
+                    """))
+                    conn.execute(text("ANALYZE user_memory"))
+                    conn.commit()
+                    conn.execute(text(f"SET search_path TO {SCHEMA}"))
+                for query_label, query, projection in (
+                    ("전체 조회 + 분류", FULL_QUERY, False),
+                    ("상위 K 투영", PROJECTION_QUERY, True),
+                ):
+                    result = measure(conn, query, params, args.repeat, projection)
+                    results.append((index_label, query_label, result))
+                conn.rollback()
+
+            print()
+            print(f"{'인덱스':<10} | {'쿼리':<16} | {'중앙값(ms)':>10} | {'전송 행':>8} | {'사용 행':>7}")
+            print("-" * 64)
+            for index_label, query_label, result in results:
+                print(
+                    f"{index_label:<10} | {query_label:<16} | {result['median_ms']:>10.2f} | "
+                    f"{result['fetched']:>8,} | {result['used']:>7,}"
+                )
+        finally:
+            conn.rollback()
+            conn.execute(text(f"DROP SCHEMA IF EXISTS {SCHEMA} CASCADE"))
+            conn.commit()
+
+
+if __name__ == "__main__":
+    main()
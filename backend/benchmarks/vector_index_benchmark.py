@@ -0,0 +1,82 @@
+"""
+임베딩 근사 최근접 이웃(IVF) 인덱스 벤치마크
+
+hashing 임베딩 기준으로 전체 내적(정확 검색)과 IVF 검색의 질의 지연 시간, recall@k를 비교합니다.
+
+사용법:
+    python benchmarks/vector_index_benchmark.py
+    python benchmarks/vector_index_benchmark.py --sizes 1000 10000 100000 --nprobe 8
+"""
+import argparse
+import random
+import sys
+import time
+from pathlib import Path
+
+import numpy as np
+
+backend_dir = Path(__file__).resolve().parent.parent
+sys.path.insert(0, str(backend_dir))
+sys.path.insert(0, str(Path(__file__).resolve().parent))
+
+from app.services.embedding_service import HashingEmbeddingBackend
+from app.services.vector_index import VectorIndex
+from few_shot_similarity_benchmark import make_sentence
+
+
+def run(size: int, queries: int, k: int, nprobe: int, seed: int) -> dict:
+    rng = random.Random(seed)
+    backend = HashingEmbeddingBackend()
+    vectors = backend.embed([make_sentence(rng) for _ in range(size)])
+    query_vectors = backend.embed([make_sentence(rng) for _ in range(queries)])
+
+    start = time.perf_counter()
+    exact = VectorIndex(vectors, ivf_min_size=size + 1)
+    approximate = VectorIndex(vectors, ivf_min_size=0, nprobe=nprobe)
+    build_ms = (time.perf_counter() - start) * 1000
+
+    start = time.perf_counter()
+    exact_results = [exact.search(query, k) for query in query_vectors]
+    exact_ms = (time.perf_counter() - start) * 1000 / queries
+
+    start = time.perf_counter()
+    approximate_results = [approximate.search(query, k) for query in query_vectors]
+    approximate_ms = (time.perf_counter() - start) * 1000 / queries
+
+    # 동점이 많으므로 k번째 정확 점수 이상을 찾았는지로 recall 계산
+    hits = 0
+    for exact_top, approximate_top in zip(exact_results, approximate_results):
+        kth_score = exact_top[-1][1] if exact_top else 0.0
+        hits += sum(1 for _, score in approximate_top if score >= kth_score - 1e-6)
+    recall = hits / (k * queries)
+
+    return {
+        "size": size,
+        "build_ms": build_ms,
+        "exact_ms": exact_ms,
+        "approximate_ms": approximate_ms,
+        "recall": recall,
+    }
+
+
+def main():
+    parser = argparse.ArgumentParser(description="임베딩 벡터 인덱스 벤치마크")
+    parser.add_argument("--sizes", type=int, nargs="+", default=[1_000, 10_000, 100_000])
+    parser.add_argument("--queries", type=int, default=50)
+    parser.add_argument("--k", type=int, default=5)
+    parser.add_argument("--nprobe", type=int, default=8)
+    parser.add_argument("--seed", type=int, default=42)
+    args = parser.parse_args()
+
+    print(f"{'벡터 수':>10} | {'구축(ms)':>10} | {'정확 검색(ms)':>13} | {'IVF(ms)':>9} | {'recall@k':>8}")
+    print("-" * 64)
+    for size in args.sizes:
+        result = run(size, args.queries, args.k, args.nprobe, args.seed)
+        print(
+            f"{result['size']:>10,} | {result['build_ms']:>10.1f} | {result['exact_ms']:>13.3f} | "
+            f"{result['approximate_ms']:>9.3f} | {result['recall']:>8.2f}"
+        )
+
+
+if __name__ == "__main__":
+    main()
@@ -28,10 +28,13 @@ from app.models import (
     ConversationRating,
     ConversationMetrics,
     UserPromptPreference,
+    FewShotExemplar,
     SubscriptionPlan,
     Subscription,
     TokenUsage,
     TokenQuota,
+    ProcessedJob,
+    WorkerLease,
 )
 
 
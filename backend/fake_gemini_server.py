@@ -0,0 +1,369 @@
+"""로컬 가짜 Gemini 서버 (LLM 게이트웨이 테스트용)
+
+Gemini REST API의 generateContent / streamGenerateContent 응답 형식을 흉내냅니다.
+실제 API 키 없이 동시성 제한, 타임아웃, 스트리밍 경로를 확인할 때 사용합니다.
+
+컨텍스트 캐시(cachedContents) 생성/조회/갱신/삭제도 흉내내며, cachedContent를 지정한
+생성 요청에는 usageMetadata.cachedContentTokenCount를 채워 돌려줍니다.
+만료되었거나 없는 캐시를 지정하면 404를 돌려줍니다.
+
+사용법:
+    python fake_gemini_server.py --port 8765 --latency 0.5
+
+    # .env
+    GEMINI_API_ENDPOINT=http://localhost:8765
+    GEMINI_TRANSPORT=rest
+
+    # 컨텍스트 캐시 사용 시
+    GEMINI_CONTEXT_CACHE_ENABLED=true
+    GEMINI_CONTEXT_CACHE_MIN_TOKENS=0
+
+    # 동시 처리/캐시 현황 확인
+    curl http://localhost:8765/stats
+"""
+import argparse
+import json
+import re
+import threading
+import time
+import uuid
+from datetime import datetime, timedelta, timezone
+from http.server import BaseHTTPRequestHandler, ThreadingHTTPServer
+from urllib.parse import parse_qs, urlparse
+
+
+EMOTION_RESPONSE = {
+    "primary_emotion": "불안",
+    "emotion_category": "negative",
+    "intensity": 0.6,
+    "secondary_emotions": ["스트레스"],
+    "keywords": ["걱정"],
+    "response_style": "calming"
+}
+
+MEMORY_RESPONSE = {
+    "facts": [{"fact": "회사에서 일하고 있음", "confidence": 0.8}],
+    "preferences": [],
+    "emotion_patterns": [{"pattern": "업무 마감 전에 불안감을 느낌", "confidence": 0.7}],
+    "tone_preferences": {}
+}
+
+CACHE_PATH_PATTERN = re.compile(r"/(cachedContents/[^/:]+)$")
+
+CHAT_RESPONSE = "**상담사**: 이야기해주셔서 고마워요. 요즘 많이 지치셨던 것 같아요. 어떤 순간이 가장 힘드셨나요?"
+
+
+class FakeGeminiState:
+    """요청 통계 (스레드 안전)"""
+
+    def __init__(self, latency: float, chunk_delay: float):
+        self.latency = latency
+        self.chunk_delay = chunk_delay
+        self.lock = threading.Lock()
+        self.requests = 0
+        self.in_flight = 0
+        self.max_in_flight = 0
+        self.caches = {}
+        self.caches_created = 0
+        self.cache_hits = 0
+        self.cache_misses = 0
+        self.cached_tokens = 0
+
+    def begin(self):
+        with self.lock:
+            self.requests += 1
+            self.in_flight += 1
+            self.max_in_flight = max(self.max_in_flight, self.in_flight)
+
+    def end(self):
+        with self.lock:
+            self.in_flight -= 1
+
+    def snapshot(self):
+        with self.lock:
+            return {
+                "requests": self.requests,
+                "in_flight": self.in_flight,
+                "max_in_flight": self.max_in_flight,
+                "caches": len(self.caches),
+                "caches_created": self.caches_created,
+                "cache_hits": self.cache_hits,
+                "cache_misses": self.cache_misses,
+                "cached_tokens": self.cached_tokens,
+            }
+
+    # 컨텍스트 캐시 (cachedContents)
+
+    def create_cache(self, body: dict) -> dict:
+        name = f"cachedContents/{uuid.uuid4().hex[:12]}"
+        text = extract_prompt_text(body)
+        now = datetime.now(timezone.utc)
+        cache = {
+            "name": name,
+            "model": body.get("model", ""),
+            "createTime": format_time(now),
+            "usageMetadata": {"totalTokenCount": max(len(text) // 2, 1)},
+            "_text": text,
+        }
+        set_expiry(cache, now, body)
+        with self.lock:
+            self.caches[name] = cache
+            self.caches_created += 1
+        return public_cache(cache)
+
+    def get_cache(self, name: str):
+        """만료되지 않은 캐시 (없으면 None)"""
+        with self.lock:
+            cache = self.caches.get(name)
+            if cache is not None and cache["_expires_at"] <= datetime.now(timezone.utc):
+                del self.caches[name]
+                cache = None
+            return cache
+
+    def update_cache(self, name: str, body: dict):
+        cache = self.get_cache(name)
+        if cache is None:
+            return None
+        with self.lock:
+            set_expiry(cache, datetime.now(timezone.utc), body)
+        return public_cache(cache)
+
+    def delete_cache(self, name: str) -> bool:
+        with self.lock:
+            return self.caches.pop(name, None) is not None
+
+    def use_cache(self, name: str):
+        """생성 요청에서 캐시 사용 (캐시 텍스트, 토큰 수) - 없으면 None"""
+        cache = self.get_cache(name)
+        with self.lock:
+            if cache is None:
+                self.cache_misses += 1
+                return None
+            tokens = cache["usageMetadata"]["totalTokenCount"]
+            self.cache_hits += 1
+            self.cached_tokens += tokens
+            return cache["_text"], tokens
+
+
+def format_time(value: datetime) -> str:
+    return value.strftime("%Y-%m-%dT%H:%M:%S.%fZ")
+
+
+def set_expiry(cache: dict, now: datetime, body: dict):
+    """요청의 expireTime 또는 "600s" 형식 ttl로 만료 시각 설정 (기본 1시간)"""
+    if body.get("expireTime"):
+        expires_at = datetime.fromisoformat(body["expireTime"].replace("Z", "+00:00"))
+    elif body.get("ttl"):
+        expires_at = now + timedelta(seconds=float(str(body["ttl"]).rstrip("s")))
+    else:
+        expires_at = cache.get("_expires_at") or now + timedelta(hours=1)
+    cache["_expires_at"] = expires_at
+    cache["expireTime"] = format_time(expires_at)
+    cache["updateTime"] = format_time(now)
+
+
+def public_cache(cache: dict) -> dict:
+    return {key: value for key, value in cache.items() if not key.startswith("_")}
+
+
+def extract_prompt_text(body: dict) -> str:
+    """요청 본문에서 텍스트 파트만 이어붙이기"""
+    texts = []
+    system_instruction = body.get("systemInstruction") or body.get("system_instruction") or {}
+    for part in system_instruction.get("parts", []):
+        if "text" in part:
+            texts.append(part["text"])
+    for content in body.get("contents", []):
+        for part in content.get("parts", []):
+            if "text" in part:
+                texts.append(part["text"])
+    return "\n".join(texts)
+
+
+def build_reply(prompt: str) -> str:
+    """프롬프트 종류에 따라 고정 응답 선택"""
+    if "감정 상태를 분석" in prompt:
+        return json.dumps(EMOTION_RESPONSE, ensure_ascii=False)
+    if "중요한 정보를 추출" in prompt:
+        return json.dumps(MEMORY_RESPONSE, ensure_ascii=False)
+    if "요약" in prompt:
+        return "사용자는 업무 스트레스와 불안감에 대해 이야기했고, 상담사는 감정을 인정하며 대처 방법을 함께 찾았다."
+    return CHAT_RESPONSE
+
+
+def candidate(text: str, finish: bool, prompt_tokens: int = 0, cached_tokens: int = 0) -> dict:
+    """응답 청크 (promptTokenCount는 캐시된 부분을 포함한 전체 입력, 캐시와 같은 글자 수 기준 근사)"""
+    item = {
+        "candidates": [{
+            "content": {"role": "model", "parts": [{"text": text}]},
+            "index": 0,
+        }],
+        "usageMetadata": {
+            "promptTokenCount": prompt_tokens,
+            "candidatesTokenCount": len(text) // 2,
+            "totalTokenCount": prompt_tokens + len(text) // 2,
+        }
+    }
+    if cached_tokens:
+        item["usageMetadata"]["cachedContentTokenCount"] = cached_tokens
+    if finish:
+        item["candidates"][0]["finishReason"] = "STOP"
+    return item
+
+
+def split_chunks(text: str, size: int = 12):
+    return [text[i:i + size] for i in range(0, len(text), size)] or [""]
+
+
+def make_handler(state: FakeGeminiState):
+    class Handler(BaseHTTPRequestHandler):
+        protocol_version = "HTTP/1.1"
+
+        def log_message(self, format, *args):
+            pass
+
+        def _send_json(self, payload, status: int = 200):
+            data = json.dumps(payload, ensure_ascii=False).encode("utf-8")
+            self.send_response(status)
+            self.send_header("Content-Type", "application/json; charset=utf-8")
+            self.send_header("Content-Length", str(len(data)))
+            self.end_headers()
+            self.wfile.write(data)
+
+        def _not_found(self, message: str = "not found"):
+            self._send_json({"error": {"code": 404, "message": message, "status": "NOT_FOUND"}}, 404)
+
+        def _read_body(self) -> dict:
+            length = int(self.headers.get("Content-Length") or 0)
+            return json.loads(self.rfile.read(length) or b"{}")
+
+        def _cache_name(self):
+            match = CACHE_PATH_PATTERN.search(urlparse(self.path).path)
+            return match.group(1) if match else None
+
+        def do_GET(self):
+            path = urlparse(self.path).path
+            if path == "/stats":
+                self._send_json(state.snapshot())
+                return
+
+            name = self._cache_name()
+            cache = state.get_cache(name) if name else None
+            if cache is not None:
+                self._send_json(public_cache(cache))
+            elif path.endswith("/cachedContents"):
+                with state.lock:
+                    caches = [public_cache(cache) for cache in state.caches.values()]
+                self._send_json({"cachedContents": caches})
+            else:
+                self._not_found()
+
+        def do_PATCH(self):
+            name = self._cache_name()
+            cache = state.update_cache(name, self._read_body()) if name else None
+            if cache is None:
+                self._not_found()
+            else:
+                self._send_json(cache)
+
+        def do_DELETE(self):
+            name = self._cache_name()
+            if name and state.delete_cache(name):
+                self._send_json({})
+            else:
+                self._not_found()
+
+        def do_POST(self):
+            parsed = urlparse(self.path)
+            body = self._read_body()
+
+            if parsed.path.endswith("/cachedContents"):
+                self._send_json(state.create_cache(body))
+                return
+
+            # cachedContent 지정 시 캐시된 텍스트를 앞에 붙여 응답 종류 판단
+            prompt = extract_prompt_text(body)
+            cached_tokens = 0
+            cache_name = body.get("cachedContent") or body.get("cached_content")
+            if cache_name:
+                cached = state.use_cache(cache_name)
+                if cached is None:
+                    self._not_found(f"CachedContent not found (or expired): {cache_name}")
+                    return
+                cached_text, cached_tokens = cached
+                prompt = f"{cached_text}\n{prompt}"
+            reply = build_reply(prompt)
+            prompt_tokens = max(len(prompt) // 2, cached_tokens)
+
+            state.begin()
+            try:
+                time.sleep(state.latency)
+                if parsed.path.endswith(":generateContent"):
+                    self._send_json(candidate(reply, finish=True, prompt_tokens=prompt_tokens, cached_tokens=cached_tokens))
+                elif parsed.path.endswith(":streamGenerateContent"):
+                    sse = parse_qs(parsed.query).get("alt", [""])[0] == "sse"
+                    self._stream(reply, sse, prompt_tokens, cached_tokens)
+                else:
+                    self._not_found()
+            finally:
+                state.end()
+
+        def _stream(self, reply: str, sse: bool, prompt_tokens: int = 0, cached_tokens: int = 0):
+            """SSE(alt=sse) 또는 JSON 배열 스트림으로 청크 전송"""
+            chunks = split_chunks(reply)
+            self.send_response(200)
+            self.send_header("Content-Type", "text/event-stream" if sse else "application/json")
+            self.send_header("Transfer-Encoding", "chunked")
+            self.end_headers()
+
+            def write(data: str):
+                encoded = data.encode("utf-8")
+                self.wfile.write(f"{len(encoded):x}\r\n".encode() + encoded + b"\r\n")
+                self.wfile.flush()
+
+            if not sse:
+                write("[")
+            for index, text in enumerate(chunks):
+                payload = json.dumps(
+                    candidate(
+                        text,
+                        finish=index == len(chunks) - 1,
+                        prompt_tokens=prompt_tokens,
+                        cached_tokens=cached_tokens
+                    ),
+                    ensure_ascii=False
+                )
+                if sse:
+                    write(f"data: {payload}\r\n\r\n")
+                else:
+                    write(("," if index else "") + payload)
+                time.sleep(state.chunk_delay)
+            if not sse:
+                write("]")
+            self.wfile.write(b"0\r\n\r\n")
+            self.wfile.flush()
+
+    return Handler
+
+
+def main():
+    parser = argparse.ArgumentParser(description="로컬 가짜 Gemini 서버")
+    parser.add_argument("--host", default="127.0.0.1")
+    parser.add_argument("--port", type=int, default=8765)
+    parser.add_argument("--latency", type=float, default=0.2, help="응답 전 대기 시간 (초)")
+    parser.add_argument("--chunk-delay", type=float, default=0.05, help="스트리밍 청크 간격 (초)")
+    args = parser.parse_args()
+
+    state = FakeGeminiState(latency=args.latency, chunk_delay=args.chunk_delay)
+    server = ThreadingHTTPServer((args.host, args.port), make_handler(state))
+    print(f"🤖 가짜 Gemini 서버 실행: http://{args.host}:{args.port}")
+    try:
+        server.serve_forever()
+    except KeyboardInterrupt:
+        print("👋 종료")
+    finally:
+        server.server_close()
+
+
+if __name__ == "__main__":
+    main()
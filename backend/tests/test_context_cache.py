@@ -0,0 +1,147 @@
+"""
+컨텍스트 캐시 테스트 (메모리 백엔드, 로컬 가짜 Redis 클라이언트로 Redis 백엔드)
+
+실행:
+    cd backend && python -m pytest tests/test_context_cache.py -q
+"""
+import time
+from datetime import datetime
+from uuid import uuid4
+
+import pytest
+
+from app.services.context_cache import (
+    ContextCache,
+    InMemoryContextCache,
+    RedisContextCache,
+    invalidate_context,
+    invalidate_context_for_conversation,
+    set_context_cache,
+)
+
+
+class FakeRedis:
+    """redis-py의 get/set(ex=)/delete만 흉내 내는 로컬 가짜 클라이언트 (bytes 저장, 만료 지원)"""
+
+    def __init__(self):
+        self.store = {}
+
+    def get(self, key):
+        entry = self.store.get(key)
+        if entry is None:
+            return None
+        value, expires_at = entry
+        if expires_at is not None and expires_at <= time.monotonic():
+            del self.store[key]
+            return None
+        return value
+
+    def set(self, key, value, ex=None):
+        if isinstance(value, str):
+            value = value.encode("utf-8")
+        self.store[key] = (value, time.monotonic() + ex if ex else None)
+
+    def delete(self, key):
+        self.store.pop(key, None)
+
+
+class BrokenRedis:
+    def get(self, key):
+        raise ConnectionError("down")
+
+    def set(self, key, value, ex=None):
+        raise ConnectionError("down")
+
+    def delete(self, key):
+        raise ConnectionError("down")
+
+
+SECTION = {
+    "conversation_id": "c1",
+    "section": {"memories": [{"id": "m1", "content": {"취미": "등산"}}], "conversation_count": 3},
+}
+
+
+@pytest.fixture(params=["memory", "redis"])
+def cache(request):
+    if request.param == "memory":
+        backend = InMemoryContextCache(ttl=60, max_entries=8)
+    else:
+        backend = RedisContextCache(FakeRedis(), ttl=60)
+    set_context_cache(backend)
+    yield backend
+    set_context_cache(None)
+
+
+def test_base_is_abstract():
+    with pytest.raises(TypeError):
+        ContextCache()
+
+
+def test_set_get_invalidate(cache):
+    user_id, character_id = uuid4(), uuid4()
+    assert cache.get(user_id, character_id) is None
+
+    cache.set(user_id, character_id, SECTION)
+    assert cache.get(user_id, character_id) == SECTION
+    assert cache.get(user_id, uuid4()) is None
+
+    invalidate_context(user_id, character_id)
+    assert cache.get(user_id, character_id) is None
+
+
+def test_same_conversation_write_keeps_entry(cache):
+    user_id, character_id = uuid4(), uuid4()
+    conversation_id = uuid4()
+    cache.set(user_id, character_id, {**SECTION, "conversation_id": str(conversation_id)})
+
+    invalidate_context_for_conversation(user_id, character_id, conversation_id)
+    assert cache.get(user_id, character_id) is not None
+
+    invalidate_context_for_conversation(user_id, character_id, uuid4())
+    assert cache.get(user_id, character_id) is None
+
+
+def test_redis_stores_json_not_pickle():
+    client = FakeRedis()
+    cache = RedisContextCache(client, ttl=60)
+    user_id, character_id = uuid4(), uuid4()
+    cache.set(user_id, character_id, SECTION)
+
+    raw = client.store[cache._key(user_id, character_id)][0]
+    assert raw.startswith(b"{")
+    assert "등산" in raw.decode("utf-8")
+
+
+def test_redis_unserializable_value_is_not_stored(capsys):
+    client = FakeRedis()
+    cache = RedisContextCache(client, ttl=60)
+    cache.set(uuid4(), uuid4(), {"at": datetime.utcnow()})
+    assert client.store == {}
+    assert "저장 실패" in capsys.readouterr().out
+
+
+def test_redis_errors_are_cache_misses():
+    cache = RedisContextCache(BrokenRedis(), ttl=60)
+    user_id, character_id = uuid4(), uuid4()
+    cache.set(user_id, character_id, SECTION)
+    assert cache.get(user_id, character_id) is None
+    cache.invalidate(user_id, character_id)
+
+
+def test_memory_ttl_and_lru_eviction(monkeypatch):
+    now = [1000.0]
+    monkeypatch.setattr(time, "monotonic", lambda: now[0])
+    cache = InMemoryContextCache(ttl=10, max_entries=2)
+    users = [uuid4() for _ in range(3)]
+    character_id = uuid4()
+
+    cache.set(users[0], character_id, {"n": 0})
+    cache.set(users[1], character_id, {"n": 1})
+    assert cache.get(users[0], character_id) == {"n": 0}  # users[0]을 최근 사용으로
+    cache.set(users[2], character_id, {"n": 2})
+    assert cache.get(users[1], character_id) is None
+    assert len(cache) == 2
+
+    now[0] += 11
+    assert cache.get(users[0], character_id) is None
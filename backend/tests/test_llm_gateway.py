@@ -0,0 +1,112 @@
+"""
+LLM 게이트웨이 테스트 (로컬 가짜 Gemini 서버, REST 전송)
+
+실행:
+    cd backend && python -m pytest tests/test_llm_gateway.py -q
+"""
+import asyncio
+import os
+import sys
+import threading
+import time
+from http.server import ThreadingHTTPServer
+from pathlib import Path
+
+import pytest
+
+pytest.importorskip("google.generativeai")
+pytest.importorskip("pydantic_settings")
+
+backend_dir = Path(__file__).resolve().parent.parent
+sys.path.insert(0, str(backend_dir))
+
+# 설정 필수값 (실제 서비스에 연결하지 않음)
+for name in ("DATABASE_URL", "SECRET_KEY", "GOOGLE_API_KEY",
+             "CLOUDINARY_CLOUD_NAME", "CLOUDINARY_API_KEY", "CLOUDINARY_API_SECRET"):
+    os.environ.setdefault(name, "postgresql://localhost/test" if name == "DATABASE_URL" else "test")
+
+import fake_gemini_server  # noqa: E402
+from app.core.config import settings  # noqa: E402
+from app.services import llm_gateway  # noqa: E402
+
+
+LATENCY = 0.5
+
+
+@pytest.fixture
+def fake_server():
+    state = fake_gemini_server.FakeGeminiState(latency=LATENCY, chunk_delay=0.0)
+    server = ThreadingHTTPServer(("127.0.0.1", 0), fake_gemini_server.make_handler(state))
+    thread = threading.Thread(target=server.serve_forever, daemon=True)
+    thread.start()
+
+    original = (settings.GEMINI_API_ENDPOINT, settings.GEMINI_TRANSPORT, settings.LLM_MAX_CONCURRENCY)
+    settings.GEMINI_API_ENDPOINT = f"http://127.0.0.1:{server.server_address[1]}"
+    settings.GEMINI_TRANSPORT = "rest"
+    settings.LLM_MAX_CONCURRENCY = 2
+    llm_gateway._configure_gemini()
+    llm_gateway._model_cache.clear()
+    llm_gateway._limiter = None
+    llm_gateway._rest_executor = None
+
+    yield state
+
+    if llm_gateway._rest_executor is not None:
+        llm_gateway._rest_executor.shutdown(wait=True)
+    llm_gateway._rest_executor = None
+    llm_gateway._limiter = None
+    llm_gateway._model_cache.clear()
+    settings.GEMINI_API_ENDPOINT, settings.GEMINI_TRANSPORT, settings.LLM_MAX_CONCURRENCY = original
+    llm_gateway._configure_gemini()
+    server.shutdown()
+    server.server_close()
+
+
+def test_generate_content_over_rest(fake_server):
+    async def run():
+        response = await llm_gateway.generate_content(llm_gateway.get_model(), "안녕하세요", purpose="chat")
+        return response.text
+
+    assert asyncio.run(run()) == fake_gemini_server.CHAT_RESPONSE
+    assert fake_server.snapshot()["requests"] == 1
+
+
+def test_stream_content_over_rest(fake_server):
+    async def run():
+        return [
+            text async for text in llm_gateway.stream_content(llm_gateway.get_model(), "안녕하세요")
+        ]
+
+    chunks = asyncio.run(run())
+    assert len(chunks) > 1
+    assert "".join(chunks) == fake_gemini_server.CHAT_RESPONSE
+
+
+def test_timed_out_calls_do_not_exceed_thread_pool(fake_server):
+    """호출자가 타임아웃으로 포기해도 실제 동시 요청 수는 스레드 풀 크기를 넘지 않음"""
+    async def call():
+        try:
+            await asyncio.wait_for(
+                llm_gateway.generate_content(llm_gateway.get_model(), "안녕하세요", purpose="chat"),
+                timeout=0.1
+            )
+        except asyncio.TimeoutError:
+            return "timeout"
+        return "ok"
+
+    async def run():
+        results = []
+        # 포기된 호출이 스레드에서 계속 실행되는 동안 새 호출을 반복
+        for _ in range(3):
+            results += await asyncio.gather(*(call() for _ in range(4)))
+        return results
+
+    assert set(asyncio.run(run())) == {"timeout"}
+
+    executor = llm_gateway.get_rest_executor()
+    assert len(executor._threads) <= settings.LLM_MAX_CONCURRENCY
+
+    time.sleep(LATENCY * 2)
+    stats = fake_server.snapshot()
+    assert stats["max_in_flight"] <= settings.LLM_MAX_CONCURRENCY
+    assert stats["requests"] <= settings.LLM_MAX_CONCURRENCY * 2  # 대기열에서 취소된 호출은 요청하지 않음
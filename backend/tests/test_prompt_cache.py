@@ -0,0 +1,81 @@
+"""
+프롬프트 캐시 테스트 (로컬 가짜 Gemini 서버의 cachedContents, REST 전송)
+
+실행:
+    cd backend && python -m pytest tests/test_prompt_cache.py -q
+"""
+import asyncio
+
+import pytest
+
+from test_llm_gateway import fake_server  # noqa: F401  (가짜 서버 fixture 공유)
+
+import fake_gemini_server  # noqa: E402
+from app.core.config import settings  # noqa: E402
+from app.services import prompt_cache  # noqa: E402
+from app.services.llm_service import stream_gemini_response  # noqa: E402
+
+
+PREFIX = "당신은 전문적이고 공감적인 심리 상담 AI입니다.\n" * 20
+
+
+@pytest.fixture
+def cache_enabled(fake_server):  # noqa: F811
+    original = (settings.GEMINI_CONTEXT_CACHE_ENABLED, settings.GEMINI_CONTEXT_CACHE_MIN_TOKENS)
+    settings.GEMINI_CONTEXT_CACHE_ENABLED = True
+    settings.GEMINI_CONTEXT_CACHE_MIN_TOKENS = 0
+    prompt_cache._cache = None
+
+    yield fake_server
+
+    prompt_cache._cache = None
+    settings.GEMINI_CONTEXT_CACHE_ENABLED, settings.GEMINI_CONTEXT_CACHE_MIN_TOKENS = original
+
+
+def chat_turn(message: str):
+    """고정 앞부분으로 시작하는 첫 메시지 한 턴 (응답 텍스트, cache_info)"""
+    async def run():
+        cache_info = {}
+        messages = [{"role": "user", "content": f"{PREFIX}\n---\n사용자 메시지:\n{message}"}]
+        chunks = [
+            text async for text in stream_gemini_response(messages, prompt_prefix=PREFIX, cache_info=cache_info)
+        ]
+        return "".join(chunks), cache_info
+
+    return asyncio.run(run())
+
+
+def test_miss_then_hit_with_same_prefix(cache_enabled):
+    text, first = chat_turn("요즘 잠을 잘 못 자요")
+    assert text == fake_gemini_server.CHAT_RESPONSE
+    assert first["prompt_cache"] == "miss"
+    assert first["cached_tokens"] == 0
+    assert first["input_tokens"] > 0
+
+    text, second = chat_turn("회사 일 때문에 불안해요")
+    assert text == fake_gemini_server.CHAT_RESPONSE
+    assert second["prompt_cache"] == "hit"
+    assert 0 < second["cached_tokens"] <= second["input_tokens"]
+
+    stats = cache_enabled.snapshot()
+    assert stats["caches_created"] == 1
+    assert stats["cache_hits"] == 2
+
+
+def test_expired_cache_falls_back_and_is_recreated(cache_enabled):
+    chat_turn("요즘 잠을 잘 못 자요")
+
+    # 서버에서 캐시가 먼저 만료된 상황
+    with cache_enabled.lock:
+        cache_enabled.caches.clear()
+
+    text, info = chat_turn("회사 일 때문에 불안해요")
+    assert text == fake_gemini_server.CHAT_RESPONSE
+    assert info["prompt_cache"] is None
+    assert info["cached_tokens"] == 0
+    assert cache_enabled.snapshot()["cache_misses"] == 1
+
+    # 무효화된 항목은 다음 턴에 새로 생성
+    _, info = chat_turn("오늘은 조금 나아졌어요")
+    assert info["prompt_cache"] == "miss"
+    assert cache_enabled.snapshot()["caches_created"] == 2
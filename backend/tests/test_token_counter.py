@@ -0,0 +1,42 @@
+"""
+토큰 수 근사 오차 테스트 (benchmarks/fixtures/token_counts.jsonl의 Gemini count_tokens 기록 기준)
+
+실행:
+    cd backend && python -m pytest tests/test_token_counter.py -q
+
+기록 갱신/계수 적합:
+    python benchmarks/token_counter_calibration.py --collect
+"""
+import json
+from pathlib import Path
+
+import pytest
+
+from app.services.token_counter import count_tokens
+
+
+FIXTURE_PATH = Path(__file__).resolve().parent.parent / "benchmarks" / "fixtures" / "token_counts.jsonl"
+
+# 종류별 평균 상대 오차 한도, 텍스트별 최대 상대 오차 한도 (짧은 텍스트는 1~2토큰 차이도 크게 보임)
+MAX_MEAN_RELATIVE_ERROR = 0.15
+MAX_RELATIVE_ERROR = 0.35
+
+
+def load_recorded():
+    with FIXTURE_PATH.open(encoding="utf-8") as f:
+        samples = [json.loads(line) for line in f if line.strip()]
+    return [s for s in samples if s.get("gemini_tokens")]
+
+
+@pytest.mark.parametrize("kind", ["korean", "mixed", "english"])
+def test_count_tokens_within_error_bound(kind):
+    samples = [s for s in load_recorded() if s["kind"] == kind]
+    if not samples:
+        pytest.skip("gemini_tokens 미기록: python benchmarks/token_counter_calibration.py --collect")
+
+    errors = {
+        s["text"]: abs(count_tokens(s["text"]) - s["gemini_tokens"]) / s["gemini_tokens"] for s in samples
+    }
+    assert sum(errors.values()) / len(errors) <= MAX_MEAN_RELATIVE_ERROR
+    worst = max(errors, key=errors.get)
+    assert errors[worst] <= MAX_RELATIVE_ERROR, worst
@@ -0,0 +1,75 @@
+"""
+로컬 감정 분류기 가중치 학습
+
+라벨 데이터(benchmarks/fixtures/emotion_messages.jsonl)의 train 분할로 특징 가중치를 학습해
+app/services/emotion_classifier_weights.json에 저장합니다. 감정 사전(EMOTION_LEXICON)이나
+라벨 데이터를 바꾼 뒤 다시 실행하고, benchmarks/emotion_classifier_benchmark.py로 확인합니다.
+
+사용법:
+    python train_emotion_classifier.py
+    python train_emotion_classifier.py --data my_labels.jsonl --split all
+"""
+import argparse
+import json
+import sys
+from pathlib import Path
+
+backend_dir = Path(__file__).parent
+sys.path.insert(0, str(backend_dir))
+
+from app.services.emotion_classifier import (
+    DEFAULT_WEIGHTS_PATH,
+    EmotionClassifier,
+    load_labelled_messages,
+    train_weights,
+)
+
+
+DEFAULT_DATA_PATH = backend_dir / "benchmarks" / "fixtures" / "emotion_messages.jsonl"
+
+
+def accuracy(classifier: EmotionClassifier, samples) -> float:
+    if not samples:
+        return 0.0
+    correct = sum(1 for message, label in samples if classifier.predict(message).emotion == label)
+    return correct / len(samples)
+
+
+def train_emotion_classifier():
+    """가중치 학습 후 파일 저장"""
+    parser = argparse.ArgumentParser(description="로컬 감정 분류기 가중치 학습")
+    parser.add_argument("--data", type=Path, default=DEFAULT_DATA_PATH, help="라벨 데이터 (JSONL)")
+    parser.add_argument("--split", default="train", help="학습에 사용할 분할 (train | all)")
+    parser.add_argument("--output", type=Path, default=DEFAULT_WEIGHTS_PATH)
+    parser.add_argument("--epochs", type=int, default=300)
+    parser.add_argument("--learning-rate", type=float, default=0.5)
+    parser.add_argument("--l2", type=float, default=1e-3)
+    args = parser.parse_args()
+
+    samples = load_labelled_messages(args.data, None if args.split == "all" else args.split)
+    if not samples:
+        print(f"❌ 학습 데이터 없음: {args.data} ({args.split})")
+        return
+
+    print(f"Training on {len(samples)} messages...")
+    weights = train_weights(samples, epochs=args.epochs, learning_rate=args.learning_rate, l2=args.l2)
+
+    with open(args.output, "w", encoding="utf-8") as f:
+        json.dump(
+            {"version": 1, "trained_on": len(samples), "weights": weights},
+            f,
+            ensure_ascii=False,
+            separators=(",", ":"),
+            sort_keys=True
+        )
+
+    classifier = EmotionClassifier(weights)
+    test_samples = load_labelled_messages(args.data, "test")
+    print(f"✅ {len(weights)}개 특징 가중치 저장: {args.output}")
+    print(f"   학습 데이터 정확도: {accuracy(classifier, samples):.1%}")
+    if test_samples and args.split != "all":
+        print(f"   test 분할 정확도: {accuracy(classifier, test_samples):.1%}")
+
+
+if __name__ == "__main__":
+    train_emotion_classifier()